@@ -6,14 +6,35 @@ from typing import Dict
 
 from back.database import get_db
 from back.gestion.sincronizacion_orquestador import sincronizar_empresa_unificada
+from back.gestion.sync_nube_queue_manager import metricas_cola_sync_nube
+from back.gestion.sync_planificador import estado_planificador
 from back.modelos import Usuario
-from back.security import obtener_usuario_actual
+from back.security import es_admin, obtener_usuario_actual
 
 router = APIRouter(
     prefix="/sincronizar",
     tags=["Sincronización Masiva"]
 )
 
+@router.get("/cola/metricas", response_model=Dict)
+def api_metricas_cola_sync_nube(db: Session = Depends(get_db), current_user: Usuario = Depends(obtener_usuario_actual)):
+    """
+    Estado de la cola de escrituras pendientes a Google Sheets (sync_nube) de la empresa:
+    cantidad por estado, items listos, leases vencidos y antigüedad del más viejo.
+    """
+    return metricas_cola_sync_nube(db, current_user.id_empresa)
+
+
+@router.get("/planificador", response_model=Dict, dependencies=[Depends(es_admin)])
+def api_estado_planificador_sync(db: Session = Depends(get_db)):
+    """
+    Estado de la sincronización automática de todas las empresas: syncs en curso, cola
+    de vencidas esperando cupo, turnos programados e intervalo, duración y filas de la
+    última corrida de cada una.
+    """
+    return estado_planificador(db)
+
+
 @router.post("/clientes", response_model=Dict)
 def api_sincronizar_clientes(db: Session = Depends(get_db),current_user: Usuario = Depends(obtener_usuario_actual)):
     """
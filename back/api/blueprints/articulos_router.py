@@ -1,10 +1,12 @@
 # back/api/blueprints/articulos_router.py
 # VERSIÓN FINAL ADAPTADA A LOS NUEVOS SCHEMAS Y MANTENIENDO RUTAS ORIGINALES
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import ValidationError
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
 # --- Módulos del Proyecto ---
 from back.database import get_db
@@ -12,12 +14,16 @@ from back.security import es_gerente, obtener_usuario_actual
 from back.modelos import Usuario
 from back.modelos import ConfiguracionEmpresa
 import back.gestion.stock.articulos as articulos_manager
+from back.gestion.stock.cache_barcodes import obtener_cache_barcodes
+from back.gestion.stock.catalogo_cambios import version_catalogo
+from back.utils.respuesta_stream import en_sesion_propia, respuesta_stream
 # --- ¡IMPORTACIONES CORREGIDAS SEGÚN SU NUEVO ARCHIVO! ---
 from back.schemas.articulo_schemas import (
     ArticuloCreate, 
     ArticuloUpdate, 
     ArticuloResponse, # Lo mantenemos si alguna parte antigua aún lo usa
     ArticuloReadConCodigos, 
+    CatalogoCambiosResponse,
     CodigoBarrasCreate
 )
 from back.schemas.articulo_schemas import ArticuloRead
@@ -247,6 +253,14 @@ def api_eliminar_codigo(
     return RespuestaGenerica(status="success", message=f"Código '{codigo}' eliminado.")
 
 
+@router.get("/codigos/cache/metricas", summary="Métricas del cache de códigos de barras (este worker)", dependencies=[Depends(es_gerente)])
+def api_metricas_cache_barcodes(
+    current_user: Usuario = Depends(obtener_usuario_actual)
+):
+    cache = obtener_cache_barcodes()
+    return {"verificar_sec": cache.verificar_sec, "empresas": cache.metricas(current_user.id_empresa)}
+
+
 @router.get("/codigos/buscar/{codigo}", response_model=ArticuloReadConCodigos, summary="Obtener artículo por código de barras")
 def api_buscar_articulo_por_codigo(
     codigo: str,
@@ -269,3 +283,52 @@ def api_catalogo_version(
 ):
     cfg = db.get(ConfiguracionEmpresa, current_user.id_empresa)
     return {"version": (cfg.catalogo_version if cfg and hasattr(cfg, "catalogo_version") else 0)}
+
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag in etiquetas
+
+@router.get("/cambios", response_model=CatalogoCambiosResponse)
+def api_catalogo_cambios(
+    response: Response,
+    desde_version: int = Query(0, ge=0),
+    if_none_match: Optional[str] = Header(default=None),
+    current_user: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(get_db)
+):
+    """
+    Artículos creados/modificados y bajas desde `desde_version`. El ETag es la versión
+    actual: con If-None-Match igual a la que ya tiene el POS responde 304 sin cuerpo.
+    """
+    version = version_catalogo(db, current_user.id_empresa)
+    etag = f'"catalogo-{version}"'
+    cabeceras = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_coincide(if_none_match, etag):
+        return Response(status_code=304, headers=cabeceras)
+    cambios = articulos_manager.obtener_cambios_catalogo(db, current_user.id_empresa, desde_version, version)
+    response.headers.update(cabeceras)
+    return CatalogoCambiosResponse(
+        **{k: v for k, v in cambios.items() if k != "articulos"},
+        articulos=[ArticuloReadConCodigos.model_validate(articulos_manager.articulo_a_catalogo(a)) for a in cambios["articulos"]],
+    )
+
+@router.get("/exportar", summary="Catálogo completo en NDJSON (streaming, comprimido según Accept-Encoding)")
+def api_exportar_catalogo(
+    accept_encoding: Optional[str] = Header(default=None),
+    current_user: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(get_db)
+):
+    """
+    Una línea JSON por artículo activo, con la misma forma que /obtener_todos. Se
+    genera de a lotes: la memoria no crece con el catálogo y el primer byte sale enseguida.
+    """
+    id_empresa = current_user.id_empresa
+
+    def _lineas(sesion: Session):
+        for articulo in articulos_manager.iterar_catalogo(sesion, id_empresa):
+            yield json.dumps(articulo, ensure_ascii=False) + "\n"
+
+    return respuesta_stream(en_sesion_propia(db, _lineas), "application/x-ndjson", accept_encoding)
@@ -2,10 +2,11 @@
 
 from sqlite3.dbapi2 import Timestamp
 import logging
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
 from sqlmodel import Session, select
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import Response
 
 # --- Módulos del Proyecto ---
@@ -16,10 +17,21 @@ from back.modelos import ConfiguracionEmpresa, Empresa, Usuario, Tercero
 # Especialistas de la capa de gestión
 from back.gestion.caja import apertura_cierre, registro_caja, consultas_caja
 from back.gestion.facturacion_afip import generar_factura_para_venta
-from back.gestion.reportes import generador_comprobantes
+from back.gestion.facturacion_cola_manager import (
+    FACTURACION_ASINCRONA,
+    encolar_factura_venta,
+    estado_factura_venta,
+    metricas_cola_facturas,
+    payload_factura,
+    procesar_cola_facturas_en_background,
+    reintentar_factura_venta,
+)
+from back.gestion.reportes.generador_escpos import es_formato_escpos
+from back.gestion.reportes.servicio_render import renderizar_ticket_cierre
 from back.gestion.sync_nube_queue_manager import procesar_cola_sync_nube_en_background
 from back.gestion import perfil_operativo_manager
 from back.utils.permisos_empresa import validar_descuentos_permitidos, empresa_tiene_panel_estadisticas_caja
+from back.utils.paginacion_keyset import HEADER_SIGUIENTE_CURSOR, PAGINA_MAXIMA
 
 # Schemas necesarios para este router
 from back.schemas.caja_schemas import (
@@ -29,7 +41,7 @@ from back.schemas.caja_schemas import (
     PanelEstadisticasCajaResponse, EditarSesionCajaRequest, AnularMovimientoRequest,
     RevisarSesionCajaRequest, EstadisticasGeneralesResponse,
 )
-from back.schemas.comprobante_schemas import EmisorData, ReceptorData, tercero_a_receptor_data
+from back.schemas.comprobante_schemas import FORMATOS_TICKET, EmisorData, ReceptorData, tercero_a_receptor_data
 
 router = APIRouter(
     prefix="/caja",
@@ -243,27 +255,45 @@ def api_registrar_venta(
             print("ANTES DE LA FUNCION GENERAR FACTURA")
             # Llamar al especialista de facturación
             # Determinar formato basado en configuración de empresa o tipo de comprobante solicitado
-            formato_comprobante = "ticket" if (config_empresa_db.formato_comprobante_predeterminado == "ticket" or 
+            formato_predeterminado = (config_empresa_db.formato_comprobante_predeterminado or "").strip().lower()
+            formato_comprobante = "ticket" if (formato_predeterminado in FORMATOS_TICKET or
                                              req.tipo_comprobante_solicitado == "ticket") else "pdf"
-            
-            factura_generada = generar_factura_para_venta(
-                db=db,                      # <-- AÑADIDO: Pasa la sesión de la BD
-                venta_a_facturar=venta_creada, # <-- AÑADIDO: Pasa el objeto Venta que acabas de crear
-                total=req.total_venta, 
-                cliente_data=cliente_data_schema,
-                emisor_data=emisor_data_schema,
-                formato_comprobante=formato_comprobante,
-                tipo_solicitado=req.tipo_comprobante_solicitado
-            )
-            print("DESPUES DE LA FUNCION GENERAR FACTURA")
-            # === FIN DE LA LÓGICA DE FACTURACIÓN CORREGIDA ===
-            #IMPORTANTE, GUARDADA DENTRO DE FACTURACION.PY
-            #venta_creada.facturada = True
-            #venta_creada.datos_factura = factura_generada
-            #db.add(venta_creada)
-            #db.commit()
-            
-            resultado_afip = factura_generada
+
+            if FACTURACION_ASINCRONA:
+                # AFIP (bóveda + microservicio, hasta ~1 min con reintentos) no bloquea la venta:
+                # se encola y la emite el worker. Estado por GET /caja/ventas/{id}/factura
+                # o por el canal push (evento factura_estado).
+                encolar_factura_venta(
+                    db,
+                    id_empresa_actual,
+                    venta_creada.id,
+                    payload_factura(
+                        req.total_venta,
+                        emisor_data_schema,
+                        cliente_data_schema,
+                        formato_comprobante,
+                        req.tipo_comprobante_solicitado,
+                    ),
+                )
+                db.commit()
+                background_tasks.add_task(procesar_cola_facturas_en_background)
+                resultado_afip = {
+                    "estado": "PENDIENTE",
+                    "id_venta": venta_creada.id,
+                    "consultar_en": f"/caja/ventas/{venta_creada.id}/factura",
+                }
+            else:
+                factura_generada = generar_factura_para_venta(
+                    db=db,
+                    venta_a_facturar=venta_creada,
+                    total=req.total_venta,
+                    cliente_data=cliente_data_schema,
+                    emisor_data=emisor_data_schema,
+                    formato_comprobante=formato_comprobante,
+                    tipo_solicitado=req.tipo_comprobante_solicitado
+                )
+                print("DESPUES DE LA FUNCION GENERAR FACTURA")
+                resultado_afip = factura_generada
 
         except (ValueError, RuntimeError) as e:
             # Imprime el error completo en la consola para ver el detalle
@@ -294,6 +324,44 @@ def api_registrar_venta(
         }
     )
 
+@router.get("/ventas/{id_venta}/factura", response_model=Dict[str, Any], tags=["Caja - Operaciones"])
+def api_estado_factura_venta(
+    id_venta: int,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(obtener_usuario_actual),
+):
+    """
+    Estado de la factura AFIP de una venta: PENDIENTE, PROCESANDO, EXITOSO (con datos_factura) o FALLIDO.
+    El POS lo consulta después de registrar la venta (o escucha el evento factura_estado).
+    """
+    estado = estado_factura_venta(db, id_venta, current_user.id_empresa)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Venta no encontrada.")
+    return estado
+
+
+@router.post("/ventas/{id_venta}/factura/reintentar", response_model=RespuestaGenerica, tags=["Caja - Operaciones"])
+def api_reintentar_factura_venta(
+    id_venta: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(obtener_usuario_actual),
+):
+    item = reintentar_factura_venta(db, id_venta, current_user.id_empresa)
+    if item is None:
+        raise HTTPException(status_code=409, detail="La venta no tiene una factura fallida para reintentar.")
+    background_tasks.add_task(procesar_cola_facturas_en_background)
+    return RespuestaGenerica(status="success", message="Factura reencolada.", data={"id_venta": id_venta, "estado": "PENDIENTE"})
+
+
+@router.get("/facturacion/cola/metricas", response_model=Dict[str, Any], tags=["Caja - Supervisión"])
+def api_metricas_cola_facturas(
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(es_supervisor_caja),
+):
+    """Profundidad de la cola de facturas AFIP de la empresa, items listos y antigüedad del más viejo."""
+    return metricas_cola_facturas(db, current_user.id_empresa)
+
 @router.post("/ingresos", response_model=RespuestaGenerica, tags=["Caja - Operaciones"])
 def api_registrar_ingreso(
     req: MovimientoSimpleRequest,
@@ -457,24 +525,41 @@ def get_estadisticas_generales(
 
 @router.get(
     "/movimientos/todos", # Una ruta clara
-    summary="Obtiene el 'Libro Mayor' de todos los movimientos de caja de la empresa",
+    summary="Obtiene el 'Libro Mayor' de los movimientos de caja de la empresa, paginado por cursor",
     response_model=List[MovimientoContableResponse],
     tags=["Caja - Supervisión"]
 )
 def get_todos_los_movimientos(
+    response: Response,
+    limite: int = Query(200, ge=1, le=PAGINA_MAXIMA),
+    cursor: Optional[str] = Query(None, description=f"Valor del header {HEADER_SIGUIENTE_CURSOR} de la página anterior."),
+    desde: Optional[datetime] = Query(None, description="Desde (inclusive), UTC."),
+    hasta: Optional[datetime] = Query(None, description="Hasta (exclusive), UTC."),
+    tipo: Optional[List[str]] = Query(None, description="Uno o más tipos de movimiento (VENTA, INGRESO, EGRESO...)."),
+    id_usuario: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(obtener_usuario_actual)
 ):
     """
-    Endpoint maestro para el tablero de contabilidad. Devuelve una lista completa
-    de ingresos, egresos y ventas, con el estado de facturación incluido.
+    Endpoint maestro para el tablero de contabilidad: ingresos, egresos y ventas, con
+    el estado de facturación incluido, lo más reciente primero. Si hay más movimientos
+    la respuesta trae el header X-Siguiente-Cursor.
     """
-    # Llamamos a nuestra nueva y potente función de consulta
-    id_empresa = current_user.id_empresa
-    movimientos = consultas_caja.obtener_todos_los_movimientos_de_caja(
-        db=db,
-        usuario_actual=current_user
-    )
+    try:
+        movimientos, siguiente = consultas_caja.obtener_todos_los_movimientos_de_caja(
+            db=db,
+            usuario_actual=current_user,
+            limite=limite,
+            cursor=cursor,
+            desde=desde,
+            hasta=hasta,
+            tipos=tipo,
+            id_usuario=id_usuario,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
     return movimientos
 
 
@@ -482,31 +567,39 @@ def get_todos_los_movimientos(
     "/sesion/{id_sesion}/ticket-cierre-detallado",
     summary="Generar PDF del Cierre de Lote Detallado"
 )
-def api_generar_ticket_cierre_detallado(
+async def api_generar_ticket_cierre_detallado(
     id_sesion: int,
+    formato: Optional[str] = Query(None, description="'pdf' (por defecto) o 'escpos' para los bytes RAW de la térmica."),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(obtener_usuario_actual)
 ):
     """
     Genera y devuelve en formato PDF un ticket de cierre de lote para una sesión
     de caja específica, incluyendo el desglose detallado de todos los
-    ingresos y egresos.
+    ingresos y egresos. Con `formato=escpos` devuelve los bytes RAW.
     """
 
     try:
         # 1. LLAMA AL MANAGER PARA OBTENER LOS DATOS
         # Llama a la función que ya creamos en 'consultas_caja.py'.
-        # Esta función hace todo el trabajo de base de datos y seguridad.
-        datos_para_plantilla = consultas_caja.obtener_datos_para_ticket_cierre_detallado(
-            db=db, 
-            id_sesion=id_sesion, 
+        # Esta función hace todo el trabajo de base de datos y seguridad (en el threadpool).
+        datos_para_plantilla = await run_in_threadpool(
+            consultas_caja.obtener_datos_para_ticket_cierre_detallado,
+            db=db,
+            id_sesion=id_sesion,
             usuario_actual=current_user
         )
         
         # 2. LLAMA AL GENERADOR DE PDFS
-        # Le pasa los datos a una función en tu generador de comprobantes
-        # que sabe cómo usar la plantilla HTML 'cierre_lote_detallado.html'.
-        pdf_bytes = generador_comprobantes.generar_ticket_cierre_pdf(datos_para_plantilla)
+        # La plantilla 'cierre_lote_detallado.html' se renderiza en el pool de procesos
+        # de servicio_render, sin ocupar un hilo del threadpool. ESC/POS se arma en el acto.
+        pdf_bytes = await renderizar_ticket_cierre(datos_para_plantilla, current_user.id_empresa, formato)
+        if es_formato_escpos(formato):
+            return Response(
+                content=pdf_bytes,
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'inline; filename="cierre_detallado_{id_sesion}.bin"'}
+            )
         
         # 3. DEVUELVE EL ARCHIVO PDF
         # Crea una respuesta HTTP con el contenido del PDF y las cabeceras correctas.
@@ -1,8 +1,9 @@
 # back/api/blueprints/clientes_router.py
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session
-from typing import List
+from typing import List, Optional
 
 from back.gestion.contabilidad.clientes_contabilidad import manager as clientes_manager
 from back.database import get_db
@@ -10,6 +11,7 @@ from back.modelos import Usuario
 from back.schemas.cliente_schemas import ClienteCreate, ClienteUpdate, ClienteResponse
 from back.schemas.caja_schemas import RespuestaGenerica
 from back.security import obtener_usuario_actual
+from back.utils.paginacion_keyset import HEADER_SIGUIENTE_CURSOR, PAGINA_MAXIMA
 # Importaremos la seguridad cuando esté lista
 # from back.security import es_cajero
 
@@ -30,18 +32,30 @@ def api_crear_cliente(req: ClienteCreate, db: Session = Depends(get_db),current_
 
 
 @router.get("/obtener-todos", response_model=List[ClienteResponse])
-def api_obtener_clientes(db: Session = Depends(get_db),current_user: Usuario = Depends(obtener_usuario_actual)):
+def api_obtener_clientes(
+    response: Response,
+    limite: int = Query(500, ge=1, le=PAGINA_MAXIMA),
+    cursor: Optional[str] = Query(None, description=f"Valor del header {HEADER_SIGUIENTE_CURSOR} de la página anterior."),
+    alta_desde: Optional[datetime] = Query(None),
+    alta_hasta: Optional[datetime] = Query(None),
+    activo: Optional[bool] = Query(None),
+    busqueda: Optional[str] = Query(None, description="Prefijo de nombre, CUIT o identificación fiscal."),
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(obtener_usuario_actual),
+):
     """
-    Obtiene la lista COMPLETA de todos los clientes activos, sin paginación.
-    
-    ADVERTENCIA: Si la base de datos tiene miles de clientes, esta
-    operación puede ser lenta y consumir mucha memoria.
+    Clientes por nombre, paginados por cursor. Si hay más, la respuesta trae el
+    header X-Siguiente-Cursor para pedir la página siguiente.
     """
-    # La llamada a la lógica de negocio ahora es más simple, sin parámetros.
-    id_empresa = current_user.id_empresa
-    lista_clientes_db = clientes_manager.obtener_todos_los_clientes(id_empresa,db)
-    
-    return lista_clientes_db
+    try:
+        clientes, siguiente = clientes_manager.listar_clientes(
+            current_user.id_empresa, db, limite, cursor, alta_desde, alta_hasta, activo, busqueda
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
+    return clientes
 
 
 @router.get("/obtener/{id_cliente}", response_model=ClienteResponse)
@@ -2,22 +2,31 @@
 # VERSIÓN FINAL, LIMPIA Y COMPLETA
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import Response
 from sqlmodel import Session # <-- 1. IMPORTACIÓN AÑADIDA
 
 # --- Módulos del Proyecto (Limpios y Ordenados) ---
 # Dependencias de FastAPI y Seguridad
 from back.database import get_db
-from back.security import obtener_usuario_actual
+from back.security import es_gerente, obtener_usuario_actual
 from back.modelos import Usuario, ConfiguracionEmpresa # <-- 2. IMPORTACIÓN AÑADIDA
 
 # Especialistas de la capa de Gestión
-from back.gestion.reportes.generador_comprobantes import generar_comprobante_stateless
+from back.gestion.reportes.cache_comprobantes import obtener_cache_comprobantes
+from back.gestion.reportes.servicio_render import (
+    ColaRenderLlena,
+    TimeoutRender,
+    obtener_servicio_render,
+    renderizar_comprobante,
+)
+from back.gestion.reportes.generador_escpos import es_formato_escpos
 from back.gestion.reportes.generador_texto_plano import es_formato_texto_plano
 from back.gestion import facturacion_lotes_manager # <-- Importamos el módulo completo
 from back.gestion import facturacion_afip
+from back.gestion import comprobantes_emitidos_manager
 from back.schemas.venta_ciclo_de_vida_schemas import VentaResponse # Reutilizamos el schema de respuesta
 from back.gestion.reportes.ciclo_vida_comp import agrupar_comprobantes_en_uno_nuevo
 
@@ -65,6 +74,118 @@ def _enriquecer_emisor_desde_config(db: Session, id_empresa: int, emisor: Emisor
     if not emisor.inicio_actividades and config.inicio_actividades:
         emisor.inicio_actividades = config.inicio_actividades
 
+def _preparar_comprobante(
+    req: GenerarComprobanteRequest,
+    db: Session,
+    current_user: Usuario,
+    idempotency_key: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Completa el emisor y, si corresponde, obtiene el CAE de AFIP (bloqueante: corre en el threadpool).
+    Con `Idempotency-Key` el CAE queda guardado antes del render: un reintento con la misma
+    clave lo reutiliza en lugar de facturar otra vez. Devuelve esa clave (None si no hubo
+    AFIP o el cliente no mandó una).
+    """
+    if current_user.id_empresa:
+        _enriquecer_emisor_desde_config(db, current_user.id_empresa, req.emisor)
+
+    # Solo procesar por AFIP si:
+    # 1. Es una factura o nota de crédito (los otros tipos como presupuesto, remito, etc. no se procesan)
+    # 2. No tiene datos de AFIP ya cargados
+    # Las facturas y notas de crédito siempre se procesan por AFIP, incluso para consumidor final
+    es_factura = req.tipo.lower() == "factura"
+    es_nota_credito = req.tipo.lower() in ["nota_credito", "nota de credito", "nc"]
+    necesita_afip = ((es_factura or es_nota_credito) and req.transaccion.afip is None)
+
+    if necesita_afip:
+        if es_factura:
+            print("Procesando factura por AFIP...")
+        else:
+            print("Procesando nota de crédito por AFIP...")
+
+        # Importar las funciones reales de facturación
+        from back.gestion.facturacion_afip import generar_factura_para_venta, generar_nota_credito_para_venta
+        from back.schemas.comprobante_schemas import AfipData
+        from back.modelos import Venta
+        from datetime import datetime
+
+        clave = comprobantes_emitidos_manager.clave_emision(idempotency_key)
+        previo = comprobantes_emitidos_manager.buscar_emision(db, current_user.id_empresa, clave) if clave else None
+        if previo is not None:
+            print(f"Reintento de un comprobante ya emitido: se reutiliza el CAE {previo.get('cae')}")
+            req.transaccion.afip = AfipData(**previo)
+            return clave
+
+        try:
+            if es_factura:
+                # Crear una venta temporal para AFIP (sin guardar en DB aún)
+                venta_temporal = Venta(
+                    total=req.transaccion.total,
+                    id_empresa=current_user.id_empresa
+                )
+
+                # Llamar a la función real de AFIP para facturas
+                resultado_afip = generar_factura_para_venta(
+                    db=db,
+                    venta_a_facturar=venta_temporal,
+                    total=req.transaccion.total,
+                    cliente_data=req.receptor,
+                    emisor_data=req.emisor,
+                    formato_comprobante=req.formato,
+                    tipo_solicitado=req.tipo
+                )
+                tipo_comprobante_nombre = "FACTURA"
+
+            elif es_nota_credito:
+                # Para nota de crédito necesitamos el comprobante asociado
+                comprobante_asociado = req.comprobante_asociado or {
+                    "tipo_afip": 1,  # Factura A por defecto
+                    "punto_venta": req.emisor.punto_venta,
+                    "numero_comprobante": 1  # Valor por defecto si no se especifica
+                }
+
+                # Llamar a la función real de AFIP para notas de crédito
+                resultado_afip = generar_nota_credito_para_venta(
+                    total=req.transaccion.total,
+                    cliente_data=req.receptor,
+                    emisor_data=req.emisor,
+                    comprobante_asociado=comprobante_asociado
+                )
+                tipo_comprobante_nombre = "NOTA DE CREDITO"
+
+            # Debug: Log de la respuesta de AFIP
+            print(f"DEBUG - Respuesta de AFIP: {resultado_afip}")
+
+            # Crear el objeto AfipData con los datos reales de AFIP con validaciones
+            req.transaccion.afip = AfipData(
+                fecha_emision=resultado_afip.get("fecha_comprobante") or datetime.now().strftime("%Y-%m-%d"),
+                tipo_comprobante_afip=resultado_afip.get("tipo_afip") or 1,
+                tipo_comprobante_nombre=tipo_comprobante_nombre,
+                numero_comprobante=resultado_afip.get("numero_comprobante") or 0,
+                codigo_tipo_doc_receptor=resultado_afip.get("tipo_doc_receptor") or 99,
+                cae=resultado_afip.get("cae") or "SIN_CAE",
+                fecha_vencimiento_cae=resultado_afip.get("vencimiento_cae"),
+                qr_base64=resultado_afip.get("qr_base64"),
+                total=resultado_afip.get("total") or resultado_afip.get("importe_total"),
+                neto=resultado_afip.get("neto"),
+                iva=resultado_afip.get("iva"),
+            )
+            print(f"Procesamiento real por AFIP completado. CAE: {resultado_afip.get('cae')}")
+
+        except Exception as e:
+            print(f"Error en procesamiento AFIP: {e}")
+            raise HTTPException(status_code=500, detail=f"Error en procesamiento AFIP: {str(e)}")
+
+        if clave:
+            comprobantes_emitidos_manager.guardar_emision(
+                db, current_user.id_empresa, clave, req.transaccion.afip.model_dump(mode="json")
+            )
+        return clave
+    else:
+        print(f"Comprobante tipo '{req.tipo}' no requiere procesamiento AFIP")
+    return None
+
+
 @router.post("/generar", summary="Generar un comprobante (factura, remito, etc.) on-demand",
     responses={
         200: {
@@ -72,116 +193,53 @@ def _enriquecer_emisor_desde_config(db: Session, id_empresa: int, emisor: Emisor
                 "application/pdf": {},
                 "text/html": {},
                 "text/plain": {},
+                "application/octet-stream": {},
             },
-            "description": "PDF (Ticket/PDF) o HTML monospace+QR (formato Texto) para térmica.",
+            "description": "PDF (Ticket/PDF), HTML monospace+QR (formato Texto) o comandos ESC/POS (formato escpos) para térmica.",
         },
         404: {"description": "Plantilla no encontrada."},
-        503: {"description": "Servicio de AFIP no disponible."}
+        503: {"description": "Servicio de AFIP no disponible o cola de impresión llena."},
+        504: {"description": "El render del comprobante excedió el tiempo máximo."}
     }
 )
-def api_generar_comprobante(
+async def api_generar_comprobante(
     req: GenerarComprobanteRequest,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(obtener_usuario_actual)
+    current_user: Usuario = Depends(obtener_usuario_actual),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
     """
     Recibe todos los datos necesarios en el cuerpo de la petición y genera
     un comprobante en PDF (factura, remito, presupuesto o recibo).
     Si es una factura y no tiene datos de AFIP, la procesa primero por AFIP.
+    Si el render falla después de obtener el CAE, el reintento con el mismo
+    `Idempotency-Key` reutiliza ese CAE en lugar de emitir otra factura.
     """
     print("entramos a generar comprobante")
     try:
         print("entramos al try de generar comprobante")
-        if current_user.id_empresa:
-            _enriquecer_emisor_desde_config(db, current_user.id_empresa, req.emisor)
-        
-        # Solo procesar por AFIP si:
-        # 1. Es una factura o nota de crédito (los otros tipos como presupuesto, remito, etc. no se procesan)
-        # 2. No tiene datos de AFIP ya cargados
-        # Las facturas y notas de crédito siempre se procesan por AFIP, incluso para consumidor final
-        es_factura = req.tipo.lower() == "factura"
-        es_nota_credito = req.tipo.lower() in ["nota_credito", "nota de credito", "nc"]
-        necesita_afip = ((es_factura or es_nota_credito) and req.transaccion.afip is None)
-        
-        if necesita_afip:
-            if es_factura:
-                print("Procesando factura por AFIP...")
-            else:
-                print("Procesando nota de crédito por AFIP...")
-            
-            # Importar las funciones reales de facturación
-            from back.gestion.facturacion_afip import generar_factura_para_venta, generar_nota_credito_para_venta
-            from back.schemas.comprobante_schemas import AfipData
-            from back.modelos import Venta
-            from datetime import datetime
-            
+        if not es_formato_escpos(req.formato):
+            # Sin lugar en la cola de render, el 503 sale antes de pedir el CAE.
+            obtener_servicio_render().verificar_capacidad(current_user.id_empresa)
+        clave_emision = await run_in_threadpool(_preparar_comprobante, req, db, current_user, idempotency_key)
+
+        contenido = await renderizar_comprobante(req, current_user.id_empresa)
+        print("salimos de genrerar comprobantes stateless")
+        if clave_emision:
             try:
-                if es_factura:
-                    # Crear una venta temporal para AFIP (sin guardar en DB aún)
-                    venta_temporal = Venta(
-                        total=req.transaccion.total,
-                        id_empresa=current_user.id_empresa
-                    )
-                    
-                    # Llamar a la función real de AFIP para facturas
-                    resultado_afip = generar_factura_para_venta(
-                        db=db,
-                        venta_a_facturar=venta_temporal,
-                        total=req.transaccion.total,
-                        cliente_data=req.receptor,
-                        emisor_data=req.emisor,
-                        formato_comprobante=req.formato,
-                        tipo_solicitado=req.tipo
-                    )
-                    tipo_comprobante_nombre = "FACTURA"
-                    
-                elif es_nota_credito:
-                    # Para nota de crédito necesitamos el comprobante asociado
-                    comprobante_asociado = req.comprobante_asociado or {
-                        "tipo_afip": 1,  # Factura A por defecto
-                        "punto_venta": req.emisor.punto_venta,
-                        "numero_comprobante": 1  # Valor por defecto si no se especifica
-                    }
-                    
-                    # Llamar a la función real de AFIP para notas de crédito
-                    resultado_afip = generar_nota_credito_para_venta(
-                        total=req.transaccion.total,
-                        cliente_data=req.receptor,
-                        emisor_data=req.emisor,
-                        comprobante_asociado=comprobante_asociado
-                    )
-                    tipo_comprobante_nombre = "NOTA DE CREDITO"
-                
-                # Debug: Log de la respuesta de AFIP
-                print(f"DEBUG - Respuesta de AFIP: {resultado_afip}")
-                
-                # Crear el objeto AfipData con los datos reales de AFIP con validaciones
-                req.transaccion.afip = AfipData(
-                    fecha_emision=resultado_afip.get("fecha_comprobante") or datetime.now().strftime("%Y-%m-%d"),
-                    tipo_comprobante_afip=resultado_afip.get("tipo_afip") or 1,
-                    tipo_comprobante_nombre=tipo_comprobante_nombre,
-                    numero_comprobante=resultado_afip.get("numero_comprobante") or 0,
-                    codigo_tipo_doc_receptor=resultado_afip.get("tipo_doc_receptor") or 99,
-                    cae=resultado_afip.get("cae") or "SIN_CAE",
-                    fecha_vencimiento_cae=resultado_afip.get("vencimiento_cae"),
-                    qr_base64=resultado_afip.get("qr_base64"),
-                    total=resultado_afip.get("total") or resultado_afip.get("importe_total"),
-                    neto=resultado_afip.get("neto"),
-                    iva=resultado_afip.get("iva"),
+                await run_in_threadpool(
+                    comprobantes_emitidos_manager.confirmar_entrega, db, current_user.id_empresa, clave_emision
                 )
-                print(f"Procesamiento real por AFIP completado. CAE: {resultado_afip.get('cae')}")
-                
             except Exception as e:
-                print(f"Error en procesamiento AFIP: {e}")
-                raise HTTPException(status_code=500, detail=f"Error en procesamiento AFIP: {str(e)}")
-        else:
-            print(f"Comprobante tipo '{req.tipo}' no requiere procesamiento AFIP")
-        
-        contenido = generar_comprobante_stateless(req)
-        print("salimos de genrerar comprobantes stateless")
+                # El comprobante ya está renderizado: no se pierde por no poder marcarlo.
+                print(f"ADVERTENCIA: no se pudo confirmar la entrega de {clave_emision}: {e}")
 
-        extension = "html" if es_formato_texto_plano(req.formato) else "pdf"
-        media_type = "text/html; charset=utf-8" if extension == "html" else "application/pdf"
+        if es_formato_escpos(req.formato):
+            extension, media_type = "bin", "application/octet-stream"
+        elif es_formato_texto_plano(req.formato):
+            extension, media_type = "html", "text/html; charset=utf-8"
+        else:
+            extension, media_type = "pdf", "application/pdf"
         filename = f"{req.tipo}_{req.emisor.punto_venta}_{req.receptor.cuit_o_dni or 'consumidor'}.{extension}"
         print("estamos por hacer la response")
         return Response(
@@ -192,15 +250,21 @@ def api_generar_comprobante(
     except ValueError as e:
         # Errores de negocio (ej. plantilla no existe)
         raise HTTPException(status_code=404, detail=str(e))
-    except HTTPException as e:
+    except (HTTPException, ColaRenderLlena, TimeoutRender):
         # Re-lanzamos excepciones HTTP que vienen de capas inferiores (ej. 503 de AFIP)
-        raise e
+        # y las del pool de render, que main.py responde como 503/504.
+        raise
     except Exception as e:
         # Capturamos cualquier otro error inesperado
         print(f"ERROR INESPERADO al generar comprobante: {e}")
         raise HTTPException(status_code=500, detail="Error interno al generar el comprobante.")
     
 
+@router.get("/cache/metricas", summary="Métricas de la caché de comprobantes generados (este worker)", dependencies=[Depends(es_gerente)])
+def api_metricas_cache_comprobantes():
+    return obtener_cache_comprobantes().metricas()
+
+
 @router.post("/facturar-lote", summary="Factura un lote de ventas no facturadas a un único cliente",
 response_model=FacturarLoteResponse)
 async def api_facturar_lote_de_ventas(
@@ -14,6 +14,7 @@ from back.schemas.caja_schemas import RespuestaGenerica
 # Lógica de negocio y Schemas
 from back.gestion import configuracion_manager
 from back.gestion import perfil_operativo_manager
+from back.gestion.configuracion_cache import obtener_cache_configuracion
 from back.schemas.configuracion_schemas import ConfiguracionResponse, ConfiguracionUpdate, RecargoData, RecargoUpdate, ColorResponse, ColorUpdateRequest, ConfiguracionUpdate 
 from back.schemas.configuracion_resuelta_schemas import ConfiguracionResponseExtendida
 from pydantic import BaseModel
@@ -40,22 +41,24 @@ def _resolver_archivo_logo(ruta: str | None) -> Path | None:
     return None
 
 
-def _configuracion_respuesta(config, db: Session) -> ConfiguracionResponse:
+def _configuracion_respuesta(config, db: Session, facturacion_afip: bool | None = None) -> ConfiguracionResponse:
     """Arma la respuesta y evita rutas de logo huérfanas en BD (archivo no en disco)."""
     respuesta = ConfiguracionResponse.model_validate(config)
     ruta = respuesta.ruta_logo
     if ruta and "logos_empresas" in ruta:
         if _resolver_archivo_logo(ruta) is None:
             respuesta = respuesta.model_copy(update={"ruta_logo": None})
-    facturacion_afip = configuracion_manager.empresa_tiene_facturacion_afip_habilitada(
-        db, config.id_empresa
-    )
+    if facturacion_afip is None:
+        facturacion_afip = configuracion_manager.empresa_tiene_facturacion_afip_habilitada(
+            db, config.id_empresa
+        )
     return respuesta.model_copy(update={"facturacion_afip_habilitada": facturacion_afip})
 
 
 def _configuracion_respuesta_extendida(config, db: Session) -> ConfiguracionResponseExtendida:
-    base = _configuracion_respuesta(config, db)
     resuelto = perfil_operativo_manager.resolver_configuracion_empresa(db, config.id_empresa)
+    # La vista resuelta (cacheada) ya consultó la bóveda: no repetir la llamada.
+    base = _configuracion_respuesta(config, db, resuelto.perfil_operativo.facturacion_afip_habilitada)
     return ConfiguracionResponseExtendida(
         **base.model_dump(),
         tipo_esquema=resuelto.tipo_esquema,
@@ -72,6 +75,16 @@ def verificar_permiso_admin(usuario: Usuario):
         raise HTTPException(status_code=403, detail="Permiso denegado. Se requiere rol de Administrador.")
 
 
+@router.get("/cache/metricas")
+def obtener_metricas_cache_configuracion(
+    current_user: Usuario = Depends(obtener_usuario_actual)
+):
+    """Hit rate y consultas SQL ahorradas por endpoint de la caché de configuración resuelta (este worker)."""
+    verificar_permiso_admin(current_user)
+    cache = obtener_cache_configuracion()
+    return {"ttl_sec": cache.ttl_sec, "endpoints": cache.metricas()}
+
+
 @router.get("/mi-empresa", response_model=ConfiguracionResponseExtendida)
 def obtener_mi_configuracion(
     db: Session = Depends(get_db),
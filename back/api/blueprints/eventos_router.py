@@ -0,0 +1,161 @@
+# back/api/blueprints/eventos_router.py
+# Canal push (Server-Sent Events) por empresa: escáner, comandas y estados de cocina.
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from back.gestion.eventos_tiempo_real import obtener_diario_eventos
+from back.gestion.scanner_bus import obtener_scanner_bus
+from back.security import (
+    CREDENTIALS_EXCEPTION,
+    EVENTOS_TICKET_TTL_SEC,
+    crear_ticket_eventos,
+    decodificar_ticket_eventos,
+    decodificar_token,
+    obtener_id_empresa_desde_token,
+)
+
+router = APIRouter(
+    prefix="/eventos",
+    tags=["Eventos en tiempo real"]
+)
+
+KEEPALIVE_SEC = 15
+
+
+def _id_empresa_desde_request(
+    request: Request,
+    ticket: Optional[str] = Query(None, description="Ticket de POST /eventos/ticket; EventSource no permite enviar headers"),
+) -> int:
+    """
+    Misma auth liviana que el poll del escáner (solo JWT, sin sesión MySQL). El JWT de
+    sesión solo se acepta en el header; en la URL va el ticket corto de /eventos/ticket.
+    """
+    auth = request.headers.get("Authorization", "")
+    if auth.lower().startswith("bearer "):
+        payload = decodificar_token(auth[7:].strip())
+    elif ticket:
+        payload = decodificar_ticket_eventos(ticket)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Falta el token o el ticket del stream",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    raw_id = payload.get("id_empresa")
+    if raw_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token sin id_empresa. Cierre sesión e ingrese nuevamente.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return int(raw_id)
+    except (TypeError, ValueError) as exc:
+        raise CREDENTIALS_EXCEPTION from exc
+
+
+def _sse(evento: str, datos: dict, id_evento: Optional[str] = None) -> str:
+    lineas = []
+    if id_evento:
+        lineas.append(f"id: {id_evento}")
+    lineas.append(f"event: {evento}")
+    lineas.append(f"data: {json.dumps(datos, default=str)}")
+    return "\n".join(lineas) + "\n\n"
+
+
+async def _stream_empresa(request: Request, id_empresa: int, ultimo_id: Optional[str], incluir_scanner: bool):
+    diario = obtener_diario_eventos()
+    bus = obtener_scanner_bus()
+
+    yield "retry: 3000\n\n"
+    if ultimo_id:
+        eventos, resync = await diario.leer_desde_async(id_empresa, ultimo_id)
+        if resync:
+            ultimo_id = await diario.ultimo_id_async(id_empresa)
+            yield _sse("resync", {"motivo": "eventos fuera del buffer"}, ultimo_id)
+        for evento in eventos:
+            ultimo_id = evento["id"]
+            yield _sse(evento["tipo"], evento["datos"], evento["id"])
+    else:
+        ultimo_id = await diario.ultimo_id_async(id_empresa)
+        yield _sse("conectado", {"id_empresa": id_empresa}, ultimo_id)
+
+    tarea_diario: Optional[asyncio.Task] = None
+    tarea_scanner: Optional[asyncio.Task] = None
+    try:
+        while not await request.is_disconnected():
+            if tarea_diario is None:
+                tarea_diario = asyncio.create_task(diario.esperar(id_empresa, ultimo_id, KEEPALIVE_SEC))
+            if incluir_scanner and tarea_scanner is None:
+                tarea_scanner = asyncio.create_task(bus.esperar(id_empresa, KEEPALIVE_SEC))
+            pendientes = [t for t in (tarea_diario, tarea_scanner) if t is not None]
+            hechas, _ = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+
+            if tarea_scanner in hechas:
+                evento_scanner = tarea_scanner.result()
+                tarea_scanner = None
+                if evento_scanner is not None:
+                    # Los eventos del escáner se consumen una sola vez: no llevan id reanudable.
+                    yield _sse("scanner", evento_scanner)
+
+            if tarea_diario in hechas:
+                eventos, resync = tarea_diario.result()
+                tarea_diario = None
+                if resync:
+                    ultimo_id = await diario.ultimo_id_async(id_empresa)
+                    yield _sse("resync", {"motivo": "eventos fuera del buffer"}, ultimo_id)
+                for evento in eventos:
+                    ultimo_id = evento["id"]
+                    yield _sse(evento["tipo"], evento["datos"], evento["id"])
+                if not eventos and not resync:
+                    yield ": ping\n\n"
+    finally:
+        for tarea in (tarea_diario, tarea_scanner):
+            if tarea is not None and not tarea.done():
+                tarea.cancel()
+
+
+@router.post("/ticket")
+def ticket_stream(id_empresa: int = Depends(obtener_id_empresa_desde_token)):
+    """
+    Ticket para `GET /eventos/stream?ticket=...`. Sirve solo para abrir el stream y vence
+    a los `EVENTOS_TICKET_TTL_SEC`; si EventSource no logra reconectar, pedir otro.
+    """
+    return {"ticket": crear_ticket_eventos(id_empresa), "expira_en_sec": EVENTOS_TICKET_TTL_SEC}
+
+
+@router.get("/stream")
+async def stream_eventos(
+    request: Request,
+    ultimo_id: Optional[str] = Query(None, description="Reanudar desde este id (alternativa a Last-Event-ID)"),
+    incluir_scanner: bool = Query(
+        False,
+        description="Consumir también los eventos del escáner/balanza (solo si nadie más hace poll de /scanner/evento/poll)",
+    ),
+    id_empresa: int = Depends(_id_empresa_desde_request),
+):
+    """
+    Stream SSE de la empresa del token. Tipos de evento: `conectado`, `scanner`,
+    `comanda_nueva`, `comandas_impresas`, `cocina_estado`, `consumo_estado`,
+    `mesas_unidas` y `resync` (recargar por REST). Al reconectar, EventSource manda
+    `Last-Event-ID` solo y se reciben los eventos perdidos.
+
+    Los eventos del escáner se entregan una sola vez: con `incluir_scanner=true` el
+    stream compite con `/scanner/evento/poll`, por eso viene apagado.
+    """
+    desde = request.headers.get("Last-Event-ID") or ultimo_id
+    return StreamingResponse(
+        _stream_empresa(request, id_empresa, desde, incluir_scanner),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            # Nginx: no bufferear el stream.
+            "X-Accel-Buffering": "no",
+        },
+    )
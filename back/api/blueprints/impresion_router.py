@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import Response
 from back.database import get_db
-from back.security import obtener_usuario_actual
+from back.security import PrincipalAutenticado, es_gerente, obtener_principal_actual, obtener_usuario_actual
 from back.modelos import Usuario
 from back.gestion.impresion_manager import abrir_sesion_impresion, cerrar_sesion_impresion, obtener_sesion_abierta
 from back.gestion.reportes.adapters_mesas import construir_request_comanda, construir_request_ticket_mesa
-from back.gestion.reportes.generador_comprobantes import generar_comprobante_stateless
+from back.gestion.reportes.servicio_render import obtener_servicio_render, renderizar_comprobante
+from back.schemas.configuracion_schemas import FormatoComprobanteEnum
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
 from back.modelos import ConsumoMesa, ConsumoMesaDetalle
 from sqlmodel import select
 from back.schemas.mesa_schemas import ComandaPdfRequest
@@ -15,7 +20,7 @@ router = APIRouter(prefix="/impresion", tags=["Impresion"])
 
 @router.get("/estado")
 def api_estado_impresion(
-    current_user: Usuario = Depends(obtener_usuario_actual),
+    current_user: PrincipalAutenticado = Depends(obtener_principal_actual),
     db: Session = Depends(get_db)
 ):
     sesion = obtener_sesion_abierta(db, current_user.id_empresa)
@@ -39,12 +44,7 @@ def api_cerrar_sesion_impresion(
         raise HTTPException(status_code=404, detail="No hay sesion de impresion abierta")
     return {"mensaje": "Sesion de impresion cerrada", "sesion_id": sesion.id}
 
-@router.post("/comanda/pdf")
-def api_generar_comanda_pdf(
-    req: ComandaPdfRequest,
-    current_user: Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(get_db)
-):
+def _request_comanda(req: ComandaPdfRequest, current_user: Usuario, db: Session, formato: Optional[str] = None) -> GenerarComprobanteRequest:
     if not obtener_sesion_abierta(db, current_user.id_empresa):
         raise HTTPException(status_code=403, detail="Debe abrir la sesión de impresión")
     detalles = []
@@ -66,21 +66,47 @@ def api_generar_comanda_pdf(
             detalles = [d for d in detalles if not d.impreso]
     else:
         raise HTTPException(status_code=400, detail="Faltan parámetros para generar comanda")
-    req = construir_request_comanda(db, detalles, current_user.id_empresa)
-    pdf = generar_comprobante_stateless(req)
-    return Response(content=pdf, media_type="application/pdf", headers={"Content-Disposition": 'inline; filename="comanda.pdf"'})
+    return construir_request_comanda(db, detalles, current_user.id_empresa, formato)
 
-@router.post("/mesa/pdf")
-def api_generar_mesa_pdf(
-    id_consumo_mesa: int,
-    current_user: Usuario = Depends(obtener_usuario_actual),
-    db: Session = Depends(get_db)
-):
+def _request_mesa(id_consumo_mesa: int, current_user: Usuario, db: Session, formato: Optional[str] = None) -> GenerarComprobanteRequest:
     if not obtener_sesion_abierta(db, current_user.id_empresa):
         raise HTTPException(status_code=403, detail="Debe abrir la sesión de impresión")
     consumo = db.exec(select(ConsumoMesa).where(ConsumoMesa.id == id_consumo_mesa, ConsumoMesa.id_empresa == current_user.id_empresa)).first()
     if not consumo:
         raise HTTPException(status_code=404, detail="Consumo no encontrado")
-    req = construir_request_ticket_mesa(db, consumo)
-    pdf = generar_comprobante_stateless(req)
-    return Response(content=pdf, media_type="application/pdf", headers={"Content-Disposition": 'inline; filename="ticket_mesa.pdf"'})
+    return construir_request_ticket_mesa(db, consumo, formato)
+
+def _respuesta_ticket(contenido: bytes, req: GenerarComprobanteRequest, nombre: str) -> Response:
+    if req.formato == FormatoComprobanteEnum.escpos.value:
+        return Response(content=contenido, media_type="application/octet-stream", headers={"Content-Disposition": f'inline; filename="{nombre}.bin"'})
+    return Response(content=contenido, media_type="application/pdf", headers={"Content-Disposition": f'inline; filename="{nombre}.pdf"'})
+
+# Las consultas van al threadpool; el PDF se renderiza en el pool de procesos (servicio_render).
+# Con `formato=escpos` la respuesta son los bytes RAW para la comandera; si no, ticket PDF.
+_FORMATO_COMANDERA = Query(None, description="'escpos' para los bytes RAW de la comandera; por defecto ticket PDF.")
+
+@router.post("/comanda/pdf")
+async def api_generar_comanda_pdf(
+    req: ComandaPdfRequest,
+    formato: Optional[str] = _FORMATO_COMANDERA,
+    current_user: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(get_db)
+):
+    req_comprobante = await run_in_threadpool(_request_comanda, req, current_user, db, formato)
+    contenido = await renderizar_comprobante(req_comprobante, current_user.id_empresa)
+    return _respuesta_ticket(contenido, req_comprobante, "comanda")
+
+@router.post("/mesa/pdf")
+async def api_generar_mesa_pdf(
+    id_consumo_mesa: int,
+    formato: Optional[str] = _FORMATO_COMANDERA,
+    current_user: Usuario = Depends(obtener_usuario_actual),
+    db: Session = Depends(get_db)
+):
+    req = await run_in_threadpool(_request_mesa, id_consumo_mesa, current_user, db, formato)
+    contenido = await renderizar_comprobante(req, current_user.id_empresa)
+    return _respuesta_ticket(contenido, req, "ticket_mesa")
+
+@router.get("/render/metricas", summary="Cola y tiempos del pool de render de PDFs (este worker)", dependencies=[Depends(es_gerente)])
+def api_metricas_render(current_user: Usuario = Depends(obtener_usuario_actual)):
+    return obtener_servicio_render().metricas(current_user.id_empresa)
@@ -1,7 +1,8 @@
 # back/api/blueprints/modo_especial_router.py
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import PlainTextResponse
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
 from sqlmodel import Session
 
 from back.database import get_db
@@ -21,6 +22,7 @@ from back.schemas.modo_especial_schemas import (
     TransferenciaStockResponse,
 )
 from back.security import es_gerente, obtener_usuario_actual
+from back.utils.respuesta_stream import en_sesion_propia, respuesta_stream
 
 router = APIRouter(prefix="/modo-especial", tags=["Modo Especial"])
 
@@ -130,17 +132,27 @@ def api_suba_precios(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/exportar", response_class=PlainTextResponse)
+@router.get("/exportar")
 def api_exportar(
+    formato: Literal["csv", "ndjson"] = Query("csv"),
+    accept_encoding: Optional[str] = Header(default=None),
     current_user: Usuario = Depends(obtener_usuario_actual),
     db: Session = Depends(get_db),
 ):
-    _verificar_modo_especial(db, current_user.id_empresa)
-    contenido = modo_especial_manager.exportar_csv(db, current_user.id_empresa)
-    return PlainTextResponse(
-        content=contenido,
-        media_type="text/csv",
-        headers={"Content-Disposition": 'attachment; filename="productos_modo_especial.csv"'},
+    """CSV (o NDJSON) generado de a lotes y comprimido con brotli/gzip si el cliente lo acepta."""
+    id_empresa = current_user.id_empresa
+    _verificar_modo_especial(db, id_empresa)
+    if formato == "ndjson":
+        return respuesta_stream(
+            en_sesion_propia(db, lambda sesion: modo_especial_manager.iterar_ndjson(sesion, id_empresa)),
+            "application/x-ndjson",
+            accept_encoding,
+        )
+    return respuesta_stream(
+        en_sesion_propia(db, lambda sesion: modo_especial_manager.iterar_csv(sesion, id_empresa)),
+        "text/csv; charset=utf-8",
+        accept_encoding,
+        nombre_archivo="productos_modo_especial.csv",
     )
 
 
@@ -1,21 +1,17 @@
-import asyncio
 import os
-import time
 from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
-from back.security import obtener_id_empresa_desde_token, obtener_usuario_actual
-from back.modelos import Usuario
+from back.security import PrincipalAutenticado, obtener_id_empresa_desde_token, obtener_principal_actual
+from back.gestion.scanner_bus import obtener_scanner_bus
 
 router = APIRouter(
     prefix="/scanner",
     tags=["Scanner"]
 )
 
-POLL_INTERVAL_SEC = float(os.getenv("SCANNER_POLL_INTERVAL_SEC", "0.25"))
-
 
 class ScannerEvent(BaseModel):
     codigo: Optional[str] = None
@@ -24,22 +20,20 @@ class ScannerEvent(BaseModel):
     precio: Optional[float] = Field(default=None)
     peso: Optional[float] = Field(default=None)
 
-_queues: Dict[int, List[ScannerEvent]] = {}
-
 
-def _pop_event(empresa_id: int) -> Optional[ScannerEvent]:
-    q = _queues.get(empresa_id)
-    if not q:
-        return None
-    return q.pop(0)
+# La cola vive en el bus (memoria / SQLite / Redis según SCANNER_BUS_BACKEND) para que
+# push y poll funcionen aunque lleguen a workers distintos.
+async def _pop_event(empresa_id: int) -> Optional[ScannerEvent]:
+    data = await obtener_scanner_bus().extraer_async(empresa_id)
+    return ScannerEvent(**data) if data is not None else None
 
 
 def _enqueue_event(empresa_id: int, event: ScannerEvent) -> None:
-    q = _queues.get(empresa_id)
-    if q is None:
-        _queues[empresa_id] = [event]
-    else:
-        q.append(event)
+    obtener_scanner_bus().publicar(empresa_id, event.model_dump())
+
+
+def obtener_metricas_colas() -> List[dict]:
+    return obtener_scanner_bus().metricas()
 
 
 def _key_map() -> Dict[str, int]:
@@ -69,19 +63,16 @@ def _allowed_ip(request: Request) -> bool:
 
 
 async def _long_poll_event(empresa_id: int, timeout_sec: int) -> dict:
-    deadline = time.monotonic() + timeout_sec
-    while time.monotonic() < deadline:
-        event = _pop_event(empresa_id)
-        if event is not None:
-            return {"has_event": True, "event": event.model_dump()}
-        await asyncio.sleep(POLL_INTERVAL_SEC)
-    return {"has_event": False}
+    data = await obtener_scanner_bus().esperar(empresa_id, timeout_sec)
+    if data is None:
+        return {"has_event": False}
+    return {"has_event": True, "event": ScannerEvent(**data).model_dump()}
 
 
 @router.post("/evento")
 def push_event(
     event: ScannerEvent,
-    current_user: Usuario = Depends(obtener_usuario_actual),
+    current_user: PrincipalAutenticado = Depends(obtener_principal_actual),
 ):
     empresa_id = current_user.id_empresa
     if empresa_id is None:
@@ -96,7 +87,7 @@ async def poll_event(
     empresa_id: int = Depends(obtener_id_empresa_desde_token),
 ):
     if timeout <= 0:
-        event = _pop_event(empresa_id)
+        event = await _pop_event(empresa_id)
         if event is None:
             return {"has_event": False}
         return {"has_event": True, "event": event.model_dump()}
@@ -130,7 +121,7 @@ async def poll_event_public(
     if not _allowed_ip(request):
         raise HTTPException(status_code=403, detail="IP no autorizada")
     if timeout <= 0:
-        event = _pop_event(empresa_id)
+        event = await _pop_event(empresa_id)
         if event is None:
             return {"has_event": False}
         return {"has_event": True, "event": event.model_dump()}
@@ -6,7 +6,7 @@ from typing import Dict, Any
 
 # --- Módulos del Proyecto ---
 from back.database import get_db
-from back.security import obtener_usuario_actual
+from back.security import invalidar_usuario_autenticado, obtener_usuario_actual
 from back.modelos import Usuario
 # Importamos los nuevos schemas y la lógica del manager
 from back.schemas.usuario_schemas import UsuarioResponse, CambiarPasswordRequest, CambiarNombreUsuarioRequest, UsuarioConfiguracionUpdate
@@ -87,6 +87,7 @@ def api_actualizar_configuracion_usuario(
         current_user.configuracion = req.configuracion
         db.add(current_user)
         db.commit()
+        invalidar_usuario_autenticado(id_usuario=current_user.id)
         db.refresh(current_user)
         return current_user
     except Exception as e:
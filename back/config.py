@@ -15,6 +15,19 @@ load_dotenv(dotenv_path)
 print(f"DEBUG_CFG: Intentando cargar .env desde: '{dotenv_path}'")
 # --- Fin Carga .env ---
 
+# Archivos de estado compartidos por los procesos del host (p. ej. el SQLite del gobernador
+# de Sheets). Ruta absoluta: la API corre con cwd en back/ y el sync_worker en la raíz.
+DATA_DIR = Path(os.getenv("DATA_DIR") or project_root / "data").resolve()
+
+
+def ruta_en_data_dir(ruta: str) -> str:
+    """Ruta absoluta de un archivo de estado compartido: si es relativa va bajo DATA_DIR, no bajo el cwd."""
+    destino = Path(ruta)
+    if not destino.is_absolute():
+        destino = DATA_DIR / destino
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    return str(destino)
+
 
 # --- SEGURIDAD-----
 SECRET_KEY_SEC= os.getenv('SECRET_KEY_SEGURIDAD')
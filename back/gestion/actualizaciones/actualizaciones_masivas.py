@@ -8,6 +8,7 @@ from typing import Dict, List, Any
 import re
 from sqlalchemy.orm import selectinload
 from back.modelos import ArticuloCodigo, ConfiguracionEmpresa, Tercero, Articulo
+from back.gestion.sync_huellas import detectar_cambios, guardar_huellas, marcar_planilla_leida, planilla_sin_cambios
 from back.utils.tablas_handler import TablasHandler
 
 def limpiar_precio(valor_texto: str) -> float:
@@ -23,11 +24,12 @@ def limpiar_precio(valor_texto: str) -> float:
 
 
 # Función auxiliar para limpiar los precios
-def sincronizar_clientes_desde_sheets(db: Session, id_empresa_actual: int) -> Dict[str, int]:
+def sincronizar_clientes_desde_sheets(db: Session, id_empresa_actual: int, incremental: bool = False) -> Dict[str, int]:
     """
     Sincroniza clientes desde Google Sheets.
     Si un cliente con el mismo (codigo_interno, id_empresa) existe, lo actualiza.
     Si no existe, lo crea.
+    Con `incremental` omite la hoja o las filas cuya huella no cambió desde la última sincronización.
     """
     # 1. VERIFICAR CONFIGURACIÓN
     config_empresa = db.get(ConfiguracionEmpresa, id_empresa_actual)
@@ -37,12 +39,30 @@ def sincronizar_clientes_desde_sheets(db: Session, id_empresa_actual: int) -> Di
 
     # 2. CARGAR DATOS DE GOOGLE SHEETS
     handler = TablasHandler(id_empresa=id_empresa_actual, db=db)
+    planilla_modificada_en = handler.obtener_modificacion_planilla()
+    if incremental and planilla_sin_cambios(db, id_empresa_actual, "clientes", planilla_modificada_en):
+        print("Planilla sin modificaciones desde la última sincronización de clientes.")
+        return {"creados": 0, "actualizados": 0, "errores": 0, "sin_cambios": 0, "hoja_sin_cambios": True}
     print("Obteniendo datos de clientes desde Google Sheets...")
     clientes_sheets = handler.cargar_clientes()
     if not clientes_sheets:
         print("Advertencia: No se pudieron cargar datos de Google Sheets o la hoja está vacía.")
         return {"creados": 0, "actualizados": 0, "errores": 0, "sin_cambios": 0}
 
+    deteccion = detectar_cambios(
+        db,
+        id_empresa_actual,
+        "clientes",
+        clientes_sheets,
+        clave_de=lambda fila: str(fila.get("id-cliente", "")).strip(),
+        incremental=incremental,
+        planilla_modificada_en=planilla_modificada_en,
+    )
+    if deteccion.hoja_sin_cambios:
+        marcar_planilla_leida(db, id_empresa_actual, "clientes", planilla_modificada_en)
+        print("Hoja de clientes sin cambios desde la última sincronización.")
+        return {"creados": 0, "actualizados": 0, "errores": 0, "sin_cambios": len(clientes_sheets), "hoja_sin_cambios": True}
+
     # 3. CARGAR CLIENTES EXISTENTES DE LA EMPRESA ACTUAL EN UN DICCIONARIO
     print("Obteniendo clientes existentes de la base de datos (solo empresa actual)...")
     clientes_db_objetos = db.exec(
@@ -56,6 +76,8 @@ def sincronizar_clientes_desde_sheets(db: Session, id_empresa_actual: int) -> Di
     }
     
     resumen = {"creados": 0, "actualizados": 0, "sin_cambios": 0, "errores": 0}
+    # Las filas sin id se repiten igual en cada corrida; no impiden guardar la huella.
+    filas_sin_id = 0
 
     # 4. ITERAR Y SINCRONIZAR
     for cliente_sheet in clientes_sheets:
@@ -64,10 +86,14 @@ def sincronizar_clientes_desde_sheets(db: Session, id_empresa_actual: int) -> Di
             codigo_interno_sheet = str(cliente_sheet.get("id-cliente", "")).strip()
             if not codigo_interno_sheet:
                 resumen["errores"] += 1
+                filas_sin_id += 1
                 continue
 
             # Buscamos el cliente en el diccionario que ya está filtrado por empresa
             cliente_existente = clientes_db_dict.get(codigo_interno_sheet)
+            if cliente_existente and not deteccion.debe_aplicar(codigo_interno_sheet):
+                resumen["sin_cambios"] += 1
+                continue
             cuit_sheet = str(cliente_sheet.get("CUIT-CUIL", "")).strip() or None
 
             # Preparamos el conjunto de datos limpios que vienen del Excel
@@ -122,6 +148,8 @@ def sincronizar_clientes_desde_sheets(db: Session, id_empresa_actual: int) -> Di
     try:
         db.commit()
         print("Sincronización de clientes completada.")
+        if resumen["errores"] == filas_sin_id:
+            guardar_huellas(db, id_empresa_actual, deteccion)
     except Exception as e:
         print(f"ERROR FATAL DURANTE EL COMMIT: Se revirtió la transacción. Detalle: {e}")
         db.rollback()
@@ -7,7 +7,7 @@ from sqlalchemy.orm import selectinload
 
 # --- Módulos del Proyecto ---
 from back.modelos import Tercero, Usuario, Rol
-from back.security import get_password_hash,verificar_password
+from back.security import get_password_hash, invalidar_usuario_autenticado, verificar_password
 from back.schemas.admin_schemas import UsuarioCreate
 from back.security import get_password_hash
 
@@ -67,6 +67,7 @@ def cambiar_rol_de_usuario(db: Session, id_usuario: int, id_rol_nuevo: int) -> U
     usuario_a_actualizar.id_rol = id_rol_nuevo
     db.add(usuario_a_actualizar)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=id_usuario)
     db.refresh(usuario_a_actualizar)
     return usuario_a_actualizar
 
@@ -82,6 +83,7 @@ def desactivar_usuario(db: Session, usuario_id_a_desactivar: int, admin_actual:
     usuario_a_desactivar.activo = False
     db.add(usuario_a_desactivar)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=usuario_id_a_desactivar)
     db.refresh(usuario_a_desactivar)
     return usuario_a_desactivar
 
@@ -94,6 +96,7 @@ def activar_usuario(db: Session, usuario_id_a_activar: int) -> Usuario:
     usuario_a_activar.activo = True
     db.add(usuario_a_activar)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=usuario_id_a_activar)
     db.refresh(usuario_a_activar)
     return usuario_a_activar
 
@@ -109,6 +112,7 @@ def actualizar_password_usuario(db: Session, usuario_id: int, nueva_password: st
     usuario.password_hash = get_password_hash(nueva_password)
     db.add(usuario)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=usuario_id)
     db.refresh(usuario)
     return usuario
 
@@ -125,6 +129,7 @@ def modificar_password_usuario(db: Session, id_usuario: int, nueva_password: str
     usuario.password_hash = get_password_hash(nueva_password)
     db.add(usuario)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=id_usuario)
     db.refresh(usuario)
     return usuario
 
@@ -142,6 +147,7 @@ def modificar_nombre_usuario(db: Session, id_usuario: int, nuevo_nombre: str) ->
     usuario.nombre_usuario = nuevo_nombre
     db.add(usuario)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=id_usuario)
     db.refresh(usuario)
     return usuario
 
@@ -162,5 +168,6 @@ def modificar_password_propia(
     usuario_actual.password_hash = get_password_hash(password_nueva)
     db.add(usuario_actual)
     db.commit()
+    invalidar_usuario_autenticado(id_usuario=usuario_actual.id)
     db.refresh(usuario_actual)
     return usuario_actual
@@ -9,6 +9,7 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 # Importamos la configuración y el cliente que ya tienes listos
 from back import config
 from back.cliente_boveda import ClienteBoveda
+from back.gestion.configuracion_cache import invalidar_configuracion_empresa
 
 # Ruta al directorio seguro en el servidor de la API principal para guardado temporal
 BOVEDA_TEMPORAL_PATH = "./boveda_afip_temporal"
@@ -86,5 +87,7 @@ def enviar_credenciales_a_boveda(cuit: str, certificado_pem: str) -> dict:
     # 5. Limpieza: Si el guardado en la bóveda fue exitoso, eliminamos el archivo temporal.
     os.remove(clave_privada_path)
     print(f"Credenciales para {cuit} enviadas a la bóveda. Clave temporal eliminada.")
+    # La vista resuelta cachea si la empresa puede facturar (depende de la bóveda).
+    invalidar_configuracion_empresa()
     
     return resultado_boveda
\ No newline at end of file
@@ -15,7 +15,6 @@ from back.modelos import (
     Articulo,
     CajaMovimiento,
     CajaSesion,
-    Categoria,
     Tercero,
     Usuario,
     Venta,
@@ -24,7 +23,9 @@ from back.modelos import (
 from back.modelos import Usuario as UsuarioApertura
 from back.modelos import Usuario as UsuarioCierre
 from back.schemas.caja_schemas import TipoMovimiento
+from back.gestion.caja import resumen_ventas
 from back.schemas.perfil_operativo_schemas import PanelEstadisticasSecciones, secciones_estadisticas_todas_on
+from back.utils.paginacion_keyset import cortar_pagina, decodificar_cursor, despues_de
 
 TZ_AR = ZoneInfo("America/Argentina/Buenos_Aires")
 
@@ -55,36 +56,6 @@ def _rango_mes_ar_utc_naive(year: int, month: int) -> Tuple[datetime, datetime]:
     )
 
 
-def _filtro_ventas_validas(query, ids_empresas: List[int], desde: datetime, hasta: datetime):
-    return (
-        query.where(Venta.id_empresa.in_(ids_empresas))
-        .where(Venta.timestamp >= desde)
-        .where(Venta.timestamp < hasta)
-        .where(func.upper(Venta.estado) != "ANULADA")
-        .where(Venta.id_venta_lote_padre.is_(None))
-    )
-
-
-def _agregar_ventas_periodo(
-    db: Session,
-    ids_empresas: List[int],
-    desde: datetime,
-    hasta: datetime,
-) -> Tuple[int, float]:
-    row = db.exec(
-        _filtro_ventas_validas(
-            select(
-                func.count(Venta.id),
-                func.coalesce(func.sum(Venta.total), 0.0),
-            ),
-            ids_empresas,
-            desde,
-            hasta,
-        )
-    ).one()
-    return int(row[0] or 0), round(float(row[1] or 0.0), 2)
-
-
 def obtener_arqueos_de_caja(db: Session, usuario_actual: Usuario) -> Dict[str, List[Dict[str, Any]]]:
     """
     Obtiene un informe de cajas abiertas y cerradas, filtrando por la empresa
@@ -267,13 +238,7 @@ def obtener_estadisticas_generales(db: Session, usuario_actual: Usuario) -> Dict
     ahora_ar = _ahora_ar()
     hoy = ahora_ar.date()
     ayer = hoy - timedelta(days=1)
-    desde_hoy, hasta_hoy = _rango_dia_ar_utc_naive(hoy)
-    desde_ayer, hasta_ayer = _rango_dia_ar_utc_naive(ayer)
     desde_mes, _hasta_mes = _rango_mes_ar_utc_naive(hoy.year, hoy.month)
-    if hoy.month == 1:
-        desde_mes_ant, hasta_mes_ant = _rango_mes_ar_utc_naive(hoy.year - 1, 12)
-    else:
-        desde_mes_ant, hasta_mes_ant = _rango_mes_ar_utc_naive(hoy.year, hoy.month - 1)
 
     # Tope superior del mes en curso: ahora (no fin de mes)
     hasta_ahora_utc = ahora_ar.astimezone(timezone.utc).replace(tzinfo=None)
@@ -299,26 +264,23 @@ def obtener_estadisticas_generales(db: Session, usuario_actual: Usuario) -> Dict
 
     nombres = {eid: _nombre_empresa(eid) for eid in ids_empresas}
 
-    tickets_mes, total_mes = _agregar_ventas_periodo(db, ids_empresas, desde_mes, hasta_ahora_utc)
+    # Ventas, rankings y medios de pago salen del resumen diario (costo independiente del volumen).
+    inicio_mes = hoy.replace(day=1)
+    fin_mes_ant = inicio_mes - timedelta(days=1)
+    tickets_mes, total_mes = resumen_ventas.totales_periodo(db, ids_empresas, inicio_mes, hoy)
     ticket_promedio_mes = round(total_mes / tickets_mes, 2) if tickets_mes else 0.0
 
     por_establecimiento: List[Dict[str, Any]] = []
     tiene_multi_sucursal = len(ids_empresas) > 1
     if secciones.por_establecimiento and tiene_multi_sucursal:
-        ventas_mes = db.exec(
-            _filtro_ventas_validas(select(Venta), ids_empresas, desde_mes, hasta_ahora_utc)
-        ).all()
-        por_empresa: Dict[int, Dict[str, float]] = {
-            eid: {"cantidad": 0, "total": 0.0} for eid in ids_empresas
+        por_empresa = {
+            eid: (int(round(cantidad)), monto)
+            for eid, cantidad, monto in resumen_ventas.ranking(
+                db, ids_empresas, resumen_ventas.DIM_TOTAL, inicio_mes, hoy, por_empresa=True
+            )
         }
-        for v in ventas_mes:
-            bucket = por_empresa.setdefault(v.id_empresa, {"cantidad": 0, "total": 0.0})
-            bucket["cantidad"] += 1
-            bucket["total"] += float(v.total or 0.0)
-
         for eid in ids_empresas:
-            cant = int(por_empresa[eid]["cantidad"])
-            tot = float(por_empresa[eid]["total"])
+            cant, tot = por_empresa.get(eid, (0, 0.0))
             por_establecimiento.append({
                 "id_empresa": eid,
                 "nombre": nombres.get(eid, f"Empresa {eid}"),
@@ -329,9 +291,9 @@ def obtener_estadisticas_generales(db: Session, usuario_actual: Usuario) -> Dict
 
     kpis = None
     if secciones.kpis_periodo:
-        tickets_hoy, venta_hoy = _agregar_ventas_periodo(db, ids_empresas, desde_hoy, hasta_hoy)
-        _, venta_ayer = _agregar_ventas_periodo(db, ids_empresas, desde_ayer, hasta_ayer)
-        _, venta_mes_ant = _agregar_ventas_periodo(db, ids_empresas, desde_mes_ant, hasta_mes_ant)
+        tickets_hoy, venta_hoy = resumen_ventas.totales_periodo(db, ids_empresas, hoy, hoy)
+        _, venta_ayer = resumen_ventas.totales_periodo(db, ids_empresas, ayer, ayer)
+        _, venta_mes_ant = resumen_ventas.totales_periodo(db, ids_empresas, fin_mes_ant.replace(day=1), fin_mes_ant)
         pct: Optional[float] = None
         if venta_mes_ant > 0:
             pct = round(((total_mes - venta_mes_ant) / venta_mes_ant) * 100.0, 2)
@@ -349,125 +311,66 @@ def obtener_estadisticas_generales(db: Session, usuario_actual: Usuario) -> Dict
             "ticket_promedio_mes": ticket_promedio_mes,
         }
 
-    monto_linea = (
-        VentaDetalle.cantidad * VentaDetalle.precio_unitario
-        - func.coalesce(VentaDetalle.descuento_aplicado, 0.0)
-    )
-
     top_productos: List[Dict[str, Any]] = []
     if secciones.top_productos:
-        top_rows = db.exec(
-            select(
-                Articulo.id,
-                Articulo.descripcion,
-                func.coalesce(func.sum(VentaDetalle.cantidad), 0.0).label("cantidad_vendida"),
-                func.coalesce(func.sum(monto_linea), 0.0).label("monto_total"),
-            )
-            .join(VentaDetalle, VentaDetalle.id_articulo == Articulo.id)
-            .join(Venta, Venta.id == VentaDetalle.id_venta)
-            .where(Venta.id_empresa.in_(ids_empresas))
-            .where(Venta.timestamp >= desde_mes)
-            .where(Venta.timestamp < hasta_ahora_utc)
-            .where(func.upper(Venta.estado) != "ANULADA")
-            .where(Venta.id_venta_lote_padre.is_(None))
-            .group_by(Articulo.id, Articulo.descripcion)
-            .order_by(func.sum(monto_linea).desc())
-            .limit(10)
-        ).all()
+        top_rows = resumen_ventas.ranking(db, ids_empresas, resumen_ventas.DIM_ARTICULO, inicio_mes, hoy, limite=10)
+        descripciones = dict(
+            db.exec(
+                select(Articulo.id, Articulo.descripcion).where(Articulo.id.in_([int(r[0]) for r in top_rows]))
+            ).all()
+        ) if top_rows else {}
         top_productos = [
             {
-                "id_articulo": int(row[0]),
-                "descripcion": row[1],
-                "cantidad_vendida": float(row[2] or 0.0),
-                "monto_total": round(float(row[3] or 0.0), 2),
+                "id_articulo": int(clave),
+                "descripcion": descripciones.get(int(clave), f"Artículo {clave}"),
+                "cantidad_vendida": cantidad,
+                "monto_total": round(monto, 2),
             }
-            for row in top_rows
+            for clave, cantidad, monto in top_rows
         ]
 
     top_categorias: List[Dict[str, Any]] = []
     if secciones.top_categorias:
-        nombre_cat = func.coalesce(Categoria.nombre, "Sin categoría")
-        cat_rows = db.exec(
-            select(
-                nombre_cat.label("categoria"),
-                func.coalesce(func.sum(VentaDetalle.cantidad), 0.0).label("cantidad_vendida"),
-                func.coalesce(func.sum(monto_linea), 0.0).label("monto_total"),
-            )
-            .select_from(Articulo)
-            .join(VentaDetalle, VentaDetalle.id_articulo == Articulo.id)
-            .join(Venta, Venta.id == VentaDetalle.id_venta)
-            .outerjoin(Categoria, Categoria.id == Articulo.id_categoria)
-            .where(Venta.id_empresa.in_(ids_empresas))
-            .where(Venta.timestamp >= desde_mes)
-            .where(Venta.timestamp < hasta_ahora_utc)
-            .where(func.upper(Venta.estado) != "ANULADA")
-            .where(Venta.id_venta_lote_padre.is_(None))
-            .group_by(nombre_cat)
-            .order_by(func.sum(monto_linea).desc())
-            .limit(10)
-        ).all()
         top_categorias = [
             {
-                "categoria": row[0] or "Sin categoría",
-                "cantidad_vendida": float(row[1] or 0.0),
-                "monto_total": round(float(row[2] or 0.0), 2),
+                "categoria": clave or resumen_ventas.SIN_CATEGORIA,
+                "cantidad_vendida": cantidad,
+                "monto_total": round(monto, 2),
             }
-            for row in cat_rows
+            for clave, cantidad, monto in resumen_ventas.ranking(
+                db, ids_empresas, resumen_ventas.DIM_CATEGORIA, inicio_mes, hoy, limite=10
+            )
         ]
 
     ranking_vendedores: List[Dict[str, Any]] = []
     if secciones.ranking_vendedores:
-        vend_rows = db.exec(
-            select(
-                Usuario.id,
-                Usuario.nombre_usuario,
-                func.count(Venta.id).label("cantidad_ventas"),
-                func.coalesce(func.sum(Venta.total), 0.0).label("total_ventas"),
-            )
-            .join(Venta, Venta.id_usuario == Usuario.id)
-            .where(Venta.id_empresa.in_(ids_empresas))
-            .where(Venta.timestamp >= desde_mes)
-            .where(Venta.timestamp < hasta_ahora_utc)
-            .where(func.upper(Venta.estado) != "ANULADA")
-            .where(Venta.id_venta_lote_padre.is_(None))
-            .group_by(Usuario.id, Usuario.nombre_usuario)
-            .order_by(func.sum(Venta.total).desc())
-            .limit(15)
-        ).all()
+        vend_rows = resumen_ventas.ranking(db, ids_empresas, resumen_ventas.DIM_USUARIO, inicio_mes, hoy, limite=15)
+        nombres_usuarios = dict(
+            db.exec(
+                select(Usuario.id, Usuario.nombre_usuario).where(Usuario.id.in_([int(r[0]) for r in vend_rows]))
+            ).all()
+        ) if vend_rows else {}
         ranking_vendedores = [
             {
-                "id_usuario": int(row[0]),
-                "nombre_usuario": row[1],
-                "cantidad_ventas": int(row[2] or 0),
-                "total_ventas": round(float(row[3] or 0.0), 2),
+                "id_usuario": int(clave),
+                "nombre_usuario": nombres_usuarios.get(int(clave), f"Usuario {clave}"),
+                "cantidad_ventas": int(round(cantidad)),
+                "total_ventas": round(monto, 2),
             }
-            for row in vend_rows
+            for clave, cantidad, monto in vend_rows
         ]
 
     medios_pago: List[Dict[str, Any]] = []
     if secciones.medios_pago:
-        medio_rows = db.exec(
-            select(
-                CajaMovimiento.metodo_pago,
-                func.count(CajaMovimiento.id).label("cantidad"),
-                func.coalesce(func.sum(CajaMovimiento.monto), 0.0).label("monto_total"),
-            )
-            .join(CajaSesion, CajaSesion.id == CajaMovimiento.id_caja_sesion)
-            .where(CajaSesion.id_empresa.in_(ids_empresas))
-            .where(CajaMovimiento.tipo == "VENTA")
-            .where(func.upper(CajaMovimiento.estado) != "ANULADO")
-            .where(CajaMovimiento.timestamp >= desde_mes)
-            .where(CajaMovimiento.timestamp < hasta_ahora_utc)
-            .group_by(CajaMovimiento.metodo_pago)
-            .order_by(func.sum(CajaMovimiento.monto).desc())
-        ).all()
         medios_pago = [
             {
-                "metodo_pago": (row[0] or "SIN_METODO").upper(),
-                "cantidad": int(row[1] or 0),
-                "monto_total": round(float(row[2] or 0.0), 2),
+                "metodo_pago": clave,
+                "cantidad": int(round(cantidad)),
+                "monto_total": round(monto, 2),
             }
-            for row in medio_rows
+            for clave, cantidad, monto in resumen_ventas.ranking(
+                db, ids_empresas, resumen_ventas.DIM_METODO_PAGO, inicio_mes, hoy
+            )
         ]
 
     stock_bajo: List[Dict[str, Any]] = []
@@ -576,35 +479,52 @@ def obtener_estadisticas_generales(db: Session, usuario_actual: Usuario) -> Dict
     }
 
 
-def obtener_todos_los_movimientos_de_caja(db: Session, usuario_actual: Usuario) -> List[CajaMovimiento]:
+def obtener_todos_los_movimientos_de_caja(
+    db: Session,
+    usuario_actual: Usuario,
+    limite: int = 200,
+    cursor: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    tipos: Optional[List[str]] = None,
+    id_usuario: Optional[int] = None,
+) -> Tuple[List[CajaMovimiento], Optional[str]]:
     """
-    Función maestra actualizada. Obtiene TODOS los movimientos de caja de la empresa
-    del usuario actual (ingresos, egresos, ventas) y carga eficientemente
-    la información de la venta y el cliente asociado cuando corresponde.
-    Es la fuente de datos para el tablero de contabilidad/libro mayor de caja.
+    Libro mayor de caja de la empresa (ingresos, egresos y ventas con su cliente e
+    ítems), lo más reciente primero y paginado por cursor (timestamp, id). Los filtros
+    de fecha (`hasta` exclusive), tipo y usuario se resuelven en SQL. Devuelve la página
+    y el cursor de la siguiente (None si no hay más).
     """
-    print(f"Buscando todos los movimientos de caja para la empresa ID: {usuario_actual.id_empresa}")
-    
-    # 1. Creamos la consulta base.
-    query = select(CajaMovimiento)
-
-    # 2. **FILTRO DE SEGURIDAD OBLIGATORIO (MULTI-EMPRESA)**
-    query = query.join(CajaSesion).where(CajaSesion.id_empresa == usuario_actual.id_empresa)
-    # 3. Cargamos las relaciones necesarias de forma eficiente.
-    query = query.options(
-        selectinload(CajaMovimiento.venta).selectinload(Venta.cliente),
-        selectinload(CajaMovimiento.venta).selectinload(Venta.items).selectinload(VentaDetalle.articulo),
-        selectinload(CajaMovimiento.usuario)
+    query = (
+        select(CajaMovimiento)
+        .join(CajaSesion)
+        .where(CajaSesion.id_empresa == usuario_actual.id_empresa)
     )
-
-    # 4. Ordenamos los resultados por fecha, lo más reciente primero.
-    query = query.order_by(CajaMovimiento.timestamp.desc())
-
-    # 5. Ejecutamos la consulta final.
-    resultados = db.exec(query).all()
-    print(f"Se encontraron {len(resultados)} movimientos en total para la empresa.")
-    print(resultados)
-    return resultados
+    if desde:
+        query = query.where(CajaMovimiento.timestamp >= desde)
+    if hasta:
+        query = query.where(CajaMovimiento.timestamp < hasta)
+    if tipos:
+        query = query.where(CajaMovimiento.tipo.in_(tipos))
+    if id_usuario is not None:
+        query = query.where(CajaMovimiento.id_usuario == id_usuario)
+    if cursor:
+        query = query.where(despues_de(
+            (CajaMovimiento.timestamp, CajaMovimiento.id),
+            decodificar_cursor(cursor, (datetime, int)),
+            descendente=True,
+        ))
+    query = (
+        query.options(
+            selectinload(CajaMovimiento.venta).selectinload(Venta.cliente),
+            selectinload(CajaMovimiento.venta).selectinload(Venta.items).selectinload(VentaDetalle.articulo),
+            selectinload(CajaMovimiento.usuario),
+        )
+        .order_by(CajaMovimiento.timestamp.desc(), CajaMovimiento.id.desc())
+        .limit(limite + 1)
+    )
+    filas = list(db.exec(query).all())
+    return cortar_pagina(filas, limite, lambda m: (m.timestamp, m.id))
 
 def obtener_datos_para_ticket_cierre_detallado(db: Session, id_sesion: int, usuario_actual: Usuario) -> dict:
     """
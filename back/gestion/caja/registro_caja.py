@@ -2,10 +2,13 @@
 
 from datetime import datetime
 from requests import session
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update
+from sqlalchemy import case
+from sqlalchemy.orm.attributes import set_committed_value
 from typing import List, Tuple, Dict, Any
 from datetime import datetime
 from back.gestion.caja.cliente_publico import obtener_cliente_por_id
+from back.gestion.caja import resumen_ventas
 # Importa todos tus modelos. Asegúrate de que las rutas sean correctas.
 from back.modelos import Usuario, Venta, VentaDetalle, Articulo, CajaMovimiento, Tercero, CajaSesion, ConfiguracionEmpresa
 from back.schemas.caja_schemas import ArticuloVendido, RegistrarVentaRequest, TipoMovimiento, PagoMultiple
@@ -239,6 +242,91 @@ def _encolar_sync_sheets_post_venta(
             requiere_reintento=True,
         )
 
+def _resolver_efectos_comprobante(tipo_comprobante_solicitado: str | None, omitir_stock: bool) -> Tuple[bool, bool]:
+    """Decide (afectar_stock, afectar_caja) según el tipo de comprobante (el "guardián")."""
+    afectar_stock = False
+    afectar_caja = False
+
+    tipo_lower = (tipo_comprobante_solicitado or "").strip().lower()
+    if tipo_lower == "comprobante":
+        tipo_lower = "recibo"
+    # El front envía factura_a / factura_b; antes no entraban al guardián y no impactaban caja ni Sheets.
+    if tipo_lower in ("factura_a", "factura_b", "factura_c") or tipo_lower.startswith("factura"):
+        tipo_lower = "factura"
+
+    if tipo_lower in ["factura", "recibo", "comprobante interno", "ticket", "comprobante"]:
+        print("   -> DECISIÓN: Afectar STOCK y CAJA.")
+        afectar_stock = True
+        afectar_caja = True
+    elif tipo_lower == "remito":
+        print("   -> DECISIÓN: Afectar SÓLO STOCK.")
+        afectar_stock = True
+        afectar_caja = False
+    elif tipo_lower == "presupuesto":
+        print("   -> DECISIÓN: NO afectar ni Stock ni Caja.")
+        afectar_stock = False
+        afectar_caja = False
+    else:
+        # Si no se reconoce el tipo, por seguridad, no hacemos nada.
+        # Podríamos lanzar un error si quisiéramos ser más estrictos.
+        print(f"   -> ADVERTENCIA: Tipo '{tipo_comprobante_solicitado}' no reconocido para lógica de stock/caja.")
+
+    # Override si se solicita omitir stock (ej: desde módulo Mesas donde ya se descontó)
+    if omitir_stock:
+        print("   -> OVERRIDE: Omitir descuento de STOCK solicitado.")
+        afectar_stock = False
+    return afectar_stock, afectar_caja
+
+
+def _cargar_articulos_carrito(
+    db: Session,
+    articulos_vendidos: List[ArticuloVendido],
+    bloquear: bool,
+) -> Dict[int, Articulo]:
+    """
+    Trae todos los artículos del carrito en una sola consulta IN (...).
+    Si la venta descuenta stock, toma los locks de fila (FOR UPDATE) en orden de id:
+    dos ventas concurrentes con artículos en común bloquean siempre en el mismo orden
+    y no se cruzan (causa de los "Lock wait timeout" que el router devuelve como 503).
+    """
+    ids = sorted({item.id_articulo for item in articulos_vendidos})
+    if not ids:
+        return {}
+    statement = select(Articulo).where(Articulo.id.in_(ids)).order_by(Articulo.id)
+    if bloquear:
+        statement = statement.with_for_update()
+    return {articulo.id: articulo for articulo in db.exec(statement).all()}
+
+
+def _descontar_stock_en_bloque(
+    db: Session,
+    articulos: Dict[int, Articulo],
+    articulos_vendidos: List[ArticuloVendido],
+) -> None:
+    """Un único UPDATE ... CASE para todo el carrito (agrupa artículos repetidos)."""
+    deltas: Dict[int, float] = {}
+    for item in articulos_vendidos:
+        articulo = articulos.get(item.id_articulo)
+        if articulo is None or getattr(articulo, "precio_manual", False):
+            continue
+        deltas[item.id_articulo] = deltas.get(item.id_articulo, 0.0) + item.cantidad
+    if not deltas:
+        return
+
+    ids = sorted(deltas)
+    db.exec(
+        update(Articulo)
+        .where(Articulo.id.in_(ids))
+        .values(stock_actual=Articulo.stock_actual - case(deltas, value=Articulo.id, else_=0))
+        .execution_options(synchronize_session=False)
+    )
+    # Las filas están bloqueadas desde la carga: el valor en memoria es el de la base.
+    for id_articulo in ids:
+        articulo = articulos[id_articulo]
+        print(f"      -> Descontando {deltas[id_articulo]} de stock para '{articulo.descripcion}'")
+        set_committed_value(articulo, "stock_actual", (articulo.stock_actual or 0) - deltas[id_articulo])
+
+
 # =============================================================================
 # === ESPECIALISTA DE BASE DE DATOS ===
 # =============================================================================
@@ -263,13 +351,16 @@ def registrar_venta_y_movimiento_caja(
     Registra una Venta, aplica recargos dinámicos según la configuración
     de la empresa, y encola la sincronización con Google Sheets para después del commit.
     """
-    # --- 1. VALIDACIÓN DE ARTÍCULOS Y STOCK (Sin Cambios) ---
+    # --- 1. VALIDACIÓN DE ARTÍCULOS Y STOCK ---
     for item in articulos_vendidos:
         # Validar que el ID sea válido (no ser 0 o negativo)
         if not item.id_articulo or item.id_articulo <= 0:
             raise ValueError(f"ID de artículo inválido: {item.id_articulo}. Debe ser un número positivo.")
-        
-        articulo_db = db.get(Articulo, item.id_articulo)
+
+    afectar_stock, afectar_caja = _resolver_efectos_comprobante(tipo_comprobante_solicitado, omitir_stock)
+    articulos_db = _cargar_articulos_carrito(db, articulos_vendidos, bloquear=afectar_stock)
+    for item in articulos_vendidos:
+        articulo_db = articulos_db.get(item.id_articulo)
         if not articulo_db:
             raise ValueError(f"El artículo con ID {item.id_articulo} no existe en la base de datos.")
         if articulo_db.id_empresa != usuario_actual.id_empresa:
@@ -323,44 +414,9 @@ def registrar_venta_y_movimiento_caja(
     db.add(nueva_venta)
     db.flush()
 
-    # ===================================================================
-    # === INICIO DE LA LÓGICA CONDICIONAL DE CONTROL (EL "GUARDIÁN") ===
-    # ===================================================================
-    
-    afectar_stock = False
-    afectar_caja = False
-
-    tipo_lower = (tipo_comprobante_solicitado or "").strip().lower()
-    if tipo_lower == "comprobante":
-        tipo_lower = "recibo"
-    # El front envía factura_a / factura_b; antes no entraban al guardián y no impactaban caja ni Sheets.
-    if tipo_lower in ("factura_a", "factura_b", "factura_c") or tipo_lower.startswith("factura"):
-        tipo_lower = "factura"
-
-    if tipo_lower in ["factura", "recibo", "comprobante interno", "ticket", "comprobante"]:
-        print("   -> DECISIÓN: Afectar STOCK y CAJA.")
-        afectar_stock = True
-        afectar_caja = True
-    elif tipo_lower == "remito":
-        print("   -> DECISIÓN: Afectar SÓLO STOCK.")
-        afectar_stock = True
-        afectar_caja = False
-    elif tipo_lower == "presupuesto":
-        print("   -> DECISIÓN: NO afectar ni Stock ni Caja.")
-        afectar_stock = False
-        afectar_caja = False
-    else:
-        # Si no se reconoce el tipo, por seguridad, no hacemos nada.
-        # Podríamos lanzar un error si quisiéramos ser más estrictos.
-        print(f"   -> ADVERTENCIA: Tipo '{tipo_comprobante_solicitado}' no reconocido para lógica de stock/caja.")
-
-    # Override si se solicita omitir stock (ej: desde módulo Mesas donde ya se descontó)
-    if omitir_stock:
-        print("   -> OVERRIDE: Omitir descuento de STOCK solicitado.")
-        afectar_stock = False
-    
+    # El "guardián" (afectar_stock / afectar_caja) ya se resolvió antes de cargar el carrito.
     for item in articulos_vendidos:
-        articulo_a_actualizar = db.get(Articulo, item.id_articulo)
+        articulo_vendido = articulos_db[item.id_articulo]
         
         precio_original_subtotal = item.precio_unitario * item.cantidad
         precio_unitario_final = item.precio_unitario # Por defecto, el precio no cambia
@@ -399,15 +455,12 @@ def registrar_venta_y_movimiento_caja(
             cantidad=item.cantidad,
             precio_unitario=precio_unitario_final, # <-- Precio final pagado (con descuentos y recargos)
             descuento_aplicado=descuento_item_total, # <-- Para auditoría
-            tasa_iva=_resolver_tasa_iva_articulo(articulo_a_actualizar),
+            tasa_iva=_resolver_tasa_iva_articulo(articulo_vendido),
         )
         db.add(detalle)
-        if afectar_stock:
-            articulo_a_actualizar = db.get(Articulo, item.id_articulo)
-            if articulo_a_actualizar and not getattr(articulo_a_actualizar, "precio_manual", False):
-                print(f"      -> Descontando {item.cantidad} de stock para '{articulo_a_actualizar.descripcion}'")
-                articulo_a_actualizar.stock_actual -= item.cantidad
-                db.add(articulo_a_actualizar)
+
+    if afectar_stock:
+        _descontar_stock_en_bloque(db, articulos_db, articulos_vendidos)
 
     movimiento_principal = None # Inicializamos como None
     
@@ -436,6 +489,9 @@ def registrar_venta_y_movimiento_caja(
             print("   -> OMITIDO: No se registra movimiento en caja según configuración.")
         
     db.flush()
+    resumen_ventas.sumar_venta(db, nueva_venta)
+    if movimiento_principal is not None:
+        resumen_ventas.sumar_movimientos_venta(db, usuario_actual.id_empresa, [movimiento_principal])
 
     # --- 4. SYNC GOOGLE SHEETS: encolar para procesar después del commit (no bloquea MySQL) ---
     if (afectar_stock or afectar_caja) and crear_movimiento_caja:
@@ -602,18 +658,10 @@ def registrar_venta_y_movimientos_caja_multiples(
         print(f"  -> Movimiento registrado: {pago.metodo_pago} - ${pago.monto:.2f}")
     
     db.flush()
+    resumen_ventas.sumar_movimientos_venta(db, usuario_actual.id_empresa, movimientos)
     
     # --- 4. SYNC GOOGLE SHEETS: encolar para procesar después del commit ---
-    tipo_lower = (tipo_comprobante_solicitado or "").strip().lower()
-    if tipo_lower == "comprobante":
-        tipo_lower = "recibo"
-    if tipo_lower in ("factura_a", "factura_b", "factura_c") or tipo_lower.startswith("factura"):
-        tipo_lower = "factura"
-    afectar_stock_multiples = tipo_lower in [
-        "factura", "recibo", "comprobante interno", "ticket", "comprobante", "remito"
-    ]
-    if omitir_stock:
-        afectar_stock_multiples = False
+    afectar_stock_multiples, _ = _resolver_efectos_comprobante(tipo_comprobante_solicitado, omitir_stock)
 
     print("[SYNC] Encolando desglose de pagos múltiples para Google Sheets (post-commit)...")
     _encolar_sync_sheets_post_venta(
@@ -0,0 +1,258 @@
+# back/gestion/caja/resumen_ventas.py
+# Acumulados diarios de ventas (ventas_resumen_diario): se actualizan al registrar y anular
+# ventas y son la fuente del panel de estadísticas generales.
+
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlmodel import Session, select
+
+from back.modelos import (
+    Articulo,
+    CajaMovimiento,
+    CajaSesion,
+    Categoria,
+    Venta,
+    VentaDetalle,
+    VentaResumenDiario,
+)
+
+TZ_AR = ZoneInfo("America/Argentina/Buenos_Aires")
+
+DIM_TOTAL = "TOTAL"
+DIM_ARTICULO = "ARTICULO"
+DIM_CATEGORIA = "CATEGORIA"
+DIM_USUARIO = "USUARIO"
+DIM_METODO_PAGO = "METODO_PAGO"
+
+SIN_CATEGORIA = "Sin categoría"
+SIN_METODO = "SIN_METODO"
+
+# (id_empresa, dimension, fecha, clave) -> [cantidad, monto]
+Acumulado = Dict[Tuple[int, str, date, str], List[float]]
+
+_MONTO_LINEA = VentaDetalle.cantidad * VentaDetalle.precio_unitario - func.coalesce(VentaDetalle.descuento_aplicado, 0.0)
+
+
+@lru_cache(maxsize=8192)
+def _fecha_ar_de_hora(hora_utc: datetime) -> date:
+    return hora_utc.replace(tzinfo=timezone.utc).astimezone(TZ_AR).date()
+
+
+def fecha_ar(momento: datetime) -> date:
+    """Día AR de un timestamp de la DB (naive UTC). Los cambios de offset AR son en horas enteras."""
+    if momento.tzinfo is not None:
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    return _fecha_ar_de_hora(momento.replace(minute=0, second=0, microsecond=0))
+
+
+def _inicio_dia_utc(dia: date) -> datetime:
+    return datetime(dia.year, dia.month, dia.day, tzinfo=TZ_AR).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _venta_cuenta(venta: Venta) -> bool:
+    return (venta.estado or "").upper() != "ANULADA" and venta.id_venta_lote_padre is None
+
+
+def _sumar(acumulado: Acumulado, id_empresa: int, dimension: str, fecha: date, clave: Any, cantidad: float, monto: float) -> None:
+    fila = acumulado.setdefault((id_empresa, dimension, fecha, str(clave)[:128]), [0.0, 0.0])
+    fila[0] += cantidad
+    fila[1] += monto
+
+
+def _acumular_venta(acumulado: Acumulado, id_empresa: int, fecha: date, id_usuario: int, total: float, signo: int) -> None:
+    monto = signo * float(total or 0.0)
+    _sumar(acumulado, id_empresa, DIM_TOTAL, fecha, "", signo, monto)
+    _sumar(acumulado, id_empresa, DIM_USUARIO, fecha, id_usuario, signo, monto)
+
+
+def _acumular_linea(acumulado: Acumulado, id_empresa: int, fecha: date, id_articulo: int, categoria: Optional[str], cantidad: float, monto: float, signo: int) -> None:
+    cantidad, monto = signo * float(cantidad or 0.0), signo * float(monto or 0.0)
+    _sumar(acumulado, id_empresa, DIM_ARTICULO, fecha, id_articulo, cantidad, monto)
+    _sumar(acumulado, id_empresa, DIM_CATEGORIA, fecha, categoria or SIN_CATEGORIA, cantidad, monto)
+
+
+def _acumular_medio_pago(acumulado: Acumulado, id_empresa: int, fecha: date, metodo_pago: Optional[str], monto: float, signo: int) -> None:
+    _sumar(acumulado, id_empresa, DIM_METODO_PAGO, fecha, (metodo_pago or SIN_METODO).upper(), signo, signo * float(monto or 0.0))
+
+
+def _aplicar(db: Session, acumulado: Acumulado) -> None:
+    """Suma el acumulado sobre la tabla con un upsert (una sentencia, filas en orden de clave)."""
+    if not acumulado:
+        return
+    filas = [
+        {"id_empresa": e, "dimension": d, "fecha": f, "clave": c, "cantidad": v[0], "monto": v[1]}
+        for (e, d, f, c), v in sorted(acumulado.items())
+    ]
+    tabla = VentaResumenDiario.__table__
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "mysql":
+        sentencia = mysql.insert(tabla).values(filas)
+        sentencia = sentencia.on_duplicate_key_update(
+            cantidad=tabla.c.cantidad + sentencia.inserted.cantidad,
+            monto=tabla.c.monto + sentencia.inserted.monto,
+        )
+    elif dialecto in ("sqlite", "postgresql"):
+        sentencia = (sqlite if dialecto == "sqlite" else postgresql).insert(tabla).values(filas)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=["id_empresa", "dimension", "fecha", "clave"],
+            set_={
+                "cantidad": tabla.c.cantidad + sentencia.excluded.cantidad,
+                "monto": tabla.c.monto + sentencia.excluded.monto,
+            },
+        )
+    else:
+        raise NotImplementedError(f"Dialecto no soportado para ventas_resumen_diario: {dialecto}")
+    db.execute(sentencia)
+
+
+def _lineas_de_ventas(db: Session, ids_ventas: Sequence[int]):
+    return db.exec(
+        select(VentaDetalle.id_venta, VentaDetalle.id_articulo, Categoria.nombre, VentaDetalle.cantidad, _MONTO_LINEA)
+        .join(Articulo, Articulo.id == VentaDetalle.id_articulo)
+        .outerjoin(Categoria, Categoria.id == Articulo.id_categoria)
+        .where(VentaDetalle.id_venta.in_(ids_ventas))
+    ).all()
+
+
+def sumar_venta(db: Session, venta: Venta, signo: int = 1) -> None:
+    """
+    Suma (+1) o resta (-1) una venta con sus ítems. Se llama con la venta ya flusheada y
+    antes de cambiarle el estado al anular. No hace commit.
+    """
+    if not _venta_cuenta(venta):
+        return
+    fecha = fecha_ar(venta.timestamp)
+    acumulado: Acumulado = {}
+    _acumular_venta(acumulado, venta.id_empresa, fecha, venta.id_usuario, venta.total, signo)
+    for _, id_articulo, categoria, cantidad, monto in _lineas_de_ventas(db, [venta.id]):
+        _acumular_linea(acumulado, venta.id_empresa, fecha, id_articulo, categoria, cantidad, monto, signo)
+    _aplicar(db, acumulado)
+
+
+def sumar_movimientos_venta(db: Session, id_empresa: int, movimientos: Iterable[CajaMovimiento], signo: int = 1) -> None:
+    """Suma o resta movimientos de caja de tipo VENTA (desglose por medio de pago). No hace commit."""
+    acumulado: Acumulado = {}
+    for movimiento in movimientos:
+        if (movimiento.tipo or "").upper() != "VENTA" or (movimiento.estado or "").upper() == "ANULADO":
+            continue
+        _acumular_medio_pago(acumulado, id_empresa, fecha_ar(movimiento.timestamp), movimiento.metodo_pago, movimiento.monto, signo)
+    _aplicar(db, acumulado)
+
+
+def reconstruir_resumen_ventas(
+    db: Session,
+    id_empresa: int,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    lote: int = 2000,
+) -> int:
+    """
+    Recalcula los acumulados de la empresa entre `desde` y `hasta` (días AR, inclusive;
+    sin límites = todo el historial) a partir de ventas y movimientos. No hace commit.
+    Devuelve la cantidad de filas escritas.
+    """
+    borrar = delete(VentaResumenDiario).where(VentaResumenDiario.id_empresa == id_empresa)
+    filtro_ventas = [
+        Venta.id_empresa == id_empresa,
+        func.upper(Venta.estado) != "ANULADA",
+        Venta.id_venta_lote_padre.is_(None),
+    ]
+    filtro_movimientos = [
+        CajaSesion.id_empresa == id_empresa,
+        CajaMovimiento.tipo == "VENTA",
+        func.upper(CajaMovimiento.estado) != "ANULADO",
+    ]
+    if desde:
+        borrar = borrar.where(VentaResumenDiario.fecha >= desde)
+        filtro_ventas.append(Venta.timestamp >= _inicio_dia_utc(desde))
+        filtro_movimientos.append(CajaMovimiento.timestamp >= _inicio_dia_utc(desde))
+    if hasta:
+        borrar = borrar.where(VentaResumenDiario.fecha <= hasta)
+        filtro_ventas.append(Venta.timestamp < _inicio_dia_utc(hasta + timedelta(days=1)))
+        filtro_movimientos.append(CajaMovimiento.timestamp < _inicio_dia_utc(hasta + timedelta(days=1)))
+    db.execute(borrar)
+
+    acumulado: Acumulado = {}
+    for timestamp, id_usuario, total in db.exec(
+        select(Venta.timestamp, Venta.id_usuario, Venta.total).where(*filtro_ventas).execution_options(yield_per=lote)
+    ):
+        _acumular_venta(acumulado, id_empresa, fecha_ar(timestamp), id_usuario, total, 1)
+    for timestamp, id_articulo, categoria, cantidad, monto in db.exec(
+        select(Venta.timestamp, VentaDetalle.id_articulo, Categoria.nombre, VentaDetalle.cantidad, _MONTO_LINEA)
+        .join(Venta, Venta.id == VentaDetalle.id_venta)
+        .join(Articulo, Articulo.id == VentaDetalle.id_articulo)
+        .outerjoin(Categoria, Categoria.id == Articulo.id_categoria)
+        .where(*filtro_ventas)
+        .execution_options(yield_per=lote)
+    ):
+        _acumular_linea(acumulado, id_empresa, fecha_ar(timestamp), id_articulo, categoria, cantidad, monto, 1)
+    for timestamp, metodo_pago, monto in db.exec(
+        select(CajaMovimiento.timestamp, CajaMovimiento.metodo_pago, CajaMovimiento.monto)
+        .join(CajaSesion, CajaSesion.id == CajaMovimiento.id_caja_sesion)
+        .where(*filtro_movimientos)
+        .execution_options(yield_per=lote)
+    ):
+        _acumular_medio_pago(acumulado, id_empresa, fecha_ar(timestamp), metodo_pago, monto, 1)
+
+    # El rango ya se borró: alcanza con un insert por lotes (sin upsert).
+    filas = [
+        {"id_empresa": e, "dimension": d, "fecha": f, "clave": c, "cantidad": v[0], "monto": v[1]}
+        for (e, d, f, c), v in sorted(acumulado.items())
+    ]
+    for i in range(0, len(filas), lote):
+        db.execute(insert(VentaResumenDiario.__table__), filas[i:i + lote])
+    return len(filas)
+
+
+# ===================================================================
+# === LECTURA (panel de estadísticas)
+# ===================================================================
+
+def totales_periodo(db: Session, ids_empresas: List[int], desde: date, hasta: date) -> Tuple[int, float]:
+    """Tickets y total vendido entre dos días AR (inclusive)."""
+    cantidad, monto = db.exec(
+        select(func.coalesce(func.sum(VentaResumenDiario.cantidad), 0.0), func.coalesce(func.sum(VentaResumenDiario.monto), 0.0))
+        .where(
+            VentaResumenDiario.id_empresa.in_(ids_empresas),
+            VentaResumenDiario.dimension == DIM_TOTAL,
+            VentaResumenDiario.fecha >= desde,
+            VentaResumenDiario.fecha <= hasta,
+        )
+    ).one()
+    return int(round(cantidad or 0)), round(float(monto or 0.0), 2)
+
+
+def ranking(
+    db: Session,
+    ids_empresas: List[int],
+    dimension: str,
+    desde: date,
+    hasta: date,
+    limite: Optional[int] = None,
+    por_empresa: bool = False,
+) -> List[Tuple[Any, float, float]]:
+    """(clave o id_empresa, cantidad, monto) de una dimensión, de mayor a menor monto."""
+    columna = VentaResumenDiario.id_empresa if por_empresa else VentaResumenDiario.clave
+    cantidad = func.sum(VentaResumenDiario.cantidad)
+    monto = func.sum(VentaResumenDiario.monto)
+    query = (
+        select(columna, cantidad, monto)
+        .where(
+            VentaResumenDiario.id_empresa.in_(ids_empresas),
+            VentaResumenDiario.dimension == dimension,
+            VentaResumenDiario.fecha >= desde,
+            VentaResumenDiario.fecha <= hasta,
+        )
+        .group_by(columna)
+        # Claves que quedaron en cero por anulaciones no se muestran.
+        .having((func.abs(cantidad) > 1e-9) | (func.abs(monto) > 0.005))
+        .order_by(monto.desc(), columna)
+    )
+    if limite:
+        query = query.limit(limite)
+    return [(fila[0], float(fila[1] or 0.0), float(fila[2] or 0.0)) for fila in db.exec(query).all()]
@@ -0,0 +1,67 @@
+"""
+CAE obtenidos por ``/comprobantes/generar`` antes del render.
+
+El endpoint pide el CAE y después renderiza; si el render falla (cola llena, timeout)
+el cliente reintenta y, sin esto, AFIP emitiría una segunda factura por la misma
+venta. El resultado de AFIP se guarda apenas llega y el reintento lo reutiliza.
+
+Solo se deduplica con el header ``Idempotency-Key`` que el cliente genera por venta:
+dos ventas iguales legítimas (mismo total, consumidor final) no comparten nada que
+permita distinguirlas de un reintento, así que sin clave cada request es una factura.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from back.modelos import ComprobanteEmitido
+
+logger = logging.getLogger(__name__)
+
+_PREFIJO_CLIENTE = "cliente:"
+
+
+def clave_emision(idempotency_key: Optional[str]) -> Optional[str]:
+    """Clave guardada para el header, o None si el cliente no mandó uno (no se deduplica)."""
+    if idempotency_key and idempotency_key.strip():
+        return _PREFIJO_CLIENTE + idempotency_key.strip()[:64]
+    return None
+
+
+def buscar_emision(db: Session, id_empresa: int, clave: str) -> Optional[Dict[str, Any]]:
+    """Datos AFIP ya obtenidos para esta clave, o None si hay que facturar."""
+    emitido = db.exec(
+        select(ComprobanteEmitido).where(
+            ComprobanteEmitido.id_empresa == id_empresa,
+            ComprobanteEmitido.clave == clave,
+        )
+    ).first()
+    if emitido is None:
+        return None
+    return dict(emitido.datos_afip or {})
+
+
+def guardar_emision(db: Session, id_empresa: int, clave: str, datos_afip: Dict[str, Any]) -> None:
+    db.add(ComprobanteEmitido(id_empresa=id_empresa, clave=clave, datos_afip=datos_afip))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Otro request con la misma clave guardó primero (reintento concurrente).
+        db.rollback()
+        logger.warning("Emisión duplicada para la clave %s de la empresa %s.", clave, id_empresa)
+
+
+def confirmar_entrega(db: Session, id_empresa: int, clave: str) -> None:
+    emitido = db.exec(
+        select(ComprobanteEmitido).where(
+            ComprobanteEmitido.id_empresa == id_empresa,
+            ComprobanteEmitido.clave == clave,
+        )
+    ).first()
+    if emitido is None:
+        return
+    emitido.entregado = True
+    db.add(emitido)
+    db.commit()
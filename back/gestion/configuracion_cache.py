@@ -0,0 +1,128 @@
+# back/gestion/configuracion_cache.py
+# Caché por proceso de la configuración resuelta (ConfiguracionEmpresa + perfil operativo) por empresa.
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from back.utils.endpoint_actual import endpoint_actual
+
+T = TypeVar("T")
+
+CONFIG_CACHE_TTL_SEC = float(os.getenv("CONFIG_CACHE_TTL_SEC", "30"))
+
+
+class CacheConfiguracionResuelta:
+    """
+    Una entrada por empresa con versión: `invalidar` sube la versión y una carga que
+    empezó antes no pisa la entrada nueva. El TTL acota cuánto tarda en verse un
+    cambio hecho por otro worker (la invalidación es local al proceso).
+    Los valores cacheados se comparten entre requests: son de solo lectura.
+    """
+
+    def __init__(self, ttl_sec: float = CONFIG_CACHE_TTL_SEC):
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._entradas: Dict[int, Tuple[Tuple[int, int], float, Any, int]] = {}
+        self._versiones: Dict[int, int] = defaultdict(int)
+        self._epoca = 0
+        self._metricas: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "consultas_ahorradas": 0, "consultas_carga": 0}
+        )
+
+    def version(self, id_empresa: int) -> Tuple[int, int]:
+        with self._lock:
+            return self._epoca, self._versiones[id_empresa]
+
+    def obtener(self, db: Session, id_empresa: int, cargar: Callable[[], T]) -> T:
+        endpoint = endpoint_actual()
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(id_empresa)
+            version = (self._epoca, self._versiones[id_empresa])
+            if entrada is not None and entrada[0] == version and entrada[1] > ahora:
+                metricas = self._metricas[endpoint]
+                metricas["hits"] += 1
+                metricas["consultas_ahorradas"] += entrada[3]
+                return entrada[2]
+
+        valor, consultas = _cargar_contando_consultas(cargar)
+        with self._lock:
+            metricas = self._metricas[endpoint]
+            metricas["misses"] += 1
+            metricas["consultas_carga"] += consultas
+            if self.ttl_sec > 0 and (self._epoca, self._versiones[id_empresa]) == version:
+                self._entradas[id_empresa] = (version, time.monotonic() + self.ttl_sec, valor, consultas)
+        return valor
+
+    def invalidar(self, id_empresa: Optional[int] = None) -> None:
+        """Sin id invalida todas las empresas (p. ej. credenciales AFIP nuevas en la bóveda)."""
+        with self._lock:
+            if id_empresa is None:
+                self._epoca += 1
+                self._entradas.clear()
+                return
+            self._versiones[id_empresa] += 1
+            self._entradas.pop(id_empresa, None)
+
+    def metricas(self) -> List[dict]:
+        with self._lock:
+            filas = []
+            for endpoint, m in sorted(self._metricas.items()):
+                total = m["hits"] + m["misses"]
+                filas.append(
+                    {
+                        "endpoint": endpoint,
+                        **m,
+                        "hit_rate": round(m["hits"] / total, 4) if total else 0.0,
+                    }
+                )
+            return filas
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._versiones.clear()
+            self._epoca = 0
+            self._metricas.clear()
+
+
+# Un solo listener para todos los engines, registrado al importar: solo cuenta mientras
+# hay un contador activo en el contexto (hilo/tarea) que está cargando la configuración.
+_consultas_en_carga: ContextVar[Optional[List[int]]] = ContextVar("consultas_carga_configuracion", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _contar_consulta(*_args) -> None:
+    contador = _consultas_en_carga.get()
+    if contador is not None:
+        contador[0] += 1
+
+
+def _cargar_contando_consultas(cargar: Callable[[], T]) -> Tuple[T, int]:
+    """Cuenta las sentencias SQL que emite `cargar` (se ahorran en cada hit)."""
+    contador = [0]
+    token = _consultas_en_carga.set(contador)
+    try:
+        valor = cargar()
+    finally:
+        _consultas_en_carga.reset(token)
+    return valor, contador[0]
+
+
+_cache = CacheConfiguracionResuelta()
+
+
+def obtener_cache_configuracion() -> CacheConfiguracionResuelta:
+    return _cache
+
+
+def invalidar_configuracion_empresa(id_empresa: Optional[int] = None) -> None:
+    _cache.invalidar(id_empresa)
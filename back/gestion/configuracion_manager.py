@@ -4,6 +4,7 @@ import os
 import shutil
 from fastapi import UploadFile, HTTPException, status
 from sqlmodel import Session
+from back.gestion.configuracion_cache import invalidar_configuracion_empresa
 from back.modelos import ConfiguracionEmpresa, Empresa
 from back.schemas.configuracion_schemas import ConfiguracionUpdate, RecargoData, RecargoUpdate
 
@@ -45,6 +46,7 @@ def guardar_archivo_configuracion(db: Session, id_empresa: int, file: UploadFile
         
     db.add(config_db)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config_db)
     return config_db
 
@@ -61,6 +63,7 @@ def guardar_links_empresa(db: Session, id_empresa: int, link1: str | None = None
 
     db.add(config_db)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config_db)
     return config_db
 
@@ -88,6 +91,7 @@ def actualizar_configuracion_parcial(db: Session, id_empresa: int, data: Configu
     
     db.add(config_db)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config_db)
     return config_db
 
@@ -133,6 +137,7 @@ def actualizar_recargo_por_tipo(db: Session, id_empresa: int, tipo: str, data: R
         
     db.add(config_db)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config_db)
     
     return obtener_recargo_por_tipo(db, id_empresa, tipo)
@@ -153,6 +158,7 @@ def actualizar_ruta_archivo(db: Session, id_empresa: int, tipo_archivo: str, rut
 
     db.add(config_db)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config_db)
     return config_db
 
@@ -218,6 +224,7 @@ def actualizar_color_principal_empresa(db: Session, id_empresa: int, nuevo_color
     try:
         db.add(config_db)
         db.commit()
+        invalidar_configuracion_empresa(id_empresa)
         db.refresh(config_db)
     except Exception as e:
         db.rollback()
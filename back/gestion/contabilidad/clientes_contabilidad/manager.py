@@ -1,9 +1,11 @@
 # back/gestion/contabilidad/clientes_contabilidad/manager.py
 # Lógica para el CRUD diario de clientes, operando 100% sobre SQL.
 
-from sqlmodel import Session, select
-from typing import List
+from datetime import datetime
+from sqlmodel import Session, or_, select
+from typing import List, Optional, Tuple
 from back.modelos import Tercero
+from back.utils.paginacion_keyset import cortar_pagina, decodificar_cursor, despues_de
 
 def crear_cliente(id_empresa: int, db: Session, cliente_data: dict) -> Tercero:
     """Crea un nuevo cliente en la DB SQL, validando la unicidad del CUIT."""
@@ -31,9 +33,41 @@ def crear_cliente(id_empresa: int, db: Session, cliente_data: dict) -> Tercero:
 def obtener_cliente_por_id(id_empresa,db: Session, id_cliente: int) -> Tercero | None:
     return db.exec(select(Tercero).where(Tercero.id == id_cliente, Tercero.es_cliente == True, Tercero.id_empresa==id_empresa)).first()
 
-def obtener_todos_los_clientes(id_empresa,db: Session, skip: int = 0, limit: int = 100) -> List[Tercero]:
-    return db.exec(select(Tercero).where(Tercero.es_cliente == True, Tercero.id_empresa == id_empresa).order_by(Tercero.nombre_razon_social))
-                   
+def listar_clientes(
+    id_empresa: int,
+    db: Session,
+    limite: int = 500,
+    cursor: Optional[str] = None,
+    alta_desde: Optional[datetime] = None,
+    alta_hasta: Optional[datetime] = None,
+    activo: Optional[bool] = None,
+    busqueda: Optional[str] = None,
+) -> Tuple[List[Tercero], Optional[str]]:
+    """
+    Una página de clientes ordenados por nombre (desempate por id) y el cursor de la
+    siguiente. `busqueda` filtra por prefijo de nombre, CUIT o identificación fiscal.
+    """
+    query = select(Tercero).where(Tercero.es_cliente == True, Tercero.id_empresa == id_empresa)
+    if activo is not None:
+        query = query.where(Tercero.activo == activo)
+    if alta_desde:
+        query = query.where(Tercero.fecha_alta >= alta_desde)
+    if alta_hasta:
+        query = query.where(Tercero.fecha_alta < alta_hasta)
+    if busqueda and busqueda.strip():
+        prefijo = f"{busqueda.strip()}%"
+        query = query.where(or_(
+            Tercero.nombre_razon_social.like(prefijo),
+            Tercero.cuit.like(prefijo),
+            Tercero.identificacion_fiscal.like(prefijo),
+        ))
+    if cursor:
+        query = query.where(despues_de(
+            (Tercero.nombre_razon_social, Tercero.id), decodificar_cursor(cursor, (str, int))
+        ))
+    filas = db.exec(query.order_by(Tercero.nombre_razon_social, Tercero.id).limit(limite + 1)).all()
+    return cortar_pagina(list(filas), limite, lambda c: (c.nombre_razon_social, c.id))
+
 
 def actualizar_cliente(id_empresa, db: Session, id_cliente: int, update_data: dict) -> Tercero:
     cliente_db = obtener_cliente_por_id(db, id_cliente)
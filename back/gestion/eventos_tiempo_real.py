@@ -0,0 +1,336 @@
+# back/gestion/eventos_tiempo_real.py
+
+"""
+Diario de eventos por empresa para el canal push (SSE) de cocina, comandas y facturas.
+
+A diferencia de la cola del escáner (cada evento se entrega una sola vez), acá cada
+evento queda numerado en un buffer acotado por empresa para que todas las pantallas
+conectadas lo reciban y un cliente que se reconecta pueda pedir "todo lo posterior a
+mi último id" (``Last-Event-ID``). Si ese id ya salió del buffer se responde ``resync``
+y el cliente recarga por REST.
+
+Backends (``EVENTOS_PUSH_BACKEND``):
+- ``memoria``: buffer dentro del proceso (un solo worker).
+- ``sqlite``:  tabla en el archivo SQLite compartido (``SCANNER_BUS_SQLITE_PATH``) para
+  que un cambio hecho en un worker llegue a los streams abiertos en otro.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from back.config import ruta_en_data_dir
+from back.gestion.scanner_bus import BACKEND_MEMORIA, BACKEND_SQLITE, EsperasPorEmpresa
+
+logger = logging.getLogger(__name__)
+
+EVENTO_COMANDA_NUEVA = "comanda_nueva"
+EVENTO_COMANDAS_IMPRESAS = "comandas_impresas"
+EVENTO_COCINA_ESTADO = "cocina_estado"
+EVENTO_CONSUMO_ESTADO = "consumo_estado"
+EVENTO_MESAS_UNIDAS = "mesas_unidas"
+EVENTO_FACTURA_ESTADO = "factura_estado"
+
+
+class DiarioEventos:
+    """
+    Interfaz común. Los ids son strings opacos ``<epoca>-<n>``: la época cambia si el
+    diario se reinicia (p. ej. reinicio del proceso con backend en memoria), así un id
+    viejo nunca se confunde con uno nuevo.
+
+    Desde código async se usan ``leer_desde_async``/``ultimo_id_async``: con un backend
+    que hace I/O la lectura va al threadpool y no frena el event loop.
+    """
+
+    epoca = ""
+    bloqueante = True
+
+    def __init__(self) -> None:
+        self._esperas = EsperasPorEmpresa()
+
+    def publicar(self, id_empresa: int, tipo: str, datos: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def leer_desde(self, id_empresa: int, ultimo_id: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Eventos posteriores a ``ultimo_id`` y si el cliente debe resincronizar."""
+        raise NotImplementedError
+
+    def ultimo_id(self, id_empresa: int) -> str:
+        raise NotImplementedError
+
+    def cerrar(self) -> None:
+        pass
+
+    async def leer_desde_async(
+        self, id_empresa: int, ultimo_id: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        if self.bloqueante:
+            return await run_in_threadpool(self.leer_desde, id_empresa, ultimo_id)
+        return self.leer_desde(id_empresa, ultimo_id)
+
+    async def ultimo_id_async(self, id_empresa: int) -> str:
+        if self.bloqueante:
+            return await run_in_threadpool(self.ultimo_id, id_empresa)
+        return self.ultimo_id(id_empresa)
+
+    def _numero(self, id_evento: Optional[str]) -> Optional[int]:
+        if not id_evento:
+            return None
+        epoca, _, numero = id_evento.rpartition("-")
+        if epoca != self.epoca:
+            return -1
+        try:
+            return int(numero)
+        except ValueError:
+            return -1
+
+    async def esperar(
+        self, id_empresa: int, ultimo_id: Optional[str], timeout_sec: float
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            eventos, resync = await self.leer_desde_async(id_empresa, ultimo_id)
+            restante = deadline - time.monotonic()
+            if eventos or resync or restante <= 0:
+                return eventos, resync
+            fut = self._esperas.registrar(id_empresa, loop)
+            try:
+                eventos, resync = await self.leer_desde_async(id_empresa, ultimo_id)
+                if eventos or resync:
+                    return eventos, resync
+                await asyncio.wait_for(fut, timeout=restante)
+            except asyncio.TimeoutError:
+                return [], False
+            finally:
+                self._esperas.quitar(id_empresa, loop, fut)
+
+    def _despertar(self, id_empresa: int) -> None:
+        # Todos los streams de la empresa reciben el evento: se despierta a todos.
+        self._esperas.despertar(id_empresa, cantidad=self._esperas.cantidad(id_empresa))
+
+
+class DiarioEnMemoria(DiarioEventos):
+    bloqueante = False
+
+    def __init__(self, maxlen: int) -> None:
+        super().__init__()
+        self.maxlen = max(1, maxlen)
+        self.epoca = format(int(time.time() * 1000), "x")
+        self._lock = threading.Lock()
+        self._buffers: Dict[int, Deque[Dict[str, Any]]] = {}
+        self._contadores: Dict[int, int] = {}
+
+    def publicar(self, id_empresa: int, tipo: str, datos: Dict[str, Any]) -> str:
+        with self._lock:
+            numero = self._contadores.get(id_empresa, 0) + 1
+            self._contadores[id_empresa] = numero
+            evento = {"id": f"{self.epoca}-{numero}", "tipo": tipo, "datos": datos, "ts": time.time()}
+            self._buffers.setdefault(id_empresa, deque(maxlen=self.maxlen)).append(evento)
+        self._despertar(id_empresa)
+        return evento["id"]
+
+    def leer_desde(self, id_empresa: int, ultimo_id: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+        desde = self._numero(ultimo_id)
+        with self._lock:
+            buffer = list(self._buffers.get(id_empresa, ()))
+            actual = self._contadores.get(id_empresa, 0)
+        if desde is None:
+            return [], False
+        if desde < 0 or desde > actual:
+            return [], True
+        if desde >= actual:
+            return [], False
+        primero = self._numero(buffer[0]["id"]) if buffer else actual + 1
+        if desde < primero - 1:
+            return [], True
+        return [e for e in buffer if self._numero(e["id"]) > desde], False
+
+    def ultimo_id(self, id_empresa: int) -> str:
+        with self._lock:
+            return f"{self.epoca}-{self._contadores.get(id_empresa, 0)}"
+
+
+class DiarioSQLite(DiarioEventos):
+    """
+    Tabla ``eventos_empresa`` con id autoincremental global (orden total entre workers).
+    El vigía por proceso usa ``PRAGMA data_version`` igual que ``BusSQLite``.
+    """
+
+    epoca = "s"
+
+    def __init__(self, ruta: str, maxlen: int, intervalo_vigia_sec: float = 0.05) -> None:
+        super().__init__()
+        self.ruta = ruta
+        self.maxlen = max(1, maxlen)
+        self.intervalo_vigia_sec = max(0.005, intervalo_vigia_sec)
+        self._local = threading.local()
+        self._cerrado = threading.Event()
+        self._vigia_lock = threading.Lock()
+        self._vigia: Optional[threading.Thread] = None
+        conn = self._conexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS eventos_empresa ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id_empresa INTEGER NOT NULL,"
+            " tipo TEXT NOT NULL,"
+            " datos TEXT NOT NULL,"
+            " creado_en REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_eventos_empresa ON eventos_empresa (id_empresa, id)")
+        # Hasta qué id se podó cada empresa: distingue "no hubo eventos" de "ya no están".
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS eventos_empresa_poda ("
+            " id_empresa INTEGER PRIMARY KEY, podado_hasta INTEGER NOT NULL)"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publicar(self, id_empresa: int, tipo: str, datos: Dict[str, Any]) -> str:
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT INTO eventos_empresa (id_empresa, tipo, datos, creado_en) VALUES (?, ?, ?, ?)",
+                (id_empresa, tipo, json.dumps(datos, default=str), time.time()),
+            )
+            nuevo_id = cur.lastrowid
+            fila = conn.execute(
+                "SELECT id FROM eventos_empresa WHERE id_empresa = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                (id_empresa, self.maxlen),
+            ).fetchone()
+            if fila is not None:
+                conn.execute("DELETE FROM eventos_empresa WHERE id_empresa = ? AND id <= ?", (id_empresa, fila[0]))
+                conn.execute(
+                    "INSERT INTO eventos_empresa_poda (id_empresa, podado_hasta) VALUES (?, ?)"
+                    " ON CONFLICT(id_empresa) DO UPDATE SET podado_hasta = excluded.podado_hasta",
+                    (id_empresa, fila[0]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._despertar(id_empresa)
+        return f"{self.epoca}-{nuevo_id}"
+
+    def leer_desde(self, id_empresa: int, ultimo_id: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+        desde = self._numero(ultimo_id)
+        if desde is None:
+            return [], False
+        if desde < 0:
+            return [], True
+        conn = self._conexion()
+        poda = conn.execute(
+            "SELECT podado_hasta FROM eventos_empresa_poda WHERE id_empresa = ?", (id_empresa,)
+        ).fetchone()
+        if poda is not None and desde < poda[0]:
+            return [], True
+        filas = conn.execute(
+            "SELECT id, tipo, datos, creado_en FROM eventos_empresa WHERE id_empresa = ? AND id > ? ORDER BY id",
+            (id_empresa, desde),
+        ).fetchall()
+        return [
+            {"id": f"{self.epoca}-{fila[0]}", "tipo": fila[1], "datos": json.loads(fila[2]), "ts": fila[3]}
+            for fila in filas
+        ], False
+
+    def ultimo_id(self, id_empresa: int) -> str:
+        fila = self._conexion().execute("SELECT MAX(id) FROM eventos_empresa").fetchone()
+        return f"{self.epoca}-{fila[0] or 0}"
+
+    async def esperar(
+        self, id_empresa: int, ultimo_id: Optional[str], timeout_sec: float
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        self._asegurar_vigia()
+        return await super().esperar(id_empresa, ultimo_id, timeout_sec)
+
+    def _asegurar_vigia(self) -> None:
+        if self._vigia is not None and self._vigia.is_alive():
+            return
+        with self._vigia_lock:
+            if self._vigia is None or not self._vigia.is_alive():
+                self._vigia = threading.Thread(target=self._bucle_vigia, daemon=True, name="eventos-push-vigia")
+                self._vigia.start()
+
+    def _bucle_vigia(self) -> None:
+        conn = self._conexion()
+        ultima_version: Optional[int] = None
+        while not self._cerrado.wait(self.intervalo_vigia_sec):
+            if not self._esperas.empresas():
+                continue
+            try:
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+            except sqlite3.Error as exc:
+                logger.warning("Vigía del diario de eventos: %s", exc)
+                continue
+            if version == ultima_version:
+                continue
+            ultima_version = version
+            # Cada stream vuelve a leer desde su propio último id; despertar de más es inocuo.
+            for id_empresa in self._esperas.empresas():
+                self._despertar(id_empresa)
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+
+
+def crear_diario_eventos(backend: Optional[str] = None) -> DiarioEventos:
+    backend = (backend or os.getenv("EVENTOS_PUSH_BACKEND", BACKEND_MEMORIA)).strip().lower()
+    maxlen = int(os.getenv("EVENTOS_PUSH_BUFFER", "500"))
+    if backend == BACKEND_SQLITE:
+        ruta = ruta_en_data_dir(os.getenv("SCANNER_BUS_SQLITE_PATH") or "scanner_eventos.sqlite3")
+        return DiarioSQLite(ruta, maxlen, float(os.getenv("SCANNER_BUS_POLL_SEC", "0.05")))
+    if backend != BACKEND_MEMORIA:
+        logger.warning("EVENTOS_PUSH_BACKEND=%r desconocido; se usa el diario en memoria.", backend)
+    return DiarioEnMemoria(maxlen)
+
+
+_diario: Optional[DiarioEventos] = None
+_diario_lock = threading.Lock()
+
+
+def obtener_diario_eventos() -> DiarioEventos:
+    global _diario
+    if _diario is None:
+        with _diario_lock:
+            if _diario is None:
+                _diario = crear_diario_eventos()
+    return _diario
+
+
+def establecer_diario_eventos(diario: DiarioEventos) -> Optional[DiarioEventos]:
+    """Reemplaza el diario del proceso (tests/benchmarks). Devuelve el anterior."""
+    global _diario
+    with _diario_lock:
+        anterior, _diario = _diario, diario
+    return anterior
+
+
+def publicar_evento_empresa(id_empresa: Optional[int], tipo: str, datos: Dict[str, Any]) -> None:
+    """
+    Publica sin romper la operación de negocio que lo llama: si el diario falla, la
+    pantalla de cocina igual se entera en el próximo refresco REST.
+    """
+    if id_empresa is None:
+        return
+    try:
+        obtener_diario_eventos().publicar(id_empresa, tipo, datos)
+    except Exception as exc:
+        logger.warning("No se pudo publicar evento %s para empresa %s: %s", tipo, id_empresa, exc)
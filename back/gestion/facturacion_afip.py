@@ -11,7 +11,7 @@ from enum import Enum
 # --- Importaciones de la aplicación ---
 from back import config
 from back.cliente_boveda import ClienteBoveda
-from back.schemas.comprobante_schemas import TransaccionData, ReceptorData, EmisorData
+from back.schemas.comprobante_schemas import FORMATOS_TICKET, TransaccionData, ReceptorData, EmisorData
 from typing import Dict, Any
 from back.modelos import Venta, VentaDetalle
 
@@ -136,7 +136,8 @@ def determinar_logica_comprobante(
         formato_norm = str(formato)
 
     # Ticket fiscal (83) solo aplica a RI. Monotributo/Exento → Factura C (11).
-    if formato_norm == "ticket":
+    # ESC/POS es un ticket impreso de otra forma: mismo comprobante AFIP.
+    if formato_norm in FORMATOS_TICKET:
         if condicion_emisor in [CondicionIVA.MONOTRIBUTO, CondicionIVA.EXENTO]:
             return {"tipo_afip": 11, "neto": total, "iva": 0.0}
         neto = round(total / (1 + TASA_IVA_21), 2)
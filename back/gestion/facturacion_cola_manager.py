@@ -0,0 +1,346 @@
+"""
+Cola de facturación AFIP: la venta se registra y responde enseguida; el CAE lo pide
+un worker (background task tras la venta y job del scheduler para reintentos).
+
+Mismo esquema que la cola sync_nube: tabla persistida, reclamo con SELECT ... FOR
+UPDATE SKIP LOCKED + lease, backoff exponencial. Un lote se reclama junto pero cada
+item renueva su lease (UPDATE condicional al worker) justo antes de su llamada a AFIP:
+si mientras se facturaban los anteriores el lease venció y otro worker lo retomó, se
+saltea. La clave de idempotencia es la venta (una fila por id_venta) y después de
+renovar se relee la venta: si ya tiene CAE (un intento anterior lo obtuvo y se cayó
+antes de cerrar el item) no se factura dos veces.
+El resultado se publica en el canal push (``factura_estado``) y se consulta por REST.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import Session, select
+
+from back.gestion.eventos_tiempo_real import EVENTO_FACTURA_ESTADO, publicar_evento_empresa
+from back.gestion.sync_nube_queue_manager import _nuevo_worker_id
+from back.modelos import FacturaPendiente, Venta
+from back.schemas.comprobante_schemas import EmisorData, ReceptorData
+
+logger = logging.getLogger(__name__)
+
+FACTURACION_ASINCRONA = os.getenv("FACTURACION_ASINCRONA", "true").strip().lower() in {"1", "true", "yes", "y", "on"}
+# generar_factura_para_venta puede tardar ~110 s (3 intentos de 30 s + esperas): el lease lo cubre.
+FACTURACION_LEASE_SEC = max(30, int(os.getenv("FACTURACION_LEASE_SEC", "180")))
+
+ESTADOS_PUBLICOS = {
+    "pendiente": "PENDIENTE",
+    "procesando": "PROCESANDO",
+    "completado": "EXITOSO",
+    "fallido": "FALLIDO",
+}
+
+
+def payload_factura(
+    total: float,
+    emisor: EmisorData,
+    receptor: Optional[ReceptorData],
+    formato_comprobante: str,
+    tipo_solicitado: Optional[str],
+) -> Dict[str, Any]:
+    """Argumentos de generar_factura_para_venta como JSON (sin credenciales: el worker usa la bóveda)."""
+    return {
+        "total": total,
+        "emisor": emisor.model_dump(mode="json", exclude={"afip_certificado", "afip_clave_privada"}),
+        "receptor": receptor.model_dump(mode="json") if receptor else None,
+        "formato_comprobante": formato_comprobante,
+        "tipo_solicitado": tipo_solicitado,
+    }
+
+
+def encolar_factura_venta(
+    db: Session,
+    id_empresa: int,
+    id_venta: int,
+    payload: Dict[str, Any],
+    max_intentos: int = 6,
+) -> FacturaPendiente:
+    """Idempotente: si la venta ya tiene su factura en cola, devuelve esa."""
+    existente = db.exec(select(FacturaPendiente).where(FacturaPendiente.id_venta == id_venta)).first()
+    if existente is not None:
+        return existente
+    ahora = datetime.utcnow()
+    pendiente = FacturaPendiente(
+        id_empresa=id_empresa,
+        id_venta=id_venta,
+        payload=payload,
+        estado="pendiente",
+        intentos=0,
+        max_intentos=max_intentos,
+        proximo_reintento_en=ahora,
+        actualizado_en=ahora,
+    )
+    db.add(pendiente)
+    db.flush()
+    return pendiente
+
+
+def _calcular_proximo_reintento(intentos_realizados: int) -> datetime:
+    # 20 s, 40 s, 80 s... con tope de 10 minutos.
+    delay_segundos = min(600, 10 * 2 ** max(1, intentos_realizados))
+    return datetime.utcnow() + timedelta(seconds=delay_segundos)
+
+
+def _ya_facturada(venta: Venta) -> bool:
+    return bool(venta.facturada and venta.datos_factura) or bool((venta.datos_factura or {}).get("cae"))
+
+
+def _facturar_item(db: Session, item: FacturaPendiente) -> Tuple[Optional[str], bool]:
+    """Devuelve (error, definitivo). Un ValueError es de datos/configuración: no se reintenta."""
+    from back.gestion.facturacion_afip import generar_factura_para_venta
+
+    try:
+        venta = db.get(Venta, item.id_venta)
+        if venta is None:
+            raise ValueError(f"La venta {item.id_venta} no existe.")
+        # Leída de nuevo: otro worker pudo haber guardado el CAE mientras este esperaba.
+        db.refresh(venta)
+        if _ya_facturada(venta):
+            logger.info("Venta %s ya tiene CAE: no se vuelve a pedir a AFIP.", item.id_venta)
+            return None, False
+        payload = item.payload or {}
+        receptor = payload.get("receptor")
+        generar_factura_para_venta(
+            db=db,
+            venta_a_facturar=venta,
+            total=float(payload["total"]),
+            cliente_data=ReceptorData(**receptor) if receptor else None,
+            emisor_data=EmisorData(**payload["emisor"]),
+            formato_comprobante=payload.get("formato_comprobante") or "pdf",
+            tipo_solicitado=payload.get("tipo_solicitado"),
+        )
+        return None, False
+    except (ValueError, KeyError) as e:
+        db.rollback()
+        return f"{type(e).__name__}: {e}", True
+    except Exception as e:
+        db.rollback()
+        return f"{type(e).__name__}: {e}", False
+
+
+def reclamar_facturas_pendientes(
+    db: Session,
+    max_items: int,
+    worker_id: str,
+    lease_sec: int = FACTURACION_LEASE_SEC,
+) -> List[FacturaPendiente]:
+    """Igual que reclamar_pendientes de sync_nube: reserva con SKIP LOCKED y libera el lock con el commit."""
+    ahora = datetime.utcnow()
+    items = db.exec(
+        select(FacturaPendiente)
+        .where(
+            or_(
+                and_(
+                    FacturaPendiente.estado == "pendiente",
+                    FacturaPendiente.proximo_reintento_en <= ahora,
+                ),
+                and_(
+                    FacturaPendiente.estado == "procesando",
+                    or_(FacturaPendiente.lease_hasta.is_(None), FacturaPendiente.lease_hasta < ahora),
+                ),
+            )
+        )
+        .order_by(FacturaPendiente.creado_en.asc())
+        .limit(max_items)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+    lease_hasta = ahora + timedelta(seconds=lease_sec)
+    for item in items:
+        if item.estado == "procesando":
+            logger.warning("Lease vencido de la factura de venta %s (%s): se retoma.", item.id_venta, item.reclamado_por)
+        item.estado = "procesando"
+        item.reclamado_por = worker_id
+        item.lease_hasta = lease_hasta
+        item.actualizado_en = ahora
+        db.add(item)
+    db.commit()
+    return items
+
+
+def renovar_lease_factura(
+    db: Session,
+    item: FacturaPendiente,
+    worker_id: str,
+    lease_sec: int = FACTURACION_LEASE_SEC,
+) -> bool:
+    """
+    Extiende el lease del item con un UPDATE condicional a que siga reclamado por
+    `worker_id`. False si otro worker lo retomó: no hay que llamar a AFIP.
+    """
+    ahora = datetime.utcnow()
+    resultado = db.execute(
+        update(FacturaPendiente)
+        .where(FacturaPendiente.id == item.id)
+        .where(FacturaPendiente.reclamado_por == worker_id)
+        .where(FacturaPendiente.estado == "procesando")
+        .values(lease_hasta=ahora + timedelta(seconds=lease_sec), actualizado_en=ahora)
+    )
+    db.commit()
+    return resultado.rowcount == 1
+
+
+def _cerrar_item(db: Session, item: FacturaPendiente, worker_id: str, error: Optional[str], definitivo: bool) -> Optional[str]:
+    """Registra el resultado si el lease sigue siendo de este worker. Devuelve el estado final (o None)."""
+    vigente = db.exec(
+        select(FacturaPendiente.id)
+        .where(FacturaPendiente.id == item.id)
+        .where(FacturaPendiente.reclamado_por == worker_id)
+        .where(FacturaPendiente.estado == "procesando")
+        .with_for_update()
+    ).first()
+    if vigente is None:
+        db.rollback()
+        logger.warning("Factura de venta %s: lease tomado por otro worker, no se actualiza.", item.id_venta)
+        return None
+
+    item.actualizado_en = datetime.utcnow()
+    item.reclamado_por = None
+    item.lease_hasta = None
+    if error is None:
+        item.estado = "completado"
+        item.ultimo_error = None
+    else:
+        item.intentos = (item.intentos or 0) + 1
+        item.ultimo_error = error
+        if definitivo or item.intentos >= item.max_intentos:
+            item.estado = "fallido"
+        else:
+            item.estado = "pendiente"
+            item.proximo_reintento_en = _calcular_proximo_reintento(item.intentos)
+    db.add(item)
+    db.commit()
+    return item.estado
+
+
+def _publicar_estado(db: Session, item: FacturaPendiente) -> None:
+    datos: Dict[str, Any] = {
+        "id_venta": item.id_venta,
+        "estado": ESTADOS_PUBLICOS.get(item.estado, item.estado),
+        "intentos": item.intentos,
+    }
+    if item.estado == "completado":
+        venta = db.get(Venta, item.id_venta)
+        datos_factura = (venta.datos_factura or {}) if venta else {}
+        datos.update({k: datos_factura.get(k) for k in ("cae", "numero_comprobante", "tipo_comprobante")})
+    else:
+        datos["ultimo_error"] = item.ultimo_error
+    publicar_evento_empresa(item.id_empresa, EVENTO_FACTURA_ESTADO, datos)
+
+
+def procesar_cola_facturas(
+    db: Session,
+    max_items: int = 10,
+    worker_id: Optional[str] = None,
+) -> Dict[str, int]:
+    """Factura los pendientes de a uno; cada item se cierra (y se publica) apenas termina."""
+    worker_id = worker_id or _nuevo_worker_id()
+    pendientes = reclamar_facturas_pendientes(db, max_items, worker_id)
+
+    resumen = {"procesados": 0, "completados": 0, "reprogramados": 0, "fallidos": 0}
+    for item in pendientes:
+        # Los anteriores del lote pudieron tardar más que el lease de este.
+        if not renovar_lease_factura(db, item, worker_id):
+            logger.warning("Factura de venta %s: lease tomado por otro worker, se saltea.", item.id_venta)
+            resumen["lease_perdido"] = resumen.get("lease_perdido", 0) + 1
+            continue
+        error, definitivo = _facturar_item(db, item)
+        estado = _cerrar_item(db, item, worker_id, error, definitivo)
+        resumen["procesados"] += 1
+        if estado is None:
+            resumen["lease_perdido"] = resumen.get("lease_perdido", 0) + 1
+            continue
+        resumen[{"completado": "completados", "pendiente": "reprogramados", "fallido": "fallidos"}[estado]] += 1
+        _publicar_estado(db, item)
+    return resumen
+
+
+def estado_factura_venta(db: Session, id_venta: int, id_empresa: int) -> Optional[Dict[str, Any]]:
+    """Estado de la factura de una venta de la empresa (None si la venta no es de la empresa)."""
+    venta = db.get(Venta, id_venta)
+    if venta is None or venta.id_empresa != id_empresa:
+        return None
+    item = db.exec(select(FacturaPendiente).where(FacturaPendiente.id_venta == id_venta)).first()
+    if item is None:
+        estado = "EXITOSO" if venta.facturada else "NO_SOLICITADA"
+        return {"id_venta": id_venta, "estado": estado, "datos_factura": venta.datos_factura}
+    return {
+        "id_venta": id_venta,
+        "estado": ESTADOS_PUBLICOS.get(item.estado, item.estado),
+        "intentos": item.intentos,
+        "ultimo_error": item.ultimo_error,
+        "proximo_reintento_en": item.proximo_reintento_en if item.estado == "pendiente" else None,
+        "datos_factura": venta.datos_factura if item.estado == "completado" else None,
+    }
+
+
+def reintentar_factura_venta(db: Session, id_venta: int, id_empresa: int) -> Optional[FacturaPendiente]:
+    """Vuelve a poner en cola una factura FALLIDA (p. ej. después de corregir la configuración AFIP)."""
+    item = db.exec(
+        select(FacturaPendiente)
+        .where(FacturaPendiente.id_venta == id_venta)
+        .where(FacturaPendiente.id_empresa == id_empresa)
+    ).first()
+    if item is None or item.estado != "fallido":
+        return None
+    item.estado = "pendiente"
+    item.intentos = 0
+    item.proximo_reintento_en = datetime.utcnow()
+    item.actualizado_en = datetime.utcnow()
+    db.add(item)
+    db.commit()
+    return item
+
+
+def metricas_cola_facturas(db: Session, id_empresa: Optional[int] = None) -> Dict[str, Any]:
+    """Profundidad por estado, items listos y antigüedad de la factura pendiente más vieja."""
+    ahora = datetime.utcnow()
+    filtro = [FacturaPendiente.id_empresa == id_empresa] if id_empresa is not None else []
+
+    por_estado = {
+        estado: cantidad
+        for estado, cantidad in db.exec(
+            select(FacturaPendiente.estado, func.count())
+            .where(*filtro)
+            .group_by(FacturaPendiente.estado)
+        ).all()
+    }
+    listos = db.exec(
+        select(func.count())
+        .select_from(FacturaPendiente)
+        .where(*filtro)
+        .where(FacturaPendiente.estado == "pendiente", FacturaPendiente.proximo_reintento_en <= ahora)
+    ).one()
+    mas_viejo = db.exec(
+        select(func.min(FacturaPendiente.creado_en))
+        .where(*filtro)
+        .where(FacturaPendiente.estado.in_(["pendiente", "procesando"]))
+    ).one()
+    return {
+        "por_estado": por_estado,
+        "profundidad": por_estado.get("pendiente", 0) + por_estado.get("procesando", 0),
+        "listos": listos,
+        "antiguedad_max_seg": round((ahora - mas_viejo).total_seconds(), 1) if mas_viejo else 0.0,
+        "lease_sec": FACTURACION_LEASE_SEC,
+    }
+
+
+def procesar_cola_facturas_en_background(max_items: int = 5) -> None:
+    """Factura lo encolado por la venta, en un hilo aparte tras la respuesta HTTP."""
+    from back.database import SessionLocal
+
+    try:
+        with SessionLocal() as db:
+            resumen = procesar_cola_facturas(db=db, max_items=max_items)
+            if resumen.get("procesados", 0) > 0:
+                logger.info("Cola de facturación (background): %s", resumen)
+    except Exception:
+        logger.exception("Error procesando cola de facturación en background")
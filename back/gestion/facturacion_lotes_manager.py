@@ -10,6 +10,7 @@ from typing import List, Dict, Any
 from back.modelos import ConfiguracionEmpresa, Usuario, Tercero, Venta, CajaMovimiento, VentaDetalle, Articulo, StockMovimiento
 # Importamos el especialista de AFIP refactorizado
 from back.gestion.facturacion_afip import generar_factura_para_venta, generar_nota_credito_para_venta
+from back.gestion.caja import resumen_ventas
 # Importamos los schemas que vamos a construir
 from back.schemas.comprobante_schemas import EmisorData, ReceptorData, TransaccionData, ItemData, tercero_a_receptor_data
 # Importamos la configuración para obtener las URLs y API Keys
@@ -226,6 +227,9 @@ def crear_nota_credito_para_anular(
     # --- INICIO DE LA CORRECCIÓN CLAVE ---
 
     # 4. Actualización de la Base de Datos
+    # Se descuenta del resumen diario antes de cambiar tipo y estado.
+    resumen_ventas.sumar_venta(db, venta_original, -1)
+    resumen_ventas.sumar_movimientos_venta(db, venta_original.id_empresa, [movimiento_original], -1)
     # 🔴 CAMBIO: Marcar el movimiento original como "venta_anulada"
     movimiento_original.tipo = "venta_anulada"
     db.add(movimiento_original)
@@ -308,6 +312,9 @@ def anular_comprobante_no_fiscal(
     if venta_original.estado == "ANULADA":
         raise ValueError("Esta venta ya fue anulada previamente.")
 
+    # Se descuenta del resumen diario antes de cambiar tipo y estado.
+    resumen_ventas.sumar_venta(db, venta_original, -1)
+    resumen_ventas.sumar_movimientos_venta(db, venta_original.id_empresa, [movimiento_original], -1)
     # 🔴 CAMBIO: Marcar el movimiento original como "venta_anulada"
     movimiento_original.tipo = "venta_anulada"
     db.add(movimiento_original)
@@ -20,6 +20,10 @@ from back.gestion.caja.registro_caja import registrar_venta_y_movimiento_caja
 from back.gestion.caja.apertura_cierre import obtener_caja_abierta_por_usuario
 from back.gestion.ordenes_manager import registrar_orden_por_consumo, actualizar_orden_con_venta
 from back.modelos import AuditLog
+from back.gestion.eventos_tiempo_real import (
+    EVENTO_COCINA_ESTADO, EVENTO_COMANDA_NUEVA, EVENTO_COMANDAS_IMPRESAS,
+    EVENTO_CONSUMO_ESTADO, EVENTO_MESAS_UNIDAS, publicar_evento_empresa,
+)
 
 # ===================================================================
 # === FUNCIONES PARA MESAS
@@ -136,6 +140,13 @@ def agregar_detalle_consumo(db: Session, id_consumo: int, detalle_data: ConsumoM
     consumo.total += subtotal
     db.commit()
     db.refresh(detalle)
+    publicar_evento_empresa(id_empresa, EVENTO_COMANDA_NUEVA, {
+        "id_detalle": detalle.id,
+        "id_consumo_mesa": id_consumo,
+        "id_mesa": consumo.id_mesa,
+        "id_articulo": detalle.id_articulo,
+        "cantidad": detalle.cantidad,
+    })
     return detalle
 
 def marcar_comandas_impresas_con_sesion(db: Session, id_empresa: int, ids_detalle: List[int]) -> int:
@@ -181,6 +192,8 @@ def marcar_comanda_como_impresa(db: Session, ids_detalle: List[int], id_empresa:
             id_empresa=id_empresa
         ))
     db.commit()
+    if count > 0:
+        publicar_evento_empresa(id_empresa, EVENTO_COMANDAS_IMPRESAS, {"ids_detalle": [d.id for d in detalles]})
     return count
 
 def cerrar_consumo_mesa(db: Session, id_consumo: int, id_empresa: int, porcentaje_propina: float = 0.0) -> Optional[ConsumoMesa]:
@@ -199,6 +212,7 @@ def cerrar_consumo_mesa(db: Session, id_consumo: int, id_empresa: int, porcentaj
     
     db.commit()
     db.refresh(consumo)
+    publicar_evento_empresa(id_empresa, EVENTO_CONSUMO_ESTADO, {"id_consumo_mesa": consumo.id, "estado": consumo.estado})
     return registrar_orden_por_consumo(db, consumo, usuario_actual) or consumo
 
 def facturar_consumo_mesa(
@@ -248,6 +262,7 @@ def facturar_consumo_mesa(
     consumo.estado = "FACTURADO"
     db.commit()
     db.refresh(consumo)
+    publicar_evento_empresa(id_empresa, EVENTO_CONSUMO_ESTADO, {"id_consumo_mesa": consumo.id, "estado": consumo.estado})
     actualizar_orden_con_venta(db, consumo, consumo.ventas[0] if hasattr(consumo, "ventas") and consumo.ventas else None, usuario_actual)
     return consumo
 
@@ -354,6 +369,12 @@ def unir_mesas(db: Session, id_empresa: int, source_mesa_ids: List[int], target_
         id_empresa=id_empresa
     ))
     db.commit()
+    if total_movidos > 0:
+        publicar_evento_empresa(id_empresa, EVENTO_MESAS_UNIDAS, {
+            "source_mesa_ids": source_mesa_ids,
+            "target_mesa_id": target_mesa_id,
+            "movidos": total_movidos,
+        })
     return total_movidos
 
 # ===================================================================
@@ -388,4 +409,9 @@ def actualizar_estado_item_cocina(db: Session, id_detalle: int, nuevo_estado: st
     detalle.estado_cocina = nuevo_estado
     db.commit()
     db.refresh(detalle)
+    publicar_evento_empresa(id_empresa, EVENTO_COCINA_ESTADO, {
+        "id_detalle": detalle.id,
+        "id_consumo_mesa": detalle.id_consumo_mesa,
+        "estado_cocina": detalle.estado_cocina,
+    })
     return detalle
@@ -2,11 +2,13 @@
 
 import csv
 import io
+import json
+import os
 import re
 import unicodedata
 from contextlib import nullcontext
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from sqlmodel import Session, select
 from sqlalchemy.orm import selectinload
@@ -15,12 +17,16 @@ from back.modelos import (
     Articulo,
     ArticuloCodigo,
     Categoria,
-    ConfiguracionEmpresa,
     Empresa,
     StockMovimiento,
     TransferenciaStock,
     TransferenciaStockDetalle,
 )
+from back.gestion.stock.catalogo_cambios import (
+    articulos_cambiados_desde,
+    incrementar_catalogo_version,
+    version_catalogo,
+)
 from back.utils.articulo_helpers import articulo_con_barcode_en_empresa, mensaje_barcode_duplicado
 from back.schemas.modo_especial_schemas import (
     BulkProductosRequest,
@@ -34,6 +40,8 @@ from back.schemas.modo_especial_schemas import (
 )
 
 UNIDADES_VALIDAS = {"unidad", "gramos", "kilogramos", "litros", "mililitros"}
+# Filas por lote al recorrer el catálogo con cursor del lado del servidor (exportaciones).
+EXPORT_YIELD_PER = max(1, int(os.getenv("EXPORT_YIELD_PER", "1000")))
 
 
 def _grupo_transferencia(db: Session, id_empresa: int) -> frozenset[int]:
@@ -185,13 +193,6 @@ def _asignar_categorias_articulo(
         _obtener_o_crear_categoria(db, id_empresa, nombre)
 
 
-def _incrementar_catalogo_version(db: Session, id_empresa: int) -> None:
-    config = db.get(ConfiguracionEmpresa, id_empresa)
-    if config:
-        config.catalogo_version = (config.catalogo_version or 0) + 1
-        db.add(config)
-
-
 def _validar_barcodes_lista(barcodes: List[str]) -> None:
     vistos: set[str] = set()
     for codigo in barcodes:
@@ -288,7 +289,7 @@ def crear_producto(
     db.add(articulo)
     db.flush()
     _asignar_barcodes(db, articulo, data.barcodes, omitir_conflictos=omitir_conflictos_barcode)
-    _incrementar_catalogo_version(db, id_empresa)
+    incrementar_catalogo_version(db, id_empresa, [articulo.id])
     if commit:
         db.commit()
         db.refresh(articulo)
@@ -339,7 +340,7 @@ def actualizar_producto(
         _asignar_barcodes(db, articulo, update["barcodes"], omitir_conflictos=omitir_conflictos_barcode)
 
     db.add(articulo)
-    _incrementar_catalogo_version(db, id_empresa)
+    incrementar_catalogo_version(db, id_empresa, [articulo.id])
     if commit:
         db.commit()
         db.refresh(articulo)
@@ -413,6 +414,7 @@ def bulk_upsert(
 
 def ingresar_stock(db: Session, id_empresa: int, id_usuario: int, req: IngresoStockRequest) -> Dict[str, Any]:
     procesados = []
+    ids_articulos = []
     for item in req.items:
         if not item.codigo_interno and not item.id_articulo:
             raise ValueError("Cada ítem debe tener codigo_interno o id_articulo.")
@@ -447,6 +449,7 @@ def ingresar_stock(db: Session, id_empresa: int, id_usuario: int, req: IngresoSt
         )
         db.add(articulo)
         db.add(movimiento)
+        ids_articulos.append(articulo.id)
         procesados.append({
             "codigo_interno": articulo.codigo_interno,
             "descripcion": articulo.descripcion,
@@ -457,13 +460,14 @@ def ingresar_stock(db: Session, id_empresa: int, id_usuario: int, req: IngresoSt
             "precio_costo": item.precio_costo,
         })
 
-    _incrementar_catalogo_version(db, id_empresa)
+    incrementar_catalogo_version(db, id_empresa, ids_articulos)
     db.commit()
     return {"procesados": procesados, "total": len(procesados)}
 
 
 def subir_precios(db: Session, id_empresa: int, req: SubaPreciosRequest) -> Dict[str, Any]:
     actualizados = 0
+    ids_articulos = []
     if req.productos:
         for item in req.productos:
             articulo = _obtener_articulo_por_codigo(db, id_empresa, item.codigo_interno)
@@ -472,6 +476,7 @@ def subir_precios(db: Session, id_empresa: int, req: SubaPreciosRequest) -> Dict
             articulo.precio_venta = item.precio_venta
             articulo.venta_negocio = item.precio_venta
             db.add(articulo)
+            ids_articulos.append(articulo.id)
             actualizados += 1
     else:
         articulos = db.exec(
@@ -492,9 +497,10 @@ def subir_precios(db: Session, id_empresa: int, req: SubaPreciosRequest) -> Dict
             articulo.precio_venta = round(articulo.precio_venta * factor, 2)
             articulo.venta_negocio = articulo.precio_venta
             db.add(articulo)
+            ids_articulos.append(articulo.id)
             actualizados += 1
 
-    _incrementar_catalogo_version(db, id_empresa)
+    incrementar_catalogo_version(db, id_empresa, ids_articulos)
     db.commit()
     return {"actualizados": actualizados}
 
@@ -612,12 +618,40 @@ def _leer_filas_csv(contenido: str) -> List[Dict[str, str]]:
     return [_normalizar_fila_csv(fila) for fila in reader]
 
 
-def exportar_csv(db: Session, id_empresa: int) -> str:
-    productos = listar_productos(db, id_empresa)
+def iterar_productos(db: Session, id_empresa: int, lote: int = EXPORT_YIELD_PER) -> Iterator[Dict[str, Any]]:
+    """
+    Como `listar_productos` pero de a `lote` filas (yield_per, cursor del lado del
+    servidor). El identity map de la sesión es débil: los artículos ya emitidos se liberan.
+    """
+    resultado = db.exec(
+        select(Articulo)
+        .where(Articulo.id_empresa == id_empresa, Articulo.activo == True)
+        .order_by(Articulo.descripcion)
+        .options(selectinload(Articulo.codigos), selectinload(Articulo.categoria))
+        .execution_options(yield_per=lote)
+    )
+    for articulo in resultado:
+        yield _articulo_a_response(articulo)
+
+
+def iterar_ndjson(db: Session, id_empresa: int) -> Iterator[str]:
+    for producto in iterar_productos(db, id_empresa):
+        yield json.dumps(producto, ensure_ascii=False) + "\n"
+
+
+def iterar_csv(db: Session, id_empresa: int) -> Iterator[str]:
     buffer = io.StringIO()
     writer = csv.DictWriter(buffer, fieldnames=CSV_HEADERS)
+
+    def _vaciar() -> str:
+        texto = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return texto
+
     writer.writeheader()
-    for p in productos:
+    yield _vaciar()
+    for p in iterar_productos(db, id_empresa):
         writer.writerow({
             "Codigo": p["codigo_interno"],
             "Producto": p["descripcion"],
@@ -631,7 +665,11 @@ def exportar_csv(db: Session, id_empresa: int) -> str:
             "CantidadEnvase": p.get("cantidad_envase") or "",
             "Ubicacion": p.get("ubicacion") or "",
         })
-    return buffer.getvalue()
+        yield _vaciar()
+
+
+def exportar_csv(db: Session, id_empresa: int) -> str:
+    return "".join(iterar_csv(db, id_empresa))
 
 
 def importar_csv(db: Session, id_empresa: int, contenido: str) -> ImportExportResumen:
@@ -775,6 +813,7 @@ def crear_transferencia_stock(
     db.add(transferencia)
     db.flush()
 
+    ids_articulos = []
     for item in req.items:
         codigo = item.codigo_interno.strip()
         articulo = _obtener_articulo_por_codigo(db, id_empresa_origen, codigo)
@@ -789,6 +828,7 @@ def crear_transferencia_stock(
         stock_nuevo = stock_actual - item.cantidad
         articulo.stock_actual = stock_nuevo
         db.add(articulo)
+        ids_articulos.append(articulo.id)
         db.add(StockMovimiento(
             tipo="EGRESO_TRANSFERENCIA",
             cantidad=item.cantidad,
@@ -807,7 +847,7 @@ def crear_transferencia_stock(
             id_articulo_origen=articulo.id,
         ))
 
-    _incrementar_catalogo_version(db, id_empresa_origen)
+    incrementar_catalogo_version(db, id_empresa_origen, ids_articulos)
     db.commit()
     db.refresh(transferencia)
     transferencia = db.exec(
@@ -866,6 +906,7 @@ def recibir_transferencia_stock(
         raise ValueError("La transferencia ya fue procesada.")
 
     detalle_por_id = {d.id: d for d in transferencia.detalles}
+    ids_articulos = []
     if len(req.items) != len(transferencia.detalles):
         raise ValueError("Debe confirmar todos los ítems de la transferencia.")
 
@@ -890,6 +931,7 @@ def recibir_transferencia_stock(
         if req.aplicar_precios and detalle.precio_unitario is not None:
             articulo_dest.precio_costo = detalle.precio_unitario
         db.add(articulo_dest)
+        ids_articulos.append(articulo_dest.id)
         db.add(StockMovimiento(
             tipo="INGRESO_TRANSFERENCIA",
             cantidad=cantidad_recibida,
@@ -907,7 +949,7 @@ def recibir_transferencia_stock(
     transferencia.recibida_en = datetime.utcnow()
     transferencia.id_usuario_recepcion = id_usuario
     db.add(transferencia)
-    _incrementar_catalogo_version(db, id_empresa)
+    incrementar_catalogo_version(db, id_empresa, ids_articulos)
     db.commit()
     db.refresh(transferencia)
     return _transferencia_a_response(db, transferencia)
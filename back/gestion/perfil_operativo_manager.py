@@ -6,6 +6,7 @@ from typing import Any, Optional
 from sqlmodel import Session, select
 
 from back.gestion import configuracion_manager
+from back.gestion.configuracion_cache import invalidar_configuracion_empresa, obtener_cache_configuracion
 from back.gestion.plantillas_perfil import DESCRIPCIONES_PLANTILLAS, PLANTILLAS
 from back.modelos import ConfiguracionEmpresa
 from back.schemas.configuracion_resuelta_schemas import (
@@ -164,6 +165,16 @@ def aplicar_computados(
 def resolver_configuracion_empresa(
     db: Session,
     id_empresa: int,
+) -> ConfiguracionEmpresaResuelta:
+    """Vista resuelta cacheada por empresa (solo lectura; se invalida al escribir la configuración)."""
+    return obtener_cache_configuracion().obtener(
+        db, id_empresa, lambda: _resolver_configuracion_empresa_sin_cache(db, id_empresa)
+    )
+
+
+def _resolver_configuracion_empresa_sin_cache(
+    db: Session,
+    id_empresa: int,
 ) -> ConfiguracionEmpresaResuelta:
     config = configuracion_manager.obtener_configuracion_empresa(db, id_empresa)
     tipo = _parse_tipo_esquema(config)
@@ -212,6 +223,7 @@ def migrar_empresa_a_esquema_estandar(db: Session, id_empresa: int) -> Configura
 
     db.add(config)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config)
     logger.info("Empresa %s migrada a esquema estándar", id_empresa)
     return config
@@ -237,6 +249,7 @@ def migrar_empresa_a_esquema_especial(
     _guardar_perfil_en_config(config, perfil, TipoEsquemaEmpresa.ESPECIAL)
     db.add(config)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config)
     logger.info("Empresa %s migrada a esquema especial (%s)", id_empresa, plantilla_id)
     return config
@@ -274,6 +287,7 @@ def aplicar_plantilla_perfil(
     _guardar_perfil_en_config(config, perfil, TipoEsquemaEmpresa.ESPECIAL)
     db.add(config)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config)
     return config
 
@@ -299,6 +313,7 @@ def actualizar_perfil_operativo(
 
     db.add(config)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config)
     return config
 
@@ -452,6 +467,8 @@ def habilitar_panel_estadisticas_modo_especial(db: Session) -> dict[str, object]
 
     if actualizadas:
         db.commit()
+        for eid in actualizadas:
+            invalidar_configuracion_empresa(eid)
 
     return {
         "actualizadas": actualizadas,
@@ -541,6 +558,7 @@ def migrar_aclaraciones_operativas_a_perfil(
 
     db.add(config)
     db.commit()
+    invalidar_configuracion_empresa(id_empresa)
     db.refresh(config)
     return {"id_empresa": id_empresa, "cambios": cambios, "mensaje": "ok"}
 
@@ -590,6 +608,7 @@ def seed_empresas_especiales_prod(db: Session) -> dict[str, int]:
             _guardar_perfil_en_config(config, perfil, TipoEsquemaEmpresa.ESPECIAL)
             db.add(config)
             db.commit()
+            invalidar_configuracion_empresa(id_empresa)
             resultados[f"panel_{id_empresa}"] = id_empresa
             continue
         migrar_empresa_a_esquema_especial(db, id_empresa, plantilla_id)
@@ -1,10 +1,21 @@
 from typing import List, Optional
 from sqlmodel import Session, select
 from back.modelos import ConsumoMesa, ConsumoMesaDetalle, ConfiguracionEmpresa, Articulo
-from back.schemas.comprobante_schemas import GenerarComprobanteRequest, EmisorData, ReceptorData, TransaccionData, ItemData
+from back.schemas.comprobante_schemas import FORMATOS_ESCPOS, GenerarComprobanteRequest, EmisorData, ReceptorData, TransaccionData, ItemData
+from back.schemas.configuracion_schemas import FormatoComprobanteEnum
 
-def _obtener_emisor(db: Session, id_empresa: int) -> EmisorData:
-    conf = db.exec(select(ConfiguracionEmpresa).where(ConfiguracionEmpresa.id_empresa == id_empresa)).first()
+def _obtener_configuracion(db: Session, id_empresa: int) -> Optional[ConfiguracionEmpresa]:
+    return db.exec(select(ConfiguracionEmpresa).where(ConfiguracionEmpresa.id_empresa == id_empresa)).first()
+
+def _formato_comandera(formato: Optional[str]) -> str:
+    # ESC/POS solo si el cliente lo pide (sabe mandarlo a la comandera); si no, ticket PDF.
+    if formato and formato.strip().lower() in FORMATOS_ESCPOS:
+        return FormatoComprobanteEnum.escpos.value
+    return FormatoComprobanteEnum.ticket.value
+
+def _obtener_emisor(db: Session, id_empresa: int, conf: Optional[ConfiguracionEmpresa] = None) -> EmisorData:
+    if conf is None:
+        conf = _obtener_configuracion(db, id_empresa)
     cuit = conf.cuit if conf and conf.cuit else ""
     pv = conf.afip_punto_venta_predeterminado if conf and conf.afip_punto_venta_predeterminado else 1
     aclar = conf.aclaraciones_legales if conf and conf.aclaraciones_legales else {}
@@ -19,7 +30,7 @@ def _obtener_emisor(db: Session, id_empresa: int) -> EmisorData:
         aclaraciones_legales=aclar,
     )
 
-def construir_request_ticket_mesa(db: Session, consumo: ConsumoMesa) -> GenerarComprobanteRequest:
+def construir_request_ticket_mesa(db: Session, consumo: ConsumoMesa, formato: Optional[str] = None) -> GenerarComprobanteRequest:
     items: List[ItemData] = []
     for d in consumo.detalles:
         art: Optional[Articulo] = d.articulo
@@ -27,17 +38,19 @@ def construir_request_ticket_mesa(db: Session, consumo: ConsumoMesa) -> GenerarC
         subtotal = d.cantidad * d.precio_unitario
         items.append(ItemData(cantidad=d.cantidad, descripcion=desc, precio_unitario=d.precio_unitario, subtotal=subtotal))
     trans = TransaccionData(items=items, total=consumo.total, observaciones=None)
-    emisor = _obtener_emisor(db, consumo.id_empresa)
+    conf = _obtener_configuracion(db, consumo.id_empresa)
+    emisor = _obtener_emisor(db, consumo.id_empresa, conf)
     receptor = ReceptorData()
-    return GenerarComprobanteRequest(tipo="ticket_mesa", formato="ticket", emisor=emisor, receptor=receptor, transaccion=trans)
+    return GenerarComprobanteRequest(tipo="ticket_mesa", formato=_formato_comandera(formato), emisor=emisor, receptor=receptor, transaccion=trans)
 
-def construir_request_comanda(db: Session, detalles: List[ConsumoMesaDetalle], id_empresa: int) -> GenerarComprobanteRequest:
+def construir_request_comanda(db: Session, detalles: List[ConsumoMesaDetalle], id_empresa: int, formato: Optional[str] = None) -> GenerarComprobanteRequest:
     items: List[ItemData] = []
     for d in detalles:
         art: Optional[Articulo] = d.articulo
         desc = art.descripcion if art else "Item"
         items.append(ItemData(cantidad=d.cantidad, descripcion=desc, precio_unitario=0.0, subtotal=0.0))
     trans = TransaccionData(items=items, total=0.0, observaciones=None)
-    emisor = _obtener_emisor(db, id_empresa)
+    conf = _obtener_configuracion(db, id_empresa)
+    emisor = _obtener_emisor(db, id_empresa, conf)
     receptor = ReceptorData()
-    return GenerarComprobanteRequest(tipo="comanda", formato="ticket", emisor=emisor, receptor=receptor, transaccion=trans)
+    return GenerarComprobanteRequest(tipo="comanda", formato=_formato_comandera(formato), emisor=emisor, receptor=receptor, transaccion=trans)
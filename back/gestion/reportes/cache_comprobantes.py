@@ -0,0 +1,119 @@
+# back/gestion/reportes/cache_comprobantes.py
+# Caché por proceso de comprobantes generados (PDF / texto), direccionada por contenido del request.
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+COMPROBANTES_CACHE_MAX_MB = float(os.getenv("COMPROBANTES_CACHE_MAX_MB", "64"))
+COMPROBANTES_CACHE_TTL_SEC = float(os.getenv("COMPROBANTES_CACHE_TTL_SEC", "21600"))
+
+# Subir si cambia algo del render que no está en el request (plantillas, CSS, QR).
+_VERSION_RENDER = "1"
+
+
+def es_cacheable(data: GenerarComprobanteRequest) -> bool:
+    """
+    Solo se cachean comprobantes con número o CAE (reimpresiones / "descargar de nuevo").
+    Igual imprimen una fecha: antes de armar la clave pasan por `fijar_fecha_emision`.
+    """
+    afip = data.transaccion.afip
+    return bool(data.numero) or bool(afip is not None and afip.cae)
+
+
+def fijar_fecha_emision(data: GenerarComprobanteRequest) -> GenerarComprobanteRequest:
+    """
+    Copia del request con la fecha a imprimir explícita, así entra en la clave. Sin
+    ``fecha_emision`` se usa el minuto actual (las plantillas imprimen hasta minutos):
+    una reimpresión en otro minuto es otra clave y sale con su propia hora.
+    """
+    if data.fecha_emision is not None:
+        return data
+    return data.model_copy(update={"fecha_emision": datetime.now().replace(second=0, microsecond=0)})
+
+
+def clave_comprobante(data: GenerarComprobanteRequest) -> str:
+    """SHA-256 del payload serializado: dos requests iguales dan el mismo comprobante."""
+    crudo = data.model_dump_json(exclude_none=False).encode("utf-8")
+    return hashlib.sha256(_VERSION_RENDER.encode("ascii") + b"\x00" + crudo).hexdigest()
+
+
+class CacheComprobantes:
+    """
+    LRU acotado por bytes totales, solo para comprobantes con número o CAE
+    (`es_cacheable`). La clave incluye la fecha impresa (`fijar_fecha_emision`).
+    Un comprobante más grande que la cuarta parte del presupuesto no se guarda.
+    """
+
+    def __init__(self, max_bytes: int = int(COMPROBANTES_CACHE_MAX_MB * 1024 * 1024), ttl_sec: float = COMPROBANTES_CACHE_TTL_SEC):
+        self.max_bytes = max_bytes
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.desalojos = 0
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] <= time.monotonic():
+                if entrada is not None:
+                    self._quitar(clave)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.hits += 1
+            return entrada[1]
+
+    def guardar(self, clave: str, contenido: bytes) -> None:
+        if self.ttl_sec <= 0 or len(contenido) > self.max_bytes // 4:
+            return
+        with self._lock:
+            self._quitar(clave)
+            self._entradas[clave] = (time.monotonic() + self.ttl_sec, contenido)
+            self._bytes += len(contenido)
+            while self._bytes > self.max_bytes:
+                self._quitar(next(iter(self._entradas)))
+                self.desalojos += 1
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.desalojos = 0
+
+    def metricas(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_sec": self.ttl_sec,
+                "hits": self.hits,
+                "misses": self.misses,
+                "desalojos": self.desalojos,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+            }
+
+    def _quitar(self, clave: str) -> None:
+        entrada = self._entradas.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= len(entrada[1])
+
+
+_cache_comprobantes = CacheComprobantes()
+
+
+def obtener_cache_comprobantes() -> CacheComprobantes:
+    return _cache_comprobantes
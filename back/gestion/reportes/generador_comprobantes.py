@@ -1,17 +1,20 @@
 # back/gestion/reportes/generador_comprobantes.py
 
 import os
+import tempfile
+import threading
 import traceback
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 from zoneinfo import ZoneInfo
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from weasyprint import HTML, CSS
 
 # --- Módulos del Proyecto ---
 from back.schemas.comprobante_schemas import GenerarComprobanteRequest
 # Importamos la nueva función modularizada para generar el QR
 from .qr_generator import generar_qr_para_comprobante
+from .cache_comprobantes import clave_comprobante, es_cacheable, fijar_fecha_emision, obtener_cache_comprobantes
 
 # --- Utilidades internas ---
 _MAP_TIPO_AFIP_LETRA = {
@@ -127,6 +130,10 @@ def _enrich_transaccion(transaccion) -> Any:
 
 # --- Constantes y Configuración ---
 TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plantillas')
+# Bytecode compilado de las plantillas, compartido entre workers y reinicios ("" = solo en memoria).
+JINJA_BYTECODE_CACHE_DIR = os.getenv(
+    "JINJA_BYTECODE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "jinja_comprobantes")
+)
 TZ_ARGENTINA = ZoneInfo("America/Argentina/Buenos_Aires")
 TZ_UTC = ZoneInfo("UTC")
 ANCHOS_IMPRESORA_VALIDOS = frozenset({"58mm", "80mm"})
@@ -243,13 +250,38 @@ def _css_comprobante_termico(estilos: Dict[str, str]) -> str:
 
 TIPOS_TICKET_TERMICO = frozenset({"recibo", "factura", "comprobante"})
 
-def _crear_env_jinja() -> Environment:
-    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+_env_jinja: Optional[Environment] = None
+_env_jinja_lock = threading.Lock()
+
+
+def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    if not JINJA_BYTECODE_CACHE_DIR:
+        return None
+    try:
+        os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"Sin caché de bytecode Jinja en {JINJA_BYTECODE_CACHE_DIR}: {e}")
+        return None
+    return FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR)
+
+
+def _nuevo_env_jinja() -> Environment:
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), bytecode_cache=_bytecode_cache())
     env.filters['date'] = format_datetime
     env.filters['wrap_ticket'] = _wrap_ticket_text
     env.filters['ticket_line'] = _ticket_line
     return env
 
+
+def _crear_env_jinja() -> Environment:
+    """Environment del módulo: conserva las plantillas compiladas entre llamadas. No modificarlo."""
+    global _env_jinja
+    if _env_jinja is None:
+        with _env_jinja_lock:
+            if _env_jinja is None:
+                _env_jinja = _nuevo_env_jinja()
+    return _env_jinja
+
 def format_datetime(value, format='%d/%m/%Y %H:%M'):
     """Formatea fechas en hora Argentina. Las fechas naive del backend se asumen UTC."""
     if isinstance(value, str):
@@ -264,12 +296,31 @@ def format_datetime(value, format='%d/%m/%Y %H:%M'):
         return local.strftime(format)
     return value
 
+def fecha_emision_de(data: GenerarComprobanteRequest) -> datetime:
+    """Fecha a imprimir: la del request si viene (reimpresión / caché), si no la del render."""
+    return data.fecha_emision or datetime.now()
+
 # --- Funciones Principales de Generación de PDF ---
 
 def generar_comprobante_stateless(data: GenerarComprobanteRequest) -> bytes:
     """
-    Genera un comprobante en PDF o texto plano según el formato solicitado.
+    Genera un comprobante en PDF, texto plano o ESC/POS según el formato solicitado.
+    Las reimpresiones del mismo comprobante numerado salen de la caché de comprobantes.
     """
+    if not es_cacheable(data):
+        return _generar_comprobante(data)
+    data = fijar_fecha_emision(data)
+    cache = obtener_cache_comprobantes()
+    clave = clave_comprobante(data)
+    contenido = cache.obtener(clave)
+    if contenido is None:
+        contenido = _generar_comprobante(data)
+        cache.guardar(clave, contenido)
+    return contenido
+
+
+def _generar_comprobante(data: GenerarComprobanteRequest) -> bytes:
+    from back.gestion.reportes.generador_escpos import es_formato_escpos, generar_comprobante_escpos
     from back.gestion.reportes.generador_texto_plano import (
         es_formato_texto_plano,
         generar_comprobante_texto_plano,
@@ -278,6 +329,12 @@ def generar_comprobante_stateless(data: GenerarComprobanteRequest) -> bytes:
     print(f"\n--- [TRACE: Iniciando generación de comprobante] ---")
     print(f"Tipo: {data.tipo}, Formato: {data.formato}")
 
+    if es_formato_escpos(data.formato):
+        escpos_bytes = generar_comprobante_escpos(data)
+        print(f"-> ESC/POS generado. Tamaño: {len(escpos_bytes)} bytes.")
+        print("--- [FIN TRACE: Generación exitosa] ---\n")
+        return escpos_bytes
+
     if es_formato_texto_plano(data.formato):
         texto_bytes = generar_comprobante_texto_plano(data)
         print(f"-> Texto plano generado. Tamaño: {len(texto_bytes)} bytes.")
@@ -321,11 +378,12 @@ def generar_comprobante_stateless(data: GenerarComprobanteRequest) -> bytes:
     if afip_context is not None and qr_url_string and not _get_attr_or_key(afip_context, "qr_url", None):
         _set_attr_or_key(afip_context, "qr_url", qr_url_string)
 
+    fecha_emision = fecha_emision_de(data)
     contexto = {
         "emisor": data.emisor,
         "receptor": data.receptor,
         "transaccion": transaccion_para_renderizar,
-        "fecha_emision": datetime.now(),
+        "fecha_emision": fecha_emision,
         # Se deja qr_base64 para retrocompatibilidad, pero las plantillas nuevas usan afip.qr_base64
         "qr_base64": qr_base64_string,
         "afip": afip_context,
@@ -358,7 +416,7 @@ def generar_comprobante_stateless(data: GenerarComprobanteRequest) -> bytes:
                     dias_str = ''.join(filter(str.isdigit, fecha_limite))
                     if dias_str:
                         dias = int(dias_str)
-                        fecha_limite_dt = datetime.now() + timedelta(days=dias)
+                        fecha_limite_dt = fecha_emision + timedelta(days=dias)
                         fecha_limite = fecha_limite_dt.strftime('%d/%m/%Y')
                 except Exception as e_date:
                     print(f"No se pudo calcular fecha límite exacta: {e_date}")
@@ -367,7 +425,7 @@ def generar_comprobante_stateless(data: GenerarComprobanteRequest) -> bytes:
                 "emisor": data.emisor,
                 "receptor": data.receptor,
                 "transaccion": transaccion_para_renderizar,
-                "fecha_emision": datetime.now(),
+                "fecha_emision": fecha_emision,
                 "numero": data.numero_comprobante if hasattr(data, 'numero_comprobante') else "",
                 "fecha_limite_cambio": fecha_limite,
                 "estilos": estilos_ticket,
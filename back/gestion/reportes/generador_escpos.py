@@ -0,0 +1,149 @@
+# back/gestion/reportes/generador_escpos.py
+
+"""
+Salida ESC/POS nativa para impresoras térmicas (comandera / RAW).
+
+Reusa los layouts de generador_texto_plano, pero en vez de texto o HTML→PDF emite
+los comandos de la impresora: negrita y doble alto para encabezados y totales, QR
+fiscal dibujado por la impresora (GS ( k) y corte de papel. Sin Jinja ni WeasyPrint:
+un ticket se arma en fracciones de milisegundo y ocupa de 0,4 a 2 KB (vs. 5-10 KB en HTML/PDF).
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional
+
+from back.gestion.reportes.generador_comprobantes import (
+    TZ_ARGENTINA,
+    _resolver_ancho_impresora,
+    _ticket_line,
+    _wrap_ticket_text,
+    fecha_emision_de,
+)
+from back.gestion.reportes.generador_texto_plano import (
+    _armar_comprobante,
+    _armar_ticket_cierre,
+    _preparar_transaccion,
+)
+from back.gestion.reportes.qr_generator import construir_url_qr_afip, generar_comandos_escpos_qr
+from back.schemas.comprobante_schemas import FORMATOS_ESCPOS, GenerarComprobanteRequest
+
+# Columnas en Font A (12x24): 48 en 80mm, 32 en 58mm.
+COLUMNAS_ESCPOS = {"58mm": 32, "80mm": 48}
+
+# PC858 (Latin-1 + €) cubre los acentos y la ñ; ESC t 19 la selecciona en Epson y compatibles.
+# Los comandos son ASCII: viajan en el mismo str que el texto y se codifican juntos.
+_CODEPAGE = "cp858"
+_INICIALIZAR = "\x1b@" + "\x1bt\x13"
+_ALINEACION = {"izquierda": "\x1ba\x00", "centro": "\x1ba\x01"}
+_RESALTADO_ON = "\x1bE\x01" + "\x1d!\x01"  # negrita + doble alto (el ancho de columna no cambia)
+_RESALTADO_OFF = "\x1bE\x00" + "\x1d!\x00"
+_SALTO = "\n"
+# GS V 66 n: avanza hasta la cuchilla (+ n) y hace corte parcial.
+_CORTE = "\x1dVB\x03"
+
+
+def es_formato_escpos(formato: Optional[str]) -> bool:
+    if not formato:
+        return False
+    return formato.strip().lower() in FORMATOS_ESCPOS
+
+
+class TicketEscposBuilder:
+    """Misma interfaz que TicketTextoBuilder, pero arma bytes ESC/POS."""
+
+    def __init__(self, ancho: int) -> None:
+        self.ancho = ancho
+        self._texto: List[str] = [_INICIALIZAR]
+        self._bloques: List[bytes] = []
+        self._alineacion = "izquierda"
+        self._cortado = False
+
+    def _alinear(self, alineacion: str) -> None:
+        if alineacion != self._alineacion:
+            self._texto.append(_ALINEACION[alineacion])
+            self._alineacion = alineacion
+
+    def _escribir(self, lineas: List[str], resaltado: bool) -> None:
+        if not lineas:
+            return
+        self._cortado = False
+        if resaltado:
+            self._texto.append(_RESALTADO_ON)
+        for linea in lineas:
+            self._texto.append(linea)
+            self._texto.append(_SALTO)
+        if resaltado:
+            self._texto.append(_RESALTADO_OFF)
+
+    def _volcar(self) -> None:
+        if self._texto:
+            self._bloques.append("".join(self._texto).encode(_CODEPAGE, errors="replace"))
+            self._texto = []
+
+    def separador(self, caracter: str = "-") -> "TicketEscposBuilder":
+        self._alinear("izquierda")
+        self._escribir([caracter * self.ancho], False)
+        return self
+
+    def vacio(self) -> "TicketEscposBuilder":
+        self._texto.append(_SALTO)
+        return self
+
+    def centrado(self, texto: str, resaltado: bool = False) -> "TicketEscposBuilder":
+        self._alinear("centro")
+        self._escribir(_wrap_ticket_text(texto, self.ancho), resaltado)
+        return self
+
+    def linea(self, texto: str, resaltado: bool = False) -> "TicketEscposBuilder":
+        self._alinear("izquierda")
+        self._escribir(_wrap_ticket_text(texto, self.ancho), resaltado)
+        return self
+
+    def par(self, izquierda: str, derecha: str, resaltado: bool = False) -> "TicketEscposBuilder":
+        self._alinear("izquierda")
+        self._escribir([_ticket_line(izquierda, derecha, self.ancho)], resaltado)
+        return self
+
+    def qr(self, url_qr: Optional[str]) -> "TicketEscposBuilder":
+        if not url_qr:
+            return self
+        self._alinear("centro")
+        # El QR lleva bytes de longitud (>= 0x80) que no pasan por la codificación del texto.
+        self._volcar()
+        self._bloques.append(generar_comandos_escpos_qr(url_qr))
+        self._texto.append(_SALTO)
+        self._cortado = False
+        return self
+
+    def corte(self) -> "TicketEscposBuilder":
+        if not self._cortado:
+            self._alinear("izquierda")
+            self._texto.append(_CORTE)
+            self._cortado = True
+        return self
+
+    def build(self) -> bytes:
+        self.corte()
+        self._volcar()
+        return b"".join(self._bloques)
+
+
+def _columnas(ancho_impresora: Optional[str]) -> int:
+    return COLUMNAS_ESCPOS.get(ancho_impresora or "80mm", COLUMNAS_ESCPOS["80mm"])
+
+
+def generar_comprobante_escpos(data: GenerarComprobanteRequest) -> bytes:
+    """Recibo, factura, comanda o ticket de mesa como bytes ESC/POS listos para el puerto RAW."""
+    ancho = _columnas(_resolver_ancho_impresora(data.emisor.aclaraciones_legales or {}))
+    qr_url = construir_url_qr_afip(data)
+    transaccion, afip = _preparar_transaccion(data, None, qr_url)
+    ticket = TicketEscposBuilder(ancho)
+    _armar_comprobante(ticket, data, transaccion, afip, fecha_emision_de(data), qr_url)
+    return ticket.build()
+
+
+def generar_ticket_cierre_escpos(datos: dict) -> bytes:
+    """Ticket de cierre de caja (mismos datos que generar_ticket_cierre_pdf)."""
+    ticket = TicketEscposBuilder(_columnas(datos.get("ancho_impresora")))
+    _armar_ticket_cierre(ticket, datos, datetime.now(TZ_ARGENTINA))
+    return ticket.build()
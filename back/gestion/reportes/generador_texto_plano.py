@@ -19,6 +19,7 @@ from back.gestion.reportes.generador_comprobantes import (
     _set_attr_or_key,
     _ticket_line,
     _wrap_ticket_text,
+    fecha_emision_de,
     format_datetime,
 )
 
@@ -48,17 +49,17 @@ class TicketTextoBuilder:
         self._lineas.append("")
         return self
 
-    def centrado(self, texto: str) -> "TicketTextoBuilder":
+    def centrado(self, texto: str, resaltado: bool = False) -> "TicketTextoBuilder":
         for linea in _wrap_ticket_text(texto, self.ancho):
             self._lineas.append(linea.center(self.ancho))
         return self
 
-    def linea(self, texto: str) -> "TicketTextoBuilder":
+    def linea(self, texto: str, resaltado: bool = False) -> "TicketTextoBuilder":
         for linea in _wrap_ticket_text(texto, self.ancho):
             self._lineas.append(linea)
         return self
 
-    def par(self, izquierda: str, derecha: str) -> "TicketTextoBuilder":
+    def par(self, izquierda: str, derecha: str, resaltado: bool = False) -> "TicketTextoBuilder":
         self._lineas.append(_ticket_line(izquierda, derecha, self.ancho))
         return self
 
@@ -68,6 +69,15 @@ class TicketTextoBuilder:
         self._lineas.extend(qr_url_a_lineas_ascii(url_qr, self.ancho))
         return self
 
+    def qr(self, url_qr: Optional[str]) -> "TicketTextoBuilder":
+        return self.qr_ascii(url_qr)
+
+    def corte(self) -> "TicketTextoBuilder":
+        if self._lineas:
+            self._lineas[-1] = self._lineas[-1].rstrip()
+        self._lineas.append("")
+        return self
+
     def build(self) -> str:
         return "\n".join(self._lineas).rstrip() + "\n"
 
@@ -96,8 +106,13 @@ def generar_recibo_texto_plano(
     ancho: int,
 ) -> str:
     ticket = TicketTextoBuilder(ancho)
+    _armar_recibo(ticket, emisor, receptor, transaccion, fecha_emision, afip)
+    return ticket.build()
 
-    ticket.centrado(_get_attr_or_key(emisor, "razon_social") or "")
+
+def _armar_recibo(ticket: Any, emisor: Any, receptor: Any, transaccion: Any, fecha_emision: datetime, afip: Any) -> None:
+    """Layout del recibo sobre cualquier builder de ticket (texto plano o ESC/POS)."""
+    ticket.centrado(_get_attr_or_key(emisor, "razon_social") or "", resaltado=True)
     ticket.centrado(f"CUIT: {_get_attr_or_key(emisor, 'cuit') or ''}")
     domicilio = _get_attr_or_key(emisor, "domicilio")
     if domicilio:
@@ -145,7 +160,7 @@ def generar_recibo_texto_plano(
             etiqueta += f" ({desc_gral_por:.0f}%)"
         ticket.par(etiqueta, f"-${desc_general:.2f}")
 
-    ticket.par("TOTAL:", f"${total:.2f}")
+    ticket.par("TOTAL:", f"${total:.2f}", resaltado=True)
 
     observaciones = _get_attr_or_key(transaccion, "observaciones")
     if observaciones:
@@ -159,8 +174,6 @@ def generar_recibo_texto_plano(
     ticket.separador()
     ticket.centrado("Firma y Aclaracion")
 
-    return ticket.build()
-
 
 def generar_factura_texto_plano(
     emisor: Any,
@@ -172,8 +185,20 @@ def generar_factura_texto_plano(
     qr_url: Optional[str] = None,
 ) -> str:
     ticket = TicketTextoBuilder(ancho)
+    _armar_factura(ticket, emisor, receptor, transaccion, fecha_emision, afip, qr_url)
+    return ticket.build()
 
-    ticket.centrado(_get_attr_or_key(emisor, "razon_social") or "")
+
+def _armar_factura(
+    ticket: Any,
+    emisor: Any,
+    receptor: Any,
+    transaccion: Any,
+    fecha_emision: datetime,
+    afip: Any,
+    qr_url: Optional[str] = None,
+) -> None:
+    ticket.centrado(_get_attr_or_key(emisor, "razon_social") or "", resaltado=True)
     domicilio = _get_attr_or_key(emisor, "domicilio")
     if domicilio:
         ticket.centrado(str(domicilio))
@@ -201,7 +226,7 @@ def generar_factura_texto_plano(
     numero = _get_attr_or_key(afip, "numero_comprobante") or 0
     punto_venta = _get_attr_or_key(emisor, "punto_venta") or 0
 
-    ticket.par(str(tipo_nombre), str(tipo_letra))
+    ticket.par(str(tipo_nombre), str(tipo_letra), resaltado=True)
     ticket.centrado(f"Cod. {_codigo_afip(afip)}")
     ticket.centrado(f"P.Venta: {punto_venta:05d} - N: {numero:08d}")
     ticket.centrado(f"Fecha: {format_datetime(fecha_emision)}")
@@ -253,7 +278,7 @@ def generar_factura_texto_plano(
         ticket.par("Neto Gravado", f"${neto:.2f}")
         ticket.par("IVA (21%)", f"${iva:.2f}")
 
-    ticket.par("TOTAL", f"${total:.2f}")
+    ticket.par("TOTAL", f"${total:.2f}", resaltado=True)
 
     pagos = _get_attr_or_key(transaccion, "pagos") or []
     if pagos:
@@ -281,7 +306,7 @@ def generar_factura_texto_plano(
         ticket.centrado(f"CAE N: {cae}")
         ticket.centrado(f"Vto. CAE: {_vencimiento_cae(afip)}")
         if qr_url:
-            ticket.qr_ascii(qr_url)
+            ticket.qr(qr_url)
         else:
             ticket.centrado("[ QR AFIP ]")
         ticket.centrado("Comprobante Autorizado")
@@ -293,8 +318,6 @@ def generar_factura_texto_plano(
     ticket.centrado("Regimen de Transparencia Fiscal")
     ticket.centrado("Ley 27.743")
 
-    return ticket.build()
-
 
 def _generar_ticket_cambio_texto_plano(
     emisor: Any,
@@ -306,9 +329,22 @@ def _generar_ticket_cambio_texto_plano(
     ancho: int,
 ) -> str:
     ticket = TicketTextoBuilder(ancho)
+    _armar_ticket_cambio(ticket, emisor, receptor, transaccion, fecha_emision, numero, fecha_limite)
+    return ticket.build()
+
+
+def _armar_ticket_cambio(
+    ticket: Any,
+    emisor: Any,
+    receptor: Any,
+    transaccion: Any,
+    fecha_emision: datetime,
+    numero: str,
+    fecha_limite: str,
+) -> None:
     ticket.separador()
     ticket.centrado(_get_attr_or_key(emisor, "razon_social") or "")
-    ticket.centrado("TICKET DE CAMBIO")
+    ticket.centrado("TICKET DE CAMBIO", resaltado=True)
     ticket.centrado(f"Fecha: {format_datetime(fecha_emision, '%d/%m/%Y %H:%M')}")
     if numero:
         ticket.centrado(f"Ref: {numero}")
@@ -330,26 +366,101 @@ def _generar_ticket_cambio_texto_plano(
     ticket.separador()
     ticket.centrado("Presentar este ticket y el producto")
     ticket.centrado("en perfectas condiciones.")
-    return ticket.build()
 
 
-def generar_comprobante_texto_plano(data: GenerarComprobanteRequest) -> bytes:
-    """
-    Genera ticket de ancho fijo + QR AFIP como HTML imprimible.
+def _armar_comanda(ticket: Any, emisor: Any, transaccion: Any, fecha_emision: datetime) -> None:
+    ticket.centrado("COMANDA", resaltado=True)
+    ticket.centrado(f"Fecha: {format_datetime(fecha_emision, '%d/%m/%Y %H:%M')}")
+    ticket.separador()
+    for item in _get_attr_or_key(transaccion, "items") or []:
+        cantidad = _get_attr_or_key(item, "cantidad") or 0
+        ticket.linea(f"{cantidad:g} x {_get_attr_or_key(item, 'descripcion') or ''}", resaltado=True)
+    observaciones = _get_attr_or_key(transaccion, "observaciones")
+    if observaciones:
+        ticket.separador()
+        ticket.linea(str(observaciones))
 
-    El cuerpo es texto monospace (comandera / driver de texto). El QR fiscal
-    AFIP no entra en ASCII de 58/80mm; se embebe PNG escaneable al emitir.
-    """
-    from back.gestion.reportes.qr_generator import generar_qr_para_comprobante
 
-    aclaraciones = data.emisor.aclaraciones_legales or {}
-    ancho = int(_estilos_impresora_termica(_resolver_ancho_impresora(aclaraciones))["chars_per_line"])
+def _armar_ticket_mesa(ticket: Any, emisor: Any, transaccion: Any, fecha_emision: datetime) -> None:
+    ticket.centrado(_get_attr_or_key(emisor, "razon_social") or "", resaltado=True)
+    ticket.centrado("TICKET MESA")
+    ticket.centrado(f"Fecha: {format_datetime(fecha_emision, '%d/%m/%Y %H:%M')}")
+    ticket.separador()
+    for item in _get_attr_or_key(transaccion, "items") or []:
+        cantidad = _get_attr_or_key(item, "cantidad") or 0
+        precio = _get_attr_or_key(item, "precio_unitario") or 0
+        subtotal = _get_attr_or_key(item, "subtotal")
+        if subtotal is None:
+            subtotal = cantidad * precio
+        ticket.par(f"{cantidad:g}x {_get_attr_or_key(item, 'descripcion') or ''}", f"${subtotal:.2f}")
+    ticket.separador()
+    ticket.par("TOTAL", f"${(_get_attr_or_key(transaccion, 'total') or 0):.2f}", resaltado=True)
+    ticket.centrado("No valido como factura")
 
-    qr_base64 = generar_qr_para_comprobante(data)
-    qr_url = construir_url_qr_afip(data)
-    # Con PNG embebido no hace falta ASCII (nunca entra el payload AFIP).
-    qr_url_para_ascii = None if qr_base64 else qr_url
 
+def _armar_ticket_cierre(ticket: Any, datos: dict, fecha_emision: datetime) -> None:
+    """Mismo contenido que ticket/cierre_lote_detallado.html."""
+    empresa = datos.get("empresa")
+    sesion = datos.get("sesion")
+    totales = datos.get("totales") or {}
+    metodos = datos.get("desglose_metodos_pago") or {}
+
+    def monto(valor: Any) -> str:
+        return f"${float(valor or 0):.2f}"
+
+    nombre = _get_attr_or_key(empresa, "nombre_fantasia") or _get_attr_or_key(empresa, "nombre_legal") or ""
+    ticket.centrado(str(nombre).upper(), resaltado=True)
+    ticket.centrado(f"CUIT: {_get_attr_or_key(empresa, 'cuit') or ''}")
+    ticket.separador()
+    ticket.centrado("CIERRE DE CAJA", resaltado=True)
+    ticket.centrado(f"Sesion ID: {_get_attr_or_key(sesion, 'id')}")
+    ticket.separador()
+
+    ticket.par("Impresion:", format_datetime(fecha_emision))
+    ticket.par("Apertura:", str(format_datetime(_get_attr_or_key(sesion, "fecha_apertura")) or ""))
+    ticket.par("Cajero Apertura:", str(datos.get("usuario_apertura") or ""))
+    ticket.par("Cierre:", str(format_datetime(_get_attr_or_key(sesion, "fecha_cierre")) or ""))
+    ticket.par("Cajero Cierre:", str(datos.get("usuario_cierre") or ""))
+
+    ticket.separador()
+    ticket.linea("Arqueo de Caja")
+    ticket.par("Saldo Inicial:", monto(_get_attr_or_key(sesion, "saldo_inicial")))
+    ticket.par("(+) Total Ventas:", monto(totales.get("ventas")))
+    ticket.par("(+) Total Propinas:", monto(totales.get("propinas")))
+    ticket.par("(+) Ingresos Varios:", monto(totales.get("ingresos")))
+    ticket.par("(-) Egresos Varios:", monto(totales.get("egresos")))
+    ticket.separador()
+    ticket.par("SALDO CALCULADO:", monto(_get_attr_or_key(sesion, "saldo_final_calculado")), resaltado=True)
+    ticket.par("SALDO DECLARADO:", monto(_get_attr_or_key(sesion, "saldo_final_declarado")))
+    ticket.separador()
+    ticket.par("DIFERENCIA:", monto(_get_attr_or_key(sesion, "diferencia")), resaltado=True)
+
+    ticket.separador()
+    ticket.linea("Desglose de Ventas")
+    ticket.par("Ventas en Efectivo:", monto(metodos.get("efectivo")))
+    ticket.par("Ventas por Transferencia:", monto(metodos.get("transferencia")))
+    ticket.par("Ventas por Banco:", monto(metodos.get("bancario")))
+    ticket.par("TOTAL VENTAS:", monto(totales.get("ventas")), resaltado=True)
+
+    for titulo, clave in (("Detalle de Ingresos", "desglose_ingresos"), ("Detalle de Egresos", "desglose_egresos")):
+        movimientos = datos.get(clave) or []
+        if not movimientos:
+            continue
+        ticket.separador()
+        ticket.linea(titulo)
+        for movimiento in movimientos:
+            ticket.par(f"{str(movimiento.get('concepto') or '')[:20]}:", monto(movimiento.get("monto")))
+
+    ticket.separador()
+    ticket.centrado("Fin del reporte de cierre.")
+
+
+TIPOS_TICKET_COMANDERA = frozenset({"comanda", "ticket_mesa"})
+
+
+def _preparar_transaccion(data: GenerarComprobanteRequest, qr_base64: Optional[str], qr_url: Optional[str]):
+    """Observaciones + aclaraciones legales, totales y datos AFIP, como en el render HTML."""
+    aclaraciones = data.emisor.aclaraciones_legales or {}
     observaciones_usuario = data.transaccion.observaciones or ""
     texto_legal = aclaraciones.get(data.tipo)
     observaciones_finales = observaciones_usuario
@@ -366,47 +477,78 @@ def generar_comprobante_texto_plano(data: GenerarComprobanteRequest) -> bytes:
     afip = _afip_build_or_enrich(transaccion, qr_base64)
     if afip is not None and qr_url and not _get_attr_or_key(afip, "qr_url", None):
         _set_attr_or_key(afip, "qr_url", qr_url)
-    fecha_emision = datetime.now()
+    return transaccion, afip
 
+
+def _fecha_limite_cambio(data: GenerarComprobanteRequest) -> str:
+    fecha_limite = str(data.plazo_cambio or "30 dias")
+    try:
+        dias_str = "".join(filter(str.isdigit, fecha_limite))
+        if dias_str:
+            fecha_limite = (fecha_emision_de(data) + timedelta(days=int(dias_str))).strftime("%d/%m/%Y")
+    except Exception:
+        pass
+    return fecha_limite
+
+
+def _armar_comprobante(
+    ticket: Any,
+    data: GenerarComprobanteRequest,
+    transaccion: Any,
+    afip: Any,
+    fecha_emision: datetime,
+    qr_url: Optional[str],
+) -> None:
+    """Arma el comprobante pedido (y el ticket de cambio, si corresponde) sobre `ticket`."""
     tipo = data.tipo.lower()
     if tipo == "recibo":
-        contenido = generar_recibo_texto_plano(
-            data.emisor, data.receptor, transaccion, fecha_emision, afip, ancho
-        )
+        _armar_recibo(ticket, data.emisor, data.receptor, transaccion, fecha_emision, afip)
     elif tipo in {"factura", "comprobante"}:
-        contenido = generar_factura_texto_plano(
-            data.emisor,
-            data.receptor,
-            transaccion,
-            fecha_emision,
-            afip,
-            ancho,
-            qr_url_para_ascii,
-        )
+        _armar_factura(ticket, data.emisor, data.receptor, transaccion, fecha_emision, afip, qr_url)
+    elif tipo == "comanda":
+        _armar_comanda(ticket, data.emisor, transaccion, fecha_emision)
+    elif tipo == "ticket_mesa":
+        _armar_ticket_mesa(ticket, data.emisor, transaccion, fecha_emision)
     else:
         raise ValueError(
-            f"Texto plano no soportado para tipo '{data.tipo}'. "
-            f"Use: {', '.join(sorted(TIPOS_TICKET_TERMICO))}."
+            f"Formato '{data.formato}' no soportado para tipo '{data.tipo}'. "
+            f"Use: {', '.join(sorted(TIPOS_TICKET_TERMICO | TIPOS_TICKET_COMANDERA))}."
         )
 
-    if data.incluir_ticket_cambio:
-        fecha_limite = str(data.plazo_cambio or "30 dias")
-        try:
-            dias_str = "".join(filter(str.isdigit, fecha_limite))
-            if dias_str:
-                fecha_limite = (datetime.now() + timedelta(days=int(dias_str))).strftime("%d/%m/%Y")
-        except Exception:
-            pass
+    if data.incluir_ticket_cambio and tipo not in TIPOS_TICKET_COMANDERA:
+        ticket.corte()
         numero = getattr(data, "numero_comprobante", "") or ""
-        contenido += "\n" + _generar_ticket_cambio_texto_plano(
+        _armar_ticket_cambio(
+            ticket,
             data.emisor,
             data.receptor,
             transaccion,
             fecha_emision,
             str(numero),
-            fecha_limite,
-            ancho,
+            _fecha_limite_cambio(data),
         )
 
-    html = envolver_ticket_texto_html(contenido, qr_base64)
+
+def generar_comprobante_texto_plano(data: GenerarComprobanteRequest) -> bytes:
+    """
+    Genera ticket de ancho fijo + QR AFIP como HTML imprimible.
+
+    El cuerpo es texto monospace (comandera / driver de texto). El QR fiscal
+    AFIP no entra en ASCII de 58/80mm; se embebe PNG escaneable al emitir.
+    """
+    from back.gestion.reportes.qr_generator import generar_qr_para_comprobante
+
+    aclaraciones = data.emisor.aclaraciones_legales or {}
+    ancho = int(_estilos_impresora_termica(_resolver_ancho_impresora(aclaraciones))["chars_per_line"])
+
+    qr_base64 = generar_qr_para_comprobante(data)
+    qr_url = construir_url_qr_afip(data)
+    # Con PNG embebido no hace falta ASCII (nunca entra el payload AFIP).
+    qr_url_para_ascii = None if qr_base64 else qr_url
+
+    transaccion, afip = _preparar_transaccion(data, qr_base64, qr_url)
+    ticket = TicketTextoBuilder(ancho)
+    _armar_comprobante(ticket, data, transaccion, afip, fecha_emision_de(data), qr_url_para_ascii)
+
+    html = envolver_ticket_texto_html(ticket.build(), qr_base64)
     return html.encode("utf-8")
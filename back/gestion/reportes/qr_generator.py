@@ -3,6 +3,7 @@
 import base64
 import html
 import json
+from functools import lru_cache
 from io import BytesIO
 from typing import Optional
 
@@ -161,6 +162,15 @@ def generar_comandos_escpos_qr(url: str, modulo_size: int = 4) -> bytes:
     return model + module + ec + store + print_qr
 
 
+@lru_cache(maxsize=256)
+def _qr_png_base64(url_qr: str) -> str:
+    """PNG del QR en Base64; la URL identifica el comprobante, así que se reusa en reimpresiones."""
+    qr_img = qrcode.make(url_qr, border=1)
+    buffered = BytesIO()
+    qr_img.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
 def generar_qr_para_comprobante(req: GenerarComprobanteRequest) -> str | None:
     """
     Función centralizada que genera el QR en Base64 para un comprobante.
@@ -176,10 +186,7 @@ def generar_qr_para_comprobante(req: GenerarComprobanteRequest) -> str | None:
 
     try:
         print("-> [DEBUG QR] Generando imagen PNG del QR...")
-        qr_img = qrcode.make(url_qr, border=1)
-        buffered = BytesIO()
-        qr_img.save(buffered, format="PNG")
-        resultado_final = base64.b64encode(buffered.getvalue()).decode("utf-8")
+        resultado_final = _qr_png_base64(url_qr)
         print("-> [DEBUG QR] ÉXITO: Imagen QR generada y codificada en Base64.")
         print("--- [DEBUG QR: Finalizado con éxito] ---\n")
         return resultado_final
@@ -0,0 +1,364 @@
+# back/gestion/reportes/servicio_render.py
+
+"""
+Render de comprobantes (WeasyPrint) fuera del threadpool de FastAPI.
+
+WeasyPrint es CPU puro: renderizado en el threadpool, una ráfaga de tickets ocupa los
+hilos y el GIL que necesitan los endpoints de venta. Acá los renders van a un pool de
+procesos con una cola acotada, repartida por empresa en round-robin (una empresa que
+manda 30 comandas no deja esperando el ticket de otra) y con timeout por pedido.
+
+Los routers hacen ``await renderizar_comprobante(...)`` / ``renderizar_ticket_cierre``.
+``PDF_RENDER_WORKERS=0`` vuelve a renderizar en el threadpool (sin procesos hijos).
+El formato ESC/POS no pasa por el pool: se arma en el event loop (sub-milisegundo).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from sqlmodel import SQLModel
+from starlette.concurrency import run_in_threadpool
+
+from back.gestion.reportes.cache_comprobantes import (
+    clave_comprobante,
+    es_cacheable,
+    fijar_fecha_emision,
+    obtener_cache_comprobantes,
+)
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+PDF_RENDER_WORKERS = _env_int("PDF_RENDER_WORKERS", 2)
+PDF_RENDER_COLA_MAX = _env_int("PDF_RENDER_COLA_MAX", 64)
+PDF_RENDER_COLA_MAX_EMPRESA = _env_int("PDF_RENDER_COLA_MAX_EMPRESA", 16)
+PDF_RENDER_TIMEOUT_SEC = float(os.getenv("PDF_RENDER_TIMEOUT_SEC", "20"))
+# Niceness de los procesos de render: con pocos CPUs, las ventas les ganan el procesador.
+PDF_RENDER_NICE = _env_int("PDF_RENDER_NICE", 5)
+
+
+class ColaRenderLlena(Exception):
+    """La cola (global o de la empresa) está completa: el router responde 503."""
+
+
+class TimeoutRender(Exception):
+    """El render no terminó dentro de PDF_RENDER_TIMEOUT_SEC: el router responde 504."""
+
+
+@dataclass
+class _Trabajo:
+    id_empresa: int
+    funcion: Callable[..., bytes]
+    args: tuple
+    futuro: Future = field(default_factory=Future)
+    encolado_en: float = field(default_factory=time.monotonic)
+    executor: Any = None
+    vencido: bool = False
+    reintentado: bool = False
+
+
+def _bajar_prioridad() -> None:
+    if PDF_RENDER_NICE > 0 and hasattr(os, "nice"):
+        try:
+            os.nice(PDF_RENDER_NICE)
+        except OSError:
+            pass
+
+
+def _inicializar_proceso() -> None:
+    _bajar_prioridad()
+    # Importa WeasyPrint y compila el Environment antes del primer pedido.
+    from back.gestion.reportes import generador_comprobantes
+
+    generador_comprobantes._crear_env_jinja()
+
+
+def _render_comprobante(data: GenerarComprobanteRequest) -> bytes:
+    from back.gestion.reportes import generador_comprobantes
+
+    return generador_comprobantes._generar_comprobante(data)
+
+
+def _render_ticket_cierre(datos: dict) -> bytes:
+    from back.gestion.reportes import generador_comprobantes
+
+    return generador_comprobantes.generar_ticket_cierre_pdf(datos)
+
+
+class ServicioRender:
+    """
+    Despachador con a lo sumo ``workers`` renders en curso. Los pendientes esperan en una
+    deque por empresa; ``_turnos`` rota entre las empresas que tienen pendientes.
+    Un pedido que vence su timeout en la cola se descarta sin llegar a renderizarse; uno
+    que vence renderizando recicla el pool (los procesos se terminan y el próximo despacho
+    arma otro), así un render colgado no se queda con el lugar. Los demás renders que
+    estaban en ese pool vuelven a la cola una vez.
+    """
+
+    def __init__(
+        self,
+        workers: int = PDF_RENDER_WORKERS,
+        cola_max: int = PDF_RENDER_COLA_MAX,
+        cola_max_empresa: int = PDF_RENDER_COLA_MAX_EMPRESA,
+        timeout_sec: float = PDF_RENDER_TIMEOUT_SEC,
+        crear_executor: Optional[Callable[[int], Any]] = None,
+    ):
+        self.workers = workers
+        self.cola_max = cola_max
+        self.cola_max_empresa = cola_max_empresa
+        self.timeout_sec = timeout_sec
+        self._crear_executor = crear_executor or _crear_pool_procesos
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pendientes: Dict[int, Deque[_Trabajo]] = {}
+        self._turnos: Deque[int] = deque()
+        self._en_curso = 0
+        self._duraciones_ms: Deque[float] = deque(maxlen=1000)
+        self._esperas_ms: Deque[float] = deque(maxlen=1000)
+        self._completados_en: Deque[float] = deque(maxlen=10000)
+        self._contadores: Dict[int, Dict[str, int]] = {}
+        self._reciclados: "weakref.WeakSet" = weakref.WeakSet()
+
+    async def ejecutar(self, id_empresa: int, funcion: Callable[..., bytes], *args: Any) -> bytes:
+        if self.workers <= 0:
+            return await run_in_threadpool(funcion, *args)
+        trabajo = self.encolar(id_empresa, funcion, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(trabajo.futuro), timeout=self.timeout_sec)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._contar(id_empresa, "timeouts")
+                trabajo.vencido = True
+                colgado = trabajo.futuro.running() and trabajo.executor is not None
+            if colgado:
+                self._reciclar(trabajo.executor)
+            raise TimeoutRender(f"El render no terminó en {self.timeout_sec:g} s") from None
+
+    def _reciclar(self, executor: Any) -> None:
+        with self._lock:
+            if executor in self._reciclados:
+                return
+            self._reciclados.add(executor)
+            if self._executor is executor:
+                self._executor = None
+        # Terminar los procesos hace fallar sus futuros con BrokenProcessPool: _terminar
+        # libera los lugares y reencola lo que no había vencido.
+        for proceso in list((getattr(executor, "_processes", None) or {}).values()):
+            try:
+                proceso.terminate()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _cola_llena(self, id_empresa: int) -> bool:
+        cola = self._pendientes.get(id_empresa)
+        total = sum(len(c) for c in self._pendientes.values())
+        return total >= self.cola_max or (cola is not None and len(cola) >= self.cola_max_empresa)
+
+    def verificar_capacidad(self, id_empresa: int) -> None:
+        """
+        ColaRenderLlena si un pedido de la empresa no entraría ahora en la cola. Va antes de
+        pasos que no se pueden repetir (pedir el CAE): el 503 sale sin haber facturado.
+        """
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._cola_llena(id_empresa):
+                self._contar(id_empresa, "rechazados")
+                raise ColaRenderLlena("Hay demasiadas impresiones en cola; reintentar en unos segundos.")
+
+    def encolar(self, id_empresa: int, funcion: Callable[..., bytes], *args: Any) -> _Trabajo:
+        trabajo = _Trabajo(id_empresa, funcion, args)
+        with self._lock:
+            if self._cola_llena(id_empresa):
+                self._contar(id_empresa, "rechazados")
+                raise ColaRenderLlena("Hay demasiadas impresiones en cola; reintentar en unos segundos.")
+            cola = self._pendientes.get(id_empresa)
+            if cola is None:
+                cola = self._pendientes[id_empresa] = deque()
+                self._turnos.append(id_empresa)
+            cola.append(trabajo)
+            self._contar(id_empresa, "encolados")
+        self._despachar()
+        return trabajo
+
+    def _despachar(self) -> None:
+        lanzar: List[_Trabajo] = []
+        with self._lock:
+            while self._en_curso + len(lanzar) < self.workers and self._turnos:
+                id_empresa = self._turnos.popleft()
+                cola = self._pendientes[id_empresa]
+                trabajo = cola.popleft()
+                if cola:
+                    self._turnos.append(id_empresa)
+                else:
+                    del self._pendientes[id_empresa]
+                if trabajo.futuro.running() or trabajo.futuro.set_running_or_notify_cancel():
+                    lanzar.append(trabajo)
+            self._en_curso += len(lanzar)
+            if lanzar and self._executor is None:
+                self._executor = self._crear_executor(self.workers)
+            executor = self._executor
+
+        for trabajo in lanzar:
+            self._esperas_ms.append((time.monotonic() - trabajo.encolado_en) * 1000)
+            inicio = time.monotonic()
+            trabajo.executor = executor
+            try:
+                interno = executor.submit(trabajo.funcion, *trabajo.args)
+            except Exception as e:  # pool roto o cerrado
+                self._terminar(trabajo, inicio, executor, None, e)
+                continue
+            interno.add_done_callback(lambda f, t=trabajo, i=inicio, ex=executor: self._terminar(t, i, ex, f, None))
+
+    def _terminar(
+        self, trabajo: _Trabajo, inicio: float, executor: Any, interno: Optional[Future], error: Optional[BaseException]
+    ) -> None:
+        if interno is not None:
+            error = interno.exception()
+        roto = None
+        with self._lock:
+            self._en_curso -= 1
+            if isinstance(error, BrokenProcessPool) and self._executor is executor:
+                # Un hijo murió (OOM, segfault): el próximo despacho arma un pool nuevo.
+                roto, self._executor = executor, None
+            if (
+                error is not None
+                and executor in self._reciclados
+                and not trabajo.vencido
+                and not trabajo.reintentado
+            ):
+                # Cayó junto con un render colgado: vuelve al frente de la cola de su empresa.
+                trabajo.reintentado = True
+                cola = self._pendientes.get(trabajo.id_empresa)
+                if cola is None:
+                    cola = self._pendientes[trabajo.id_empresa] = deque()
+                    self._turnos.appendleft(trabajo.id_empresa)
+                cola.appendleft(trabajo)
+                reencolado = True
+            else:
+                reencolado = False
+        if reencolado:
+            self._despachar()
+            return
+        with self._lock:
+            if error is None:
+                self._duraciones_ms.append((time.monotonic() - inicio) * 1000)
+                self._completados_en.append(time.monotonic())
+                self._contar(trabajo.id_empresa, "completados")
+            else:
+                self._contar(trabajo.id_empresa, "errores")
+        if roto is not None:
+            roto.shutdown(wait=False, cancel_futures=True)
+        if error is None:
+            trabajo.futuro.set_result(interno.result())
+        else:
+            trabajo.futuro.set_exception(error)
+        self._despachar()
+
+    def _contar(self, id_empresa: int, nombre: str) -> None:
+        contadores = self._contadores.setdefault(
+            id_empresa, {"encolados": 0, "completados": 0, "errores": 0, "rechazados": 0, "timeouts": 0}
+        )
+        contadores[nombre] += 1
+
+    def metricas(self, id_empresa: Optional[int] = None) -> dict:
+        with self._lock:
+            ahora = time.monotonic()
+            duraciones = sorted(self._duraciones_ms)
+            esperas = sorted(self._esperas_ms)
+            empresas = [
+                {"id_empresa": i, "pendientes": len(self._pendientes.get(i, ())), **c}
+                for i, c in sorted(self._contadores.items())
+                if id_empresa is None or i == id_empresa
+            ]
+            return {
+                "workers": self.workers,
+                "en_curso": self._en_curso,
+                "pendientes": sum(len(c) for c in self._pendientes.values()),
+                "cola_max": self.cola_max,
+                "cola_max_empresa": self.cola_max_empresa,
+                "timeout_sec": self.timeout_sec,
+                "renders_ultimo_minuto": sum(1 for t in self._completados_en if ahora - t <= 60),
+                "render_ms_p50": round(statistics.median(duraciones), 2) if duraciones else None,
+                "render_ms_p99": round(duraciones[int(len(duraciones) * 0.99)], 2) if duraciones else None,
+                "espera_ms_p99": round(esperas[int(len(esperas) * 0.99)], 2) if esperas else None,
+                "empresas": empresas,
+            }
+
+    def cerrar(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _crear_pool_procesos(workers: int) -> ProcessPoolExecutor:
+    # spawn: el proceso de la API tiene hilos (scheduler, startup) y fork los copiaría a medias.
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_inicializar_proceso,
+    )
+
+
+def _datos_serializables(datos: dict) -> dict:
+    """Los modelos ORM del contexto viajan como dict de columnas (Jinja los lee igual)."""
+    return {k: v.model_dump() if isinstance(v, SQLModel) else v for k, v in datos.items()}
+
+
+_servicio_render: Optional[ServicioRender] = None
+_servicio_render_lock = threading.Lock()
+
+
+def obtener_servicio_render() -> ServicioRender:
+    global _servicio_render
+    if _servicio_render is None:
+        with _servicio_render_lock:
+            if _servicio_render is None:
+                _servicio_render = ServicioRender()
+    return _servicio_render
+
+
+async def renderizar_comprobante(data: GenerarComprobanteRequest, id_empresa: int) -> bytes:
+    """Equivalente async de generar_comprobante_stateless (misma caché de comprobantes)."""
+    from back.gestion.reportes import generador_escpos
+
+    if generador_escpos.es_formato_escpos(data.formato):
+        return generador_escpos.generar_comprobante_escpos(data)
+    if not es_cacheable(data):
+        return await obtener_servicio_render().ejecutar(id_empresa, _render_comprobante, data)
+    data = fijar_fecha_emision(data)
+    cache = obtener_cache_comprobantes()
+    clave = clave_comprobante(data)
+    contenido = cache.obtener(clave)
+    if contenido is None:
+        contenido = await obtener_servicio_render().ejecutar(id_empresa, _render_comprobante, data)
+        cache.guardar(clave, contenido)
+    return contenido
+
+
+async def renderizar_ticket_cierre(datos: dict, id_empresa: int, formato: Optional[str] = None) -> bytes:
+    from back.gestion.reportes import generador_escpos
+
+    if generador_escpos.es_formato_escpos(formato):
+        return generador_escpos.generar_ticket_cierre_escpos(datos)
+    return await obtener_servicio_render().ejecutar(id_empresa, _render_ticket_cierre, _datos_serializables(datos))
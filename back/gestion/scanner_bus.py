@@ -0,0 +1,631 @@
+# back/gestion/scanner_bus.py
+
+"""
+Bus de eventos del escáner/balanza compartible entre procesos.
+
+Con un solo worker alcanza la cola en memoria; con varios workers de uvicorn (o el
+proceso `back/sync_worker.py`) un push recibido por el worker A tiene que poder
+entregarse a un poller conectado al worker B, así que el backend es intercambiable:
+
+- ``memoria``: deque acotada por empresa dentro del proceso (comportamiento histórico).
+- ``sqlite``:  archivo SQLite compartido por los workers de un mismo host.
+- ``redis``:   cualquier servidor que hable el protocolo de Redis (RESP).
+
+Se elige con ``SCANNER_BUS_BACKEND``; ``obtener_scanner_bus()`` devuelve la instancia
+del proceso. Los eventos viajan como dict JSON-serializable.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from starlette.concurrency import run_in_threadpool
+
+from back.config import ruta_en_data_dir
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORIA = "memoria"
+BACKEND_SQLITE = "sqlite"
+BACKEND_REDIS = "redis"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+class EsperasPorEmpresa:
+    """
+    Pollers (futuros de asyncio) esperando eventos, agrupados por empresa.
+
+    Los push pueden llegar desde el threadpool de FastAPI o desde un hilo vigía, por eso
+    el aviso se hace con ``call_soon_threadsafe`` sobre el loop de cada poller.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._por_empresa: Dict[int, Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+
+    def registrar(self, id_empresa: int, loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+        fut = loop.create_future()
+        with self._lock:
+            self._por_empresa.setdefault(id_empresa, deque()).append((loop, fut))
+        return fut
+
+    def quitar(self, id_empresa: int, loop: asyncio.AbstractEventLoop, fut: asyncio.Future) -> None:
+        with self._lock:
+            cola = self._por_empresa.get(id_empresa)
+            if cola is None:
+                return
+            try:
+                cola.remove((loop, fut))
+            except ValueError:
+                pass
+            if not cola:
+                self._por_empresa.pop(id_empresa, None)
+
+    def despertar(self, id_empresa: int, cantidad: int = 1) -> None:
+        with self._lock:
+            cola = self._por_empresa.get(id_empresa)
+            while cola and cantidad > 0:
+                loop, fut = cola.popleft()
+                if fut.done() or loop.is_closed():
+                    continue
+                loop.call_soon_threadsafe(_resolver_futuro, fut)
+                cantidad -= 1
+
+    def empresas(self) -> List[int]:
+        with self._lock:
+            return [id_empresa for id_empresa, cola in self._por_empresa.items() if cola]
+
+    def cantidad(self, id_empresa: int) -> int:
+        with self._lock:
+            return sum(1 for _, fut in self._por_empresa.get(id_empresa, ()) if not fut.done())
+
+
+def _resolver_futuro(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(True)
+
+
+class ScannerBus:
+    """
+    Interfaz común. ``esperar`` combina ``extraer`` con el aviso de ``EsperasPorEmpresa``.
+
+    ``publicar``/``extraer``/``hay_pendientes`` son síncronos; desde código async se usan
+    las variantes ``*_async``, que los mandan al threadpool cuando el backend hace I/O
+    (SQLite, socket) para no frenar el event loop del worker.
+    """
+
+    backend = ""
+    bloqueante = True
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen = max(1, maxlen)
+        self._esperas = EsperasPorEmpresa()
+
+    def publicar(self, id_empresa: int, evento: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def extraer(self, id_empresa: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def hay_pendientes(self, id_empresa: int) -> bool:
+        raise NotImplementedError
+
+    def metricas(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def cerrar(self) -> None:
+        pass
+
+    async def _fuera_del_loop(self, funcion, *args):
+        if self.bloqueante:
+            return await run_in_threadpool(funcion, *args)
+        return funcion(*args)
+
+    async def extraer_async(self, id_empresa: int) -> Optional[Dict[str, Any]]:
+        return await self._fuera_del_loop(self.extraer, id_empresa)
+
+    async def hay_pendientes_async(self, id_empresa: int) -> bool:
+        return await self._fuera_del_loop(self.hay_pendientes, id_empresa)
+
+    def _reenviar_aviso(self, loop: asyncio.AbstractEventLoop, id_empresa: int) -> None:
+        def revisar() -> None:
+            try:
+                if self.hay_pendientes(id_empresa):
+                    self._esperas.despertar(id_empresa)
+            except Exception as exc:
+                logger.warning("Bus del escáner: no se pudo reenviar el aviso: %s", exc)
+
+        if self.bloqueante:
+            # La tarea ya está cancelada: la consulta va al executor sin esperarla.
+            loop.run_in_executor(None, revisar)
+        else:
+            revisar()
+
+    async def esperar(self, id_empresa: int, timeout_sec: float) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout_sec
+        while True:
+            evento = await self.extraer_async(id_empresa)
+            if evento is not None:
+                return evento
+            restante = deadline - time.monotonic()
+            if restante <= 0:
+                return None
+
+            fut = self._esperas.registrar(id_empresa, loop)
+            try:
+                if await self.hay_pendientes_async(id_empresa):
+                    # Llegó un evento entre el extraer y el registro: no hace falta esperar.
+                    continue
+                await asyncio.wait_for(fut, timeout=restante)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                # Si el cliente se fue justo después de ser despertado, el aviso pasa a otro poller.
+                self._reenviar_aviso(loop, id_empresa)
+                raise
+            finally:
+                self._esperas.quitar(id_empresa, loop, fut)
+
+
+class BusEnMemoria(ScannerBus):
+    """Deque acotada por empresa (drop-oldest). Solo sirve con un único proceso."""
+
+    backend = BACKEND_MEMORIA
+    bloqueante = False
+
+    def __init__(self, maxlen: int) -> None:
+        super().__init__(maxlen)
+        self._lock = threading.Lock()
+        self._colas: Dict[int, Deque[Dict[str, Any]]] = {}
+        self._descartados: Dict[int, int] = {}
+
+    def publicar(self, id_empresa: int, evento: Dict[str, Any]) -> None:
+        with self._lock:
+            cola = self._colas.get(id_empresa)
+            if cola is None:
+                cola = self._colas[id_empresa] = deque(maxlen=self.maxlen)
+            if len(cola) == cola.maxlen:
+                # deque(maxlen) descarta el más viejo al hacer append.
+                self._descartados[id_empresa] = self._descartados.get(id_empresa, 0) + 1
+            cola.append(evento)
+        self._esperas.despertar(id_empresa)
+
+    def extraer(self, id_empresa: int) -> Optional[Dict[str, Any]]:
+        cola = self._colas.get(id_empresa)
+        if not cola:
+            return None
+        with self._lock:
+            return cola.popleft() if cola else None
+
+    def hay_pendientes(self, id_empresa: int) -> bool:
+        return bool(self._colas.get(id_empresa))
+
+    def limpiar(self, id_empresa: Optional[int] = None) -> None:
+        with self._lock:
+            if id_empresa is None:
+                self._colas.clear()
+                self._descartados.clear()
+            else:
+                self._colas.pop(id_empresa, None)
+                self._descartados.pop(id_empresa, None)
+
+    def metricas(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            ids = set(self._colas) | set(self._descartados)
+            pendientes = {i: len(self._colas.get(i, ())) for i in ids}
+        return [
+            {
+                "id_empresa": id_empresa,
+                "pendientes": pendientes[id_empresa],
+                "pollers_esperando": self._esperas.cantidad(id_empresa),
+                "descartados": self._descartados.get(id_empresa, 0),
+            }
+            for id_empresa in sorted(ids)
+        ]
+
+
+class BusSQLite(ScannerBus):
+    """
+    Cola en un archivo SQLite (WAL) compartido por los workers del host.
+
+    Un hilo vigía por proceso mira ``PRAGMA data_version`` (cambia cuando otro proceso
+    confirma una escritura) y solo entonces consulta qué empresas con pollers locales
+    tienen eventos, así los pollers ociosos no golpean la base.
+    """
+
+    backend = BACKEND_SQLITE
+
+    def __init__(self, ruta: str, maxlen: int, intervalo_vigia_sec: float = 0.05) -> None:
+        super().__init__(maxlen)
+        self.ruta = ruta
+        self.intervalo_vigia_sec = max(0.005, intervalo_vigia_sec)
+        self._local = threading.local()
+        self._vigia: Optional[threading.Thread] = None
+        self._vigia_lock = threading.Lock()
+        self._cerrado = threading.Event()
+        self._descartados: Dict[int, int] = {}
+        conn = self._conexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS scanner_eventos ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id_empresa INTEGER NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " creado_en REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_scanner_eventos_empresa ON scanner_eventos (id_empresa, id)"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publicar(self, id_empresa: int, evento: Dict[str, Any]) -> None:
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO scanner_eventos (id_empresa, payload, creado_en) VALUES (?, ?, ?)",
+                (id_empresa, json.dumps(evento), time.time()),
+            )
+            cur = conn.execute(
+                "DELETE FROM scanner_eventos WHERE id_empresa = ? AND id <= ("
+                " SELECT id FROM scanner_eventos WHERE id_empresa = ?"
+                " ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (id_empresa, id_empresa, self.maxlen),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if cur.rowcount and cur.rowcount > 0:
+            self._descartados[id_empresa] = self._descartados.get(id_empresa, 0) + cur.rowcount
+        self._esperas.despertar(id_empresa)
+
+    def extraer(self, id_empresa: int) -> Optional[Dict[str, Any]]:
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conn.execute(
+                "SELECT id, payload FROM scanner_eventos WHERE id_empresa = ? ORDER BY id LIMIT 1",
+                (id_empresa,),
+            ).fetchone()
+            if fila is not None:
+                conn.execute("DELETE FROM scanner_eventos WHERE id = ?", (fila[0],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return json.loads(fila[1]) if fila is not None else None
+
+    def hay_pendientes(self, id_empresa: int) -> bool:
+        fila = self._conexion().execute(
+            "SELECT 1 FROM scanner_eventos WHERE id_empresa = ? LIMIT 1", (id_empresa,)
+        ).fetchone()
+        return fila is not None
+
+    async def esperar(self, id_empresa: int, timeout_sec: float) -> Optional[Dict[str, Any]]:
+        self._asegurar_vigia()
+        return await super().esperar(id_empresa, timeout_sec)
+
+    def _asegurar_vigia(self) -> None:
+        if self._vigia is not None and self._vigia.is_alive():
+            return
+        with self._vigia_lock:
+            if self._vigia is None or not self._vigia.is_alive():
+                self._vigia = threading.Thread(target=self._bucle_vigia, daemon=True, name="scanner-bus-vigia")
+                self._vigia.start()
+
+    def _bucle_vigia(self) -> None:
+        conn = self._conexion()
+        ultima_version: Optional[int] = None
+        while not self._cerrado.wait(self.intervalo_vigia_sec):
+            empresas = self._esperas.empresas()
+            if not empresas:
+                continue
+            try:
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version == ultima_version:
+                    continue
+                ultima_version = version
+                marcas = ",".join("?" for _ in empresas)
+                filas = conn.execute(
+                    f"SELECT id_empresa, COUNT(*) FROM scanner_eventos WHERE id_empresa IN ({marcas}) GROUP BY id_empresa",
+                    empresas,
+                ).fetchall()
+            except sqlite3.Error as exc:
+                logger.warning("Vigía del bus SQLite del escáner: %s", exc)
+                continue
+            for id_empresa, pendientes in filas:
+                self._esperas.despertar(id_empresa, pendientes)
+
+    def metricas(self) -> List[Dict[str, Any]]:
+        filas = self._conexion().execute(
+            "SELECT id_empresa, COUNT(*) FROM scanner_eventos GROUP BY id_empresa"
+        ).fetchall()
+        pendientes = dict(filas)
+        ids = set(pendientes) | set(self._descartados) | set(self._esperas.empresas())
+        return [
+            {
+                "id_empresa": id_empresa,
+                "pendientes": pendientes.get(id_empresa, 0),
+                "pollers_esperando": self._esperas.cantidad(id_empresa),
+                "descartados": self._descartados.get(id_empresa, 0),
+            }
+            for id_empresa in sorted(ids)
+        ]
+
+    def cerrar(self) -> None:
+        self._cerrado.set()
+
+
+class RespError(RuntimeError):
+    """Respuesta de error (``-ERR ...``) de un servidor RESP."""
+
+
+def _codificar_resp(*partes: Any) -> bytes:
+    salida = [f"*{len(partes)}\r\n".encode()]
+    for parte in partes:
+        dato = parte if isinstance(parte, bytes) else str(parte).encode()
+        salida.append(b"$%d\r\n%s\r\n" % (len(dato), dato))
+    return b"".join(salida)
+
+
+def _leer_resp(leer_linea, leer_bytes) -> Any:
+    linea = leer_linea()
+    if not linea:
+        raise ConnectionError("Conexión RESP cerrada")
+    tipo, resto = linea[:1], linea[1:-2]
+    if tipo == b"+":
+        return resto.decode()
+    if tipo == b"-":
+        raise RespError(resto.decode())
+    if tipo == b":":
+        return int(resto)
+    if tipo == b"$":
+        largo = int(resto)
+        return None if largo < 0 else leer_bytes(largo + 2)[:-2]
+    if tipo == b"*":
+        largo = int(resto)
+        return None if largo < 0 else [_leer_resp(leer_linea, leer_bytes) for _ in range(largo)]
+    raise RespError(f"Respuesta RESP inválida: {linea!r}")
+
+
+async def _leer_resp_async(reader: asyncio.StreamReader) -> Any:
+    linea = await reader.readline()
+    if not linea:
+        raise ConnectionError("Conexión RESP cerrada")
+    tipo, resto = linea[:1], linea[1:-2]
+    if tipo == b"$":
+        largo = int(resto)
+        return None if largo < 0 else (await reader.readexactly(largo + 2))[:-2]
+    if tipo == b"*":
+        largo = int(resto)
+        return None if largo < 0 else [await _leer_resp_async(reader) for _ in range(largo)]
+    return _leer_resp(lambda: linea, lambda _n: b"")
+
+
+async def _cerrar_conexion(writer: asyncio.StreamWriter) -> None:
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (OSError, ConnectionError):
+        pass
+
+
+class BusRedis(ScannerBus):
+    """
+    Lista por empresa en un servidor compatible con Redis (RPUSH/LTRIM/LPOP/BLPOP/LPUSH).
+
+    Cliente RESP mínimo sin dependencias: una conexión bloqueante por hilo para los
+    push y una conexión asyncio por poller en espera (BLPOP no ocupa hilos del pool).
+    """
+
+    backend = BACKEND_REDIS
+    PREFIJO = "scanner:eventos:"
+
+    def __init__(self, url: str, maxlen: int) -> None:
+        super().__init__(maxlen)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self._local = threading.local()
+        self._empresas_vistas: set = set()
+        self._rescates: set = set()
+
+    def _clave(self, id_empresa: int) -> str:
+        return f"{self.PREFIJO}{id_empresa}"
+
+    def _preambulo(self) -> List[Tuple[Any, ...]]:
+        comandos: List[Tuple[Any, ...]] = []
+        if self.password:
+            comandos.append(("AUTH", self.password))
+        if self.db:
+            comandos.append(("SELECT", self.db))
+        return comandos
+
+    def _cerrar_local(self) -> None:
+        for recurso in (getattr(self._local, "archivo", None), getattr(self._local, "sock", None)):
+            if recurso is not None:
+                try:
+                    recurso.close()
+                except OSError:
+                    pass
+        self._local.sock = None
+        self._local.archivo = None
+
+    def _comando(self, *partes: Any) -> Any:
+        for intento in range(2):
+            sock = getattr(self._local, "sock", None)
+            try:
+                if sock is None:
+                    sock = socket.create_connection((self.host, self.port), timeout=5.0)
+                    self._local.sock = sock
+                    self._local.archivo = sock.makefile("rb")
+                    for previo in self._preambulo():
+                        sock.sendall(_codificar_resp(*previo))
+                        _leer_resp(self._local.archivo.readline, self._local.archivo.read)
+                sock.sendall(_codificar_resp(*partes))
+                return _leer_resp(self._local.archivo.readline, self._local.archivo.read)
+            except (OSError, ConnectionError):
+                self._cerrar_local()
+                if intento:
+                    raise
+        return None
+
+    def publicar(self, id_empresa: int, evento: Dict[str, Any]) -> None:
+        clave = self._clave(id_empresa)
+        largo = self._comando("RPUSH", clave, json.dumps(evento))
+        if isinstance(largo, int) and largo > self.maxlen:
+            self._comando("LTRIM", clave, -self.maxlen, -1)
+        self._empresas_vistas.add(id_empresa)
+
+    def extraer(self, id_empresa: int) -> Optional[Dict[str, Any]]:
+        dato = self._comando("LPOP", self._clave(id_empresa))
+        return json.loads(dato) if dato is not None else None
+
+    def hay_pendientes(self, id_empresa: int) -> bool:
+        return bool(self._comando("LLEN", self._clave(id_empresa)))
+
+    def _devolver(self, id_empresa: int, dato: Any) -> None:
+        # LPUSH lo deja otra vez al frente: el próximo poller lo recibe en orden.
+        self._comando("LPUSH", self._clave(id_empresa), dato)
+
+    def _devolver_extraido(self, id_empresa: int, extraccion: asyncio.Future) -> None:
+        if extraccion.cancelled() or extraccion.exception() is not None:
+            return
+        evento = extraccion.result()
+        if evento is not None:
+            extraccion.get_loop().run_in_executor(None, self._devolver, id_empresa, json.dumps(evento))
+
+    async def esperar(self, id_empresa: int, timeout_sec: float) -> Optional[Dict[str, Any]]:
+        extraccion = asyncio.ensure_future(self.extraer_async(id_empresa))
+        try:
+            evento = await asyncio.shield(extraccion)
+        except asyncio.CancelledError:
+            # El LPOP ya puede haber sacado el evento en el threadpool: si llega, vuelve a la cola.
+            extraccion.add_done_callback(lambda fut: self._devolver_extraido(id_empresa, fut))
+            raise
+        if evento is not None or timeout_sec <= 0:
+            return evento
+        clave = self._clave(id_empresa)
+        limite = timeout_sec + 2
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        lectura: Optional[asyncio.Future] = None
+        cedida = False
+        try:
+            for previo in self._preambulo():
+                writer.write(_codificar_resp(*previo))
+                await _leer_resp_async(reader)
+            # BLPOP acepta segundos con decimales desde Redis 6; mandamos entero redondeado hacia arriba.
+            writer.write(_codificar_resp("BLPOP", clave, max(1, int(timeout_sec + 0.999))))
+            await writer.drain()
+            # La lectura va en su propia tarea para que una cancelación no la corte a mitad de respuesta.
+            lectura = asyncio.ensure_future(_leer_resp_async(reader))
+            respuesta = await asyncio.wait_for(asyncio.shield(lectura), timeout=limite)
+        except asyncio.TimeoutError:
+            return None
+        except asyncio.CancelledError:
+            if lectura is not None:
+                # El BLPOP sigue en curso: otra tarea recibe la respuesta y devuelve el evento a la cola.
+                cedida = True
+                rescate = asyncio.ensure_future(self._rescatar_bloqueado(lectura, reader, writer, clave, limite))
+                self._rescates.add(rescate)
+                rescate.add_done_callback(self._rescates.discard)
+            raise
+        finally:
+            if not cedida:
+                if lectura is not None and not lectura.done():
+                    lectura.cancel()
+                await _cerrar_conexion(writer)
+        if not respuesta:
+            return None
+        return json.loads(respuesta[1])
+
+    async def _rescatar_bloqueado(
+        self,
+        lectura: asyncio.Future,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        clave: str,
+        limite: float,
+    ) -> None:
+        try:
+            respuesta = await asyncio.wait_for(lectura, timeout=limite)
+            if respuesta:
+                writer.write(_codificar_resp("LPUSH", clave, respuesta[1]))
+                await writer.drain()
+                await _leer_resp_async(reader)
+        except (asyncio.TimeoutError, OSError, ConnectionError, RespError) as exc:
+            logger.warning("Bus Redis del escáner: no se pudo devolver el evento en vuelo de %s: %s", clave, exc)
+        finally:
+            await _cerrar_conexion(writer)
+
+    def metricas(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id_empresa": id_empresa,
+                "pendientes": int(self._comando("LLEN", self._clave(id_empresa)) or 0),
+                "pollers_esperando": None,
+                "descartados": None,
+            }
+            for id_empresa in sorted(self._empresas_vistas)
+        ]
+
+
+def crear_scanner_bus(backend: Optional[str] = None) -> ScannerBus:
+    backend = (backend or os.getenv("SCANNER_BUS_BACKEND", BACKEND_MEMORIA)).strip().lower()
+    maxlen = int(os.getenv("SCANNER_QUEUE_MAXLEN", "100"))
+    if backend == BACKEND_SQLITE:
+        ruta = ruta_en_data_dir(os.getenv("SCANNER_BUS_SQLITE_PATH") or "scanner_eventos.sqlite3")
+        return BusSQLite(ruta, maxlen, _env_float("SCANNER_BUS_POLL_SEC", 0.05))
+    if backend == BACKEND_REDIS:
+        return BusRedis(os.getenv("SCANNER_BUS_REDIS_URL", "redis://127.0.0.1:6379/0"), maxlen)
+    if backend != BACKEND_MEMORIA:
+        logger.warning("SCANNER_BUS_BACKEND=%r desconocido; se usa la cola en memoria.", backend)
+    return BusEnMemoria(maxlen)
+
+
+_bus: Optional[ScannerBus] = None
+_bus_lock = threading.Lock()
+
+
+def obtener_scanner_bus() -> ScannerBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = crear_scanner_bus()
+    return _bus
+
+
+def establecer_scanner_bus(bus: ScannerBus) -> ScannerBus:
+    """Reemplaza el bus del proceso (tests/benchmarks). Devuelve el anterior."""
+    global _bus
+    with _bus_lock:
+        anterior, _bus = _bus, bus
+    return anterior
@@ -0,0 +1,335 @@
+# back/gestion/sheets_rate_governor.py
+
+"""
+Gobernador de cuota de la API de Google Sheets compartido entre procesos.
+
+Google limita las requests por minuto por cuenta de servicio (lecturas y escrituras por
+separado). Antes cada proceso (workers de uvicorn, `back/sync_worker.py`) gastaba cuota
+por su cuenta y solo frenaba después de ver un 429; ahora toda llamada de TablasHandler
+toma un token de dos buckets antes de salir:
+
+- ``cuenta:<email>:<tipo>``    cuota de la cuenta de servicio (la que devuelve 429).
+- ``planilla:<id>:<tipo>``     tope por planilla, para que una empresa no se lleve toda la cuenta.
+
+Prioridades: una escritura de venta (``registrar_movimiento``, ``restar_stock``) puede
+usar todo el bucket; la sync programada solo toma tokens si queda la reserva de ventas
+(``SHEETS_RESERVA_VENTAS``, fracción de la capacidad), así una sync completa no deja a
+las ventas sin cuota. Cada bucket acumula a lo sumo ``SHEETS_RAFAGA_SEC`` segundos de
+cuota: en cualquier ventana de un minuto salen como mucho cuota + ráfaga llamadas, por
+eso la cuota por defecto queda por debajo de las 60/min de Google. Si no hay token se espera hasta ``SHEETS_ESPERA_MAX_*_SEC`` y
+después se levanta RuntimeError (el caller reprograma igual que ante un 429). Un 429
+real vacía y pausa los buckets de la cuenta y la planilla para todos los procesos.
+
+El estado vive en un backend intercambiable (``SHEETS_GOBERNADOR_BACKEND``):
+
+- ``memoria``: buckets dentro del proceso.
+- ``sqlite``:  archivo SQLite compartido por los procesos del host (por defecto).
+
+``SHEETS_CUOTA_*_POR_MINUTO=0`` desactiva ese bucket.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from back.config import ruta_en_data_dir
+
+logger = logging.getLogger(__name__)
+
+BACKEND_MEMORIA = "memoria"
+BACKEND_SQLITE = "sqlite"
+
+PRIORIDAD_VENTA = "venta"
+PRIORIDAD_SYNC = "sync"
+
+LECTURA = "lectura"
+ESCRITURA = "escritura"
+
+# Estado de un bucket: [tokens, actualizado_en, pausado_hasta] (epoch en segundos).
+Estado = List[float]
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+def _tomar(
+    estados: Dict[str, Estado],
+    buckets: List[Tuple[str, float]],
+    prioridad: str,
+    reserva: float,
+    rafaga_sec: float,
+    ahora: float,
+) -> float:
+    """
+    Repone cada bucket según el tiempo transcurrido y, si todos tienen token (más la
+    reserva de ventas cuando la prioridad es sync), descuenta uno de cada uno.
+    Devuelve 0 si se tomó, o los segundos a esperar. Modifica ``estados``.
+    """
+    espera = 0.0
+    for clave, por_minuto in buckets:
+        tasa = por_minuto / 60.0
+        capacidad = max(1.0, tasa * rafaga_sec)
+        estado = estados.setdefault(clave, [capacidad, ahora, 0.0])
+        estado[0] = min(capacidad, estado[0] + max(0.0, ahora - estado[1]) * tasa)
+        estado[1] = ahora
+        if estado[2] > ahora:
+            espera = max(espera, estado[2] - ahora)
+            continue
+        minimo = 1.0 + (reserva * capacidad if prioridad != PRIORIDAD_VENTA else 0.0)
+        if estado[0] < minimo:
+            espera = max(espera, (minimo - estado[0]) / tasa)
+    if espera <= 0:
+        for clave, _ in buckets:
+            estados[clave][0] -= 1.0
+    return espera
+
+
+class GobernadorSheets:
+    """Interfaz común: adquirir antes de cada llamada a la API, pausar ante un 429."""
+
+    backend = ""
+
+    def __init__(
+        self,
+        cuota_cuenta_por_minuto: float = 50.0,
+        cuota_planilla_por_minuto: float = 50.0,
+        reserva_ventas: float = 0.2,
+        rafaga_sec: float = 10.0,
+        espera_max_venta_sec: float = 10.0,
+        espera_max_sync_sec: float = 60.0,
+    ) -> None:
+        self.cuota_cuenta_por_minuto = cuota_cuenta_por_minuto
+        self.cuota_planilla_por_minuto = cuota_planilla_por_minuto
+        self.reserva_ventas = min(0.9, reserva_ventas)
+        self.rafaga_sec = max(1.0, rafaga_sec)
+        self.espera_max = {PRIORIDAD_VENTA: espera_max_venta_sec, PRIORIDAD_SYNC: espera_max_sync_sec}
+        self._contadores_lock = threading.Lock()
+        self._adquiridos: Counter = Counter()
+        self._rechazados: Counter = Counter()
+        self._espera_total: Counter = Counter()
+
+    def _buckets(self, id_planilla: str, cuenta: str, tipo: str) -> List[Tuple[str, float]]:
+        candidatos = [
+            (f"cuenta:{cuenta}:{tipo}", self.cuota_cuenta_por_minuto),
+            (f"planilla:{id_planilla}:{tipo}", self.cuota_planilla_por_minuto),
+        ]
+        return [(clave, por_minuto) for clave, por_minuto in candidatos if por_minuto > 0]
+
+    def _intentar(self, buckets: List[Tuple[str, float]], prioridad: str, ahora: float) -> float:
+        raise NotImplementedError
+
+    def _pausar_claves(self, buckets: List[Tuple[str, float]], hasta: float) -> None:
+        raise NotImplementedError
+
+    def estado_buckets(self) -> Dict[str, Dict[str, float]]:
+        raise NotImplementedError
+
+    def adquirir(
+        self,
+        id_planilla: str,
+        cuenta: str,
+        tipo: str = LECTURA,
+        prioridad: str = PRIORIDAD_SYNC,
+    ) -> float:
+        """Toma un token (esperando si hace falta). Devuelve los segundos esperados."""
+        buckets = self._buckets(id_planilla, cuenta, tipo)
+        if not buckets:
+            return 0.0
+        limite = self.espera_max.get(prioridad, self.espera_max[PRIORIDAD_SYNC])
+        esperado = 0.0
+        while True:
+            espera = self._intentar(buckets, prioridad, time.time())
+            if espera <= 0:
+                with self._contadores_lock:
+                    self._adquiridos[prioridad] += 1
+                    self._espera_total[prioridad] += esperado
+                return esperado
+            if esperado + espera > limite:
+                with self._contadores_lock:
+                    self._rechazados[prioridad] += 1
+                raise RuntimeError(
+                    f"Google Sheets sin cuota disponible ({tipo}, prioridad {prioridad}). "
+                    f"Reintentar en ~{espera:.0f} s."
+                )
+            time.sleep(espera)
+            esperado += espera
+
+    def pausar(self, id_planilla: str, cuenta: str, segundos: float) -> None:
+        """Tras un 429: vacía y pausa los buckets de la cuenta y la planilla (lectura y escritura)."""
+        buckets = self._buckets(id_planilla, cuenta, LECTURA) + self._buckets(id_planilla, cuenta, ESCRITURA)
+        if buckets:
+            self._pausar_claves(buckets, time.time() + segundos)
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._contadores_lock:
+            return {
+                "backend": self.backend,
+                "cuota_cuenta_por_minuto": self.cuota_cuenta_por_minuto,
+                "cuota_planilla_por_minuto": self.cuota_planilla_por_minuto,
+                "reserva_ventas": self.reserva_ventas,
+                "rafaga_sec": self.rafaga_sec,
+                "adquiridos": dict(self._adquiridos),
+                "rechazados": dict(self._rechazados),
+                "espera_total_sec": {k: round(v, 3) for k, v in self._espera_total.items()},
+                "buckets": self.estado_buckets(),
+            }
+
+
+def _resumen_estado(estado: Estado, ahora: float) -> Dict[str, float]:
+    return {"tokens": round(estado[0], 2), "pausado_sec": round(max(0.0, estado[2] - ahora), 1)}
+
+
+class GobernadorEnMemoria(GobernadorSheets):
+    """Buckets en un dict del proceso (un solo worker, tests)."""
+
+    backend = BACKEND_MEMORIA
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._estados: Dict[str, Estado] = {}
+
+    def _intentar(self, buckets: List[Tuple[str, float]], prioridad: str, ahora: float) -> float:
+        with self._lock:
+            return _tomar(self._estados, buckets, prioridad, self.reserva_ventas, self.rafaga_sec, ahora)
+
+    def _pausar_claves(self, buckets: List[Tuple[str, float]], hasta: float) -> None:
+        with self._lock:
+            for clave, _ in buckets:
+                self._estados[clave] = [0.0, time.time(), hasta]
+
+    def estado_buckets(self) -> Dict[str, Dict[str, float]]:
+        ahora = time.time()
+        with self._lock:
+            return {clave: _resumen_estado(estado, ahora) for clave, estado in sorted(self._estados.items())}
+
+
+class GobernadorSQLite(GobernadorSheets):
+    """
+    Buckets en un archivo SQLite (WAL) compartido por los procesos del host. Cada
+    adquisición es una transacción BEGIN IMMEDIATE: leer, reponer, descontar, escribir.
+    """
+
+    backend = BACKEND_SQLITE
+
+    def __init__(self, ruta: str, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.ruta = ruta
+        self._local = threading.local()
+        conn = self._conexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sheets_cuota_buckets ("
+            " clave TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " actualizado_en REAL NOT NULL,"
+            " pausado_hasta REAL NOT NULL DEFAULT 0)"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaccion(self, claves: List[str], aplicar) -> Any:
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            marcadores = ",".join("?" * len(claves))
+            estados: Dict[str, Estado] = {
+                clave: [tokens, actualizado_en, pausado_hasta]
+                for clave, tokens, actualizado_en, pausado_hasta in conn.execute(
+                    "SELECT clave, tokens, actualizado_en, pausado_hasta FROM sheets_cuota_buckets"
+                    f" WHERE clave IN ({marcadores})",
+                    claves,
+                )
+            }
+            resultado = aplicar(estados)
+            conn.executemany(
+                "INSERT OR REPLACE INTO sheets_cuota_buckets (clave, tokens, actualizado_en, pausado_hasta)"
+                " VALUES (?, ?, ?, ?)",
+                [(clave, *estado) for clave, estado in estados.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return resultado
+
+    def _intentar(self, buckets: List[Tuple[str, float]], prioridad: str, ahora: float) -> float:
+        return self._transaccion(
+            [clave for clave, _ in buckets],
+            lambda estados: _tomar(estados, buckets, prioridad, self.reserva_ventas, self.rafaga_sec, ahora),
+        )
+
+    def _pausar_claves(self, buckets: List[Tuple[str, float]], hasta: float) -> None:
+        def aplicar(estados: Dict[str, Estado]) -> None:
+            for clave, _ in buckets:
+                estados[clave] = [0.0, time.time(), hasta]
+
+        self._transaccion([clave for clave, _ in buckets], aplicar)
+
+    def estado_buckets(self) -> Dict[str, Dict[str, float]]:
+        ahora = time.time()
+        filas = self._conexion().execute(
+            "SELECT clave, tokens, actualizado_en, pausado_hasta FROM sheets_cuota_buckets ORDER BY clave"
+        ).fetchall()
+        return {
+            clave: _resumen_estado([tokens, actualizado_en, pausado_hasta], ahora)
+            for clave, tokens, actualizado_en, pausado_hasta in filas
+        }
+
+
+def crear_gobernador_sheets(backend: Optional[str] = None) -> GobernadorSheets:
+    backend = (backend or os.getenv("SHEETS_GOBERNADOR_BACKEND", BACKEND_SQLITE)).strip().lower()
+    opciones = {
+        "cuota_cuenta_por_minuto": _env_float("SHEETS_CUOTA_CUENTA_POR_MINUTO", 50),
+        "cuota_planilla_por_minuto": _env_float("SHEETS_CUOTA_PLANILLA_POR_MINUTO", 50),
+        "reserva_ventas": _env_float("SHEETS_RESERVA_VENTAS", 0.2),
+        "rafaga_sec": _env_float("SHEETS_RAFAGA_SEC", 10),
+        "espera_max_venta_sec": _env_float("SHEETS_ESPERA_MAX_VENTA_SEC", 10),
+        "espera_max_sync_sec": _env_float("SHEETS_ESPERA_MAX_SYNC_SEC", 60),
+    }
+    if backend == BACKEND_SQLITE:
+        ruta = os.getenv("SHEETS_GOBERNADOR_SQLITE_PATH") or "sheets_cuota.sqlite3"
+        try:
+            return GobernadorSQLite(ruta_en_data_dir(ruta), **opciones)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("No se pudo abrir %s (%s); el gobernador de Sheets queda en memoria.", ruta, e)
+    elif backend != BACKEND_MEMORIA:
+        logger.warning("SHEETS_GOBERNADOR_BACKEND=%r desconocido; se usan buckets en memoria.", backend)
+    return GobernadorEnMemoria(**opciones)
+
+
+_gobernador: Optional[GobernadorSheets] = None
+_gobernador_lock = threading.Lock()
+
+
+def obtener_gobernador_sheets() -> GobernadorSheets:
+    global _gobernador
+    if _gobernador is None:
+        with _gobernador_lock:
+            if _gobernador is None:
+                _gobernador = crear_gobernador_sheets()
+    return _gobernador
+
+
+def establecer_gobernador_sheets(gobernador: GobernadorSheets) -> Optional[GobernadorSheets]:
+    """Reemplaza el gobernador del proceso (tests/benchmarks). Devuelve el anterior."""
+    global _gobernador
+    with _gobernador_lock:
+        anterior, _gobernador = _gobernador, gobernador
+    return anterior
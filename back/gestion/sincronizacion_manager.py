@@ -7,44 +7,88 @@ y poblarlos de manera inteligente en nuestra base de datos SQL, que es la
 fuente única de verdad de la aplicación.
 """
 
+import os
+import unicodedata
+from time import perf_counter
+
 from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, tuple_, update
 from sqlmodel import Session, select
-from typing import List, Dict, Any, Type, Optional
+from typing import List, Dict, Any, Callable, Type, Optional
 
 # Importamos los modelos de nuestra base de datos con los que vamos a trabajar
-from back.modelos import Articulo, ArticuloCodigo, Categoria, ConfiguracionEmpresa, Marca
-from back.utils.articulo_helpers import (
-    conflicto_barcode_en_empresa,
-    es_articulo_precio_manual,
-    obtener_codigo_barras_articulo,
+from back.modelos import (
+    Articulo,
+    ArticuloCodigo,
+    Categoria,
+    CompraDetalle,
+    ConfiguracionEmpresa,
+    Marca,
+    VentaDetalle,
 )
+from back.gestion.stock.catalogo_cambios import incrementar_catalogo_version
+from back.gestion.sync_huellas import detectar_cambios, guardar_huellas, marcar_planilla_leida, planilla_sin_cambios
+from back.utils.articulo_helpers import es_articulo_precio_manual
 
 # Importamos nuestro "operario" para leer Google Sheets
 from back.utils.tablas_handler import TablasHandler
 
-# --- Función Auxiliar para manejar Categorías y Marcas ---
-def _obtener_o_crear_relacion(db: Session, id_empresa: int, modelo: Type[Any], nombre: str) -> Any:
+# Filas por sentencia bulk; si un bloque falla se reintenta fila por fila con savepoint.
+SYNC_ARTICULOS_CHUNK = max(1, int(os.getenv("SYNC_ARTICULOS_CHUNK", "500")))
+
+# Columnas que la hoja pisa en cada sincronización.
+_CAMPOS_DESDE_SHEET = (
+    "descripcion",
+    "precio_costo",
+    "precio_venta",
+    "venta_negocio",
+    "stock_actual",
+    "tasa_iva",
+    "ubicacion",
+    "unidad_venta",
+    "activo",
+)
+
+
+def _clave(valor: Any) -> str:
     """
-    Busca una instancia de un modelo (Categoria o Marca) por su nombre.
-    Si no existe, la crea. Esto evita duplicados.
+    Clave de comparación en memoria alineada con las collations utf8mb4 *_ci por defecto:
+    sin mayúsculas, sin acentos y sin espacios en los extremos ("Café" y "CAFE" son la
+    misma fila para MySQL, así que acá también).
     """
-    if not nombre: # Si el nombre viene vacío desde el sheet
-        return None
+    descompuesto = unicodedata.normalize("NFKD", str(valor).strip())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
 
-    # Busca si ya existe una con ese nombre para esa empresa
-    instancia = db.exec(
-        select(modelo).where(modelo.nombre == nombre, modelo.id_empresa == id_empresa)
-    ).first()
 
-    if instancia:
-        return instancia
-    else:
-        # Si no existe, la crea y la añade a la sesión
-        print(f"Creando nueva {modelo.__name__}: '{nombre}'")
-        nueva_instancia = modelo(nombre=nombre, id_empresa=id_empresa)
-        db.add(nueva_instancia)
-        # No hacemos commit aquí, esperamos al final de la transacción principal.
-        return nueva_instancia
+# --- Función Auxiliar para manejar Categorías y Marcas ---
+def _asegurar_relaciones(db: Session, id_empresa: int, modelo: Type[Any], nombres: List[str]) -> Dict[str, int]:
+    """
+    Devuelve {clave de nombre: id} de las categorías o marcas de la empresa.
+    Las que no existen se crean en un solo INSERT.
+    """
+    existentes = {
+        _clave(nombre): id_
+        for id_, nombre in db.exec(select(modelo.id, modelo.nombre).where(modelo.id_empresa == id_empresa)).all()
+    }
+    faltantes: Dict[str, str] = {}
+    for nombre in nombres:
+        clave = _clave(nombre)
+        if clave not in existentes and clave not in faltantes:
+            faltantes[clave] = str(nombre).strip()
+    if faltantes:
+        print(f"Creando {len(faltantes)} {modelo.__name__}(s) nuevas.")
+        db.execute(insert(modelo), [{"nombre": nombre, "id_empresa": id_empresa} for nombre in faltantes.values()])
+        existentes.update(
+            {
+                _clave(nombre): id_
+                for id_, nombre in db.exec(
+                    select(modelo.id, modelo.nombre).where(
+                        modelo.id_empresa == id_empresa, modelo.nombre.in_(list(faltantes.values()))
+                    )
+                ).all()
+            }
+        )
+    return existentes
 
 
 def _procesar_codigos_barra(codigo_barra_string: str) -> List[str]:
@@ -82,15 +126,199 @@ def _procesar_codigos_barra(codigo_barra_string: str) -> List[str]:
     return [codigo_str]
 
 
-def sincronizar_articulos_desde_sheet(db: Session, id_empresa_actual: int, nombre_hoja: Optional[str] = None) -> Dict[str, Any]:
+def _valores_articulo_desde_fila(fila_sheet: Dict[str, Any]) -> tuple[Dict[str, Any], bool]:
+    """Columnas del artículo según la fila ya mapeada. El bool indica números inválidos."""
+    precio_costo = fila_sheet.get('precio_costo', 0) or 0
+    precio_venta = fila_sheet.get('precio_venta', 0) or 0
+    venta_negocio = fila_sheet.get('venta_negocio', 0) or 0
+    stock_actual = fila_sheet.get('stock_actual', 0) or 0
+    tasa_iva = fila_sheet.get('tasa_iva', 0.21) or 0.21
+    activo_raw = str(fila_sheet.get('Activo', 'TRUE')).strip().lower()
+    numeros_invalidos = False
+    try:
+        precio_costo = float(precio_costo)
+        precio_venta = float(precio_venta)
+        venta_negocio = float(venta_negocio)
+        stock_actual = float(stock_actual)
+        tasa_iva = float(tasa_iva)
+    except (ValueError, TypeError):
+        numeros_invalidos = True
+        precio_costo = 0.0
+        precio_venta = 0.0
+        venta_negocio = 0.0
+        stock_actual = 0.0
+        tasa_iva = 0.21
+
+    return {
+        "descripcion": fila_sheet.get('descripcion'),
+        "precio_costo": precio_costo,
+        "precio_venta": precio_venta,
+        "venta_negocio": venta_negocio,
+        "stock_actual": stock_actual,
+        "tasa_iva": tasa_iva,
+        "ubicacion": fila_sheet.get('ubicacion', 'Sin definir') or 'Sin definir',
+        "unidad_venta": fila_sheet.get('unidad_venta', 'Unidad') or 'Unidad',
+        "activo": activo_raw in {'true', '1', 'si', 'sí', 'yes', 'y', 'on'},
+    }, numeros_invalidos
+
+
+def _aplicar_en_bloques(
+    db: Session,
+    filas: List[Dict[str, Any]],
+    aplicar: Callable[[List[Dict[str, Any]]], Any],
+    etiqueta: str,
+) -> int:
+    """
+    Aplica `aplicar` por bloques de SYNC_ARTICULOS_CHUNK dentro de un savepoint.
+    Si un bloque falla, se reintenta fila por fila para aislar las filas con error.
+    Devuelve la cantidad de filas que no se pudieron aplicar.
+    """
+    errores = 0
+    for inicio in range(0, len(filas), SYNC_ARTICULOS_CHUNK):
+        bloque = filas[inicio:inicio + SYNC_ARTICULOS_CHUNK]
+        try:
+            with db.begin_nested():
+                aplicar(bloque)
+            continue
+        except Exception as e:
+            print(f"⚠️ Falló un bloque de {len(bloque)} {etiqueta} ({type(e).__name__}); reintentando fila por fila.")
+        for fila in bloque:
+            try:
+                with db.begin_nested():
+                    aplicar([fila])
+            except Exception as e:
+                ref = fila.get('codigo_interno') or fila.get('codigo') or fila.get('id')
+                print(f"Error aplicando {etiqueta} ({ref}): {e}")
+                errores += 1
+    return errores
+
+
+def _sincronizar_codigos_barra(
+    db: Session,
+    id_empresa: int,
+    filas: Dict[str, Dict[str, Any]],
+    ids_por_clave: Dict[str, int],
+) -> tuple[int, int, set]:
+    """
+    La hoja es la fuente de los códigos de barra de cada artículo que trae la columna:
+    se borran los que ya no figuran y se agregan los nuevos, salvo que otro artículo de
+    la empresa ya tenga ese código (conflicto). Devuelve (conflictos, errores, ids tocados).
+    """
+    filas_con_codigos = [(clave, fila) for clave, fila in filas.items() if fila["codigos_barra"]]
+    if not filas_con_codigos:
+        return 0, 0, set()
+
+    codigos_por_articulo: Dict[int, Dict[str, str]] = {}
+    duenos_por_codigo: Dict[str, set] = {}
+    for codigo, id_articulo in db.exec(
+        select(ArticuloCodigo.codigo, ArticuloCodigo.id_articulo)
+        .join(Articulo, Articulo.id == ArticuloCodigo.id_articulo)
+        .where(Articulo.id_empresa == id_empresa)
+    ).all():
+        codigos_por_articulo.setdefault(id_articulo, {})[_clave(codigo)] = codigo
+        duenos_por_codigo.setdefault(_clave(codigo), set()).add(id_articulo)
+
+    a_borrar: List[Dict[str, Any]] = []
+    a_insertar: List[Dict[str, Any]] = []
+    conflictos = 0
+    for clave, fila in filas_con_codigos:
+        id_articulo = ids_por_clave.get(clave)
+        if id_articulo is None:
+            continue
+        deseados: Dict[str, str] = {}
+        for codigo in fila["codigos_barra"]:
+            codigo = str(codigo).strip()
+            if codigo:
+                deseados.setdefault(_clave(codigo), codigo)
+
+        actuales = codigos_por_articulo.get(id_articulo, {})
+        for clave_codigo, codigo in actuales.items():
+            if clave_codigo not in deseados:
+                a_borrar.append({"codigo": codigo, "id_articulo": id_articulo})
+                duenos_por_codigo[clave_codigo].discard(id_articulo)
+
+        for clave_codigo, codigo in deseados.items():
+            if clave_codigo in actuales:
+                continue
+            if duenos_por_codigo.get(clave_codigo, set()) - {id_articulo}:
+                print(
+                    f"  ⚠️ Conflicto código '{codigo}' para '{fila['codigo_interno']}' "
+                    f"(ya asignado a otro artículo de la empresa)."
+                )
+                conflictos += 1
+                continue
+            a_insertar.append({"codigo": codigo, "id_articulo": id_articulo})
+            duenos_por_codigo.setdefault(clave_codigo, set()).add(id_articulo)
+
+    errores = _aplicar_en_bloques(
+        db,
+        a_borrar,
+        lambda bloque: db.execute(
+            delete(ArticuloCodigo)
+            .where(
+                tuple_(ArticuloCodigo.codigo, ArticuloCodigo.id_articulo).in_(
+                    [(f["codigo"], f["id_articulo"]) for f in bloque]
+                )
+            )
+            .execution_options(synchronize_session=False)
+        ),
+        "códigos de barra a borrar",
+    )
+    errores += _aplicar_en_bloques(
+        db, a_insertar, lambda bloque: db.execute(insert(ArticuloCodigo), bloque), "códigos de barra nuevos"
+    )
+    tocados = {f["id_articulo"] for f in a_borrar} | {f["id_articulo"] for f in a_insertar}
+    return conflictos, errores, tocados
+
+
+def _ids_con_movimientos(db: Session, ids: List[int]) -> set:
+    con_movimientos: set = set()
+    for inicio in range(0, len(ids), SYNC_ARTICULOS_CHUNK):
+        bloque = ids[inicio:inicio + SYNC_ARTICULOS_CHUNK]
+        for modelo in (VentaDetalle, CompraDetalle):
+            con_movimientos.update(
+                db.exec(select(modelo.id_articulo).where(modelo.id_articulo.in_(bloque)).distinct()).all()
+            )
+    return con_movimientos
+
+
+def _resumen_hoja_sin_cambios(leidos: int) -> Dict[str, Any]:
+    return {
+        "mensaje": "Sin cambios en la hoja desde la última sincronización.",
+        "leidos_de_sheet": leidos,
+        "creados_en_db": 0,
+        "actualizados_en_db": 0,
+        "sin_cambios_en_db": leidos,
+        "eliminados_en_db": 0,
+        "filas_con_error": 0,
+        "hoja_sin_cambios": True,
+    }
+
+
+def sincronizar_articulos_desde_sheet(
+    db: Session,
+    id_empresa_actual: int,
+    nombre_hoja: Optional[str] = None,
+    incremental: bool = False,
+) -> Dict[str, Any]:
     """
     Orquesta el proceso completo de sincronización de artículos.
     Ahora con mapeo automático flexible de columnas.
+
+    Funciona como un motor de diferencias: carga una vez los artículos, categorías,
+    marcas y códigos de la empresa, calcula en memoria qué crear, actualizar,
+    inactivar o eliminar y lo aplica con sentencias bulk por bloques.
+
+    Con `incremental` usa las huellas guardadas de la última sincronización: si la
+    planilla no se modificó no lee valores, si la hoja no cambió no toca la DB y si
+    cambió solo aplica las filas cuya huella difiere (las bajas se siguen calculando
+    contra la hoja completa).
     
     Args:
         db: Sesión de base de datos
         id_empresa_actual: ID de la empresa
         nombre_hoja: Nombre específico de la hoja (opcional, buscará automáticamente)
+        incremental: Omitir hojas y filas sin cambios (scheduler)
     """
     print(f"--- Iniciando Sincronización de Artículos para Empresa ID: {id_empresa_actual} ---")
     
@@ -104,6 +332,11 @@ def sincronizar_articulos_desde_sheet(db: Session, id_empresa_actual: int, nombr
 
     # 2. LEER DATOS DEL GOOGLE SHEET (ya mapeados a formato estándar)
     handler = TablasHandler(id_empresa=id_empresa_actual, db=db)
+    hoja_huella = f"articulos:{nombre_hoja}" if nombre_hoja else "articulos"
+    planilla_modificada_en = handler.obtener_modificacion_planilla()
+    if incremental and planilla_sin_cambios(db, id_empresa_actual, hoja_huella, planilla_modificada_en):
+        print("ℹ️ Planilla sin modificaciones desde la última sincronización: no se leen artículos.")
+        return _resumen_hoja_sin_cambios(0)
     articulos_del_sheet = handler.cargar_articulos(nombre_hoja=nombre_hoja)
 
     if not articulos_del_sheet:
@@ -117,177 +350,162 @@ def sincronizar_articulos_desde_sheet(db: Session, id_empresa_actual: int, nombr
         }
 
     print(f"Se encontraron {len(articulos_del_sheet)} filas en Google Sheets. Procesando...")
-    
-    # Contadores para el reporte final
-    creados = 0
-    actualizados = 0
-    eliminados = 0
+    inicio_proceso = perf_counter()
+    print(f"DEBUG: Campos mapeados disponibles: {[k for k in articulos_del_sheet[0].keys() if k != '_fila_original']}")
+
     filas_con_error = 0
-    conflictos_codigos = 0
+    errores_aplicacion = 0
+    filas_numeros_invalidos = 0
     codigos_duplicados_en_sheet = 0
-    
-    # Set para rastrear los códigos que SÍ existen en el sheet
-    codigos_en_sheet = set()
-
 
-    # 3. PROCESAR CADA FILA Y SINCRONIZAR
+    # 3. NORMALIZAR FILAS (si un código se repite, gana la última fila, como antes)
+    filas: Dict[str, Dict[str, Any]] = {}
     for i, fila_sheet in enumerate(articulos_del_sheet):
-        # Debug en la primera fila
-        if i == 0:
-            print(f"DEBUG: Campos mapeados disponibles: {[k for k in fila_sheet.keys() if k != '_fila_original']}")
-
+        codigo_interno = fila_sheet.get('codigo_interno')
+        if codigo_interno:
+            codigo_interno = str(codigo_interno).strip()
+        if not codigo_interno or not fila_sheet.get('descripcion'):
+            print(f"⚠️ Fila {i+2}: Código o descripción vacíos. Saltando.")
+            filas_con_error += 1
+            continue
+
+        clave = _clave(codigo_interno)
+        if clave in filas:
+            codigos_duplicados_en_sheet += 1
+        valores, numeros_invalidos = _valores_articulo_desde_fila(fila_sheet)
+        if numeros_invalidos:
+            filas_numeros_invalidos += 1
+        nombre_categoria = fila_sheet.get('categoria')
+        nombre_marca = fila_sheet.get('marca')
+        filas[clave] = {
+            "codigo_interno": codigo_interno,
+            "valores": valores,
+            "categoria": nombre_categoria if nombre_categoria and str(nombre_categoria).strip() else None,
+            "marca": nombre_marca if nombre_marca and str(nombre_marca).strip() else None,
+            "codigos_barra": _procesar_codigos_barra(fila_sheet.get('Codigo de barras', '')),
+        }
+    if filas_numeros_invalidos:
+        print(f"⚠️ {filas_numeros_invalidos} fila(s) con números inválidos: se usaron valores por defecto.")
+
+    deteccion = detectar_cambios(
+        db,
+        id_empresa_actual,
+        hoja_huella,
+        filas.items(),
+        clave_de=lambda item: item[0],
+        fila_de=lambda item: item[1],
+        incremental=incremental,
+        planilla_modificada_en=planilla_modificada_en,
+    )
+    if deteccion.hoja_sin_cambios:
+        marcar_planilla_leida(db, id_empresa_actual, hoja_huella, planilla_modificada_en)
+        print("ℹ️ Hoja de artículos sin cambios desde la última sincronización.")
+        return _resumen_hoja_sin_cambios(len(articulos_del_sheet))
+
+    # 4. ESTADO ACTUAL DE LA EMPRESA (una consulta por tabla)
+    existentes: Dict[str, Any] = {}
+    for fila_db in db.exec(
+        select(
+            Articulo.id,
+            Articulo.codigo_interno,
+            *(getattr(Articulo, campo) for campo in _CAMPOS_DESDE_SHEET),
+            Articulo.precio_manual,
+            Articulo.auto_actualizar_precio,
+            Articulo.id_categoria,
+            Articulo.id_marca,
+        ).where(Articulo.id_empresa == id_empresa_actual)
+    ).all():
+        if fila_db.codigo_interno is not None:
+            existentes[_clave(fila_db.codigo_interno)] = fila_db._mapping
+    # Las filas sin cambios de huella se omiten, salvo que el artículo ya no esté en la DB.
+    filas_a_aplicar = {
+        clave: fila for clave, fila in filas.items() if clave not in existentes or deteccion.debe_aplicar(clave)
+    }
+    categorias = _asegurar_relaciones(
+        db, id_empresa_actual, Categoria, [f["categoria"] for f in filas_a_aplicar.values() if f["categoria"]]
+    )
+    marcas = _asegurar_relaciones(
+        db, id_empresa_actual, Marca, [f["marca"] for f in filas_a_aplicar.values() if f["marca"]]
+    )
+
+    # 5. DIFERENCIAS EN MEMORIA
+    nuevos: List[Dict[str, Any]] = []
+    cambios: List[Dict[str, Any]] = []
+    sin_cambios = len(filas) - len(filas_a_aplicar)
+    for clave, fila in filas_a_aplicar.items():
+        valores = dict(fila["valores"])
+        id_categoria = categorias.get(_clave(fila["categoria"])) if fila["categoria"] else None
+        id_marca = marcas.get(_clave(fila["marca"])) if fila["marca"] else None
         try:
-            # Savepoint por fila: evita perder todo lo procesado por errores puntuales.
-            with db.begin_nested():
-                # Ya tiene formato estándar gracias al mapeo
-                codigo_interno = fila_sheet.get('codigo_interno')
-                descripcion = fila_sheet.get('descripcion')
-
-                # Normalización del código
-                if codigo_interno:
-                    codigo_interno = str(codigo_interno).strip()
-
-                # Validación básica
-                if not codigo_interno or not descripcion:
-                    print(f"⚠️ Fila {i+2}: Código o descripción vacíos. Saltando.")
-                    filas_con_error += 1
-                    continue
-
-                # Agregamos el código al set de códigos válidos (normalizado)
-                if codigo_interno in codigos_en_sheet:
-                    codigos_duplicados_en_sheet += 1
-                codigos_en_sheet.add(codigo_interno)
-
-                # Obtener valores numéricos seguros
-                precio_costo = fila_sheet.get('precio_costo', 0) or 0
-                precio_venta = fila_sheet.get('precio_venta', 0) or 0
-                venta_negocio = fila_sheet.get('venta_negocio', 0) or 0
-                stock_actual = fila_sheet.get('stock_actual', 0) or 0
-                tasa_iva = fila_sheet.get('tasa_iva', 0.21) or 0.21
-                ubicacion = fila_sheet.get('ubicacion', 'Sin definir') or 'Sin definir'
-                unidad_venta = fila_sheet.get('unidad_venta', 'Unidad') or 'Unidad'
-                activo_raw = str(fila_sheet.get('Activo', 'TRUE')).strip().lower()
-                activo_en_sheet = activo_raw in {'true', '1', 'si', 'sí', 'yes', 'y', 'on'}
-
-                try:
-                    precio_costo = float(precio_costo)
-                    precio_venta = float(precio_venta)
-                    venta_negocio = float(venta_negocio)
-                    stock_actual = float(stock_actual)
-                    tasa_iva = float(tasa_iva)
-                except (ValueError, TypeError):
-                    print(f"⚠️ Fila {i+2}: Error en conversión de números. Usando valores por defecto.")
-                    precio_costo = 0.0
-                    precio_venta = 0.0
-                    venta_negocio = 0.0
-                    stock_actual = 0.0
-                    tasa_iva = 0.21
-
-                # --- Lógica de UPSERT (Update or Insert) ---
-                articulo_existente = db.exec(
-                    select(Articulo).where(Articulo.codigo_interno == codigo_interno, Articulo.id_empresa == id_empresa_actual)
-                ).first()
-
-                # Manejo de relaciones (Categoría y Marca)
-                nombre_categoria = fila_sheet.get('categoria')
-                nombre_marca = fila_sheet.get('marca')
-
-                categoria_obj = _obtener_o_crear_relacion(db, id_empresa_actual, Categoria, nombre_categoria)
-                marca_obj = _obtener_o_crear_relacion(db, id_empresa_actual, Marca, nombre_marca)
-
-                if articulo_existente:
-                    # --- ACTUALIZAR ARTÍCULO EXISTENTE ---
-                    print(f"  ✏️ Actualizando: {codigo_interno} - {descripcion}")
-                    articulo_existente.descripcion = descripcion
-                    articulo_existente.precio_costo = precio_costo
-                    articulo_existente.precio_venta = precio_venta
-                    articulo_existente.venta_negocio = venta_negocio
-                    articulo_existente.stock_actual = stock_actual
-                    articulo_existente.tasa_iva = tasa_iva
-                    articulo_existente.ubicacion = ubicacion
-                    articulo_existente.unidad_venta = unidad_venta
-                    articulo_existente.activo = activo_en_sheet
-                    if es_articulo_precio_manual(descripcion, codigo_interno):
-                        articulo_existente.precio_manual = True
-                        articulo_existente.auto_actualizar_precio = False
-                    if categoria_obj:
-                        articulo_existente.categoria = categoria_obj
-                    if marca_obj:
-                        articulo_existente.marca = marca_obj
-
-                    db.add(articulo_existente)
-                    articulo_actual = articulo_existente
-                    actualizados += 1
-                else:
-                    # --- CREAR NUEVO ARTÍCULO ---
-                    print(f"  ✨ Creando nuevo: {codigo_interno} - {descripcion}")
-                    es_precio_manual = es_articulo_precio_manual(descripcion, codigo_interno)
-                    nuevo_articulo = Articulo(
-                        id_empresa=id_empresa_actual,
-                        codigo_interno=codigo_interno,
-                        descripcion=descripcion,
-                        precio_costo=precio_costo,
-                        precio_venta=precio_venta,
-                        venta_negocio=venta_negocio,
-                        stock_actual=stock_actual,
-                        tasa_iva=tasa_iva,
-                        ubicacion=ubicacion,
-                        unidad_venta=unidad_venta,
-                        activo=activo_en_sheet,
-                        precio_manual=es_precio_manual,
-                        auto_actualizar_precio=not es_precio_manual,
-                        id_categoria=categoria_obj.id if categoria_obj else None,
-                        id_marca=marca_obj.id if marca_obj else None
-                    )
-                    db.add(nuevo_articulo)
-                    db.flush()  # obtener ID
-                    articulo_actual = nuevo_articulo
-                    creados += 1
-
-                # --- PROCESAR CÓDIGOS DE BARRA (sin romper la fila por duplicados) ---
-                codigos_barra = _procesar_codigos_barra(fila_sheet.get('Codigo de barras', ''))
-                if codigos_barra:
-                    # Eliminar códigos actuales del artículo y reconstruirlos desde hoja
-                    codigos_antiguos = db.exec(
-                        select(ArticuloCodigo).where(ArticuloCodigo.id_articulo == articulo_actual.id)
-                    ).all()
-                    for cod_antiguo in codigos_antiguos:
-                        db.delete(cod_antiguo)
-                    db.flush()
-
-                    # Evitar repetir códigos dentro de la misma fila
-                    codigos_unicos_fila = []
-                    vistos_fila = set()
-                    for c in codigos_barra:
-                        c_norm = str(c).strip()
-                        if c_norm and c_norm not in vistos_fila:
-                            codigos_unicos_fila.append(c_norm)
-                            vistos_fila.add(c_norm)
-
-                    for codigo_barra in codigos_unicos_fila:
-                        if obtener_codigo_barras_articulo(db, codigo_barra, articulo_actual.id):
-                            continue
-
-                        if conflicto_barcode_en_empresa(
-                            db, codigo_barra, articulo_actual.id, id_empresa_actual
-                        ):
-                            print(
-                                f"  ⚠️ Conflicto código '{codigo_barra}' para '{codigo_interno}' "
-                                f"(ya asignado a otro artículo de la empresa)."
-                            )
-                            conflictos_codigos += 1
-                            continue
-
-                        db.add(ArticuloCodigo(codigo=codigo_barra, id_articulo=articulo_actual.id))
-        
+            es_precio_manual = es_articulo_precio_manual(valores["descripcion"], fila["codigo_interno"])
         except Exception as e:
-            print(f"Error procesando la fila {i+2} ({fila_sheet.get('codigo_interno')}): {e}")
-            filas_con_error += 1    
+            print(f"Error procesando {fila['codigo_interno']}: {e}")
+            errores_aplicacion += 1
+            continue
+        actual = existentes.get(clave)
+
+        if actual is None:
+            nuevos.append({
+                "id_empresa": id_empresa_actual,
+                "codigo_interno": fila["codigo_interno"],
+                **valores,
+                "precio_manual": es_precio_manual,
+                "auto_actualizar_precio": not es_precio_manual,
+                "id_categoria": id_categoria,
+                "id_marca": id_marca,
+            })
+            continue
+
+        if es_precio_manual:
+            valores["precio_manual"] = True
+            valores["auto_actualizar_precio"] = False
+        if id_categoria:
+            valores["id_categoria"] = id_categoria
+        if id_marca:
+            valores["id_marca"] = id_marca
+        if any(actual[campo] != valor for campo, valor in valores.items()):
+            cambios.append({"id": actual["id"], **valores})
+        else:
+            sin_cambios += 1
+
+    # 6. APLICAR EN BLOQUES
+    errores_creacion = _aplicar_en_bloques(
+        db, nuevos, lambda bloque: db.execute(insert(Articulo), bloque), "artículos nuevos"
+    )
+    errores_actualizacion = _aplicar_en_bloques(
+        db, cambios, lambda bloque: db.execute(update(Articulo), bloque), "artículos modificados"
+    )
+    creados = len(nuevos) - errores_creacion
+    actualizados = len(cambios) - errores_actualizacion
+    errores_aplicacion += errores_creacion + errores_actualizacion
+
+    ids_por_clave = {clave: actual["id"] for clave, actual in existentes.items()}
+    ids_tocados = {c["id"] for c in cambios}
+    if nuevos:
+        codigos_nuevos = [n["codigo_interno"] for n in nuevos]
+        for inicio in range(0, len(codigos_nuevos), SYNC_ARTICULOS_CHUNK):
+            for id_, codigo in db.exec(
+                select(Articulo.id, Articulo.codigo_interno).where(
+                    Articulo.id_empresa == id_empresa_actual,
+                    Articulo.codigo_interno.in_(codigos_nuevos[inicio:inicio + SYNC_ARTICULOS_CHUNK]),
+                )
+            ).all():
+                ids_por_clave[_clave(codigo)] = id_
+                ids_tocados.add(id_)
+    conflictos_codigos, errores_codigos, ids_con_codigos = _sincronizar_codigos_barra(
+        db, id_empresa_actual, filas_a_aplicar, ids_por_clave
+    )
+    ids_tocados |= ids_con_codigos
+    errores_aplicacion += errores_codigos
+    filas_con_error += errores_aplicacion
     
     # --- COMMIT 1: Guardar artículos nuevos/actualizados PRIMERO ---
     try:
         db.commit()
-        print(f"✅ {creados + actualizados} artículos procesados y guardados correctamente.")
+        print(
+            f"✅ Artículos: {creados} creados, {actualizados} actualizados, "
+            f"{sin_cambios} sin cambios ({len(filas)} códigos en la hoja)."
+        )
     except Exception as e:
         print(f"⚠️ Error durante commit de artículos: {e}")
         db.rollback()
@@ -303,71 +521,67 @@ def sincronizar_articulos_desde_sheet(db: Session, id_empresa_actual: int, nombr
     # --- Lógica de Eliminación (Delete) ---
     # Eliminar artículos que están en la DB pero NO en el Sheet
     # IMPORTANTE: Solo eliminamos artículos SIN movimientos (ventas/compras)
-    # Los artículos con historial se mantienen para preservar integridad
-    
-    # 1. Obtenemos todos los artículos de esta empresa
-    articulos_en_db = db.exec(
-        select(Articulo).where(Articulo.id_empresa == id_empresa_actual)
-    ).all()
-    
+    # Los artículos con historial se mantienen (inactivados) para preservar integridad
+    total_en_db = len(existentes) + creados
     eliminados = 0
     no_eliminados_con_movimientos = 0
     inactivados_con_movimientos = 0
     eliminacion_omitida_por_seguridad = False
-    print(f"Verificando eliminaciones... Total en DB: {len(articulos_en_db)}. Total en Sheet (únicos): {len(codigos_en_sheet)}")
-    print(f"Muestra de códigos en Sheet: {list(codigos_en_sheet)[:10]}")
+    print(f"Verificando eliminaciones... Total en DB: {total_en_db}. Total en Sheet (únicos): {len(filas)}")
 
     # Guardrail: si la lectura de sheet luce incompleta, no borrar/inactivar masivamente.
-    if len(codigos_en_sheet) == 0:
+    if len(filas) == 0:
         eliminacion_omitida_por_seguridad = True
         print("⚠️ Eliminación omitida por seguridad: el Sheet devolvió 0 códigos válidos.")
 
-    if not eliminacion_omitida_por_seguridad and len(articulos_en_db) > 20:
-        cobertura = len(codigos_en_sheet) / max(1, len(articulos_en_db))
+    if not eliminacion_omitida_por_seguridad and total_en_db > 20:
+        cobertura = len(filas) / max(1, total_en_db)
         if cobertura < 0.2:
             eliminacion_omitida_por_seguridad = True
             print(
                 f"⚠️ Eliminación omitida por seguridad: cobertura de Sheet muy baja ({cobertura:.2%})."
             )
-    
-    for articulo in articulos_en_db:
-        if eliminacion_omitida_por_seguridad:
-            break
-
-        # Normalizamos también el código de la DB para comparar manzanas con manzanas
-        codigo_db_normalizado = str(articulo.codigo_interno).strip()
-        
-        if codigo_db_normalizado not in codigos_en_sheet:
-            # Verificar si el artículo tiene movimientos
-            tiene_ventas = len(articulo.items_venta) > 0
-            tiene_compras = len(articulo.items_compra) > 0
-            
-            if tiene_ventas or tiene_compras:
-                print(f"  ⚠️ No se puede eliminar '{codigo_db_normalizado}' - Tiene movimientos históricos (Ventas: {len(articulo.items_venta)}, Compras: {len(articulo.items_compra)})")
-                no_eliminados_con_movimientos += 1
-                if getattr(articulo, "activo", True):
-                    articulo.activo = False
-                    articulo.stock_actual = 0
-                    db.add(articulo)
-                    inactivados_con_movimientos += 1
-                    print(f"  📌 Artículo histórico inactivado: '{codigo_db_normalizado}' - {articulo.descripcion}")
-            else:
-                print(f"  🗑️ Eliminando artículo sin movimientos: '{codigo_db_normalizado}' - {articulo.descripcion}")
+
+    if not eliminacion_omitida_por_seguridad:
+        ausentes = {actual["id"]: actual for clave, actual in existentes.items() if clave not in filas}
+        con_movimientos = _ids_con_movimientos(db, list(ausentes))
+        no_eliminados_con_movimientos = len(con_movimientos)
+        a_inactivar = [id_ for id_ in con_movimientos if ausentes[id_]["activo"]]
+        for inicio in range(0, len(a_inactivar), SYNC_ARTICULOS_CHUNK):
+            db.execute(
+                update(Articulo)
+                .where(Articulo.id.in_(a_inactivar[inicio:inicio + SYNC_ARTICULOS_CHUNK]))
+                .values(activo=False, stock_actual=0)
+                .execution_options(synchronize_session=False)
+            )
+        inactivados_con_movimientos = len(a_inactivar)
+        ids_tocados.update(a_inactivar)
+
+        # Pocos por corrida: se borran vía ORM para respetar las cascadas (códigos de barra).
+        a_eliminar = [id_ for id_ in ausentes if id_ not in con_movimientos]
+        ids_tocados.update(a_eliminar)
+        for inicio in range(0, len(a_eliminar), SYNC_ARTICULOS_CHUNK):
+            for articulo in db.exec(
+                select(Articulo).where(Articulo.id.in_(a_eliminar[inicio:inicio + SYNC_ARTICULOS_CHUNK]))
+            ).all():
                 db.delete(articulo)
                 eliminados += 1
     
-    # Actualizar versión de catálogo
-    if config_empresa:
+    # Actualizar versión de catálogo (y bitácora delta) solo si algo cambió
+    if ids_tocados:
         try:
-            config_empresa.catalogo_version = (config_empresa.catalogo_version or 0) + 1
-            db.add(config_empresa)
-        except Exception:
-            pass
+            incrementar_catalogo_version(db, id_empresa_actual, ids_tocados)
+        except Exception as e:
+            print(f"⚠️ No se pudo actualizar la versión de catálogo: {type(e).__name__}")
     
     # --- COMMIT 2: Guardar eliminaciones ---
     try:
         db.commit()
         print("✅ Sincronización completada exitosamente.")
+        if errores_aplicacion == 0:
+            guardar_huellas(db, id_empresa_actual, deteccion)
+        if eliminados > 0:
+            print(f"🗑️ {eliminados} artículo(s) sin movimientos eliminados (no figuran en el Sheet).")
         if no_eliminados_con_movimientos > 0:
             print(f"ℹ️ {no_eliminados_con_movimientos} artículo(s) no se eliminaron porque tienen movimientos históricos.")
         if inactivados_con_movimientos > 0:
@@ -380,14 +594,17 @@ def sincronizar_articulos_desde_sheet(db: Session, id_empresa_actual: int, nombr
         except:
             pass
     
-    print("--- Sincronización Finalizada ---")
+    duracion = perf_counter() - inicio_proceso
+    print(f"--- Sincronización Finalizada ({len(articulos_del_sheet) / max(duracion, 1e-9):.0f} filas/s) ---")
     
-    # 5. DEVOLVER UN REPORTE DEL RESULTADO
+    # 7. DEVOLVER UN REPORTE DEL RESULTADO
     return {
         "mensaje": "Sincronización completada.",
         "leidos_de_sheet": len(articulos_del_sheet),
         "creados_en_db": creados,
         "actualizados_en_db": actualizados,
+        "sin_cambios_en_db": sin_cambios,
+        "filas_omitidas_por_huella": len(filas) - len(filas_a_aplicar),
         "eliminados_en_db": eliminados,
         "no_eliminados_con_movimientos": no_eliminados_con_movimientos,
         "inactivados_con_movimientos": inactivados_con_movimientos,
@@ -395,4 +612,6 @@ def sincronizar_articulos_desde_sheet(db: Session, id_empresa_actual: int, nombr
         "conflictos_codigos": conflictos_codigos,
         "codigos_duplicados_en_sheet": codigos_duplicados_en_sheet,
         "eliminacion_omitida_por_seguridad": eliminacion_omitida_por_seguridad,
+        "duracion_seg": round(duracion, 3),
+        "filas_por_segundo": round(len(articulos_del_sheet) / max(duracion, 1e-9), 1),
     }
@@ -79,12 +79,14 @@ def sincronizar_empresa_unificada(
     incluir_proveedores: bool = False,
     detener_en_error: bool = False,
     usar_lock: bool = True,
+    incremental: bool = False,
 ) -> Dict[str, Any]:
     """
     Ejecuta sincronización unificada por empresa y devuelve reporte homogéneo.
 
     - `detener_en_error=False`: continúa con los siguientes pasos aunque falle uno.
     - `detener_en_error=True`: corta en el primer error.
+    - `incremental=True`: artículos y clientes omiten hojas/filas sin cambios (huellas).
     """
     inicio_total = perf_counter()
     pasos: Dict[str, Dict[str, Any]] = {}
@@ -124,15 +126,15 @@ def sincronizar_empresa_unificada(
         }
 
     if incluir_articulos:
-        orden.append(("articulos", sincronizar_articulos_desde_sheet))
+        orden.append(("articulos", sincronizar_articulos_desde_sheet, {"incremental": incremental}))
     if incluir_clientes:
-        orden.append(("clientes", sincronizar_clientes_desde_sheets))
+        orden.append(("clientes", sincronizar_clientes_desde_sheets, {"incremental": incremental}))
     if incluir_proveedores:
-        orden.append(("proveedores", sincronizar_proveedores_desde_sheets))
+        orden.append(("proveedores", sincronizar_proveedores_desde_sheets, {}))
 
     try:
-        for nombre, fn in orden:
-            paso = _ejecutar_paso(nombre, fn, db, id_empresa)
+        for nombre, fn, kwargs in orden:
+            paso = _ejecutar_paso(nombre, fn, db, id_empresa, **kwargs)
             pasos[nombre] = paso
             if detener_en_error and not paso["ok"]:
                 break
@@ -1,13 +1,16 @@
 # back/gestion/stock/articulos.py
 # VERSIÓN REFACTORIZADA - Lógica de negocio para Artículos usando SQLModel (ORM)
 
-from sqlmodel import Session, or_, select
-from typing import List, Optional
+from sqlmodel import Session, select
+from typing import Any, Dict, Iterator, List, Optional
 from sqlalchemy.orm import selectinload
 
 # --- Modelos de la Base de Datos ---
 from back.modelos import Articulo, ArticuloCodigo
 from back.utils.articulo_helpers import conflicto_barcode_en_empresa, obtener_codigo_barras_articulo
+from back.gestion.stock.cache_barcodes import obtener_cache_barcodes
+from back.gestion.stock.catalogo_cambios import articulos_cambiados_desde, incrementar_catalogo_version
+from back.gestion.stock.indice_busqueda import obtener_cache_indice_busqueda
 
 # --- Schemas (DTOs) para validación de datos ---
 # ¡ESTA ES LA IMPORTACIÓN QUE FALTABA Y CAUSABA EL ERROR DE ARRANQUE!
@@ -52,29 +55,21 @@ def obtener_articulo_por_id(id_empresa: int, db: Session, articulo_id: int) -> O
 
 def buscar_articulo_por_codigo(db: Session, id_empresa_actual: int, codigo: str) -> Optional[Articulo]:
     """
-    Busca un artículo por uno de sus códigos de barras, incluso si hay múltiples códigos
-    separados por punto y coma. Asegura que el artículo pertenezca a la empresa del usuario.
-    Pre-carga eficientemente todos los demás códigos de barras asociados al artículo encontrado.
+    Busca un artículo activo por código de barras (también en filas viejas con varios
+    códigos separados por punto y coma) o, si no hay, por código interno. El código se
+    resuelve en el cache de barcodes; el artículo se lee de la BD para tener stock y precio al día.
     """
-
-    statement = (
-        select(Articulo)
-        .join(ArticuloCodigo)
-        .where(
-            # Aseguramos que la búsqueda sea dentro de la empresa y en artículos activos
-            Articulo.id_empresa == id_empresa_actual,
-            Articulo.activo == True,
-            # Nueva condición para buscar el código dentro del string
-            or_(
-                ArticuloCodigo.codigo == codigo,
-                ArticuloCodigo.codigo.like(f'{codigo};%'),
-                ArticuloCodigo.codigo.like(f'%;{codigo};%'),
-                ArticuloCodigo.codigo.like(f'%;{codigo}')
-            )
-        )
-        .options(selectinload(Articulo.codigos))
-    )
-    return db.exec(statement).first()
+    cache = obtener_cache_barcodes()
+    id_articulo = cache.resolver(db, id_empresa_actual, codigo)
+    if id_articulo is None:
+        return None
+    articulo = obtener_articulo_por_id(id_empresa_actual, db, id_articulo)
+    if articulo is None or not articulo.activo:
+        # Baja hecha por otro worker dentro de la ventana de verificación del cache.
+        cache.marcar_desactualizado(id_empresa_actual)
+        id_articulo = cache.resolver(db, id_empresa_actual, codigo)
+        articulo = obtener_articulo_por_id(id_empresa_actual, db, id_articulo) if id_articulo else None
+    return articulo if articulo is not None and articulo.activo else None
 
 
 def obtener_todos_los_articulos(db: Session, id_empresa_actual: int, skip: int = 0, limit: int = 100) -> List[Articulo]:
@@ -104,9 +99,9 @@ def buscar_articulos_por_termino(
     limit: int = 100
 ) -> List[Articulo]:
     """
-    NUEVA FUNCIÓN: Busca artículos de una empresa que coincidan con un término de búsqueda.
-    Filtra por descripción, código interno y códigos de barras asociados.
-    Refactorizado para evitar problemas con NULL en JOINs.
+    Busca artículos de una empresa por descripción, código interno y códigos de barras,
+    sin distinguir mayúsculas ni acentos. Todas las palabras del término deben aparecer;
+    primero van los códigos exactos o por prefijo, después las descripciones.
     """
     
     # Si no hay término, retornar todos los artículos de la empresa sin filtro
@@ -124,48 +119,91 @@ def buscar_articulos_por_termino(
         )
         return db.exec(statement_todos).all()
 
-    # Preparamos el término para una búsqueda de tipo "contiene"
-    termino_like = f"%{termino}%"
-
-    # Búsqueda por descripción y código interno (sin JOIN problemático)
-    statement_main = (
+    # Ranking y paginación salen del índice en memoria; a la base solo se le pide la página.
+    ids_pagina, _total = obtener_cache_indice_busqueda().obtener(db, id_empresa_actual).buscar(termino, skip, limit)
+    if not ids_pagina:
+        return []
+    statement = (
         select(Articulo)
         .where(
+            Articulo.id.in_(ids_pagina),
             Articulo.id_empresa == id_empresa_actual,
-            Articulo.activo == True,
-            or_(
-                Articulo.descripcion.ilike(termino_like),
-                Articulo.codigo_interno.ilike(termino_like)
-            )
+            Articulo.activo == True
         )
-        .order_by(Articulo.descripcion)
-        .options(selectinload(Articulo.codigos))
+        .options(selectinload(Articulo.codigos), selectinload(Articulo.categoria))
     )
-    articulos_por_descripcion = db.exec(statement_main).all()
+    por_id = {a.id: a for a in db.exec(statement).all()}
+    return [por_id[i] for i in ids_pagina if i in por_id]
+
+def articulo_a_catalogo(articulo: Articulo) -> Dict[str, Any]:
+    """Forma de ArticuloReadConCodigos que usa la caché offline del POS (codigos y categoria precargados)."""
+    return {
+        'id': articulo.id,
+        'codigo_interno': articulo.codigo_interno,
+        'descripcion': articulo.descripcion,
+        'precio_venta': articulo.precio_venta,
+        'venta_negocio': articulo.venta_negocio,
+        'categoria': articulo.categoria.nombre if articulo.categoria else None,
+        'ubicacion': articulo.ubicacion,
+        'stock_actual': articulo.stock_actual,
+        'activo': articulo.activo,
+        'unidad_venta': articulo.unidad_venta,
+        'precio_manual': getattr(articulo, 'precio_manual', False),
+        'codigos': [{'codigo': c.codigo} for c in (articulo.codigos or [])]
+    }
 
-    # Búsqueda adicional por códigos de barras
-    statement_codigos = (
+def iterar_catalogo(db: Session, id_empresa_actual: int, lote: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Catálogo activo completo de a `lote` filas (yield_per); la memoria no crece con el catálogo."""
+    resultado = db.exec(
         select(Articulo)
-        .join(ArticuloCodigo)
         .where(
             Articulo.id_empresa == id_empresa_actual,
-            Articulo.activo == True,
-            ArticuloCodigo.codigo.ilike(termino_like)
+            Articulo.activo == True
         )
-        .distinct()
-        .options(selectinload(Articulo.codigos))
+        .order_by(Articulo.id)
+        .options(selectinload(Articulo.codigos), selectinload(Articulo.categoria))
+        .execution_options(yield_per=lote)
     )
-    articulos_por_codigo = db.exec(statement_codigos).all()
+    for articulo in resultado:
+        yield articulo_a_catalogo(articulo)
 
-    # Combinar resultados sin duplicados, manteniendo orden
-    articulos_set = {a.id: a for a in articulos_por_descripcion}
-    for a in articulos_por_codigo:
-        articulos_set[a.id] = a
-
-    resultados = sorted(articulos_set.values(), key=lambda a: a.descripcion)
-
-    # Aplicar paginación después de combinar
-    return resultados[skip:skip + limit]
+def obtener_cambios_catalogo(
+    db: Session,
+    id_empresa_actual: int,
+    desde_version: int,
+    version_actual: int,
+) -> Dict[str, Any]:
+    """
+    Artículos activos tocados después de `desde_version` y los ids que ya no están
+    (inactivados o borrados). Con `completo` el cliente debe bajar el catálogo entero.
+    """
+    ids = articulos_cambiados_desde(db, id_empresa_actual, desde_version, version_actual)
+    resultado: Dict[str, Any] = {
+        "version": version_actual,
+        "desde_version": desde_version,
+        "completo": ids is None,
+        "articulos": [],
+        "bajas": [],
+    }
+    if not ids:
+        return resultado
+    articulos = []
+    for inicio in range(0, len(ids), 1000):
+        articulos.extend(
+            db.exec(
+                select(Articulo)
+                .where(
+                    Articulo.id.in_(ids[inicio:inicio + 1000]),
+                    Articulo.id_empresa == id_empresa_actual,
+                    Articulo.activo == True
+                )
+                .options(selectinload(Articulo.codigos), selectinload(Articulo.categoria))
+            ).all()
+        )
+    activos = {a.id for a in articulos}
+    resultado["articulos"] = sorted(articulos, key=lambda a: a.id)
+    resultado["bajas"] = sorted(i for i in ids if i not in activos)
+    return resultado
 
 # ===================================================================
 # === OPERACIONES DE ESCRITURA (CREATE, UPDATE, DELETE)
@@ -185,6 +223,8 @@ def crear_articulo(id_empresa: int, db: Session, articulo_data: ArticuloCreate)
     db_articulo = Articulo.from_orm(articulo_data, {"id_empresa": id_empresa})
     _recalcular_precio_venta(db_articulo)
     db.add(db_articulo)
+    db.flush()
+    incrementar_catalogo_version(db, id_empresa, [db_articulo.id])
     db.commit()
     db.refresh(db_articulo)
     return db_articulo
@@ -202,6 +242,7 @@ def actualizar_articulo(id_empresa: int, db: Session, articulo_id: int, articulo
         setattr(db_articulo, key, value)
     _recalcular_precio_venta(db_articulo)
     db.add(db_articulo)
+    incrementar_catalogo_version(db, id_empresa, [db_articulo.id])
     db.commit()
     db.refresh(db_articulo)
     return db_articulo
@@ -215,6 +256,7 @@ def eliminar_articulo(db: Session, id_empresa_actual: int, articulo_id: int) ->
         return None
     db_articulo.activo = False
     db.add(db_articulo)
+    incrementar_catalogo_version(db, id_empresa_actual, [db_articulo.id])
     db.commit()
     db.refresh(db_articulo)
     return db_articulo
@@ -236,7 +278,9 @@ def anadir_codigo_a_articulo(db: Session, articulo_id: int, nuevo_codigo: str) -
 
     nuevo_codigo_obj = ArticuloCodigo(codigo=nuevo_codigo, id_articulo=articulo_id)
     db.add(nuevo_codigo_obj)
+    incrementar_catalogo_version(db, articulo.id_empresa, [articulo_id])
     db.commit()
+    obtener_cache_barcodes().marcar_desactualizado(articulo.id_empresa)
     db.refresh(nuevo_codigo_obj)
     
     return nuevo_codigo_obj
@@ -251,8 +295,13 @@ def eliminar_codigo_de_articulo(
         codigo_obj = obtener_codigo_barras_articulo(db, codigo_a_borrar, id_articulo)
         if not codigo_obj:
             return False
+        articulo = db.get(Articulo, id_articulo)
         db.delete(codigo_obj)
+        if articulo:
+            incrementar_catalogo_version(db, articulo.id_empresa, [id_articulo])
         db.commit()
+        if articulo:
+            obtener_cache_barcodes().marcar_desactualizado(articulo.id_empresa)
         return True
 
     codigos_obj = db.exec(
@@ -260,7 +309,15 @@ def eliminar_codigo_de_articulo(
     ).all()
     if not codigos_obj:
         return False
+    ids_por_empresa: Dict[int, List[int]] = {}
     for codigo_obj in codigos_obj:
+        articulo = db.get(Articulo, codigo_obj.id_articulo)
+        if articulo:
+            ids_por_empresa.setdefault(articulo.id_empresa, []).append(articulo.id)
         db.delete(codigo_obj)
+    for id_empresa, ids in ids_por_empresa.items():
+        incrementar_catalogo_version(db, id_empresa, ids)
     db.commit()
+    for id_empresa in ids_por_empresa:
+        obtener_cache_barcodes().marcar_desactualizado(id_empresa)
     return True
\ No newline at end of file
@@ -0,0 +1,194 @@
+# back/gestion/stock/cache_barcodes.py
+# Snapshot en memoria por empresa de código de barras / código interno -> id de artículo (escaneos del POS).
+
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from back.gestion.stock.catalogo_cambios import articulos_cambiados_desde, version_catalogo
+from back.modelos import Articulo, ArticuloCodigo
+
+# Cada cuánto se consulta catalogo_version como máximo; entre medio los escaneos no tocan la DB.
+BARCODE_CACHE_VERIFICAR_SEC = float(os.getenv("BARCODE_CACHE_VERIFICAR_SEC", "2"))
+
+
+def _codigos_de_fila(codigo: Optional[str]) -> List[str]:
+    # Compatibilidad con filas viejas que guardan varios códigos separados por ';'.
+    return [c.strip() for c in (codigo or "").split(";") if c.strip()]
+
+
+@dataclass
+class SnapshotBarcodes:
+    """Los códigos de barra ganan sobre los internos; `por_articulo` permite reemplazar un artículo entero."""
+
+    version: int = 0
+    barcodes: Dict[str, int] = field(default_factory=dict)
+    internos: Dict[str, int] = field(default_factory=dict)
+    por_articulo: Dict[int, Tuple[Tuple[str, ...], Optional[str]]] = field(default_factory=dict)
+    verificado_en: float = 0.0
+
+    def resolver(self, codigo: str) -> Optional[int]:
+        id_articulo = self.barcodes.get(codigo)
+        return id_articulo if id_articulo is not None else self.internos.get(codigo)
+
+    def quitar(self, id_articulo: int) -> None:
+        barcodes, interno = self.por_articulo.pop(id_articulo, ((), None))
+        for codigo in barcodes:
+            if self.barcodes.get(codigo) == id_articulo:
+                del self.barcodes[codigo]
+        if interno and self.internos.get(interno) == id_articulo:
+            del self.internos[interno]
+
+    def poner(self, id_articulo: int, barcodes: Iterable[str], interno: Optional[str]) -> None:
+        barcodes = tuple(barcodes)
+        interno = (interno or "").strip() or None
+        self.por_articulo[id_articulo] = (barcodes, interno)
+        for codigo in barcodes:
+            self.barcodes[codigo] = id_articulo
+        if interno:
+            self.internos[interno] = id_articulo
+
+    @property
+    def cantidad_codigos(self) -> int:
+        return len(self.barcodes) + len(self.internos)
+
+
+def _cargar_articulos(db: Session, id_empresa: int, ids: Optional[List[int]] = None) -> Dict[int, Tuple[List[str], Optional[str]]]:
+    """Códigos de los artículos activos de la empresa (todos, o solo `ids`)."""
+    filtro = [Articulo.id_empresa == id_empresa, Articulo.activo == True]
+    if ids is not None:
+        filtro.append(Articulo.id.in_(ids))
+    articulos: Dict[int, Tuple[List[str], Optional[str]]] = {
+        id_articulo: ([], interno)
+        for id_articulo, interno in db.exec(select(Articulo.id, Articulo.codigo_interno).where(*filtro)).all()
+    }
+    for id_articulo, codigo in db.exec(
+        select(ArticuloCodigo.id_articulo, ArticuloCodigo.codigo)
+        .join(Articulo, Articulo.id == ArticuloCodigo.id_articulo)
+        .where(*filtro)
+    ).all():
+        articulos[id_articulo][0].extend(_codigos_de_fila(codigo))
+    return articulos
+
+
+class CacheBarcodes:
+    """
+    Un snapshot por empresa. Al cambiar `catalogo_version` se aplican solo los artículos
+    de la bitácora de cambios; si la bitácora no alcanza se reconstruye entero. Las
+    escrituras de códigos de este worker fuerzan la verificación en el próximo escaneo.
+    """
+
+    def __init__(self, verificar_sec: float = BARCODE_CACHE_VERIFICAR_SEC):
+        self.verificar_sec = verificar_sec
+        self._lock = threading.Lock()
+        self._snapshots: Dict[int, SnapshotBarcodes] = {}
+        self._metricas: Dict[int, Dict[str, float]] = defaultdict(
+            lambda: {
+                "hits": 0,
+                "misses": 0,
+                "reconstrucciones": 0,
+                "ultima_reconstruccion_ms": 0.0,
+                "refrescos_incrementales": 0,
+                "ultimo_refresco_ms": 0.0,
+            }
+        )
+
+    def _sincronizar(self, db: Session, id_empresa: int, forzar: bool = False) -> SnapshotBarcodes:
+        ahora = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshots.get(id_empresa)
+            if snapshot is not None and not forzar and ahora - snapshot.verificado_en < self.verificar_sec:
+                return snapshot
+
+        version = version_catalogo(db, id_empresa)
+        if snapshot is not None and snapshot.version == version:
+            snapshot.verificado_en = ahora
+            return snapshot
+
+        t0 = time.perf_counter()
+        ids = None
+        if snapshot is not None:
+            ids = articulos_cambiados_desde(db, id_empresa, snapshot.version, version)
+        if ids is None:
+            nuevo = SnapshotBarcodes(version=version, verificado_en=ahora)
+            for id_articulo, (barcodes, interno) in _cargar_articulos(db, id_empresa).items():
+                nuevo.poner(id_articulo, barcodes, interno)
+            tipo = "reconstrucciones", "ultima_reconstruccion_ms"
+        else:
+            cargados = _cargar_articulos(db, id_empresa, ids) if ids else {}
+            nuevo = SnapshotBarcodes(
+                version=version,
+                barcodes=dict(snapshot.barcodes),
+                internos=dict(snapshot.internos),
+                por_articulo=dict(snapshot.por_articulo),
+                verificado_en=ahora,
+            )
+            for id_articulo in ids:
+                nuevo.quitar(id_articulo)
+            for id_articulo, (barcodes, interno) in cargados.items():
+                nuevo.poner(id_articulo, barcodes, interno)
+            tipo = "refrescos_incrementales", "ultimo_refresco_ms"
+
+        with self._lock:
+            actual = self._snapshots.get(id_empresa)
+            if actual is None or actual.version <= version:
+                self._snapshots[id_empresa] = nuevo
+            metricas = self._metricas[id_empresa]
+            metricas[tipo[0]] += 1
+            metricas[tipo[1]] = round((time.perf_counter() - t0) * 1000, 3)
+        return nuevo
+
+    def resolver(self, db: Session, id_empresa: int, codigo: str) -> Optional[int]:
+        """Id del artículo activo con ese código. Un miss verifica la versión antes de darlo por inexistente."""
+        codigo = (codigo or "").strip()
+        if not codigo:
+            return None
+        id_articulo = self._sincronizar(db, id_empresa).resolver(codigo)
+        if id_articulo is None:
+            id_articulo = self._sincronizar(db, id_empresa, forzar=True).resolver(codigo)
+        with self._lock:
+            self._metricas[id_empresa]["hits" if id_articulo is not None else "misses"] += 1
+        return id_articulo
+
+    def marcar_desactualizado(self, id_empresa: Optional[int] = None) -> None:
+        with self._lock:
+            snapshots = self._snapshots.values() if id_empresa is None else [self._snapshots.get(id_empresa)]
+            for snapshot in snapshots:
+                if snapshot is not None:
+                    snapshot.verificado_en = 0.0
+
+    def metricas(self, id_empresa: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            filas = []
+            for empresa in sorted(self._snapshots if id_empresa is None else [id_empresa]):
+                snapshot = self._snapshots.get(empresa)
+                m = dict(self._metricas[empresa])
+                total = m["hits"] + m["misses"]
+                filas.append(
+                    {
+                        "id_empresa": empresa,
+                        "version": snapshot.version if snapshot else None,
+                        "articulos": len(snapshot.por_articulo) if snapshot else 0,
+                        "codigos": snapshot.cantidad_codigos if snapshot else 0,
+                        **m,
+                        "hit_rate": round(m["hits"] / total, 4) if total else 0.0,
+                    }
+                )
+            return filas
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._metricas.clear()
+
+
+_cache = CacheBarcodes()
+
+
+def obtener_cache_barcodes() -> CacheBarcodes:
+    return _cache
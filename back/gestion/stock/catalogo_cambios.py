@@ -0,0 +1,71 @@
+# back/gestion/stock/catalogo_cambios.py
+# Versión del catálogo por empresa y bitácora de artículos tocados en cada versión (sync delta de los POS).
+
+import os
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from back.modelos import CatalogoCambio, ConfiguracionEmpresa
+
+# Versiones que se conservan en la bitácora; un POS más atrasado descarga el catálogo completo.
+CATALOGO_CAMBIOS_MAX_VERSIONES = int(os.getenv("CATALOGO_CAMBIOS_MAX_VERSIONES", "500"))
+
+
+def incrementar_catalogo_version(db: Session, id_empresa: int, ids_articulos: Iterable[Optional[int]] = ()) -> int:
+    """
+    Sube `catalogo_version` y anota en la bitácora los artículos tocados (creados,
+    modificados, dados de baja o borrados). Sin ids igual deja una fila para que la
+    versión conste. No hace commit. Devuelve la versión nueva (0 si no hay configuración).
+    """
+    config = db.get(ConfiguracionEmpresa, id_empresa, with_for_update=True, populate_existing=True)
+    if not config:
+        return 0
+    version = (config.catalogo_version or 0) + 1
+    config.catalogo_version = version
+    db.add(config)
+
+    ids = sorted({i for i in ids_articulos if i is not None}) or [None]
+    db.add_all([CatalogoCambio(id_empresa=id_empresa, version=version, id_articulo=i) for i in ids])
+    if version > CATALOGO_CAMBIOS_MAX_VERSIONES:
+        db.execute(
+            delete(CatalogoCambio).where(
+                CatalogoCambio.id_empresa == id_empresa,
+                CatalogoCambio.version <= version - CATALOGO_CAMBIOS_MAX_VERSIONES,
+            )
+        )
+    return version
+
+
+def version_catalogo(db: Session, id_empresa: int) -> int:
+    config = db.get(ConfiguracionEmpresa, id_empresa)
+    return (config.catalogo_version or 0) if config else 0
+
+
+def articulos_cambiados_desde(db: Session, id_empresa: int, desde_version: int, version_actual: int) -> Optional[List[int]]:
+    """
+    Ids de artículos tocados después de `desde_version`. None si la bitácora no alcanza
+    (versión podada, anterior a la bitácora o posterior a la actual): hay que bajar todo.
+    """
+    if desde_version == version_actual:
+        return []
+    if desde_version > version_actual:
+        return None
+    minima = db.exec(
+        select(func.min(CatalogoCambio.version)).where(CatalogoCambio.id_empresa == id_empresa)
+    ).one()
+    if minima is None or desde_version < minima - 1:
+        return None
+    return list(
+        db.exec(
+            select(CatalogoCambio.id_articulo)
+            .where(
+                CatalogoCambio.id_empresa == id_empresa,
+                CatalogoCambio.version > desde_version,
+                CatalogoCambio.version <= version_actual,
+                CatalogoCambio.id_articulo.is_not(None),
+            )
+            .distinct()
+        ).all()
+    )
@@ -0,0 +1,217 @@
+# back/gestion/stock/indice_busqueda.py
+# Índice de búsqueda de artículos en memoria (trigramas) por empresa, para el buscador del POS.
+
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from back.modelos import Articulo, ArticuloCodigo, ConfiguracionEmpresa
+
+BUSQUEDA_INDICE_TTL_SEC = float(os.getenv("BUSQUEDA_INDICE_TTL_SEC", "60"))
+BUSQUEDA_INDICE_MAX_EMPRESAS = int(os.getenv("BUSQUEDA_INDICE_MAX_EMPRESAS", "64"))
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+# Menor rango = mejor resultado; el empate se resuelve por descripción.
+RANGO_CODIGO_EXACTO = 0
+RANGO_CODIGO_PREFIJO = 1
+RANGO_DESCRIPCION_PREFIJO = 2
+RANGO_PALABRA_PREFIJO = 3
+RANGO_FRASE = 4
+RANGO_PALABRAS = 5
+
+
+def normalizar_texto(texto: Optional[str]) -> str:
+    """Minúsculas, sin acentos y con cualquier separador reducido a un espacio."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.casefold()).strip()
+
+
+def _trigramas(texto: str) -> set:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+@dataclass
+class IndiceArticulos:
+    """
+    Documentos en orden de descripción: la posición en `ids` es el desempate del ranking.
+    `postings` va de trigrama a posiciones; solo sirve para acotar candidatos, la
+    coincidencia real se verifica sobre el texto normalizado.
+    """
+
+    ids: List[int] = field(default_factory=list)
+    descripciones: List[str] = field(default_factory=list)
+    codigos: List[Tuple[str, ...]] = field(default_factory=list)
+    textos: List[str] = field(default_factory=list)
+    postings: Dict[str, List[int]] = field(default_factory=dict)
+
+    @classmethod
+    def construir(cls, filas: List[Tuple[int, str, Optional[str]]], barcodes: Dict[int, List[str]]) -> "IndiceArticulos":
+        indice = cls()
+        postings: Dict[str, List[int]] = defaultdict(list)
+        ordenadas = sorted(filas, key=lambda f: (normalizar_texto(f[1]), f[0]))
+        for pos, (id_articulo, descripcion, codigo_interno) in enumerate(ordenadas):
+            desc = normalizar_texto(descripcion)
+            codigos = tuple(
+                c for c in (normalizar_texto(codigo_interno), *(normalizar_texto(b) for b in barcodes.get(id_articulo, ()))) if c
+            )
+            texto = " | ".join((desc, *codigos))
+            indice.ids.append(id_articulo)
+            indice.descripciones.append(desc)
+            indice.codigos.append(codigos)
+            indice.textos.append(texto)
+            for trigrama in _trigramas(texto):
+                postings[trigrama].append(pos)
+        indice.postings = dict(postings)
+        return indice
+
+    def _candidatos(self, palabras: List[str]) -> Iterable[int]:
+        listas = []
+        for palabra in palabras:
+            for trigrama in _trigramas(palabra):
+                posting = self.postings.get(trigrama)
+                if posting is None:
+                    return []
+                listas.append(posting)
+        if not listas:
+            # Términos de 1-2 caracteres: no hay trigramas, se recorre todo el catálogo.
+            return range(len(self.ids))
+        return min(listas, key=len)
+
+    def _rango(self, pos: int, frase: str, palabras: List[str]) -> Optional[int]:
+        texto = self.textos[pos]
+        if not all(p in texto for p in palabras):
+            return None
+        codigos = self.codigos[pos]
+        if frase in codigos:
+            return RANGO_CODIGO_EXACTO
+        if any(c.startswith(frase) for c in codigos):
+            return RANGO_CODIGO_PREFIJO
+        desc = self.descripciones[pos]
+        if desc.startswith(frase):
+            return RANGO_DESCRIPCION_PREFIJO
+        if f" {frase}" in desc:
+            return RANGO_PALABRA_PREFIJO
+        if frase in texto:
+            return RANGO_FRASE
+        return RANGO_PALABRAS
+
+    def buscar(self, termino: str, skip: int = 0, limit: int = 100) -> Tuple[List[int], int]:
+        """Ids de la página pedida ya rankeados, y el total de coincidencias."""
+        frase = normalizar_texto(termino)
+        if not frase:
+            return self.ids[skip:skip + limit], len(self.ids)
+        palabras = frase.split(" ")
+        coincidencias = []
+        for pos in self._candidatos(palabras):
+            rango = self._rango(pos, frase, palabras)
+            if rango is not None:
+                coincidencias.append((rango, pos))
+        mejores = heapq.nsmallest(skip + limit, coincidencias)
+        return [self.ids[pos] for _, pos in mejores[skip:]], len(coincidencias)
+
+
+class CacheIndiceBusqueda:
+    """
+    Un índice por empresa, válido mientras no cambie `catalogo_version` ni se invalide
+    localmente. El TTL acota cuánto tarda en verse una escritura de otro worker que no
+    sube la versión del catálogo (p. ej. importaciones de precios de proveedores).
+    Una sola construcción por empresa a la vez: los requests que llegan durante una
+    reconstrucción esperan ese índice en lugar de cargar el catálogo cada uno.
+    """
+
+    def __init__(self, ttl_sec: float = BUSQUEDA_INDICE_TTL_SEC, max_empresas: int = BUSQUEDA_INDICE_MAX_EMPRESAS):
+        self.ttl_sec = ttl_sec
+        self.max_empresas = max_empresas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[int, Tuple[Tuple[int, int, int], float, IndiceArticulos]]" = OrderedDict()
+        self._invalidaciones: Dict[int, int] = defaultdict(int)
+        self._construyendo: Dict[int, threading.Lock] = {}
+        self._epoca = 0
+        self._construcciones = 0
+
+    def _vigente(self, id_empresa: int, version: Tuple[int, int, int]) -> Optional[IndiceArticulos]:
+        entrada = self._entradas.get(id_empresa)
+        if entrada is not None and entrada[0] == version and entrada[1] > time.monotonic():
+            self._entradas.move_to_end(id_empresa)
+            return entrada[2]
+        return None
+
+    def obtener(self, db: Session, id_empresa: int) -> IndiceArticulos:
+        config = db.get(ConfiguracionEmpresa, id_empresa)
+        catalogo_version = (config.catalogo_version or 0) if config else 0
+        with self._lock:
+            version = (catalogo_version, self._epoca, self._invalidaciones[id_empresa])
+            indice = self._vigente(id_empresa, version)
+            if indice is not None:
+                return indice
+            construccion = self._construyendo.setdefault(id_empresa, threading.Lock())
+
+        with construccion:
+            with self._lock:
+                # Mientras esperábamos, otro request pudo dejar construido este mismo índice.
+                version = (catalogo_version, self._epoca, self._invalidaciones[id_empresa])
+                indice = self._vigente(id_empresa, version)
+                if indice is not None:
+                    return indice
+            indice = _cargar_indice(db, id_empresa)
+            with self._lock:
+                self._construcciones += 1
+                if self.ttl_sec > 0 and (self._epoca, self._invalidaciones[id_empresa]) == version[1:]:
+                    self._entradas[id_empresa] = (version, time.monotonic() + self.ttl_sec, indice)
+                    self._entradas.move_to_end(id_empresa)
+                    while len(self._entradas) > self.max_empresas:
+                        self._entradas.popitem(last=False)
+        return indice
+
+    def invalidar(self, id_empresa: Optional[int] = None) -> None:
+        with self._lock:
+            if id_empresa is None:
+                self._epoca += 1
+                self._entradas.clear()
+                return
+            self._invalidaciones[id_empresa] += 1
+            self._entradas.pop(id_empresa, None)
+
+    @property
+    def construcciones(self) -> int:
+        return self._construcciones
+
+
+def _cargar_indice(db: Session, id_empresa: int) -> IndiceArticulos:
+    filas = db.exec(
+        select(Articulo.id, Articulo.descripcion, Articulo.codigo_interno).where(
+            Articulo.id_empresa == id_empresa,
+            Articulo.activo == True,
+        )
+    ).all()
+    barcodes: Dict[int, List[str]] = defaultdict(list)
+    for id_articulo, codigo in db.exec(
+        select(ArticuloCodigo.id_articulo, ArticuloCodigo.codigo)
+        .join(Articulo, Articulo.id == ArticuloCodigo.id_articulo)
+        .where(Articulo.id_empresa == id_empresa, Articulo.activo == True)
+    ).all():
+        barcodes[id_articulo].append(codigo)
+    return IndiceArticulos.construir(list(filas), barcodes)
+
+
+_cache = CacheIndiceBusqueda()
+
+
+def obtener_cache_indice_busqueda() -> CacheIndiceBusqueda:
+    return _cache
+
+
+def invalidar_indice_busqueda(id_empresa: Optional[int] = None) -> None:
+    _cache.invalidar(id_empresa)
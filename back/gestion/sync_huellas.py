@@ -0,0 +1,153 @@
+# back/gestion/sync_huellas.py
+# Huellas de contenido por hoja y por fila para la sincronización incremental con Google Sheets.
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from sqlmodel import Session, select
+
+from back.modelos import SyncHuellaHoja
+
+# Cada cuánto una corrida incremental igual aplica la hoja completa (corrige desvíos de la DB).
+SYNC_RECONCILIACION_COMPLETA_MIN = float(os.getenv("SYNC_RECONCILIACION_COMPLETA_MIN", "60"))
+
+
+def huella_fila(fila: Dict[str, Any]) -> str:
+    """Hash estable de una fila; ignora las claves internas que empiezan con '_'."""
+    contenido = {k: v for k, v in fila.items() if not str(k).startswith("_")}
+    serializada = json.dumps(contenido, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(serializada.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class DeteccionCambios:
+    """
+    Resultado de comparar la hoja leída contra la última huella aplicada.
+    `claves_cambiadas` es None cuando hay que aplicar todas las filas.
+    """
+
+    hoja: str
+    huella: str
+    huellas_filas: Dict[str, str]
+    hoja_sin_cambios: bool = False
+    claves_cambiadas: Optional[Set[str]] = None
+    planilla_modificada_en: Optional[str] = None
+    completa: bool = True
+    filas_sin_cambios: int = 0
+
+    def debe_aplicar(self, clave: str) -> bool:
+        return self.claves_cambiadas is None or clave in self.claves_cambiadas
+
+
+def _vencida(registro: SyncHuellaHoja) -> bool:
+    if SYNC_RECONCILIACION_COMPLETA_MIN <= 0:
+        return False
+    return datetime.utcnow() - registro.reconciliado_en >= timedelta(minutes=SYNC_RECONCILIACION_COMPLETA_MIN)
+
+
+def obtener_huella(db: Session, id_empresa: int, hoja: str) -> Optional[SyncHuellaHoja]:
+    return db.exec(
+        select(SyncHuellaHoja).where(SyncHuellaHoja.id_empresa == id_empresa, SyncHuellaHoja.hoja == hoja)
+    ).first()
+
+
+def planilla_sin_cambios(db: Session, id_empresa: int, hoja: str, planilla_modificada_en: Optional[str]) -> bool:
+    """
+    True si la planilla no se modificó desde la última aplicación de esta hoja
+    (mismo modifiedTime de Drive) y no toca reconciliación completa: se puede
+    omitir la lectura de valores.
+    """
+    if not planilla_modificada_en:
+        return False
+    registro = obtener_huella(db, id_empresa, hoja)
+    return bool(
+        registro
+        and registro.planilla_modificada_en == planilla_modificada_en
+        and not _vencida(registro)
+    )
+
+
+def detectar_cambios(
+    db: Session,
+    id_empresa: int,
+    hoja: str,
+    filas: Iterable[Any],
+    clave_de: Callable[[Any], str],
+    fila_de: Callable[[Any], Dict[str, Any]] = lambda fila: fila,
+    incremental: bool = True,
+    planilla_modificada_en: Optional[str] = None,
+) -> DeteccionCambios:
+    """
+    Calcula la huella de cada fila (por clave de negocio) y de la hoja completa y las
+    compara con las guardadas. Sin `incremental`, sin huella previa o con la
+    reconciliación vencida, marca todas las filas para aplicar.
+    """
+    huellas_filas: Dict[str, str] = {}
+    for fila in filas:
+        huellas_filas[clave_de(fila)] = huella_fila(fila_de(fila))
+    huella = hashlib.sha256(
+        json.dumps(sorted(huellas_filas.items()), ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    deteccion = DeteccionCambios(
+        hoja=hoja,
+        huella=huella,
+        huellas_filas=huellas_filas,
+        planilla_modificada_en=planilla_modificada_en,
+    )
+
+    registro = obtener_huella(db, id_empresa, hoja) if incremental else None
+    if registro is None or _vencida(registro):
+        return deteccion
+
+    anteriores = registro.huellas_filas or {}
+    deteccion.completa = False
+    deteccion.hoja_sin_cambios = registro.huella == huella
+    deteccion.claves_cambiadas = {
+        clave for clave, valor in huellas_filas.items() if anteriores.get(clave) != valor
+    }
+    deteccion.filas_sin_cambios = len(huellas_filas) - len(deteccion.claves_cambiadas)
+    return deteccion
+
+
+def guardar_huellas(db: Session, id_empresa: int, deteccion: DeteccionCambios) -> None:
+    """
+    Persiste la huella una vez aplicada la hoja. Solo debe llamarse si no hubo
+    filas con error: así una fila fallida vuelve a figurar como cambiada.
+    """
+    ahora = datetime.utcnow()
+    try:
+        registro = obtener_huella(db, id_empresa, deteccion.hoja)
+        if registro is None:
+            registro = SyncHuellaHoja(id_empresa=id_empresa, hoja=deteccion.hoja, huella=deteccion.huella)
+        registro.huella = deteccion.huella
+        registro.huellas_filas = deteccion.huellas_filas
+        registro.cantidad_filas = len(deteccion.huellas_filas)
+        registro.planilla_modificada_en = deteccion.planilla_modificada_en
+        registro.actualizado_en = ahora
+        if deteccion.completa:
+            registro.reconciliado_en = ahora
+        db.add(registro)
+        db.commit()
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar la huella de '{deteccion.hoja}' (empresa {id_empresa}): {e}")
+        db.rollback()
+
+
+def marcar_planilla_leida(db: Session, id_empresa: int, hoja: str, planilla_modificada_en: Optional[str]) -> None:
+    """Actualiza el modifiedTime visto cuando la hoja se leyó y no tenía cambios."""
+    if not planilla_modificada_en:
+        return
+    registro = obtener_huella(db, id_empresa, hoja)
+    if registro is None or registro.planilla_modificada_en == planilla_modificada_en:
+        return
+    try:
+        registro.planilla_modificada_en = planilla_modificada_en
+        db.add(registro)
+        db.commit()
+    except Exception:
+        db.rollback()
+
@@ -1,7 +1,12 @@
 import logging
+import os
+import socket
+import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
+from sqlalchemy import and_, func, or_, update
 from sqlmodel import Session, select
 
 from back.modelos import SyncNubePendiente
@@ -14,6 +19,12 @@ logger = logging.getLogger(__name__)
 OPERACION_REGISTRAR_MOVIMIENTO = "registrar_movimiento"
 OPERACION_RESTAR_STOCK = "restar_stock"
 
+# Agrupa los pendientes por empresa: una lectura de stock y una escritura por hoja por tanda.
+SYNC_NUBE_EN_LOTE = os.getenv("SYNC_NUBE_EN_LOTE", "true").strip().lower() in {"1", "true", "yes", "y", "on"}
+# Un item reclamado queda reservado este tiempo; si el worker muere, otro lo retoma al vencer.
+# Se renueva antes de cada escritura a Sheets, así que alcanza con cubrir una sola escritura.
+SYNC_NUBE_LEASE_SEC = max(5, int(os.getenv("SYNC_NUBE_LEASE_SEC", "120")))
+
 
 def encolar_sync_nube_pendiente(
     db: Session,
@@ -52,7 +63,7 @@ def _procesar_registrar_movimiento(handler: TablasHandler, payload: Dict[str, An
         raise RuntimeError(handler.ultimo_error_sync or "Fallo al registrar movimiento en Google Sheets.")
 
 
-def _procesar_restar_stock(handler: TablasHandler, payload: Dict[str, Any]) -> None:
+def _items_desde_payload(payload: Dict[str, Any]) -> List[ArticuloVendido]:
     items_payload = payload.get("articulos_vendidos", [])
     items: List[ArticuloVendido] = []
     for item in items_payload:
@@ -63,51 +74,237 @@ def _procesar_restar_stock(handler: TablasHandler, payload: Dict[str, Any]) -> N
                 precio_unitario=float(item.get("precio_unitario", 0.0)),
             )
         )
-    ok = handler.restar_stock(handler.db, items)
+    return items
+
+
+def _procesar_restar_stock(handler: TablasHandler, payload: Dict[str, Any]) -> None:
+    ok = handler.restar_stock(handler.db, _items_desde_payload(payload))
     if not ok:
         raise RuntimeError(handler.ultimo_error_sync or "Fallo al actualizar stock en Google Sheets.")
 
 
-def procesar_cola_sync_nube(db: Session, max_items: int = 50) -> Dict[str, int]:
+def _procesar_item(db: Session, item: SyncNubePendiente) -> Optional[str]:
+    try:
+        handler = TablasHandler(id_empresa=item.id_empresa, db=db)
+        if item.operacion == OPERACION_REGISTRAR_MOVIMIENTO:
+            _procesar_registrar_movimiento(handler, item.payload)
+        elif item.operacion == OPERACION_RESTAR_STOCK:
+            _procesar_restar_stock(handler, item.payload)
+        else:
+            raise ValueError(f"Operación de sync no soportada: {item.operacion}")
+        return None
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def _procesar_lote_empresa(
+    db: Session,
+    id_empresa: int,
+    items: List[SyncNubePendiente],
+    renovar: Optional[Callable[[List[SyncNubePendiente]], List[SyncNubePendiente]]] = None,
+) -> Dict[int, Optional[str]]:
+    """
+    Procesa los pendientes de una empresa juntos: todos los movimientos en una
+    escritura y todos los descuentos de stock con una lectura y un batch_update
+    (neto por código). Devuelve el error de cada item (None si se completó).
+    `renovar` se llama antes de cada escritura y devuelve los items cuyo lease
+    sigue siendo de este worker; los demás no se escriben.
+    """
+    renovar = renovar or (lambda pendientes: pendientes)
+    errores: Dict[int, Optional[str]] = {}
+    try:
+        handler = TablasHandler(id_empresa=id_empresa, db=db)
+    except Exception as e:
+        return {item.id: f"{type(e).__name__}: {e}" for item in items}
+
+    movimientos = [item for item in items if item.operacion == OPERACION_REGISTRAR_MOVIMIENTO]
+    if movimientos:
+        movimientos = renovar(movimientos)
+    if movimientos:
+        ok = handler.registrar_movimientos([item.payload for item in movimientos])
+        error = None if ok else f"RuntimeError: {handler.ultimo_error_sync or 'Fallo al registrar movimiento en Google Sheets.'}"
+        for item in movimientos:
+            errores[item.id] = error
+
+    descuentos: List[SyncNubePendiente] = []
+    lotes: List[List[ArticuloVendido]] = []
+    for item in items:
+        if item.operacion == OPERACION_RESTAR_STOCK:
+            try:
+                lotes.append(_items_desde_payload(item.payload))
+                descuentos.append(item)
+            except Exception as e:
+                errores[item.id] = f"{type(e).__name__}: {e}"
+        elif item.operacion != OPERACION_REGISTRAR_MOVIMIENTO:
+            errores[item.id] = f"ValueError: Operación de sync no soportada: {item.operacion}"
+    if descuentos:
+        vigentes = {item.id for item in renovar(descuentos)}
+        lotes = [lote for item, lote in zip(descuentos, lotes) if item.id in vigentes]
+        descuentos = [item for item in descuentos if item.id in vigentes]
+    if descuentos:
+        for item, error in zip(descuentos, handler.restar_stock_en_lote(db, lotes)):
+            errores[item.id] = f"RuntimeError: {error}" if error else None
+    return errores
+
+
+def _nuevo_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def reclamar_pendientes(
+    db: Session,
+    max_items: int,
+    worker_id: str,
+    lease_sec: int = SYNC_NUBE_LEASE_SEC,
+) -> List[SyncNubePendiente]:
+    """
+    Reserva hasta `max_items` items listos (pendientes vencidos o en proceso con el
+    lease vencido) con SELECT ... FOR UPDATE SKIP LOCKED y los marca con el worker y
+    el vencimiento del lease. El commit libera los locks enseguida: el procesamiento
+    contra Sheets corre fuera de la transacción y el lease evita que otro worker
+    tome los mismos items.
+    """
     ahora = datetime.utcnow()
-    pendientes = db.exec(
+    items = db.exec(
         select(SyncNubePendiente)
-        .where(SyncNubePendiente.estado == "pendiente")
-        .where(SyncNubePendiente.proximo_reintento_en <= ahora)
+        .where(
+            or_(
+                and_(
+                    SyncNubePendiente.estado == "pendiente",
+                    SyncNubePendiente.proximo_reintento_en <= ahora,
+                ),
+                and_(
+                    SyncNubePendiente.estado == "procesando",
+                    or_(SyncNubePendiente.lease_hasta.is_(None), SyncNubePendiente.lease_hasta < ahora),
+                ),
+            )
+        )
         .order_by(SyncNubePendiente.creado_en.asc())
         .limit(max_items)
+        .with_for_update(skip_locked=True)
     ).all()
 
+    lease_hasta = ahora + timedelta(seconds=lease_sec)
+    for item in items:
+        if item.estado == "procesando":
+            logger.warning("Lease vencido del item sync_nube %s (%s): se retoma.", item.id, item.reclamado_por)
+        item.estado = "procesando"
+        item.reclamado_por = worker_id
+        item.lease_hasta = lease_hasta
+        item.actualizado_en = ahora
+        db.add(item)
+    _commit_sin_expirar(db)
+    return items
+
+
+def _commit_sin_expirar(db: Session) -> None:
+    """
+    Commit que no expira los items del lote: el worker sigue leyendo `id`, `payload`,
+    etc. y con el expire de siempre cada acceso sería un SELECT por item.
+    """
+    previo = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = previo
+
+
+def renovar_lease(
+    db: Session,
+    ids: List[int],
+    worker_id: str,
+    lease_sec: int = SYNC_NUBE_LEASE_SEC,
+) -> set:
+    """
+    Extiende el lease de `ids` con un UPDATE condicional a que sigan reclamados por
+    `worker_id` y devuelve los que siguen siéndolo. Se llama justo antes de escribir en
+    Sheets: un lote que tarda más que el lease (p. ej. esperando cuota) no deja que
+    otro worker retome los mismos items y escriba las mismas filas otra vez.
+    """
+    if not ids:
+        return set()
+    ahora = datetime.utcnow()
+    db.execute(
+        update(SyncNubePendiente)
+        .where(SyncNubePendiente.id.in_(ids))
+        .where(SyncNubePendiente.reclamado_por == worker_id)
+        .where(SyncNubePendiente.estado == "procesando")
+        .values(lease_hasta=ahora + timedelta(seconds=lease_sec), actualizado_en=ahora)
+    )
+    vigentes = set(
+        db.exec(
+            select(SyncNubePendiente.id)
+            .where(SyncNubePendiente.id.in_(ids))
+            .where(SyncNubePendiente.reclamado_por == worker_id)
+            .where(SyncNubePendiente.estado == "procesando")
+        ).all()
+    )
+    _commit_sin_expirar(db)
+    return vigentes
+
+
+def procesar_cola_sync_nube(
+    db: Session,
+    max_items: int = 50,
+    en_lote: Optional[bool] = None,
+    worker_id: Optional[str] = None,
+) -> Dict[str, int]:
+    en_lote = SYNC_NUBE_EN_LOTE if en_lote is None else en_lote
+    worker_id = worker_id or _nuevo_worker_id()
+    pendientes = reclamar_pendientes(db, max_items, worker_id)
+
     procesados = 0
     completados = 0
     reprogramados = 0
     fallidos = 0
+    lease_perdido = 0
+
+    def renovar(items: List[SyncNubePendiente]) -> List[SyncNubePendiente]:
+        vigentes = renovar_lease(db, [item.id for item in items], worker_id)
+        return [item for item in items if item.id in vigentes]
+
+    errores: Dict[int, Optional[str]] = {}
+    if en_lote:
+        por_empresa: Dict[int, List[SyncNubePendiente]] = defaultdict(list)
+        for item in pendientes:
+            por_empresa[item.id_empresa].append(item)
+        for id_empresa, items in por_empresa.items():
+            errores.update(_procesar_lote_empresa(db, id_empresa, items, renovar))
+    else:
+        for item in pendientes:
+            if renovar([item]):
+                errores[item.id] = _procesar_item(db, item)
+
+    # Solo se cierran los items cuyo lease sigue siendo de este worker.
+    ids = [item.id for item in pendientes]
+    vigentes = set(
+        db.exec(
+            select(SyncNubePendiente.id)
+            .where(SyncNubePendiente.id.in_(ids))
+            .where(SyncNubePendiente.reclamado_por == worker_id)
+            .where(SyncNubePendiente.estado == "procesando")
+            .with_for_update()
+        ).all()
+    ) if ids else set()
 
     for item in pendientes:
         procesados += 1
-        item.estado = "procesando"
+        if item.id not in vigentes:
+            logger.warning("Item sync_nube %s: lease tomado por otro worker, no se actualiza.", item.id)
+            lease_perdido += 1
+            continue
+        error = errores.get(item.id)
         item.actualizado_en = datetime.utcnow()
-        db.add(item)
-        db.flush()
-
-        try:
-            handler = TablasHandler(id_empresa=item.id_empresa, db=db)
-            if item.operacion == OPERACION_REGISTRAR_MOVIMIENTO:
-                _procesar_registrar_movimiento(handler, item.payload)
-            elif item.operacion == OPERACION_RESTAR_STOCK:
-                _procesar_restar_stock(handler, item.payload)
-            else:
-                raise ValueError(f"Operación de sync no soportada: {item.operacion}")
-
+        item.reclamado_por = None
+        item.lease_hasta = None
+        if error is None:
             item.estado = "completado"
             item.ultimo_error = None
-            item.actualizado_en = datetime.utcnow()
-            db.add(item)
             completados += 1
-        except Exception as e:
+        else:
             item.intentos = (item.intentos or 0) + 1
-            item.ultimo_error = f"{type(e).__name__}: {e}"
-            item.actualizado_en = datetime.utcnow()
+            item.ultimo_error = error
 
             if item.intentos >= item.max_intentos:
                 item.estado = "fallido"
@@ -116,7 +313,7 @@ def procesar_cola_sync_nube(db: Session, max_items: int = 50) -> Dict[str, int]:
                 item.estado = "pendiente"
                 item.proximo_reintento_en = _calcular_proximo_reintento(item.intentos)
                 reprogramados += 1
-            db.add(item)
+        db.add(item)
 
     db.commit()
     return {
@@ -124,6 +321,47 @@ def procesar_cola_sync_nube(db: Session, max_items: int = 50) -> Dict[str, int]:
         "completados": completados,
         "reprogramados": reprogramados,
         "fallidos": fallidos,
+        **({"lease_perdido": lease_perdido} if lease_perdido else {}),
+    }
+
+
+def metricas_cola_sync_nube(db: Session, id_empresa: Optional[int] = None) -> Dict[str, Any]:
+    """Profundidad por estado, items listos, leases vencidos y antigüedad del pendiente más viejo."""
+    ahora = datetime.utcnow()
+    filtro = [SyncNubePendiente.id_empresa == id_empresa] if id_empresa is not None else []
+
+    por_estado = {
+        estado: cantidad
+        for estado, cantidad in db.exec(
+            select(SyncNubePendiente.estado, func.count())
+            .where(*filtro)
+            .group_by(SyncNubePendiente.estado)
+        ).all()
+    }
+    listos = db.exec(
+        select(func.count())
+        .select_from(SyncNubePendiente)
+        .where(*filtro)
+        .where(SyncNubePendiente.estado == "pendiente", SyncNubePendiente.proximo_reintento_en <= ahora)
+    ).one()
+    leases_vencidos = db.exec(
+        select(func.count())
+        .select_from(SyncNubePendiente)
+        .where(*filtro)
+        .where(SyncNubePendiente.estado == "procesando", SyncNubePendiente.lease_hasta < ahora)
+    ).one()
+    mas_viejo = db.exec(
+        select(func.min(SyncNubePendiente.creado_en))
+        .where(*filtro)
+        .where(SyncNubePendiente.estado.in_(["pendiente", "procesando"]))
+    ).one()
+    return {
+        "por_estado": por_estado,
+        "profundidad": por_estado.get("pendiente", 0) + por_estado.get("procesando", 0),
+        "listos": listos,
+        "leases_vencidos": leases_vencidos,
+        "antiguedad_max_seg": round((ahora - mas_viejo).total_seconds(), 1) if mas_viejo else 0.0,
+        "lease_sec": SYNC_NUBE_LEASE_SEC,
     }
 
 
@@ -0,0 +1,444 @@
+# back/gestion/sync_planificador.py
+
+"""
+Planificador de la sincronización automática Sheets -> DB de todas las empresas.
+
+Antes cada empresa tenía su job de APScheduler con el mismo SYNC_INTERVAL_SECONDS: todas
+arrancaban en el mismo segundo, en el pool por defecto, sin tope ni orden. Ahora un único
+job de despacho (cada SYNC_DESPACHO_SECONDS) decide qué empresas corren:
+
+- Turno determinístico: cada empresa tiene un desfase fijo dentro del intervalo (crc32
+  del id) alineado al reloj, así las corridas se reparten y el turno no cambia entre
+  reinicios ni entre procesos.
+- Concurrencia acotada: como mucho SYNC_MAX_CONCURRENTES syncs a la vez y
+  SYNC_MAX_POR_CUENTA por cuenta de servicio de Google (comparten la cuota de Sheets).
+- Prioridad: entre las vencidas van primero las empresas con ediciones recientes (su
+  última corrida trajo cambios hace menos de SYNC_EDICION_RECIENTE_MIN), luego las más
+  atrasadas.
+- Intervalo adaptativo: cada corrida guarda duración y filas leídas/cambiadas en
+  sync_empresa_estado. Cada corrida sin cambios duplica el intervalo hasta
+  SYNC_INTERVALO_MAX_SECONDS; una con cambios o con error lo vuelve al base. Nunca es
+  menor a 4 veces la duración media de la empresa. Mientras espera con el intervalo
+  estirado, una vez por intervalo base se mira el modifiedTime de la planilla en Drive
+  (TablasHandler.obtener_modificacion_planilla): si cambió desde la última corrida, el
+  backoff se corta y la empresa vuelve a su próximo turno base.
+- Varios procesos: el scheduler corre en cada worker de la API y en back/sync_worker.py.
+  Los cupos se cuentan sobre las filas "ejecutando" de sync_empresa_estado (de todos los
+  procesos) y cada empresa se reclama con un UPDATE condicional antes de lanzarla: si
+  otro proceso la tomó primero, no corre dos veces. Una corrida "ejecutando" por más de
+  SYNC_EJECUCION_MAX_SECONDS se da por abandonada (proceso caído) y se puede retomar.
+
+El estado persistido alimenta GET /sincronizar/planificador (cola, en curso y últimos
+tiempos), que sirve la API aunque el scheduler corra en back/sync_worker.py.
+"""
+
+import logging
+import math
+import os
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_, update
+from sqlmodel import Session, select
+
+from back.config import GOOGLE_SERVICE_ACCOUNT_FILE
+from back.modelos import SyncEmpresaEstado
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except (TypeError, ValueError):
+        return default
+
+
+SYNC_DESPACHO_SECONDS = _env_int("SYNC_DESPACHO_SECONDS", 5)
+SYNC_MAX_CONCURRENTES = _env_int("SYNC_MAX_CONCURRENTES", 2)
+SYNC_MAX_POR_CUENTA = _env_int("SYNC_MAX_POR_CUENTA", 1)
+SYNC_INTERVALO_MAX_SECONDS = _env_int("SYNC_INTERVALO_MAX_SECONDS", 1800)
+SYNC_EDICION_RECIENTE_MIN = _env_int("SYNC_EDICION_RECIENTE_MIN", 30)
+SYNC_EJECUCION_MAX_SECONDS = _env_int("SYNC_EJECUCION_MAX_SECONDS", 3600)
+
+# Peso de la última corrida en la duración media (media exponencial).
+ALFA_DURACION = 0.3
+_EPOCH = datetime(1970, 1, 1)
+
+
+def desfase_empresa(id_empresa: int, intervalo_sec: int) -> int:
+    """Segundo del intervalo en el que le toca correr a la empresa."""
+    return zlib.crc32(f"sync_empresa_{id_empresa}".encode()) % max(1, intervalo_sec)
+
+
+def proxima_en_turno(id_empresa: int, intervalo_base_sec: int, desde: datetime) -> datetime:
+    """Primer instante >= `desde` que cae en el turno de la empresa (UTC naive, como la DB)."""
+    intervalo = max(1, intervalo_base_sec)
+    segundos = math.ceil((desde - _EPOCH).total_seconds())
+    t = segundos + (desfase_empresa(id_empresa, intervalo) - segundos) % intervalo
+    return _EPOCH + timedelta(seconds=t)
+
+
+def filas_de_resultado(resultado: Dict[str, Any]) -> Tuple[int, int]:
+    """(filas leídas, filas cambiadas) sumando los pasos de sincronizar_empresa_unificada."""
+    leidas = cambiadas = 0
+    for paso in (resultado.get("pasos") or {}).values():
+        r = paso.get("resultado") if isinstance(paso, dict) else None
+        if not isinstance(r, dict):
+            continue
+        cambios = sum(
+            int(r.get(k) or 0)
+            for k in ("creados_en_db", "actualizados_en_db", "eliminados_en_db", "creados", "actualizados")
+        )
+        cambiadas += cambios
+        if "leidos_de_sheet" in r:
+            leidas += int(r.get("leidos_de_sheet") or 0)
+        else:
+            leidas += cambios + int(r.get("sin_cambios") or 0) + int(r.get("errores") or 0)
+    return leidas, cambiadas
+
+
+def intervalo_adaptado(
+    intervalo_base_sec: int,
+    intervalo_max_sec: int,
+    corridas_sin_cambios: int,
+    duracion_promedio_ms: Optional[float],
+) -> int:
+    intervalo = min(intervalo_max_sec, intervalo_base_sec * 2 ** min(corridas_sin_cambios, 16))
+    if duracion_promedio_ms:
+        intervalo = max(intervalo, math.ceil(4 * duracion_promedio_ms / 1000))
+    return max(intervalo_base_sec, intervalo)
+
+
+class PlanificadorSync:
+    """
+    Despacha las syncs vencidas a un pool propio de `max_concurrentes` hilos.
+    `sincronizar(id_empresa)` devuelve el reporte de sincronizar_empresa_unificada y
+    `modificacion_de(id_empresa)` el modifiedTime de su planilla (None: sin dato).
+    """
+
+    def __init__(
+        self,
+        engine,
+        sincronizar: Callable[[int], Dict[str, Any]],
+        intervalo_base_sec: int = 300,
+        intervalo_max_sec: int = SYNC_INTERVALO_MAX_SECONDS,
+        max_concurrentes: int = SYNC_MAX_CONCURRENTES,
+        max_por_cuenta: int = SYNC_MAX_POR_CUENTA,
+        edicion_reciente_sec: int = SYNC_EDICION_RECIENTE_MIN * 60,
+        cuenta_de: Optional[Callable[[int], str]] = None,
+        modificacion_de: Optional[Callable[[int], Optional[str]]] = None,
+        ejecucion_max_sec: int = SYNC_EJECUCION_MAX_SECONDS,
+    ) -> None:
+        self.engine = engine
+        self.sincronizar = sincronizar
+        self.intervalo_base_sec = max(1, intervalo_base_sec)
+        self.intervalo_max_sec = max(self.intervalo_base_sec, intervalo_max_sec)
+        self.max_concurrentes = max(1, max_concurrentes)
+        self.max_por_cuenta = max(1, max_por_cuenta)
+        self.edicion_reciente_sec = edicion_reciente_sec
+        # Hoy todas las empresas usan la misma cuenta de servicio (GOOGLE_SERVICE_ACCOUNT_FILE).
+        self.cuenta_de = cuenta_de or (lambda _id_empresa: GOOGLE_SERVICE_ACCOUNT_FILE)
+        self.modificacion_de = modificacion_de
+        self.ejecucion_max_sec = max(1, ejecucion_max_sec)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrentes, thread_name_prefix="sync-empresa")
+        self._empresas: Set[int] = set()
+        self._en_curso: Dict[int, Tuple[str, Future]] = {}
+
+    def actualizar_empresas(self, ids_empresas: Iterable[int]) -> None:
+        """Fija las empresas a sincronizar; las nuevas reciben su primer turno."""
+        ids = set(ids_empresas)
+        ahora = datetime.utcnow()
+        with Session(self.engine) as db:
+            existentes = {
+                e.id_empresa: e
+                for e in db.exec(select(SyncEmpresaEstado).where(SyncEmpresaEstado.id_empresa.in_(ids))).all()
+            } if ids else {}
+            for id_empresa in ids - existentes.keys():
+                db.add(
+                    SyncEmpresaEstado(
+                        id_empresa=id_empresa,
+                        intervalo_sec=self.intervalo_base_sec,
+                        proxima_ejecucion=proxima_en_turno(id_empresa, self.intervalo_base_sec, ahora),
+                    )
+                )
+            # Corridas "ejecutando" de un proceso que se cayó. Las de otros procesos vivos
+            # (API y sync_worker comparten la tabla) no se tocan.
+            for estado in db.exec(
+                select(SyncEmpresaEstado)
+                .where(SyncEmpresaEstado.estado == "ejecutando")
+                .where(self._ejecucion_abandonada(ahora))
+            ).all():
+                estado.estado = "programada"
+                estado.en_curso_desde = None
+                db.add(estado)
+            db.commit()
+        with self._lock:
+            self._empresas = ids
+
+    def _ejecucion_abandonada(self, ahora: datetime):
+        limite = ahora - timedelta(seconds=self.ejecucion_max_sec)
+        return or_(SyncEmpresaEstado.en_curso_desde.is_(None), SyncEmpresaEstado.en_curso_desde < limite)
+
+    def _modificacion(self, id_empresa: int) -> Optional[str]:
+        if self.modificacion_de is None:
+            return None
+        try:
+            return self.modificacion_de(id_empresa)
+        except Exception as e:
+            logger.warning("No se pudo leer el modifiedTime de la planilla de la empresa %s: %s", id_empresa, e)
+            return None
+
+    def revisar_modificaciones(self, empresas: Iterable[int], ahora: datetime) -> List[int]:
+        """
+        Empresas con el intervalo estirado cuya planilla cambió desde la última corrida:
+        se les corta el backoff y vuelven a su próximo turno base. Cada una se revisa
+        como mucho una vez por intervalo base (una llamada a Drive, no a Sheets).
+        """
+        if self.modificacion_de is None:
+            return []
+        revisar_hasta = ahora - timedelta(seconds=self.intervalo_base_sec)
+        with Session(self.engine) as db:
+            candidatas = [
+                (e.id_empresa, e.modificacion_planilla)
+                for e in db.exec(
+                    select(SyncEmpresaEstado)
+                    .where(SyncEmpresaEstado.id_empresa.in_(list(empresas)))
+                    .where(SyncEmpresaEstado.estado == "programada")
+                    .where(SyncEmpresaEstado.proxima_ejecucion > ahora)
+                    .where(SyncEmpresaEstado.intervalo_sec > self.intervalo_base_sec)
+                    .where(
+                        or_(
+                            SyncEmpresaEstado.modificacion_revisada_en.is_(None),
+                            SyncEmpresaEstado.modificacion_revisada_en <= revisar_hasta,
+                        )
+                    )
+                ).all()
+            ]
+        if not candidatas:
+            return []
+
+        # Drive fuera de la sesión: no se retiene una conexión durante la red.
+        actuales = {id_empresa: self._modificacion(id_empresa) for id_empresa, _ in candidatas}
+        reiniciadas: List[int] = []
+        with Session(self.engine) as db:
+            for id_empresa, vista in candidatas:
+                estado = db.get(SyncEmpresaEstado, id_empresa)
+                if estado is None or estado.estado != "programada":
+                    continue
+                estado.modificacion_revisada_en = ahora
+                actual = actuales[id_empresa]
+                if actual is not None and vista is not None and actual != vista:
+                    estado.corridas_sin_cambios = 0
+                    estado.intervalo_sec = intervalo_adaptado(
+                        self.intervalo_base_sec, self.intervalo_max_sec, 0, estado.duracion_promedio_ms
+                    )
+                    estado.proxima_ejecucion = min(
+                        estado.proxima_ejecucion, proxima_en_turno(id_empresa, self.intervalo_base_sec, ahora)
+                    )
+                    reiniciadas.append(id_empresa)
+                db.add(estado)
+            db.commit()
+        if reiniciadas:
+            logger.info("Planillas editadas: se corta el backoff de las empresas %s.", reiniciadas)
+        return reiniciadas
+
+    def despachar(self, ahora: Optional[datetime] = None) -> List[int]:
+        """Lanza las empresas vencidas que entren en los cupos; el resto queda en cola."""
+        ahora = ahora or datetime.utcnow()
+        with self._lock:
+            empresas = set(self._empresas)
+            en_curso = dict(self._en_curso)
+        if not empresas:
+            return []
+        self.revisar_modificaciones(empresas, ahora)
+
+        reciente_desde = ahora - timedelta(seconds=self.edicion_reciente_sec)
+        limite = ahora - timedelta(seconds=self.ejecucion_max_sec)
+        # Sin microsegundos: es la marca del reclamo y MySQL DATETIME los descarta.
+        reclamada_en = ahora.replace(microsecond=0)
+        a_lanzar: List[int] = []
+        with Session(self.engine) as db:
+            # FOR UPDATE: los despachos de los distintos procesos se serializan (MySQL) y
+            # cuentan los cupos sobre las mismas filas.
+            estados = db.exec(select(SyncEmpresaEstado).with_for_update()).all()
+            ocupadas = set(en_curso) | {
+                e.id_empresa
+                for e in estados
+                if e.estado == "ejecutando" and e.en_curso_desde is not None and e.en_curso_desde >= limite
+            }
+            vencidas = [
+                e
+                for e in estados
+                if e.id_empresa in empresas and e.proxima_ejecucion <= ahora and e.id_empresa not in ocupadas
+            ]
+            vencidas.sort(
+                key=lambda e: (
+                    not (e.ultimo_cambio_en is not None and e.ultimo_cambio_en >= reciente_desde),
+                    e.proxima_ejecucion,
+                    e.id_empresa,
+                )
+            )
+            libres = self.max_concurrentes - len(ocupadas)
+            por_cuenta = Counter(self.cuenta_de(id_empresa) for id_empresa in ocupadas)
+            for estado in vencidas:
+                cuenta = self.cuenta_de(estado.id_empresa)
+                if libres > 0 and por_cuenta[cuenta] < self.max_por_cuenta:
+                    reclamo = db.execute(
+                        update(SyncEmpresaEstado)
+                        .where(SyncEmpresaEstado.id_empresa == estado.id_empresa)
+                        .where(SyncEmpresaEstado.proxima_ejecucion <= ahora)
+                        .where(or_(SyncEmpresaEstado.estado != "ejecutando", self._ejecucion_abandonada(ahora)))
+                        .values(estado="ejecutando", en_curso_desde=reclamada_en, en_cola_desde=None)
+                        .execution_options(synchronize_session=False)
+                    )
+                    if reclamo.rowcount != 1:
+                        continue  # la tomó otro proceso
+                    libres -= 1
+                    por_cuenta[cuenta] += 1
+                    a_lanzar.append(estado.id_empresa)
+                    continue
+                if estado.estado != "en_cola":
+                    estado.estado = "en_cola"
+                    estado.en_cola_desde = ahora
+                    db.add(estado)
+            db.commit()
+
+        for id_empresa in a_lanzar:
+            # Bajo el lock: _correr no puede sacar la entrada antes de que se agregue.
+            with self._lock:
+                self._en_curso[id_empresa] = (
+                    self.cuenta_de(id_empresa),
+                    self._pool.submit(self._correr, id_empresa, reclamada_en),
+                )
+        return a_lanzar
+
+    def _correr(self, id_empresa: int, reclamada_en: datetime) -> None:
+        inicio = datetime.utcnow()
+        t0 = perf_counter()
+        try:
+            # Antes de leer: una edición hecha durante la corrida cuenta como cambio después.
+            modificacion = self._modificacion(id_empresa)
+            try:
+                resultado = self.sincronizar(id_empresa) or {}
+            except Exception as e:
+                resultado = {"status": "error", "message": f"{type(e).__name__}: {e}"}
+            self._registrar_corrida(
+                id_empresa, inicio, (perf_counter() - t0) * 1000, resultado, reclamada_en, modificacion
+            )
+        except Exception as e:
+            logger.error("No se pudo registrar la corrida de sync de la empresa %s: %s", id_empresa, e, exc_info=True)
+        finally:
+            with self._lock:
+                self._en_curso.pop(id_empresa, None)
+
+    def _registrar_corrida(
+        self,
+        id_empresa: int,
+        inicio: datetime,
+        duracion_ms: float,
+        resultado: Dict[str, Any],
+        reclamada_en: Optional[datetime] = None,
+        modificacion: Optional[str] = None,
+    ) -> None:
+        status = str(resultado.get("status") or "unknown")
+        leidas, cambiadas = filas_de_resultado(resultado)
+        with Session(self.engine) as db:
+            estado = db.get(SyncEmpresaEstado, id_empresa) or SyncEmpresaEstado(id_empresa=id_empresa)
+            if reclamada_en is not None and estado.en_curso_desde != reclamada_en:
+                # Tardó más que SYNC_EJECUCION_MAX_SECONDS y otro proceso la retomó: su estado manda.
+                logger.warning("La sync de la empresa %s fue retomada por otra corrida; no se registra.", id_empresa)
+                return
+            estado.ultimo_status = status
+            if modificacion is not None:
+                estado.modificacion_planilla = modificacion
+                estado.modificacion_revisada_en = inicio
+            # "busy": ya corría una sync (manual) de la empresa; no es una corrida propia.
+            if status != "busy":
+                estado.corridas += 1
+                estado.ultimo_inicio = inicio
+                estado.ultima_duracion_ms = round(duracion_ms, 2)
+                estado.duracion_promedio_ms = round(
+                    duracion_ms
+                    if estado.duracion_promedio_ms is None
+                    else ALFA_DURACION * duracion_ms + (1 - ALFA_DURACION) * estado.duracion_promedio_ms,
+                    2,
+                )
+                estado.ultimas_filas_leidas = leidas
+                estado.ultimas_filas_cambiadas = cambiadas
+                estado.ultimo_error = resultado.get("message") if status in ("error", "partial") else None
+                if cambiadas:
+                    estado.ultimo_cambio_en = datetime.utcnow()
+                if cambiadas or status == "error":
+                    estado.corridas_sin_cambios = 0
+                else:
+                    estado.corridas_sin_cambios += 1
+            estado.intervalo_sec = intervalo_adaptado(
+                self.intervalo_base_sec, self.intervalo_max_sec, estado.corridas_sin_cambios, estado.duracion_promedio_ms
+            )
+            # Medio intervalo base de tolerancia: el despacho arranca unos segundos después del turno.
+            desde = max(
+                inicio + timedelta(seconds=estado.intervalo_sec - self.intervalo_base_sec / 2),
+                datetime.utcnow(),
+            )
+            estado.proxima_ejecucion = proxima_en_turno(id_empresa, self.intervalo_base_sec, desde)
+            estado.estado = "programada"
+            estado.en_curso_desde = None
+            db.add(estado)
+            db.commit()
+
+    def esperar(self, timeout: Optional[float] = None) -> None:
+        """Espera a que terminen las syncs en curso (tests y apagado ordenado)."""
+        with self._lock:
+            futuros = [futuro for _, futuro in self._en_curso.values()]
+        wait(futuros, timeout=timeout)
+
+    def cerrar(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _detalle(estado: SyncEmpresaEstado, ahora: datetime) -> Dict[str, Any]:
+    def _seg(desde: Optional[datetime]) -> Optional[float]:
+        return round((ahora - desde).total_seconds(), 1) if desde else None
+
+    return {
+        "id_empresa": estado.id_empresa,
+        "estado": estado.estado,
+        "intervalo_sec": estado.intervalo_sec,
+        "proxima_ejecucion": estado.proxima_ejecucion,
+        "en_cola_seg": _seg(estado.en_cola_desde),
+        "en_curso_seg": _seg(estado.en_curso_desde),
+        "ultimo_inicio": estado.ultimo_inicio,
+        "ultima_duracion_ms": estado.ultima_duracion_ms,
+        "duracion_promedio_ms": estado.duracion_promedio_ms,
+        "ultimas_filas_leidas": estado.ultimas_filas_leidas,
+        "ultimas_filas_cambiadas": estado.ultimas_filas_cambiadas,
+        "ultimo_status": estado.ultimo_status,
+        "ultimo_error": estado.ultimo_error,
+        "ultimo_cambio_en": estado.ultimo_cambio_en,
+        "corridas": estado.corridas,
+    }
+
+
+def estado_planificador(db: Session) -> Dict[str, Any]:
+    """Syncs en curso, cola de vencidas esperando cupo y turnos programados con sus últimos tiempos."""
+    ahora = datetime.utcnow()
+    estados = db.exec(select(SyncEmpresaEstado).order_by(SyncEmpresaEstado.proxima_ejecucion)).all()
+    en_cola = sorted(
+        (e for e in estados if e.estado == "en_cola"),
+        key=lambda e: e.en_cola_desde or ahora,
+    )
+    return {
+        "max_concurrentes": SYNC_MAX_CONCURRENTES,
+        "max_por_cuenta": SYNC_MAX_POR_CUENTA,
+        "intervalo_max_sec": SYNC_INTERVALO_MAX_SECONDS,
+        "en_curso": [_detalle(e, ahora) for e in estados if e.estado == "ejecutando"],
+        "en_cola": [_detalle(e, ahora) for e in en_cola],
+        "programadas": [_detalle(e, ahora) for e in estados if e.estado == "programada"],
+    }
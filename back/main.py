@@ -3,9 +3,10 @@
 import logging
 import os
 import threading
-from back.api.blueprints import admin_router, afip_tools_router, articulos_router, auth_router,actualizacion_masiva_router,clientes_router, configuracion_router, empresa_router, importaciones_router, proveedores_router, comprobantes_router, mesas_router, scanner_router, ordenes_router, impresion_router, modo_especial_router
-from fastapi import FastAPI, APIRouter
+from back.api.blueprints import admin_router, afip_tools_router, articulos_router, auth_router,actualizacion_masiva_router,clientes_router, configuracion_router, empresa_router, importaciones_router, proveedores_router, comprobantes_router, mesas_router, scanner_router, ordenes_router, impresion_router, modo_especial_router, eventos_router
+from fastapi import FastAPI, APIRouter, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 
@@ -18,6 +19,9 @@ from back.api.blueprints import usuarios_router
 from back import config # (y otros que necesites)
 from back.utils.mysql_handler import get_db_connection
 from back.database import create_db_and_tables
+from back.utils.endpoint_actual import EndpointActualMiddleware
+from back.utils.paginacion_keyset import HEADER_SIGUIENTE_CURSOR
+from back.gestion.reportes.servicio_render import ColaRenderLlena, TimeoutRender, obtener_servicio_render
 
 logger = logging.getLogger(__name__)
 
@@ -86,7 +90,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[HEADER_SIGUIENTE_CURSOR],
 )
+# Etiqueta cada request con su endpoint (métricas de cachés por endpoint).
+app.add_middleware(EndpointActualMiddleware)
+
+
+# --- Pool de render de PDFs: cola llena y timeout ---
+@app.exception_handler(ColaRenderLlena)
+async def _cola_render_llena(request: Request, exc: ColaRenderLlena):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "2"})
+
+
+@app.exception_handler(TimeoutRender)
+async def _timeout_render(request: Request, exc: TimeoutRender):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 # --- Verificación inicial en segundo plano (no bloquea el bind de Uvicorn) ---
 @app.on_event("startup")
@@ -106,6 +124,7 @@ def shutdown_event():
         shutdown_scheduler()
     except Exception as e:
         print(f"⚠️ No se pudo detener el scheduler correctamente: {e}")
+    obtener_servicio_render().cerrar()
 
 
 # --- Inclusión de Routers ---
@@ -125,6 +144,7 @@ app.include_router(comprobantes_router.router)
 app.include_router(afip_tools_router.router)
 app.include_router(mesas_router.router)
 app.include_router(scanner_router.router)
+app.include_router(eventos_router.router)
 app.include_router(ordenes_router.router)
 app.include_router(impresion_router.router)
 app.include_router(modo_especial_router.router)
@@ -0,0 +1,49 @@
+"""Crear tabla sync_huellas_hojas para sincronización incremental con Sheets
+
+Revision ID: n8o9p0q1r2s3
+Revises: m7n8o9p0q1r2
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "n8o9p0q1r2s3"
+down_revision: Union[str, Sequence[str], None] = "m7n8o9p0q1r2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("sync_huellas_hojas"):
+        return
+    op.create_table(
+        "sync_huellas_hojas",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_empresa", sa.Integer(), nullable=False),
+        sa.Column("hoja", sa.String(length=255), nullable=False),
+        sa.Column("huella", sa.String(length=64), nullable=False),
+        sa.Column("huellas_filas", sa.JSON(), nullable=True),
+        sa.Column("cantidad_filas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("planilla_modificada_en", sa.String(length=64), nullable=True),
+        sa.Column("actualizado_en", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("reconciliado_en", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["id_empresa"], ["empresas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id_empresa", "hoja", name="uq_sync_huella_empresa_hoja"),
+    )
+    op.create_index("ix_sync_huellas_hojas_id_empresa", "sync_huellas_hojas", ["id_empresa"])
+
+
+def downgrade() -> None:
+    if _has_table("sync_huellas_hojas"):
+        op.drop_index("ix_sync_huellas_hojas_id_empresa", table_name="sync_huellas_hojas")
+        op.drop_table("sync_huellas_hojas")
@@ -0,0 +1,39 @@
+"""Agregar lease (reclamado_por, lease_hasta) a sync_nube_pendientes
+
+Revision ID: o9p0q1r2s3t4
+Revises: n8o9p0q1r2s3
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "o9p0q1r2s3t4"
+down_revision: Union[str, Sequence[str], None] = "n8o9p0q1r2s3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    bind = op.get_bind()
+    return any(col["name"] == column for col in inspect(bind).get_columns(table))
+
+
+def upgrade() -> None:
+    if not _has_column("sync_nube_pendientes", "reclamado_por"):
+        op.add_column("sync_nube_pendientes", sa.Column("reclamado_por", sa.String(length=128), nullable=True))
+    if not _has_column("sync_nube_pendientes", "lease_hasta"):
+        op.add_column("sync_nube_pendientes", sa.Column("lease_hasta", sa.DateTime(), nullable=True))
+        op.create_index("ix_sync_nube_pendientes_lease_hasta", "sync_nube_pendientes", ["lease_hasta"])
+
+
+def downgrade() -> None:
+    if _has_column("sync_nube_pendientes", "lease_hasta"):
+        op.drop_index("ix_sync_nube_pendientes_lease_hasta", table_name="sync_nube_pendientes")
+        op.drop_column("sync_nube_pendientes", "lease_hasta")
+    if _has_column("sync_nube_pendientes", "reclamado_por"):
+        op.drop_column("sync_nube_pendientes", "reclamado_por")
@@ -0,0 +1,44 @@
+"""Crear tabla catalogo_cambios para la sincronización delta del catálogo
+
+Revision ID: p0q1r2s3t4u5
+Revises: o9p0q1r2s3t4
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "p0q1r2s3t4u5"
+down_revision: Union[str, Sequence[str], None] = "o9p0q1r2s3t4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("catalogo_cambios"):
+        return
+    op.create_table(
+        "catalogo_cambios",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_empresa", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("id_articulo", sa.Integer(), nullable=True),
+        sa.Column("creado_en", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["id_empresa"], ["empresas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_catalogo_cambios_empresa_version", "catalogo_cambios", ["id_empresa", "version"])
+
+
+def downgrade() -> None:
+    if _has_table("catalogo_cambios"):
+        op.drop_index("ix_catalogo_cambios_empresa_version", table_name="catalogo_cambios")
+        op.drop_table("catalogo_cambios")
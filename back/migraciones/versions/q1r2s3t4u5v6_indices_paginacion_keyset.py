@@ -0,0 +1,42 @@
+"""Índices para la paginación por cursor de clientes y movimientos de caja
+
+Revision ID: q1r2s3t4u5v6
+Revises: p0q1r2s3t4u5
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import inspect
+
+
+revision: str = "q1r2s3t4u5v6"
+down_revision: Union[str, Sequence[str], None] = "p0q1r2s3t4u5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES = (
+    ("ix_terceros_empresa_cliente_nombre", "terceros", ["id_empresa", "es_cliente", "nombre_razon_social", "id"]),
+    ("ix_caja_movimientos_timestamp_id", "caja_movimientos", ["timestamp", "id"]),
+)
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def _has_index(table: str, index: str) -> bool:
+    return any(i["name"] == index for i in inspect(op.get_bind()).get_indexes(table))
+
+
+def upgrade() -> None:
+    for nombre, tabla, columnas in INDICES:
+        if _has_table(tabla) and not _has_index(tabla, nombre):
+            op.create_index(nombre, tabla, columnas)
+
+
+def downgrade() -> None:
+    for nombre, tabla, _ in INDICES:
+        if _has_table(tabla) and _has_index(tabla, nombre):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,45 @@
+"""Crear tabla ventas_resumen_diario (acumulados del panel de estadísticas)
+
+Revision ID: r2s3t4u5v6w7
+Revises: q1r2s3t4u5v6
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "r2s3t4u5v6w7"
+down_revision: Union[str, Sequence[str], None] = "q1r2s3t4u5v6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("ventas_resumen_diario"):
+        return
+    op.create_table(
+        "ventas_resumen_diario",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("id_empresa", sa.Integer(), nullable=False),
+        sa.Column("dimension", sa.String(length=16), nullable=False),
+        sa.Column("fecha", sa.Date(), nullable=False),
+        sa.Column("clave", sa.String(length=128), nullable=False, server_default=""),
+        sa.Column("cantidad", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("monto", sa.Float(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["id_empresa"], ["empresas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id_empresa", "dimension", "fecha", "clave", name="uq_ventas_resumen_diario"),
+    )
+
+
+def downgrade() -> None:
+    if _has_table("ventas_resumen_diario"):
+        op.drop_table("ventas_resumen_diario")
@@ -0,0 +1,57 @@
+"""Crear tabla facturas_pendientes (cola de facturación AFIP)
+
+Revision ID: s3t4u5v6w7x8
+Revises: r2s3t4u5v6w7
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "s3t4u5v6w7x8"
+down_revision: Union[str, Sequence[str], None] = "r2s3t4u5v6w7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("facturas_pendientes"):
+        return
+    op.create_table(
+        "facturas_pendientes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("creado_en", sa.DateTime(), nullable=False),
+        sa.Column("actualizado_en", sa.DateTime(), nullable=False),
+        sa.Column("id_empresa", sa.Integer(), nullable=False),
+        sa.Column("id_venta", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("estado", sa.String(length=32), nullable=False),
+        sa.Column("intentos", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_intentos", sa.Integer(), nullable=False, server_default="6"),
+        sa.Column("ultimo_error", sa.Text(), nullable=True),
+        sa.Column("proximo_reintento_en", sa.DateTime(), nullable=False),
+        sa.Column("reclamado_por", sa.String(length=128), nullable=True),
+        sa.Column("lease_hasta", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["id_empresa"], ["empresas.id"]),
+        sa.ForeignKeyConstraint(["id_venta"], ["ventas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id_venta", name="uq_facturas_pendientes_venta"),
+    )
+    op.create_index("ix_facturas_pendientes_creado_en", "facturas_pendientes", ["creado_en"])
+    op.create_index("ix_facturas_pendientes_id_empresa", "facturas_pendientes", ["id_empresa"])
+    op.create_index("ix_facturas_pendientes_estado", "facturas_pendientes", ["estado"])
+    op.create_index("ix_facturas_pendientes_proximo_reintento_en", "facturas_pendientes", ["proximo_reintento_en"])
+    op.create_index("ix_facturas_pendientes_lease_hasta", "facturas_pendientes", ["lease_hasta"])
+
+
+def downgrade() -> None:
+    if _has_table("facturas_pendientes"):
+        op.drop_table("facturas_pendientes")
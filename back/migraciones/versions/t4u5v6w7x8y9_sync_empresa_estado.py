@@ -0,0 +1,55 @@
+"""Crear tabla sync_empresa_estado (planificador de sync automática)
+
+Revision ID: t4u5v6w7x8y9
+Revises: s3t4u5v6w7x8
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "t4u5v6w7x8y9"
+down_revision: Union[str, Sequence[str], None] = "s3t4u5v6w7x8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("sync_empresa_estado"):
+        return
+    op.create_table(
+        "sync_empresa_estado",
+        sa.Column("id_empresa", sa.Integer(), nullable=False),
+        sa.Column("estado", sa.String(length=32), nullable=False),
+        sa.Column("intervalo_sec", sa.Integer(), nullable=False, server_default="300"),
+        sa.Column("proxima_ejecucion", sa.DateTime(), nullable=False),
+        sa.Column("en_cola_desde", sa.DateTime(), nullable=True),
+        sa.Column("en_curso_desde", sa.DateTime(), nullable=True),
+        sa.Column("ultimo_inicio", sa.DateTime(), nullable=True),
+        sa.Column("ultima_duracion_ms", sa.Float(), nullable=True),
+        sa.Column("duracion_promedio_ms", sa.Float(), nullable=True),
+        sa.Column("ultimas_filas_leidas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ultimas_filas_cambiadas", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("ultimo_status", sa.String(length=32), nullable=True),
+        sa.Column("ultimo_error", sa.Text(), nullable=True),
+        sa.Column("ultimo_cambio_en", sa.DateTime(), nullable=True),
+        sa.Column("corridas_sin_cambios", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("corridas", sa.Integer(), nullable=False, server_default="0"),
+        sa.ForeignKeyConstraint(["id_empresa"], ["empresas.id"]),
+        sa.PrimaryKeyConstraint("id_empresa"),
+    )
+    op.create_index("ix_sync_empresa_estado_estado", "sync_empresa_estado", ["estado"])
+    op.create_index("ix_sync_empresa_estado_proxima_ejecucion", "sync_empresa_estado", ["proxima_ejecucion"])
+
+
+def downgrade() -> None:
+    if _has_table("sync_empresa_estado"):
+        op.drop_table("sync_empresa_estado")
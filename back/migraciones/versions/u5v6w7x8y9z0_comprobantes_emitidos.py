@@ -0,0 +1,46 @@
+"""Crear tabla comprobantes_emitidos (CAE de /comprobantes/generar pendiente de entrega)
+
+Revision ID: u5v6w7x8y9z0
+Revises: t4u5v6w7x8y9
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "u5v6w7x8y9z0"
+down_revision: Union[str, Sequence[str], None] = "t4u5v6w7x8y9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(table: str) -> bool:
+    return inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _has_table("comprobantes_emitidos"):
+        return
+    op.create_table(
+        "comprobantes_emitidos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("creado_en", sa.DateTime(), nullable=False),
+        sa.Column("id_empresa", sa.Integer(), nullable=False),
+        sa.Column("clave", sa.String(length=80), nullable=False),
+        sa.Column("datos_afip", sa.JSON(), nullable=True),
+        sa.Column("entregado", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.ForeignKeyConstraint(["id_empresa"], ["empresas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("id_empresa", "clave", name="uq_comprobantes_emitidos_clave"),
+    )
+    op.create_index("ix_comprobantes_emitidos_creado_en", "comprobantes_emitidos", ["creado_en"])
+    op.create_index("ix_comprobantes_emitidos_id_empresa", "comprobantes_emitidos", ["id_empresa"])
+
+
+def downgrade() -> None:
+    if _has_table("comprobantes_emitidos"):
+        op.drop_table("comprobantes_emitidos")
@@ -0,0 +1,35 @@
+"""Agregar modifiedTime de la planilla a sync_empresa_estado (reinicio del backoff)
+
+Revision ID: v6w7x8y9z0a1
+Revises: u5v6w7x8y9z0
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+
+revision: str = "v6w7x8y9z0a1"
+down_revision: Union[str, Sequence[str], None] = "u5v6w7x8y9z0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columnas(table: str) -> set:
+    return {c["name"] for c in inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    columnas = _columnas("sync_empresa_estado")
+    if "modificacion_planilla" not in columnas:
+        op.add_column("sync_empresa_estado", sa.Column("modificacion_planilla", sa.String(length=64), nullable=True))
+    if "modificacion_revisada_en" not in columnas:
+        op.add_column("sync_empresa_estado", sa.Column("modificacion_revisada_en", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("sync_empresa_estado", "modificacion_revisada_en")
+    op.drop_column("sync_empresa_estado", "modificacion_planilla")
@@ -4,7 +4,7 @@ from datetime import datetime, date
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 from sqlmodel import Field, Relationship, SQLModel, JSON, Column
-from sqlalchemy import DECIMAL, TIMESTAMP, BigInteger, Date, UniqueConstraint, func
+from sqlalchemy import DECIMAL, TIMESTAMP, BigInteger, Date, Index, UniqueConstraint, func
 from sqlmodel import Column  # Importante
 from sqlalchemy import String,JSON   # Importante
 
@@ -43,6 +43,9 @@ class Usuario(SQLModel, table=True):
 
 class Tercero(SQLModel, table=True):
     __tablename__ = "terceros"
+    __table_args__ = (
+        Index("ix_terceros_empresa_cliente_nombre", "id_empresa", "es_cliente", "nombre_razon_social", "id"),
+    )
     id: int = Field(primary_key=True)
     codigo_interno: Optional[str] = Field(index=True)
     es_cliente: bool = Field(default=False)
@@ -227,6 +230,7 @@ class CajaSesion(SQLModel, table=True):
 
 class CajaMovimiento(SQLModel, table=True):
     __tablename__ = "caja_movimientos"
+    __table_args__ = (Index("ix_caja_movimientos_timestamp_id", "timestamp", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     tipo: str
@@ -374,6 +378,24 @@ class VentaDetalle(SQLModel, table=True):
     articulo: Articulo = Relationship(back_populates="items_venta")
     movimiento_stock: Optional[StockMovimiento] = Relationship(back_populates="venta_detalle")
 
+class VentaResumenDiario(SQLModel, table=True):
+    """
+    Acumulado diario de ventas por empresa (día AR) para el panel de estadísticas.
+    `dimension` TOTAL/USUARIO cuenta tickets, ARTICULO/CATEGORIA unidades y
+    METODO_PAGO movimientos de caja; `monto` es el importe en todos los casos.
+    """
+    __tablename__ = "ventas_resumen_diario"
+    __table_args__ = (
+        UniqueConstraint("id_empresa", "dimension", "fecha", "clave", name="uq_ventas_resumen_diario"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    id_empresa: int = Field(foreign_key="empresas.id")
+    dimension: str = Field(sa_column=Column(String(16), nullable=False))
+    fecha: date
+    clave: str = Field(default="", sa_column=Column(String(128), nullable=False, server_default=""))
+    cantidad: float = Field(default=0.0)
+    monto: float = Field(default=0.0)
+
 # ===================================================================
 # === MODELOS DE SEGURIDAD Y OTROS
 # ===================================================================
@@ -613,10 +635,99 @@ class SyncNubePendiente(SQLModel, table=True):
     max_intentos: int = Field(default=10)
     ultimo_error: Optional[str] = Field(default=None)
     proximo_reintento_en: datetime = Field(default_factory=datetime.utcnow, index=True)
+    reclamado_por: Optional[str] = Field(default=None)  # worker que tiene el lease
+    lease_hasta: Optional[datetime] = Field(default=None, index=True)  # vencido = se puede volver a reclamar
 
     empresa: "Empresa" = Relationship()
     venta: Optional["Venta"] = Relationship()
 
+class FacturaPendiente(SQLModel, table=True):
+    """Factura AFIP de una venta, emitida por el worker fuera del request de la venta."""
+    __tablename__ = "facturas_pendientes"
+    # Clave de idempotencia: una sola factura encolada por venta.
+    __table_args__ = (UniqueConstraint("id_venta", name="uq_facturas_pendientes_venta"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    creado_en: datetime = Field(default_factory=datetime.utcnow, index=True)
+    actualizado_en: datetime = Field(default_factory=datetime.utcnow)
+    id_empresa: int = Field(foreign_key="empresas.id", index=True)
+    id_venta: int = Field(foreign_key="ventas.id")
+    payload: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))  # emisor, receptor, total, formato
+    estado: str = Field(default="pendiente", index=True)  # pendiente | procesando | completado | fallido
+    intentos: int = Field(default=0)
+    max_intentos: int = Field(default=6)
+    ultimo_error: Optional[str] = Field(default=None)
+    proximo_reintento_en: datetime = Field(default_factory=datetime.utcnow, index=True)
+    reclamado_por: Optional[str] = Field(default=None)
+    lease_hasta: Optional[datetime] = Field(default=None, index=True)
+
+    empresa: "Empresa" = Relationship()
+    venta: "Venta" = Relationship()
+
+class ComprobanteEmitido(SQLModel, table=True):
+    """CAE obtenido por /comprobantes/generar, guardado antes del render: un reintento re-renderiza sin volver a facturar."""
+    __tablename__ = "comprobantes_emitidos"
+    __table_args__ = (UniqueConstraint("id_empresa", "clave", name="uq_comprobantes_emitidos_clave"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    creado_en: datetime = Field(default_factory=datetime.utcnow, index=True)
+    id_empresa: int = Field(foreign_key="empresas.id", index=True)
+    clave: str = Field(max_length=80)  # "cliente:<Idempotency-Key>"
+    datos_afip: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+    entregado: bool = Field(default=False)
+
+    empresa: "Empresa" = Relationship()
+
+class SyncHuellaHoja(SQLModel, table=True):
+    """Huella del contenido de una hoja de Sheets ya aplicado a la DB (sync incremental)."""
+    __tablename__ = "sync_huellas_hojas"
+    __table_args__ = (UniqueConstraint("id_empresa", "hoja", name="uq_sync_huella_empresa_hoja"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    id_empresa: int = Field(foreign_key="empresas.id", index=True)
+    hoja: str  # articulos | clientes | articulos:<nombre_hoja>
+    huella: str
+    huellas_filas: Dict[str, str] = Field(default_factory=dict, sa_column=Column(JSON))
+    cantidad_filas: int = Field(default=0)
+    planilla_modificada_en: Optional[str] = Field(default=None)  # modifiedTime de Drive al leer
+    actualizado_en: datetime = Field(default_factory=datetime.utcnow)
+    reconciliado_en: datetime = Field(default_factory=datetime.utcnow)  # última sync completa
+
+class SyncEmpresaEstado(SQLModel, table=True):
+    """Turno y última corrida de la sync automática Sheets -> DB de una empresa (planificador)."""
+    __tablename__ = "sync_empresa_estado"
+
+    id_empresa: int = Field(foreign_key="empresas.id", primary_key=True)
+    estado: str = Field(default="programada", index=True)  # programada | en_cola | ejecutando
+    intervalo_sec: int = Field(default=300)  # adaptado según cambios y duración de las corridas
+    proxima_ejecucion: datetime = Field(default_factory=datetime.utcnow, index=True)
+    en_cola_desde: Optional[datetime] = Field(default=None)
+    en_curso_desde: Optional[datetime] = Field(default=None)
+    ultimo_inicio: Optional[datetime] = Field(default=None)
+    ultima_duracion_ms: Optional[float] = Field(default=None)
+    duracion_promedio_ms: Optional[float] = Field(default=None)  # media exponencial
+    ultimas_filas_leidas: int = Field(default=0)
+    ultimas_filas_cambiadas: int = Field(default=0)
+    ultimo_status: Optional[str] = Field(default=None)  # status de sincronizar_empresa_unificada
+    ultimo_error: Optional[str] = Field(default=None)
+    ultimo_cambio_en: Optional[datetime] = Field(default=None)  # última corrida que trajo cambios
+    corridas_sin_cambios: int = Field(default=0)
+    corridas: int = Field(default=0)
+    # modifiedTime de Drive al arrancar la última corrida; si cambia, se corta el backoff.
+    modificacion_planilla: Optional[str] = Field(default=None, max_length=64)
+    modificacion_revisada_en: Optional[datetime] = Field(default=None)
+
+class CatalogoCambio(SQLModel, table=True):
+    """Bitácora de artículos tocados en cada versión del catálogo (sync delta de los POS)."""
+    __tablename__ = "catalogo_cambios"
+    __table_args__ = (Index("ix_catalogo_cambios_empresa_version", "id_empresa", "version"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    id_empresa: int = Field(foreign_key="empresas.id")
+    version: int
+    id_articulo: Optional[int] = Field(default=None)  # None: la versión subió sin artículos puntuales
+    creado_en: datetime = Field(default_factory=datetime.utcnow)
+
 class Orden(SQLModel, table=True):
     __tablename__ = "ordenes"
     id: Optional[int] = Field(default=None, primary_key=True)
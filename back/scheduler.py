@@ -1,7 +1,7 @@
 """
 Background scheduler para sincronización automática configurable
 Integrado en el API FastAPI
-Sincroniza TODAS las empresas configuradas
+Sincroniza TODAS las empresas configuradas (turnos, cupos y prioridad: back/gestion/sync_planificador.py)
 """
 import logging
 import os
@@ -20,10 +20,19 @@ from back.database import engine
 from back.modelos import ConfiguracionEmpresa, Empresa
 from back.gestion.sincronizacion_orquestador import sincronizar_empresa_unificada
 from back.gestion.sync_nube_queue_manager import procesar_cola_sync_nube
+from back.gestion.facturacion_cola_manager import procesar_cola_facturas
+from back.gestion.sync_planificador import (
+    SYNC_DESPACHO_SECONDS,
+    SYNC_INTERVALO_MAX_SECONDS,
+    SYNC_MAX_CONCURRENTES,
+    SYNC_MAX_POR_CUENTA,
+    PlanificadorSync,
+)
 
 logger = logging.getLogger(__name__)
 
 scheduler = None
+planificador: PlanificadorSync | None = None
 
 def _get_int_env(name: str, default: int) -> int:
     valor = os.getenv(name, str(default))
@@ -46,7 +55,11 @@ SYNC_JOB_MISFIRE_GRACE_SECONDS = _get_int_env("SYNC_JOB_MISFIRE_GRACE_SECONDS",
 SYNC_INCLUDE_PROVEEDORES = _get_bool_env("SYNC_INCLUDE_PROVEEDORES", False)
 SYNC_REFRESH_COMPANIES_SECONDS = _get_int_env("SYNC_REFRESH_COMPANIES_SECONDS", 300)
 SYNC_QUEUE_RETRY_SECONDS = _get_int_env("SYNC_QUEUE_RETRY_SECONDS", 60)
+# Reintentos de facturas AFIP encoladas (el worker en background cubre el caso normal).
+FACTURACION_COLA_RETRY_SECONDS = _get_int_env("FACTURACION_COLA_RETRY_SECONDS", 20)
 SYNC_AUTO_ENABLED = _get_bool_env("SYNC_AUTO_ENABLED", True)
+# Omite hojas y filas sin cambios según las huellas de la última sincronización.
+SYNC_INCREMENTAL = _get_bool_env("SYNC_INCREMENTAL", True)
 
 
 def _parse_empresa_ids_env(name: str) -> set[int] | None:
@@ -92,8 +105,8 @@ def obtener_todas_las_empresas() -> list[int]:
         print(f"⚠️ Error al obtener empresas: {e}")
         return []
 
-def sincronizar_empresa_background(id_empresa: int):
-    """Función que se ejecuta en background cada 5 minutos"""
+def sincronizar_empresa_background(id_empresa: int) -> dict:
+    """Sync automática de una empresa; la lanza el planificador en su turno. Devuelve el reporte."""
     try:
         with Session(engine) as db:
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -105,6 +118,7 @@ def sincronizar_empresa_background(id_empresa: int):
                 incluir_clientes=True,
                 incluir_proveedores=SYNC_INCLUDE_PROVEEDORES,
                 detener_en_error=False,
+                incremental=SYNC_INCREMENTAL,
             )
             status_sync = resultado.get("status", "unknown")
             if status_sync == "busy":
@@ -113,10 +127,19 @@ def sincronizar_empresa_background(id_empresa: int):
                 print(f"  ✓ Resultado sincronización: {resultado}")
             
             print(f"[{timestamp}] ✅ Sincronización completada")
-            
+            return resultado
+
     except Exception as e:
         print(f"❌ Error en sincronización: {e}")
         logger.error(f"Error en sincronización automática: {e}", exc_info=True)
+        return {"status": "error", "message": f"{type(e).__name__}: {e}"}
+
+def modificacion_planilla_empresa(id_empresa: int) -> str | None:
+    """modifiedTime (Drive) de la planilla de la empresa; el planificador corta el backoff si cambió."""
+    from back.utils.tablas_handler import TablasHandler
+
+    with Session(engine) as db:
+        return TablasHandler(id_empresa=id_empresa, db=db).obtener_modificacion_planilla()
 
 def procesar_cola_sync_nube_background():
     """Worker pasivo: reprocesa pendientes de sincronización Sheets."""
@@ -130,66 +153,66 @@ def procesar_cola_sync_nube_background():
         logger.error(f"Error procesando cola sync_nube: {e}", exc_info=True)
 
 
-def _reconciliar_jobs_empresas():
-    """Sincroniza jobs del scheduler con las empresas activas actuales."""
-    global scheduler
-    if scheduler is None:
-        return
+def procesar_cola_facturas_background():
+    """Worker pasivo: reintenta facturas AFIP pendientes y recupera leases vencidos."""
+    try:
+        with Session(engine) as db:
+            resumen = procesar_cola_facturas(db=db, max_items=20)
+            if resumen.get("procesados", 0) > 0:
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                print(f"[{timestamp}] 🧾 Cola facturas AFIP: {resumen}")
+    except Exception as e:
+        logger.error(f"Error procesando cola de facturas AFIP: {e}", exc_info=True)
 
-    jobs_actuales = {job.id: job for job in scheduler.get_jobs()}
-    jobs_empresas_ids = {
-        job_id for job_id in jobs_actuales.keys() if job_id.startswith("sync_empresa_")
-    }
+
+def _reconciliar_empresas_sync():
+    """Actualiza las empresas del planificador con las empresas activas actuales."""
+    if planificador is None:
+        return
 
     if not SYNC_AUTO_ENABLED:
-        for job_id in jobs_empresas_ids:
-            scheduler.remove_job(job_id)
-        if jobs_empresas_ids:
-            print("⏸️ Sync automático Sheets desactivado (SYNC_AUTO_ENABLED=false)")
+        planificador.actualizar_empresas([])
         return
 
     empresas_activas = set(obtener_todas_las_empresas())
     if SYNC_EMPRESA_IDS is not None:
         empresas_activas &= SYNC_EMPRESA_IDS
+    planificador.actualizar_empresas(empresas_activas)
 
-    # Crear faltantes
-    for id_empresa in empresas_activas:
-        job_id = f"sync_empresa_{id_empresa}"
-        if job_id not in jobs_actuales:
-            scheduler.add_job(
-                sincronizar_empresa_background,
-                'interval',
-                seconds=SYNC_INTERVAL_SECONDS,
-                args=[id_empresa],
-                id=job_id,
-                name=f'Sincronización Empresa {id_empresa}',
-                replace_existing=True,
-                max_instances=1,
-                coalesce=True,
-                misfire_grace_time=SYNC_JOB_MISFIRE_GRACE_SECONDS,
-            )
-            print(f"➕ Job agregado para empresa activa {id_empresa}")
 
-    # Eliminar jobs de empresas inactivas o inexistentes
-    for job_id in jobs_empresas_ids:
-        id_empresa_job = int(job_id.replace("sync_empresa_", ""))
-        if id_empresa_job not in empresas_activas:
-            scheduler.remove_job(job_id)
-            print(f"➖ Job removido para empresa inactiva {id_empresa_job}")
+def despachar_syncs_background():
+    """Lanza las syncs de empresas cuyo turno venció, dentro de los cupos de concurrencia."""
+    if planificador is None:
+        return
+    try:
+        lanzadas = planificador.despachar()
+        if lanzadas:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] ▶️ Sync automática lanzada para empresas {lanzadas}")
+    except Exception as e:
+        logger.error(f"Error despachando syncs automáticas: {e}", exc_info=True)
 
 def init_scheduler():
     """Inicializar el scheduler con TODAS las empresas activas"""
-    global scheduler
+    global scheduler, planificador
     
     if scheduler is None:
         scheduler = BackgroundScheduler()
+        planificador = PlanificadorSync(
+            engine,
+            sincronizar_empresa_background,
+            intervalo_base_sec=SYNC_INTERVAL_SECONDS,
+            modificacion_de=modificacion_planilla_empresa,
+        )
 
-        # Carga inicial de jobs de empresas activas
-        _reconciliar_jobs_empresas()
+        # Carga inicial de empresas activas
+        _reconciliar_empresas_sync()
+        if not SYNC_AUTO_ENABLED:
+            print("⏸️ Sync automático Sheets desactivado (SYNC_AUTO_ENABLED=false)")
 
         # Job de mantenimiento: refresca altas/bajas de empresas sin reiniciar API
         scheduler.add_job(
-            _reconciliar_jobs_empresas,
+            _reconciliar_empresas_sync,
             'interval',
             seconds=SYNC_REFRESH_COMPANIES_SECONDS,
             id='sync_refresh_empresas',
@@ -200,6 +223,19 @@ def init_scheduler():
             misfire_grace_time=max(SYNC_JOB_MISFIRE_GRACE_SECONDS, 30),
         )
 
+        # Un solo job de despacho: las syncs corren en el pool del planificador, no en el del scheduler.
+        scheduler.add_job(
+            despachar_syncs_background,
+            'interval',
+            seconds=SYNC_DESPACHO_SECONDS,
+            id='sync_despacho',
+            name='Despacho de sincronizaciones por empresa',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=max(SYNC_JOB_MISFIRE_GRACE_SECONDS, 15),
+        )
+
         scheduler.add_job(
             procesar_cola_sync_nube_background,
             'interval',
@@ -211,15 +247,30 @@ def init_scheduler():
             coalesce=True,
             misfire_grace_time=max(SYNC_JOB_MISFIRE_GRACE_SECONDS, 15),
         )
+
+        scheduler.add_job(
+            procesar_cola_facturas_background,
+            'interval',
+            seconds=FACTURACION_COLA_RETRY_SECONDS,
+            id='facturacion_queue_retry',
+            name='Reintento de cola de facturas AFIP',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=max(SYNC_JOB_MISFIRE_GRACE_SECONDS, 15),
+        )
         
         scheduler.start()
         print(
             f"✅ Background scheduler iniciado - "
             f"Sync automático Sheets={'ON' if SYNC_AUTO_ENABLED else 'OFF'} - "
-            f"Intervalo sync={SYNC_INTERVAL_SECONDS}s - "
+            f"Intervalo sync={SYNC_INTERVAL_SECONDS}s (máx {SYNC_INTERVALO_MAX_SECONDS}s) - "
+            f"Concurrencia sync={SYNC_MAX_CONCURRENTES} ({SYNC_MAX_POR_CUENTA} por cuenta) - "
             f"Refresh empresas={SYNC_REFRESH_COMPANIES_SECONDS}s - "
             f"Cola sync={SYNC_QUEUE_RETRY_SECONDS}s - "
+            f"Cola facturas={FACTURACION_COLA_RETRY_SECONDS}s - "
             f"Proveedores={'ON' if SYNC_INCLUDE_PROVEEDORES else 'OFF'} - "
+            f"Incremental={'ON' if SYNC_INCREMENTAL else 'OFF'} - "
             f"Empresas sync={sorted(SYNC_EMPRESA_IDS) if SYNC_EMPRESA_IDS else 'todas'}"
         )
         
@@ -232,4 +283,6 @@ def shutdown_scheduler():
     global scheduler
     if scheduler:
         scheduler.shutdown()
+        if planificador is not None:
+            planificador.cerrar()
         print("✅ Background scheduler detenido")
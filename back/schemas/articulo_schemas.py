@@ -71,6 +71,14 @@ class ArticuloReadConCodigos(ArticuloRead):
     """
     codigos: List[ArticuloCodigoRead] = []
     
+class CatalogoCambiosResponse(BaseModel):
+    """Delta del catálogo desde una versión: upserts en `articulos`, ids a quitar en `bajas`."""
+    version: int
+    desde_version: int
+    completo: bool = False  # la bitácora no alcanza: bajar el catálogo entero
+    articulos: List[ArticuloReadConCodigos] = []
+    bajas: List[int] = []
+
 class CodigoBarrasCreate(BaseModel):
     id_articulo: int
     codigo: str
@@ -1,10 +1,15 @@
 # back/schemas/comprobante_schemas.py
 
+from datetime import datetime
+
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional, Dict, Any
 
 # --- Definición de Tipos ---
 TipoFormato = Literal["pdf", "ticket"]
+# Impresora térmica (comandera / RAW). Para AFIP es un ticket: el formato solo elige el renderer.
+FORMATOS_ESCPOS = frozenset({"escpos", "esc/pos", "esc_pos", "raw"})
+FORMATOS_TICKET = frozenset({"ticket"}) | FORMATOS_ESCPOS
 TipoComprobante = Literal["factura", "remito", "presupuesto", "recibo"]
 
 # --- Estructuras de Datos ---
@@ -105,6 +110,8 @@ class GenerarComprobanteRequest(BaseModel):
     receptor: ReceptorData  
     transaccion: TransaccionData
     comprobante_asociado: Optional[Dict[str, Any]] = None  # Para notas de crédito
+    # Fecha impresa (p. ej. la de la venta al reimprimir). Sin ella se imprime la hora del render.
+    fecha_emision: Optional[datetime] = None
     
     # Nuevo soporte para ticket de cambio
     incluir_ticket_cambio: Optional[bool] = False
@@ -15,6 +15,7 @@ class FormatoComprobanteEnum(str, Enum):
     ticket = "ticket"
     pdf = "pdf"
     texto = "texto"
+    escpos = "escpos"
     
 class ConfiguracionUpdate(BaseModel):
     """
@@ -1,16 +1,24 @@
 # back/security.py
 # VERSIÓN FINAL CON CORRECCIÓN DE LÓGICA EN `obtener_usuario_actual`
 
+import copy
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlmodel import Session, select
+from sqlalchemy import inspect as sa_inspect
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
 from back.schemas.caja_schemas import AbrirCajaRequest # Necesitamos importar el schema
 from back.modelos import LlaveMaestra # Asumimos que este modelo existe
 
@@ -49,6 +57,22 @@ def crear_access_token(data: dict, expires_delta: Optional[timedelta] = None) ->
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+# Ticket para abrir /eventos/stream: EventSource no manda headers y el JWT de sesión en la
+# query string termina en los logs de acceso y de proxies. El ticket vence rápido, solo
+# lleva id_empresa y tiene `aud`, así que decodificar_token lo rechaza como access token.
+EVENTOS_TICKET_TTL_SEC = int(os.getenv("EVENTOS_TICKET_TTL_SEC", "120"))
+AUDIENCIA_TICKET_EVENTOS = "eventos-stream"
+
+
+def crear_ticket_eventos(id_empresa: int) -> str:
+    expire = datetime.utcnow() + timedelta(seconds=EVENTOS_TICKET_TTL_SEC)
+    return jwt.encode(
+        {"id_empresa": id_empresa, "aud": AUDIENCIA_TICKET_EVENTOS, "exp": expire},
+        SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+
+
 CREDENTIALS_EXCEPTION = HTTPException(
     status_code=status.HTTP_401_UNAUTHORIZED,
     detail="Credenciales inválidas, token expirado o permisos insuficientes.",
@@ -63,6 +87,20 @@ def decodificar_token(token: str) -> dict:
         raise CREDENTIALS_EXCEPTION from exc
 
 
+def decodificar_ticket_eventos(ticket: str) -> dict:
+    try:
+        # require_aud: un access token (sin `aud`) tampoco se acepta en la URL.
+        return jwt.decode(
+            ticket,
+            SECRET_KEY,
+            algorithms=[ALGORITHM],
+            audience=AUDIENCIA_TICKET_EVENTOS,
+            options={"require_aud": True},
+        )
+    except JWTError as exc:
+        raise CREDENTIALS_EXCEPTION from exc
+
+
 # ===================================================================
 # === DEPENDENCIAS DE SEGURIDAD (NÚCLEO DEL SISTEMA) ===
 # ===================================================================
@@ -87,22 +125,180 @@ def obtener_id_empresa_desde_token(token: str = Depends(oauth2_scheme)) -> int:
         raise CREDENTIALS_EXCEPTION from exc
 
 
+# --- Caché de usuarios autenticados (por `sub` del token) ---
+AUTH_CACHE_TTL_SEC = float(os.getenv("AUTH_CACHE_TTL_SEC", "10"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "2048"))
+
+
+@dataclass(frozen=True)
+class PrincipalAutenticado:
+    """Identidad del request usable sin sesión de DB (ids y nombre de rol)."""
+
+    id: int
+    nombre_usuario: str
+    id_empresa: int
+    id_rol: int
+    rol_nombre: str
+
+
+def _principal_de(usuario: Usuario) -> PrincipalAutenticado:
+    return PrincipalAutenticado(
+        id=usuario.id,
+        nombre_usuario=usuario.nombre_usuario,
+        id_empresa=usuario.id_empresa,
+        id_rol=usuario.id_rol,
+        rol_nombre=usuario.rol.nombre,
+    )
+
+
+def _columnas(obj: Any) -> Dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in sa_inspect(type(obj)).column_attrs}
+
+
+class CacheUsuariosAutenticados:
+    """
+    LRU acotado con TTL corto. Guarda columnas (no instancias ORM): en cada hit se arma
+    un Usuario nuevo y se adjunta a la sesión del request sin consultar la DB.
+    La invalidación explícita es local al worker; el TTL acota el resto.
+
+    Cada invalidación sube ``generacion``: una carga que empezó antes (y pudo leer el
+    usuario todavía activo) no se guarda, así no revive lo que se acaba de invalidar.
+    """
+
+    def __init__(self, ttl_sec: float = AUTH_CACHE_TTL_SEC, maxsize: int = AUTH_CACHE_MAXSIZE):
+        self.ttl_sec = ttl_sec
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Tuple[float, Dict[str, Any], Dict[str, Any], PrincipalAutenticado]]" = OrderedDict()
+        self._por_id: Dict[int, str] = {}
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generacion(self) -> int:
+        with self._lock:
+            return self._generacion
+
+    def obtener(self, nombre_usuario: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], PrincipalAutenticado]]:
+        with self._lock:
+            entrada = self._entradas.get(nombre_usuario)
+            if entrada is None or entrada[0] <= time.monotonic():
+                if entrada is not None:
+                    self._quitar(nombre_usuario)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(nombre_usuario)
+            self.hits += 1
+            return entrada[1], entrada[2], entrada[3]
+
+    def guardar(self, usuario: Usuario, generacion: Optional[int] = None) -> None:
+        """``generacion``: la de antes de leer el usuario; si hubo invalidaciones desde entonces no se guarda."""
+        if self.ttl_sec <= 0 or self.maxsize <= 0:
+            return
+        entrada = (
+            time.monotonic() + self.ttl_sec,
+            copy.deepcopy(_columnas(usuario)),
+            _columnas(usuario.rol),
+            _principal_de(usuario),
+        )
+        with self._lock:
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._quitar(usuario.nombre_usuario)
+            self._entradas[usuario.nombre_usuario] = entrada
+            self._por_id[usuario.id] = usuario.nombre_usuario
+            while len(self._entradas) > self.maxsize:
+                self._quitar(next(iter(self._entradas)))
+
+    def invalidar(self, id_usuario: Optional[int] = None, nombre_usuario: Optional[str] = None) -> None:
+        with self._lock:
+            self._generacion += 1
+            if id_usuario is not None and id_usuario in self._por_id:
+                self._quitar(self._por_id[id_usuario])
+            if nombre_usuario is not None:
+                self._quitar(nombre_usuario)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._generacion += 1
+            self._entradas.clear()
+            self._por_id.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _quitar(self, nombre_usuario: str) -> None:
+        entrada = self._entradas.pop(nombre_usuario, None)
+        if entrada is not None:
+            self._por_id.pop(entrada[3].id, None)
+
+
+_cache_usuarios = CacheUsuariosAutenticados()
+
+
+def obtener_cache_usuarios() -> CacheUsuariosAutenticados:
+    return _cache_usuarios
+
+
+def invalidar_usuario_autenticado(id_usuario: Optional[int] = None, nombre_usuario: Optional[str] = None) -> None:
+    """Llamar después del commit que desactiva, cambia rol/nombre/contraseña o configuración."""
+    _cache_usuarios.invalidar(id_usuario=id_usuario, nombre_usuario=nombre_usuario)
+
+
+def _adjuntar_usuario_cacheado(db: Session, columnas_usuario: Dict[str, Any], columnas_rol: Dict[str, Any]) -> Usuario:
+    usuario = Usuario(**copy.deepcopy(columnas_usuario))
+    rol = Rol(**columnas_rol)
+    # Sin disparar el backref: Rol.usuarios queda sin cargar en vez de [usuario].
+    set_committed_value(usuario, "rol", rol)
+    make_transient_to_detached(rol)
+    make_transient_to_detached(usuario)
+    return db.merge(usuario, load=False)
+
+
+def _username_desde_token(token: str) -> str:
+    payload = decodificar_token(token)
+    username: str | None = payload.get("sub")
+    _auth_debug("Token decodificado para username=%r", username)
+    if username is None:
+        raise CREDENTIALS_EXCEPTION
+    return username
+
+
 def obtener_usuario_actual(
     token: str = Depends(oauth2_scheme), 
     db: Session = Depends(get_db)
 ) -> Usuario:
     """
     Función central de seguridad. Valida el token y devuelve el objeto Usuario
-    completo desde la base de datos con su rol actualizado en tiempo real.
+    completo (adjunto a la sesión) con su rol. Usa la caché de usuarios: un
+    cambio de rol o una desactivación se ve al invalidar o, en otros workers,
+    al vencer el TTL (AUTH_CACHE_TTL_SEC).
     """
     _auth_debug("obtener_usuario_actual: iniciando validación")
 
-    payload = decodificar_token(token)
-    username: str | None = payload.get("sub")
-    _auth_debug("Token decodificado para username=%r", username)
-    if username is None:
-        raise CREDENTIALS_EXCEPTION
+    username = _username_desde_token(token)
+    entrada = _cache_usuarios.obtener(username)
+    if entrada is not None:
+        return _adjuntar_usuario_cacheado(db, entrada[0], entrada[1])
+    return _cargar_usuario_autenticado(db, username)
+
+
+def obtener_principal_actual(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> PrincipalAutenticado:
+    """
+    Como obtener_usuario_actual, pero en un hit no toca la sesión (la conexión ni se abre).
+    Para endpoints que solo usan ids/rol: push del escáner, estado de impresión.
+    """
+    username = _username_desde_token(token)
+    entrada = _cache_usuarios.obtener(username)
+    if entrada is not None:
+        return entrada[2]
+    return _principal_de(_cargar_usuario_autenticado(db, username))
+
 
+def _cargar_usuario_autenticado(db: Session, username: str) -> Usuario:
+    generacion = _cache_usuarios.generacion()
     consulta = select(Usuario).where(Usuario.nombre_usuario == username).options(selectinload(Usuario.rol))
     usuario = db.exec(consulta).first()
 
@@ -124,6 +320,7 @@ def obtener_usuario_actual(
         usuario.id,
         usuario.rol.nombre,
     )
+    _cache_usuarios.guardar(usuario, generacion)
     return usuario
 
 def verificar_llave_maestra_apertura(
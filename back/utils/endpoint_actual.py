@@ -0,0 +1,36 @@
+"""Endpoint en curso (método + ruta plantilla) para etiquetar métricas por endpoint."""
+
+from contextvars import ContextVar
+from typing import Any, Optional
+
+FUERA_DE_REQUEST = "fuera_de_request"
+
+_scope_actual: ContextVar[Optional[dict]] = ContextVar("scope_actual", default=None)
+
+
+def endpoint_actual() -> str:
+    """`GET /caja/ventas/registrar` (ruta plantilla, sin ids) o `fuera_de_request` (scheduler, scripts)."""
+    scope = _scope_actual.get()
+    if scope is None:
+        return FUERA_DE_REQUEST
+    # FastAPI deja la ruta resuelta en el scope recién al despachar; antes solo hay path.
+    ruta = scope.get("route")
+    path = getattr(ruta, "path", None) or scope.get("path", "?")
+    return f"{scope.get('method', '?')} {path}"
+
+
+class EndpointActualMiddleware:
+    """Middleware ASGI puro: no envuelve la respuesta (no rompe SSE ni streaming)."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _scope_actual.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope_actual.reset(token)
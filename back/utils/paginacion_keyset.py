@@ -0,0 +1,52 @@
+# back/utils/paginacion_keyset.py
+# Paginación por cursor (keyset) para listados largos: el cursor es la clave de orden de la última fila enviada.
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+# Header con el cursor de la página siguiente; ausente en la última página.
+HEADER_SIGUIENTE_CURSOR = "X-Siguiente-Cursor"
+PAGINA_MAXIMA = 1000
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    crudo = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(crudo, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, tipos: Sequence[type]) -> Tuple[Any, ...]:
+    """Valores del cursor convertidos a `tipos`. ValueError si el cursor no es válido."""
+    try:
+        crudo = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(crudo, list) or len(crudo) != len(tipos):
+            raise ValueError
+        return tuple(
+            datetime.fromisoformat(v) if tipo is datetime else tipo(v)
+            for v, tipo in zip(crudo, tipos)
+        )
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginación inválido.") from e
+
+
+def despues_de(columnas: Sequence[Any], valores: Sequence[Any], descendente: bool = False):
+    """
+    Condición "fila posterior al cursor" para ORDER BY `columnas` (todas en el mismo
+    sentido). Se arma con OR/AND en lugar de comparar tuplas para que MySQL use el índice.
+    """
+    condiciones = []
+    for i, (columna, valor) in enumerate(zip(columnas, valores)):
+        iguales = [c == v for c, v in zip(columnas[:i], valores[:i])]
+        condiciones.append(and_(*iguales, columna < valor if descendente else columna > valor))
+    return or_(*condiciones)
+
+
+def cortar_pagina(filas: List[Any], limite: int, clave) -> Tuple[List[Any], Optional[str]]:
+    """Recibe `limite + 1` filas: devuelve la página y el cursor siguiente (None si no hay más)."""
+    if len(filas) <= limite:
+        return filas, None
+    pagina = filas[:limite]
+    return pagina, codificar_cursor(clave(pagina[-1]))
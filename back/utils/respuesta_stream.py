@@ -0,0 +1,108 @@
+# back/utils/respuesta_stream.py
+# Respuestas en streaming con compresión negociada (brotli/gzip) para exportaciones grandes.
+
+import os
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete solo se negocia gzip
+    brotli = None
+
+# Bytes sin comprimir que se juntan antes de mandar un bloque al cliente.
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", "65536"))
+
+
+def elegir_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """`br` si el cliente lo acepta y está brotli, si no `gzip`; None = sin comprimir."""
+    aceptados: Dict[str, float] = {}
+    for parte in (accept_encoding or "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptados[nombre.strip().lower()] = calidad
+    if brotli is not None and aceptados.get("br", 0) > 0:
+        return "br"
+    if aceptados.get("gzip", aceptados.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def _agrupar(partes: Iterable[str], tamanio: int) -> Iterator[bytes]:
+    """Junta partes chicas en bloques de ~`tamanio` bytes; la primera sale sola (primer byte inmediato)."""
+    buffer: list = []
+    acumulado = 0
+    primera = True
+    for parte in partes:
+        datos = parte.encode("utf-8")
+        if primera:
+            primera = False
+            yield datos
+            continue
+        buffer.append(datos)
+        acumulado += len(datos)
+        if acumulado >= tamanio:
+            yield b"".join(buffer)
+            buffer, acumulado = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _comprimir(bloques: Iterable[bytes], encoding: Optional[str]) -> Iterator[bytes]:
+    if encoding is None:
+        yield from bloques
+        return
+    if encoding == "br":
+        # Brotli retiene la salida hasta finish(): flush por bloque para que el stream avance.
+        compresor = brotli.Compressor(quality=5)
+        for bloque in bloques:
+            salida = compresor.process(bloque) + compresor.flush()
+            if salida:
+                yield salida
+        yield compresor.finish()
+        return
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for i, bloque in enumerate(bloques):
+        salida = compresor.compress(bloque)
+        if i == 0:
+            salida += compresor.flush(zlib.Z_SYNC_FLUSH)
+        if salida:
+            yield salida
+    yield compresor.flush()
+
+
+def en_sesion_propia(db: Session, generar: Callable[[Session], Iterable[str]]) -> Iterator[str]:
+    """
+    Corre `generar` con una sesión nueva sobre el mismo engine: la del request puede
+    cerrarse antes de que termine de enviarse el cuerpo.
+    """
+    with Session(db.get_bind()) as sesion:
+        yield from generar(sesion)
+
+
+def respuesta_stream(
+    partes: Iterable[str],
+    media_type: str,
+    accept_encoding: Optional[str] = None,
+    nombre_archivo: Optional[str] = None,
+) -> StreamingResponse:
+    encoding = elegir_encoding(accept_encoding)
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if nombre_archivo:
+        headers["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    return StreamingResponse(
+        _comprimir(_agrupar(partes, EXPORT_CHUNK_BYTES), encoding),
+        media_type=media_type,
+        headers=headers,
+    )
@@ -1,13 +1,20 @@
+import functools
 import os
 import re
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
 from requests import Session
+from back.gestion.sheets_rate_governor import (
+    ESCRITURA, LECTURA, PRIORIDAD_SYNC, PRIORIDAD_VENTA, obtener_gobernador_sheets,
+)
 from back.modelos import Articulo, ConfiguracionEmpresa
 from back.schemas.caja_schemas import ArticuloVendido
 import gspread
+from gspread.utils import numericise
 from google.oauth2.service_account import Credentials
-from sqlmodel import Session as DBSession
+from sqlmodel import Session as DBSession, select
 from typing import List, Dict, Any, Optional, Tuple
 # Importar las VARIABLES PYTHON definidas en config.py
 from back.config import (
@@ -30,13 +37,98 @@ gspread_client: Optional[gspread.Client] = None
 
 datos_clientes: List[Dict] = []
 
+
+@dataclass(frozen=True)
+class PlanMapeoArticulos:
+    """
+    Posición de cada campo estándar en la fila de la hoja de artículos (None = columna ausente).
+    Se compila una vez por lectura de hoja; el mapeo por fila ya no busca encabezados.
+    """
+
+    encabezados: Tuple[str, ...]
+    codigo: Optional[int]
+    id_producto: Optional[int]
+    nombre: Optional[int]
+    descripcion: Optional[int]
+    precio: Optional[int]
+    precio_negocio: Optional[int]
+    costo: Optional[int]
+    stock: Optional[int]
+    activo: Optional[int]
+    barras: Optional[int]
+    ubicacion: Optional[int]
+    unidad: Optional[int]
+    categoria: Optional[int]
+    marca: Optional[int]
+
+
+# int()/float() solo aceptan texto que empieza (tras espacios, y numericise quita las comas)
+# con dígito, signo, punto o inf/nan.
+_INICIO_NUMERICO = frozenset("0123456789+-.iInN")
+
+
+def _numericise_celda(valor: Any) -> Any:
+    """numericise de gspread (lo que hace get_all_records) evitando las excepciones en celdas de texto."""
+    if isinstance(valor, str):
+        inicio = valor.replace(",", "").lstrip()[:1]
+        if not (inicio in _INICIO_NUMERICO or inicio.isdigit()):
+            return valor
+    return numericise(valor)
+
+
+# Variantes de encabezado aceptadas por campo del plan (mismas que usaba _mapear_fila).
+VARIANTES_COLUMNAS_ARTICULOS: Dict[str, List[str]] = {
+    'codigo': ['Código', 'codigo', 'codigo_interno'],
+    'id_producto': ['id producto', 'id_producto'],
+    'nombre': ['nombre'],
+    'descripcion': ['Descripción', 'descripcion'],
+    'precio': ['precio', 'precio venta'],
+    'precio_negocio': ['precio negocio'],
+    'costo': ['Costo 1', 'costo'],
+    'stock': ['cantidad', 'stock'],
+    'activo': ['Activo'],
+    'barras': ['Codigo de barras', 'Barras'],
+    'ubicacion': ['ubicacion'],
+    'unidad': ['unidad'],
+    'categoria': ['Categoria', 'categoria'],
+    'marca': ['Marca', 'marca'],
+}
+
+
+def _prioridad_venta(metodo):
+    """Las llamadas a la API hechas dentro del método toman cuota con prioridad de venta."""
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        anterior, self.prioridad_cuota = self.prioridad_cuota, PRIORIDAD_VENTA
+        try:
+            return metodo(self, *args, **kwargs)
+        finally:
+            self.prioridad_cuota = anterior
+    return envoltura
+
+
+@dataclass
+class _CursorHoja:
+    """Próxima fila libre de una hoja de movimientos y escrituras de este proceso todavía en curso."""
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    siguiente: Optional[int] = None
+    en_vuelo: int = 0
+
+
 class TablasHandler:
     _worksheet_title_cache: Dict[str, str] = {}
     _headers_cache: Dict[str, Tuple[datetime, List[str]]] = {}
     _spreadsheet_cache: Dict[str, Tuple[datetime, Any]] = {}
     _worksheets_index_cache: Dict[str, Tuple[datetime, Dict[str, Any]]] = {}
     _clientes_cache: Dict[str, Tuple[datetime, List[Dict[str, Any]]]] = {}
+    _modificacion_cache: Dict[str, Tuple[datetime, Optional[str]]] = {}
+    # Próxima fila libre por hoja de movimientos ("sheet_id:titulo"); se valida en cada escritura.
+    # Cada hoja tiene su lock; el del dict solo protege el alta de entradas.
+    _cursor_filas: Dict[str, _CursorHoja] = {}
+    _cursor_filas_lock = threading.Lock()
     _sheets_quota_blocked_until: Optional[datetime] = None
+    # Prioridad con la que se pide cuota al gobernador; ventas la suben con @_prioridad_venta.
+    prioridad_cuota: str = PRIORIDAD_SYNC
 
     @staticmethod
     def _env_int(name: str, default: int) -> int:
@@ -61,14 +153,25 @@ class TablasHandler:
                 f"Google Sheets en pausa por cuota (429). Reintentar después de las {hasta} UTC."
             )
 
-    @classmethod
-    def _register_sheets_quota_error(cls, error: Exception) -> None:
+    def _register_sheets_quota_error(self, error: Exception) -> None:
         if "429" not in str(error):
             return
-        mins = cls._env_int("SHEETS_QUOTA_BACKOFF_MINUTES", 2)
-        cls._sheets_quota_blocked_until = datetime.utcnow() + timedelta(minutes=mins)
+        mins = self._env_int("SHEETS_QUOTA_BACKOFF_MINUTES", 2)
+        TablasHandler._sheets_quota_blocked_until = datetime.utcnow() + timedelta(minutes=mins)
+        # La pausa se comparte con los demás procesos a través del gobernador.
+        obtener_gobernador_sheets().pausar(self.google_sheet_id, self._cuenta_servicio(), mins * 60)
         print(f"⚠️ [SHEETS] Cuota 429: pausando lecturas automáticas ~{mins} min")
 
+    def _cuenta_servicio(self) -> str:
+        return getattr(getattr(self.client, "auth", None), "service_account_email", None) or GOOGLE_SERVICE_ACCOUNT_FILE
+
+    def _consumir_cuota(self, tipo: str = LECTURA) -> None:
+        """Token del gobernador compartido antes de cada llamada a la API de Sheets."""
+        self._check_sheets_quota()
+        obtener_gobernador_sheets().adquirir(
+            self.google_sheet_id, self._cuenta_servicio(), tipo, self.prioridad_cuota
+        )
+
     def __init__(self, id_empresa: int, db: DBSession):
         self.db = db  
         self.id_empresa = id_empresa
@@ -132,6 +235,7 @@ class TablasHandler:
         if cached and (datetime.utcnow() - cached[0]) < self._cache_ttl():
             return cached[1]
         try:
+            self._consumir_cuota()
             spreadsheet = self.client.open_by_key(self.google_sheet_id)
             self._spreadsheet_cache[cache_key] = (datetime.utcnow(), spreadsheet)
             return spreadsheet
@@ -142,6 +246,25 @@ class TablasHandler:
                 f"{type(e).__name__} - {e}"
             ) from e
 
+    def obtener_modificacion_planilla(self) -> Optional[str]:
+        """
+        modifiedTime de la planilla según Drive (cuota de Drive, no de Sheets).
+        Si no coincide con el de la última sincronización hay que leer valores;
+        None si no se pudo obtener (la cuenta de servicio puede no tener acceso a Drive).
+        """
+        ttl = timedelta(seconds=self._env_int("SHEETS_MODIFICACION_TTL_SEC", 20))
+        cached = self._modificacion_cache.get(self.google_sheet_id)
+        if cached and (datetime.utcnow() - cached[0]) < ttl:
+            return cached[1]
+        try:
+            modificada_en = self._abrir_planilla().get_lastUpdateTime()
+        except Exception as e:
+            self._register_sheets_quota_error(e)
+            print(f"ℹ️ [SHEETS] No se pudo leer modifiedTime de la planilla: {type(e).__name__}")
+            modificada_en = None
+        self._modificacion_cache[self.google_sheet_id] = (datetime.utcnow(), modificada_en)
+        return modificada_en
+
     def _obtener_worksheets_index(self, sheet) -> Dict[str, Any]:
         """Índice título normalizado -> worksheet (cacheado por planilla)."""
         cache_key = self.google_sheet_id
@@ -149,6 +272,7 @@ class TablasHandler:
         if cached and (datetime.utcnow() - cached[0]) < self._cache_ttl():
             return cached[1]
         try:
+            self._consumir_cuota()
             worksheets = sheet.worksheets()
             por_titulo = {
                 self._normalizar_nombre_columna(ws.title): ws for ws in worksheets
@@ -171,6 +295,7 @@ class TablasHandler:
         cache_key = f"{self.google_sheet_id}:{'|'.join(sorted([self._normalizar_nombre_columna(n) for n in nombres_posibles]))}"
         titulo_cacheado = self._worksheet_title_cache.get(cache_key)
         if titulo_cacheado:
+            self._consumir_cuota()
             try:
                 return sheet.worksheet(titulo_cacheado)
             except Exception:
@@ -217,7 +342,7 @@ class TablasHandler:
         if cache_entry and (now - cache_entry[0]) < self._headers_ttl():
             return cache_entry[1]
 
-        self._check_sheets_quota()
+        self._consumir_cuota()
         try:
             encabezados = hoja.row_values(1)
         except Exception as e:
@@ -244,6 +369,7 @@ class TablasHandler:
             worksheet = self._obtener_worksheet_flexible(
                 sheet, ["clientes", "Clientes", "CLIENTES", "cliente", "Cliente"],
             )
+            self._consumir_cuota()
             datos_clientes = worksheet.get_all_records()
             self._clientes_cache[cache_key] = (datetime.utcnow(), datos_clientes)
             return datos_clientes
@@ -260,7 +386,9 @@ class TablasHandler:
         if self.client:
             try:
                 sheet = self._abrir_planilla()
+                self._consumir_cuota()
                 worksheet = sheet.worksheet("proveedores") 
+                self._consumir_cuota()
                 datos_proveedores = worksheet.get_all_records()
                 return datos_proveedores
             except gspread.exceptions.WorksheetNotFound:
@@ -377,26 +505,94 @@ class TablasHandler:
         cols = columnas_referencia or [1, 3, 11, 14]  # A, C, K tipo, N monto
         ultima_con_datos = 1
         for col in cols:
+            self._consumir_cuota()
             largo = len(hoja.col_values(col))
             if largo > ultima_con_datos:
                 ultima_con_datos = largo
         return ultima_con_datos + 1
 
     def _asegurar_filas_grid(self, hoja, numero_fila: int, margen: int = 50) -> None:
-        """Amplía el grid si la fila destino supera row_count."""
+        """Amplía el grid si la fila destino supera row_count (con `margen` filas de holgura)."""
         filas_necesarias = numero_fila + margen
         if filas_necesarias > hoja.row_count:
-            hoja.add_rows(filas_necesarias - hoja.row_count)
+            # Se suma otro margen: si no, cerca del final cada escritura pagaría un add_rows.
+            self._consumir_cuota(ESCRITURA)
+            hoja.add_rows(filas_necesarias - hoja.row_count + margen)
 
     def _escribir_fila_movimientos_desde_a(self, hoja, fila: List[str]) -> None:
         """Escribe explícitamente en A{row}.. para no correr columnas a la derecha."""
-        if not fila:
+        self._escribir_filas_movimientos_desde_a(hoja, [fila])
+
+    def _cursor_valido(self, hoja, siguiente_fila: int, cantidad: int, ultima_col: str, exigir_anterior: bool = True) -> bool:
+        """
+        Una sola lectura acotada: la fila anterior al cursor tiene datos y las de destino
+        están vacías. Si otro proceso o una persona escribió o borró filas, no coincide.
+        Con `exigir_anterior=False` solo se miran las de destino: la anterior puede ser de
+        otra escritura de este proceso que reservó antes y todavía no terminó.
+        """
+        self._consumir_cuota()
+        if not exigir_anterior:
+            valores = hoja.get(f"A{siguiente_fila}:{ultima_col}{siguiente_fila + cantidad - 1}")
+            return not any(str(v).strip() for fila in valores or [] for v in fila)
+        valores = hoja.get(f"A{siguiente_fila - 1}:{ultima_col}{siguiente_fila + cantidad - 1}")
+        if not valores or not any(str(v).strip() for v in valores[0]):
+            return False
+        return not any(str(v).strip() for fila in valores[1:] for v in fila)
+
+    @classmethod
+    def _cursor_hoja(cls, cache_key: str) -> _CursorHoja:
+        cursor = cls._cursor_filas.get(cache_key)
+        if cursor is None:
+            with cls._cursor_filas_lock:
+                cursor = cls._cursor_filas.setdefault(cache_key, _CursorHoja())
+        return cursor
+
+    def _escribir_filas_movimientos_desde_a(self, hoja, filas: List[List[str]]) -> None:
+        """
+        Igual que la versión de una fila, pero todas las filas en un único update.
+
+        La próxima fila libre se toma de un cursor en memoria por hoja, validado con una
+        lectura del rango destino: dos llamadas por escritura sin importar el tamaño de la
+        hoja. Si el cursor no existe o no valida, se recalcula leyendo las columnas de referencia.
+        El lock de la hoja solo cubre reservar los números de fila; las llamadas a Sheets
+        (y la espera de cuota) van afuera, así otra escritura no queda detrás de la red.
+        """
+        filas = [fila for fila in filas if fila]
+        if not filas:
             return
-        siguiente_fila = self._obtener_siguiente_fila_hoja(hoja)
-        self._asegurar_filas_grid(hoja, siguiente_fila)
-        ultima_col = gspread.utils.rowcol_to_a1(1, len(fila))[:-1]
-        rango = f"A{siguiente_fila}:{ultima_col}{siguiente_fila}"
-        hoja.update(rango, [fila], value_input_option="USER_ENTERED")
+        ancho = max(len(fila) for fila in filas)
+        ultima_col = gspread.utils.rowcol_to_a1(1, ancho)[:-1]
+        cursor = self._cursor_hoja(f"{self.google_sheet_id}:{hoja.title}")
+        with cursor.lock:
+            siguiente_fila = cursor.siguiente
+            anterior_escrita = cursor.en_vuelo == 0
+            cursor.en_vuelo += 1
+            if siguiente_fila is not None:
+                cursor.siguiente = siguiente_fila + len(filas)
+            reservado = cursor.siguiente
+        try:
+            if siguiente_fila is not None:
+                # Leer fuera del grid también da 400: primero ampliarlo.
+                self._asegurar_filas_grid(hoja, siguiente_fila + len(filas) - 1)
+                if not self._cursor_valido(hoja, siguiente_fila, len(filas), ultima_col, anterior_escrita):
+                    siguiente_fila = None
+            if siguiente_fila is None:
+                calculada = self._obtener_siguiente_fila_hoja(hoja)
+                with cursor.lock:
+                    # Si otra escritura reservó mientras se leía la hoja, sus filas pueden no verse todavía.
+                    if cursor.siguiente is not None and (cursor.en_vuelo > 1 or cursor.siguiente != reservado):
+                        calculada = max(calculada, cursor.siguiente)
+                    siguiente_fila = calculada
+                    cursor.siguiente = siguiente_fila + len(filas)
+            ultima_fila = siguiente_fila + len(filas) - 1
+            self._asegurar_filas_grid(hoja, ultima_fila)
+            rango = f"A{siguiente_fila}:{ultima_col}{ultima_fila}"
+            valores = [fila + [""] * (ancho - len(fila)) for fila in filas]
+            self._consumir_cuota(ESCRITURA)
+            hoja.update(rango, valores, value_input_option="USER_ENTERED")
+        finally:
+            with cursor.lock:
+                cursor.en_vuelo -= 1
 
     def _construir_fila_movimiento(
         self,
@@ -463,10 +659,17 @@ class TablasHandler:
         }
 
     def registrar_movimiento(self, datos_venta: Dict[str, Any]) -> bool:
+        return self.registrar_movimientos([datos_venta])
+
+    @_prioridad_venta
+    def registrar_movimientos(self, lista_datos_venta: List[Dict[str, Any]]) -> bool:
+        """Agrega uno o más movimientos a la hoja MOVIMIENTOS con una sola escritura."""
         if not self.client:
             print("ERROR: Cliente de Google Sheets no disponible.")
             self.ultimo_error_sync = "Cliente de Google Sheets no disponible."
             return False
+        if not lista_datos_venta:
+            return True
 
         try:
             sheet = self._abrir_planilla()
@@ -475,17 +678,21 @@ class TablasHandler:
                 ["MOVIMIENTOS", "Movimientos", "movimientos", "movimiento", "Movimiento"],
             )
 
-            id_movimiento = str(uuid.uuid4())[:8]
-
             encabezados = self._obtener_encabezados_cacheados(hoja)
             if not encabezados:
                 encabezados = self.encabezados_movimientos_swing()
 
-            fila, _ = self._construir_fila_movimiento_desde_columna_a(
-                encabezados, datos_venta, id_movimiento=id_movimiento
-            )
-            self._escribir_fila_movimientos_desde_a(hoja, fila)
-            print(f"✅ Movimiento registrado correctamente en hoja 'MOVIMIENTOS' con ID: {id_movimiento}")
+            filas: List[List[str]] = []
+            ids_movimiento: List[str] = []
+            for datos_venta in lista_datos_venta:
+                id_movimiento = str(uuid.uuid4())[:8]
+                fila, _ = self._construir_fila_movimiento_desde_columna_a(
+                    encabezados, datos_venta, id_movimiento=id_movimiento
+                )
+                filas.append(fila)
+                ids_movimiento.append(id_movimiento)
+            self._escribir_filas_movimientos_desde_a(hoja, filas)
+            print(f"✅ Movimiento(s) registrado(s) correctamente en hoja 'MOVIMIENTOS' con ID: {', '.join(ids_movimiento)}")
             self.ultimo_error_sync = None
             return True
 
@@ -498,23 +705,41 @@ class TablasHandler:
 
 
     def restar_stock(self, db: DBSession, lista_items: List[ArticuloVendido]) -> bool:
+        error = self.restar_stock_en_lote(db, [lista_items])[0]
+        self.ultimo_error_sync = error
+        return error is None
+
+    @_prioridad_venta
+    def restar_stock_en_lote(self, db: DBSession, lotes: List[List[ArticuloVendido]]) -> List[Optional[str]]:
+        """
+        Descuenta en la hoja stock varios lotes (p. ej. una venta cada uno) con una sola
+        lectura y un solo batch_update con el neto por celda.
+
+        Cada lote se valida en orden contra el stock que dejaron los anteriores, igual
+        que si se procesaran de a uno: un lote con un producto inexistente o sin stock
+        suficiente no se aplica y no bloquea a los demás. Devuelve el error de cada
+        lote (None si se aplicó).
+        """
+        if not lotes:
+            return []
         if not self.client:
             print("❌ ERROR [STOCK]: Cliente de Google Sheets no disponible.")
             self.ultimo_error_sync = "Cliente de Google Sheets no disponible para stock."
-            return False
+            return [self.ultimo_error_sync] * len(lotes)
 
-        print("🔄 [STOCK] Iniciando proceso de actualización de stock en Google Sheets...")
+        print(f"🔄 [STOCK] Iniciando proceso de actualización de stock en Google Sheets ({len(lotes)} lote(s))...")
         try:
             sheet = self._abrir_planilla()
             worksheet = self._obtener_worksheet_flexible(
                 sheet, ["stock", "Stock", "STOCK", "articulos", "productos"],
             )
+            self._consumir_cuota()
             datos_stock = worksheet.get_all_records()
 
             if not datos_stock:
                 print("❌ ERROR [STOCK]: La hoja 'stock' está vacía.")
                 self.ultimo_error_sync = "La hoja 'stock' está vacía."
-                return False
+                return [self.ultimo_error_sync] * len(lotes)
 
             encabezados = list(datos_stock[0].keys())
             columna_id = self._encontrar_columna(
@@ -529,7 +754,7 @@ class TablasHandler:
             if not columna_id or not columna_stock:
                 print(f"❌ ERROR [STOCK]: Columnas ID/stock no detectadas. Disponibles: {encabezados}")
                 self.ultimo_error_sync = "Columnas ID o stock no encontradas en hoja stock."
-                return False
+                return [self.ultimo_error_sync] * len(lotes)
 
             col_idx_stock = encabezados.index(columna_stock) + 1
             letra_columna_stock = gspread.utils.rowcol_to_a1(1, col_idx_stock)[:-1]
@@ -538,62 +763,84 @@ class TablasHandler:
                 for i, fila in enumerate(datos_stock)
                 if fila.get(columna_id) is not None
             }
-            actualizaciones_batch: List[Dict[str, Any]] = []
-
-            for item_a_restar in lista_items:
-                articulo_db = db.get(Articulo, item_a_restar.id_articulo)
-                id_producto = articulo_db.codigo_interno if articulo_db else None
-                cantidad_a_restar = item_a_restar.cantidad
-
-                if not id_producto or cantidad_a_restar is None:
-                    print(f"⚠️ ADVERTENCIA [STOCK]: Item inválido, saltando: {item_a_restar}")
-                    continue
-
-                entrada = indice_por_codigo.get(str(id_producto))
-                if not entrada:
-                    print(f"❌ ERROR [STOCK]: Producto {id_producto} no encontrado en hoja stock.")
-                    self.ultimo_error_sync = f"Producto {id_producto} no encontrado en hoja stock."
-                    return False
+            ids_articulos = {item.id_articulo for lote in lotes for item in lote if item.id_articulo}
+            codigo_por_id = dict(
+                db.exec(
+                    select(Articulo.id, Articulo.codigo_interno).where(Articulo.id.in_(ids_articulos))
+                ).all()
+            ) if ids_articulos else {}
+
+            # Stock vigente por fila de la hoja, ya descontados los lotes aceptados.
+            stock_inicial: Dict[int, float] = {}
+            stock_por_fila: Dict[int, float] = {}
+            errores: List[Optional[str]] = []
+            for lote in lotes:
+                error_lote: Optional[str] = None
+                descuentos: Dict[int, float] = {}
+                for item_a_restar in lote:
+                    id_producto = codigo_por_id.get(item_a_restar.id_articulo)
+                    cantidad_a_restar = item_a_restar.cantidad
+
+                    if not id_producto or cantidad_a_restar is None:
+                        print(f"⚠️ ADVERTENCIA [STOCK]: Item inválido, saltando: {item_a_restar}")
+                        continue
 
-                i, fila = entrada
-                numero_fila = i + 2
-                valor_stock = fila.get(columna_stock, 0)
-                try:
-                    stock_actual = float(str(valor_stock).replace(',', '.').replace('$', '').strip())
-                except (ValueError, AttributeError):
-                    stock_actual = 0.0
-
-                if stock_actual < cantidad_a_restar:
-                    print(
-                        f"❌ ERROR [STOCK]: Stock insuficiente para {id_producto}. "
-                        f"Actual={stock_actual}, necesita={cantidad_a_restar}."
-                    )
-                    self.ultimo_error_sync = f"Stock insuficiente para ID {id_producto}."
-                    return False
-
-                nuevo_stock = stock_actual - cantidad_a_restar
-                celda = f"{letra_columna_stock}{numero_fila}"
-                actualizaciones_batch.append({"range": celda, "values": [[nuevo_stock]]})
-                fila[columna_stock] = nuevo_stock
-                indice_por_codigo[str(id_producto)] = (i, fila)
+                    entrada = indice_por_codigo.get(str(id_producto))
+                    if not entrada:
+                        print(f"❌ ERROR [STOCK]: Producto {id_producto} no encontrado en hoja stock.")
+                        error_lote = f"Producto {id_producto} no encontrado en hoja stock."
+                        break
+
+                    i, fila = entrada
+                    if i not in stock_por_fila:
+                        valor_stock = fila.get(columna_stock, 0)
+                        try:
+                            stock_inicial[i] = float(str(valor_stock).replace(',', '.').replace('$', '').strip())
+                        except (ValueError, AttributeError):
+                            stock_inicial[i] = 0.0
+                        stock_por_fila[i] = stock_inicial[i]
+                    stock_actual = stock_por_fila[i] - descuentos.get(i, 0.0)
+
+                    if stock_actual < cantidad_a_restar:
+                        print(
+                            f"❌ ERROR [STOCK]: Stock insuficiente para {id_producto}. "
+                            f"Actual={stock_actual}, necesita={cantidad_a_restar}."
+                        )
+                        error_lote = f"Stock insuficiente para ID {id_producto}."
+                        break
+
+                    descuentos[i] = descuentos.get(i, 0.0) + cantidad_a_restar
+
+                if error_lote is None:
+                    for i, cantidad in descuentos.items():
+                        stock_por_fila[i] -= cantidad
+                errores.append(error_lote)
+
+            actualizaciones_batch: List[Dict[str, Any]] = [
+                {"range": f"{letra_columna_stock}{i + 2}", "values": [[stock_por_fila[i]]]}
+                for i in sorted(stock_por_fila)
+                if stock_por_fila[i] != stock_inicial[i]
+            ]
 
             if actualizaciones_batch:
+                self._consumir_cuota(ESCRITURA)
                 worksheet.batch_update(actualizaciones_batch, value_input_option="USER_ENTERED")
 
             print("✅ [STOCK] Stock actualizado correctamente en Google Sheets.")
-            self.ultimo_error_sync = None
-            return True
+            self.ultimo_error_sync = next((e for e in errores if e), None)
+            return errores
 
         except gspread.WorksheetNotFound:
             print("❌ ERROR [STOCK]: Hoja 'stock' no encontrada en el documento.")
             self.ultimo_error_sync = "Hoja 'stock' no encontrada."
-            return False
+            return [self.ultimo_error_sync] * len(lotes)
         except Exception as e:
+            self._register_sheets_quota_error(e)
             print(f"❌ ERROR [STOCK]: Error inesperado al actualizar stock: {e}")
             import traceback
             traceback.print_exc()
             self.ultimo_error_sync = f"{type(e).__name__}: {e}"
-            return False
+            return [self.ultimo_error_sync] * len(lotes)
         
 
   
@@ -609,6 +856,15 @@ class TablasHandler:
             if encab_norm in variantes_norm:
                 return encabezado
         return None
+
+    def _compilar_plan_articulos(self, encabezados: List[Any]) -> PlanMapeoArticulos:
+        """Normaliza cada encabezado una sola vez y resuelve el índice de cada campo estándar."""
+        normalizados = [self._normalizar_nombre_columna(str(e)) for e in encabezados]
+        indices: Dict[str, Optional[int]] = {}
+        for campo, variantes in VARIANTES_COLUMNAS_ARTICULOS.items():
+            variantes_norm = {self._normalizar_nombre_columna(v) for v in variantes}
+            indices[campo] = next((i for i, n in enumerate(normalizados) if n in variantes_norm), None)
+        return PlanMapeoArticulos(encabezados=tuple(str(e) for e in encabezados), **indices)
     
     def _limpiar_precio(self, valor: Any) -> float:
         """Convierte valores como '$ 2.900,00' o '1200.00' a float."""
@@ -656,74 +912,62 @@ class TablasHandler:
     
     def _mapear_fila(self, fila: Dict[str, Any], encabezados: List[str]) -> Dict[str, Any]:
         """
-        Mapea automáticamente una fila a campos estándar.
-        Detecta flexiblemente: código, descripción, precio_venta, precio_costo, stock, categoría, marca, ubicación.
+        Mapea automáticamente una fila (dict de get_all_records) a campos estándar.
+        Para hojas completas usar _compilar_plan_articulos + _mapear_valores_fila.
         """
-        mapeada = {}
-        
-        col_codigo = self._encontrar_columna(encabezados, ['Código', 'codigo', 'codigo_interno'])
-        col_id = self._encontrar_columna(encabezados, ['id producto', 'id_producto'])
-
-        codigo_valor = str(fila.get(col_codigo, '')).strip() if col_codigo else ''
-        if not codigo_valor:
-            codigo_valor = str(fila.get(col_id, '')).strip() if col_id else ''
-        if not codigo_valor:
-            return {}
-
-        mapeada['codigo_interno'] = codigo_valor
-        mapeada['Código'] = codigo_valor
+        plan = self._compilar_plan_articulos(encabezados)
+        mapeada = self._mapear_valores_fila([fila.get(e, '') for e in encabezados], plan)
+        if mapeada:
+            mapeada['_fila_original'] = fila
+        return mapeada
 
-        col_nombre = self._encontrar_columna(encabezados, ['nombre'])
-        col_desc = self._encontrar_columna(encabezados, ['Descripción', 'descripcion'])
-        valor_nombre = str(fila.get(col_nombre, '')).strip() if col_nombre else ''
-        valor_desc = str(fila.get(col_desc, '')).strip() if col_desc else ''
-        mapeada['descripcion'] = valor_nombre or valor_desc or 'Sin Descripción'
-
-        col_precio = self._encontrar_columna(encabezados, ['precio', 'precio venta'])
-        mapeada['precio_venta'] = self._limpiar_precio(fila.get(col_precio)) if col_precio else 0.0
-
-        col_negocio = self._encontrar_columna(encabezados, ['precio negocio'])
-        mapeada['venta_negocio'] = self._limpiar_precio(fila.get(col_negocio)) if col_negocio else 0.0
-
-        col_costo = self._encontrar_columna(encabezados, ['Costo 1', 'costo'])
-        mapeada['precio_costo'] = self._limpiar_precio(fila.get(col_costo)) if col_costo else 0.0
-
-        col_stock = self._encontrar_columna(encabezados, ['cantidad', 'stock'])
-        if col_stock:
-            try:
-                mapeada['stock_actual'] = self._limpiar_numero(fila.get(col_stock, 0))
-            except Exception:
-                mapeada['stock_actual'] = 0.0
-        else:
-            mapeada['stock_actual'] = 0.0
-
-        col_activo = self._encontrar_columna(encabezados, ['Activo'])
-        activo_val = str(fila.get(col_activo, 'TRUE')).strip().upper() if col_activo else 'TRUE'
-        mapeada['Activo'] = activo_val
-
-        col_barras = self._encontrar_columna(encabezados, ['Codigo de barras', 'Barras'])
-        mapeada['Codigo de barras'] = str(fila.get(col_barras, '')).strip() if col_barras else ''
-
-        col_ubicacion = self._encontrar_columna(encabezados, ['ubicacion'])
-        mapeada['ubicacion'] = str(fila.get(col_ubicacion, '')).strip() if col_ubicacion else 'Sin definir'
-
-        col_unidad = self._encontrar_columna(encabezados, ['unidad'])
-        mapeada['unidad_venta'] = str(fila.get(col_unidad, 'Unidad')).strip() if col_unidad else 'Unidad'
+    def _mapear_valores_fila(
+        self,
+        valores: List[Any],
+        plan: PlanMapeoArticulos,
+        conservar_original: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Mapea una fila de get_all_values() según el plan: código, descripción, precio_venta,
+        precio_costo, stock, categoría, marca, ubicación. Cada celda pasa por numericise
+        igual que en get_all_records, así los códigos y montos quedan como antes.
+        """
+        largo = len(valores)
 
-        col_categoria = self._encontrar_columna(encabezados, ['Categoria', 'categoria'])
-        mapeada['categoria'] = str(fila.get(col_categoria, '')).strip() if col_categoria else ''
+        def celda(indice: Optional[int]) -> Any:
+            return _numericise_celda(valores[indice]) if indice is not None and indice < largo else ''
 
-        col_marca = self._encontrar_columna(encabezados, ['Marca', 'marca'])
-        mapeada['marca'] = str(fila.get(col_marca, '')).strip() if col_marca else ''
+        def texto(indice: Optional[int], defecto: str = '') -> str:
+            return str(celda(indice)).strip() if indice is not None else defecto
 
-        mapeada['_fila_original'] = fila
+        codigo_valor = texto(plan.codigo) or texto(plan.id_producto)
+        if not codigo_valor:
+            return {}
 
-        return mapeada if mapeada.get('codigo_interno') else {}
+        mapeada: Dict[str, Any] = {
+            'codigo_interno': codigo_valor,
+            'Código': codigo_valor,
+            'descripcion': texto(plan.nombre) or texto(plan.descripcion) or 'Sin Descripción',
+            'precio_venta': self._limpiar_precio(celda(plan.precio)) if plan.precio is not None else 0.0,
+            'venta_negocio': self._limpiar_precio(celda(plan.precio_negocio)) if plan.precio_negocio is not None else 0.0,
+            'precio_costo': self._limpiar_precio(celda(plan.costo)) if plan.costo is not None else 0.0,
+            'stock_actual': self._limpiar_numero(celda(plan.stock)) if plan.stock is not None else 0.0,
+            'Activo': texto(plan.activo, 'TRUE').upper(),
+            'Codigo de barras': texto(plan.barras),
+            'ubicacion': texto(plan.ubicacion, 'Sin definir'),
+            'unidad_venta': texto(plan.unidad, 'Unidad'),
+            'categoria': texto(plan.categoria),
+            'marca': texto(plan.marca),
+        }
+        if conservar_original:
+            mapeada['_fila_original'] = dict(zip(plan.encabezados, map(_numericise_celda, valores)))
+        return mapeada
 
-    def cargar_articulos(self, nombre_hoja: Optional[str] = None):
+    def cargar_articulos(self, nombre_hoja: Optional[str] = None, conservar_fila_original: bool = False):
         """
         Carga artículos desde Google Sheets.
         Intenta múltiples nombres de hoja si no se especifica uno.
+        Con conservar_fila_original=True cada artículo lleva además la fila cruda en '_fila_original'.
         """
         print("📦 Cargando artículos desde Google Sheets...")
         
@@ -735,26 +979,30 @@ class TablasHandler:
         
         try:
             sheet = self._abrir_planilla()
+            # Índice cacheado: evita una lectura de metadatos por cada nombre probado.
+            por_titulo = self._obtener_worksheets_index(sheet)
             
             for nombre_hoja_intento in hojas_posibles:
                 try:
                     print(f"  Intentando cargar hoja: '{nombre_hoja_intento}'...")
-                    worksheet = sheet.worksheet(nombre_hoja_intento)
-                    datos_crudos = worksheet.get_all_records()
+                    worksheet = por_titulo.get(self._normalizar_nombre_columna(nombre_hoja_intento))
+                    if worksheet is None:
+                        raise gspread.exceptions.WorksheetNotFound(nombre_hoja_intento)
+                    self._consumir_cuota()
+                    valores = worksheet.get_all_values()
                     
-                    if not datos_crudos:
+                    if len(valores) < 2:
                         print(f"  ⚠️ Hoja '{nombre_hoja_intento}' vacía, intentando siguiente...")
                         continue
                     
-                    # Obtener encabezados para mapeo flexible
-                    encabezados = list(datos_crudos[0].keys()) if datos_crudos else []
+                    # Plan de columnas compilado una vez por hoja; las filas se mapean por índice.
+                    encabezados = valores[0]
                     print(f"  ✅ Hoja '{nombre_hoja_intento}' cargada. Columnas: {encabezados}")
-                    
-                    # Mapear registros a formato estándar
-                    datos_mapeados = []
-                    for fila in datos_crudos:
-                        fila_mapeada = self._mapear_fila(fila, encabezados)
-                        datos_mapeados.append(fila_mapeada)
+                    plan = self._compilar_plan_articulos(encabezados)
+                    datos_mapeados = [
+                        self._mapear_valores_fila(fila, plan, conservar_fila_original)
+                        for fila in valores[1:]
+                    ]
                     
                     print(f"  ✅ {len(datos_mapeados)} registros mapeados exitosamente.")
                     return datos_mapeados
@@ -763,6 +1011,7 @@ class TablasHandler:
                     print(f"  ⚠️ Hoja '{nombre_hoja_intento}' no encontrada, intentando siguiente...")
                     continue
                 except Exception as e:
+                    self._register_sheets_quota_error(e)
                     print(f"  ⚠️ Error con hoja '{nombre_hoja_intento}': {e}")
                     continue
             
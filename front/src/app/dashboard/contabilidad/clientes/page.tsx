@@ -5,6 +5,7 @@ import { DataTable } from "./data-table";
 import { columns } from "./columns";
 import type { Cliente } from "./columns";
 import { useAuthStore } from "@/lib/authStore";
+import { fetchTodasLasPaginas } from "@/lib/paginacion";
 
 function ClientesPage() {
   const [data, setData] = useState<Cliente[]>([]);
@@ -15,18 +16,15 @@ function ClientesPage() {
   useEffect(() => {
     const fetchClientes = async () => {
       try {
-        const res = await fetch("https://sistema-ima.sistemataup.online/api/clientes/obtener-todos", {
-          method: "GET",
-          headers: {
-            "Authorization": `Bearer ${token}`,
+        const data = await fetchTodasLasPaginas<Cliente>(
+          "https://sistema-ima.sistemataup.online/api/clientes/obtener-todos",
+          {
+            method: "GET",
+            headers: {
+              "Authorization": `Bearer ${token}`,
+            },
           },
-        });
-
-        if (!res.ok) {
-          throw new Error("Error al obtener clientes");
-        }
-
-        const data = await res.json();
+        );
         const clientesFiltrados = data.filter((cliente: Cliente) => cliente);
         setData(clientesFiltrados);
 
@@ -7,11 +7,16 @@ import { MovimientoAPI } from "./columns";
 import { useAuthStore } from "@/lib/authStore";
 import ProtectedRoute from "@/components/ProtectedRoute";
 import { API_CONFIG } from "@/lib/api-config";
+import { fetchPagina } from "@/lib/paginacion";
+
+const URL_MOVIMIENTOS = `${API_CONFIG.BASE_URL}/caja/movimientos/todos`;
 
 export default function ContabilidadPage() {
 
   const [data, setData] = useState<MovimientoAPI[]>([]);
   const [loading, setLoading] = useState(true);
+  const [siguienteCursor, setSiguienteCursor] = useState<string | null>(null);
+  const [cargandoMas, setCargandoMas] = useState(false);
   const { token } = useAuthStore();
 
   /**
@@ -30,32 +35,45 @@ export default function ContabilidadPage() {
 
     setLoading(true);
     try {
-      const res = await fetch(`${API_CONFIG.BASE_URL}/caja/movimientos/todos`, {
+      // Primera página del libro mayor; el resto se pide con "Cargar más".
+      const pagina = await fetchPagina<MovimientoAPI>(URL_MOVIMIENTOS, {
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${token}`,
         },
       });
-
-      if (!res.ok) {
-        // Si la respuesta no es exitosa, lanzamos un error para que lo capture el 'catch'.
-        throw new Error(`Error ${res.status}: Fallo al obtener los movimientos`);
-      }
-      
-      const json = await res.json();
-      setData(json);
-      console.log(json)
+      setData(pagina.items);
+      setSiguienteCursor(pagina.siguienteCursor);
 
     } catch (err) {
       console.error("Error al obtener los datos:", err);
       // Aquí podrías añadir una notificación al usuario (ej. con toast.error).
       setData([]); // En caso de error, es bueno limpiar los datos viejos.
+      setSiguienteCursor(null);
     } finally {
       // Este bloque se ejecuta siempre, tanto si hubo éxito como si hubo error.
       setLoading(false);
     }
   }, [token]); // El array de dependencias de useCallback.
 
+  const cargarMas = useCallback(async () => {
+    if (!token || !siguienteCursor) return;
+    setCargandoMas(true);
+    try {
+      const pagina = await fetchPagina<MovimientoAPI>(
+        URL_MOVIMIENTOS,
+        { headers: { Authorization: `Bearer ${token}` } },
+        siguienteCursor,
+      );
+      setData((previos) => [...previos, ...pagina.items]);
+      setSiguienteCursor(pagina.siguienteCursor);
+    } catch (err) {
+      console.error("Error al obtener más movimientos:", err);
+    } finally {
+      setCargandoMas(false);
+    }
+  }, [token, siguienteCursor]);
+
   /**
    * `useEffect` para ejecutar la carga de datos.
    * Ahora depende de la función `fetchData` memoizada.
@@ -83,6 +101,17 @@ export default function ContabilidadPage() {
             onActionComplete={fetchData}
           />
         )}
+
+        {!loading && siguienteCursor && (
+          <button
+            type="button"
+            onClick={cargarMas}
+            disabled={cargandoMas}
+            className="self-center rounded-md border border-green-900 px-4 py-2 text-green-950 disabled:opacity-50"
+          >
+            {cargandoMas ? "Cargando..." : "Cargar más movimientos"}
+          </button>
+        )}
       </div>
     </ProtectedRoute>
   );
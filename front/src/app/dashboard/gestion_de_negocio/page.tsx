@@ -45,7 +45,7 @@ export default function GestionNegocio() {
   const [navbarColor, setNavbarColor] = useState("bg-sky-600");
 
   // Formatos de impresión de ticket - escalable a mas opciones 
-  const formatosDisponibles = ["PDF", "Ticket", "Texto"];
+  const formatosDisponibles = ["PDF", "Ticket", "Texto", "ESC/POS"];
 
   /* Edición y manejo de empresas - obtenemos la empresa a partir del user para una cosa*/
   const usuario = useAuthStore((state) => state.usuario);
@@ -244,6 +244,33 @@ export default function GestionNegocio() {
     }
   };
 
+  // El formato también va a la configuración del servidor (tickets de venta por caja).
+  const guardarFormatoComprobante = async (valor: string) => {
+    setFormatoComprobante(valor);
+    if (!token) return;
+    try {
+      const res = await fetch(`${API_CONFIG.BASE_URL}/configuracion/mi-empresa`, {
+        method: "PATCH",
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${token}`,
+        },
+        body: JSON.stringify({
+          formato_comprobante_predeterminado: valor.toLowerCase().replace("/", ""),
+        }),
+      });
+
+      if (res.ok) {
+        toast.success("Formato de comprobante actualizado");
+      } else {
+        toast.error("Error al guardar configuración");
+      }
+    } catch (e) {
+      console.error(e);
+      toast.error("Error al guardar configuración");
+    }
+  };
+
   const patchRecargoTransferencia = async (body: { porcentaje?: number; habilitado?: boolean; concepto?: string }) => {
     const res = await fetch(
       `${API_CONFIG.BASE_URL}/configuracion/mi-empresa/recargo/transferencia`,
@@ -634,7 +661,7 @@ export default function GestionNegocio() {
             </div>
             <div>
               <label className="text-sm font-medium text-gray-700 mb-1 block">Formato del Comprobante</label>
-              <Select value={formatoComprobante} onValueChange={setFormatoComprobante}>
+              <Select value={formatoComprobante} onValueChange={guardarFormatoComprobante}>
                 <SelectTrigger className="w-[180px] cursor-pointer">
                   <SelectValue placeholder="Seleccionar formato" />
                 </SelectTrigger>
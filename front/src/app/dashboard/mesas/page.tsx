@@ -20,6 +20,8 @@ import { routeToDepartments } from '@/lib/ticketRoutingService';
 import { toast } from 'sonner';
 import type { ConsumoMesa, TicketResponse, Mesa } from '@/lib/types/mesas';
 import { api } from '@/lib/api-client';
+import { useFacturacionStore } from '@/lib/facturacionStore';
+import { descargarEscpos, enviarEscposSerial } from '@/lib/impresoraEscpos';
 
 export default function MesasPage() {
   const { cajaAbierta, verificarEstadoCaja } = useCajaStore();
@@ -43,25 +45,38 @@ export default function MesasPage() {
   const [viewMode, setViewMode] = useState<'grid' | 'list'>('grid');
   const [autoPrintMode, setAutoPrintMode] = useState<'none' | 'ticket' | 'comanda'>('none');
   const [onlyPending, setOnlyPending] = useState<boolean>(true);
-  const openBlob = (blob: Blob | null) => {
+  const formatoComprobante = useFacturacionStore((state) => state.formatoComprobante);
+  // Comandas y tickets de mesa: ESC/POS solo si el negocio lo eligió; si no, PDF.
+  const formatoComandera = formatoComprobante.toLowerCase().replace("/", "") === "escpos" ? "escpos" : undefined;
+  const openBlob = async (blob: Blob | null, nombre: string) => {
     if (!blob) {
       toast.error("No se pudo generar el PDF. Verifica la sesión de impresión.");
       return;
     }
+    if (blob.type === "application/octet-stream") {
+      const bytes = new Uint8Array(await blob.arrayBuffer());
+      if (await enviarEscposSerial(bytes)) {
+        toast.success("✅ Enviado a la comandera.");
+      } else {
+        descargarEscpos(`${nombre}_${Date.now()}.bin`, bytes);
+        toast.info("Ticket ESC/POS descargado: envialo a la impresora en modo RAW.");
+      }
+      return;
+    }
     const url = URL.createObjectURL(blob);
     window.open(url, '_blank');
   };
   const handlePrintMesaPDF = async (mesaId: number) => {
     const consumoActivo = consumos.find(c => c.id_mesa === mesaId && c.estado === 'abierto');
     if (!consumoActivo) return;
-    const blob = await api.impresion.generarMesaPDF(consumoActivo.id);
-    openBlob(blob);
+    const blob = await api.impresion.generarMesaPDF(consumoActivo.id, formatoComandera);
+    await openBlob(blob, "ticket_mesa");
   };
   const handlePrintComandaPDF = async (mesaId: number) => {
     const consumoActivo = consumos.find(c => c.id_mesa === mesaId && c.estado === 'abierto');
     if (!consumoActivo) return;
-    const blob = await api.impresion.generarComandaPDF({ id_consumo_mesa: consumoActivo.id, only_pendientes: onlyPending });
-    openBlob(blob);
+    const blob = await api.impresion.generarComandaPDF({ id_consumo_mesa: consumoActivo.id, only_pendientes: onlyPending }, formatoComandera);
+    await openBlob(blob, "comanda");
   };
 
   // Alternar selección de una mesa
@@ -27,8 +27,10 @@ import { useProductoStore, type Producto } from "@/lib/productoStore";
 import { API_CONFIG } from "@/lib/api-config";
 import { downloadPlainText, printHtml, printPlainText } from "@/lib/printerService";
 import { fetchArticuloPorId, mapArticulosToStore } from "@/lib/articulos-api";
+import { fetchTodasLasPaginas } from "@/lib/paginacion";
 import { actualizarProductosEnCache } from "@/lib/catalogo-sync";
 import { attachAutoScaleBridge } from "@/lib/scaleSerial";
+import { descargarEscpos, enviarEscposSerial } from "@/lib/impresoraEscpos";
 import {
   VENTAS_CAMPOS,
   focusVentasCampo,
@@ -725,12 +727,10 @@ function FormVentas({
   useEffect(() => {
     const fetchClientes = async () => {
       try {
-        const res = await fetch(`${API_CONFIG.BASE_URL}/clientes/obtener-todos`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        if (!res.ok) return;
-        const data: Cliente[] = await res.json();
-        const clientesActivos = data.filter((cliente: Cliente) => cliente.activo);
+        const clientesActivos = await fetchTodasLasPaginas<Cliente>(
+          `${API_CONFIG.BASE_URL}/clientes/obtener-todos?activo=true`,
+          { headers: { Authorization: `Bearer ${token}` } },
+        );
         setClientes(clientesActivos);
       } catch (error) {
         console.error("❌ Error al obtener clientes:", error);
@@ -766,7 +766,9 @@ function FormVentas({
     totalFinal: number,
     descGeneral: number,
     descGeneralPor: number,
-    obs: string
+    obs: string,
+    // Una por venta: el "Reintentar" la repite y el back reutiliza el CAE ya emitido.
+    idempotencyKey: string = crypto.randomUUID()
   ) => {
     console.log(`[${new Date().toISOString()}] Iniciando impresión de ${tipo}`);
 
@@ -805,7 +807,11 @@ function FormVentas({
     try {
       const respComp = await fetch(`${API_CONFIG.BASE_URL}/comprobantes/generar`, {
         method: "POST",
-        headers: { "Content-Type": "application/json", Authorization: `Bearer ${token}` },
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${token}`,
+          "Idempotency-Key": idempotencyKey,
+        },
         body: JSON.stringify(reqPayload)
       });
 
@@ -815,6 +821,16 @@ function FormVentas({
       }
 
       const contentType = respComp.headers.get("content-type") || "";
+      if (contentType.includes("application/octet-stream")) {
+        const bytes = new Uint8Array(await respComp.arrayBuffer());
+        if (await enviarEscposSerial(bytes)) {
+          toast.success("✅ Comprobante ESC/POS enviado a la impresora.");
+        } else {
+          descargarEscpos(`Comprobante_${tipo}_${Date.now()}.bin`, bytes);
+          toast.info("Comprobante ESC/POS descargado: envialo a la impresora en modo RAW.");
+        }
+        return;
+      }
       const esTextoPlano = contentType.includes("text/plain");
       const esHtmlTicket = contentType.includes("text/html");
       const nombreArchivo = `Comprobante_${tipo}_${Date.now()}.${esHtmlTicket ? "html" : esTextoPlano ? "txt" : "pdf"}`;
@@ -866,7 +882,7 @@ function FormVentas({
       toast.error("❌ Fallo al intentar generar el comprobante.", {
         action: {
           label: "Reintentar",
-          onClick: () => imprimirComprobante(tipo, items, totalFinal, descGeneral, descGeneralPor, obs)
+          onClick: () => imprimirComprobante(tipo, items, totalFinal, descGeneral, descGeneralPor, obs, idempotencyKey)
         },
         duration: 8000
       });
@@ -192,8 +192,11 @@ export const api = {
   },
 
   impresion: {
-    generarComandaPDF: async (payload: any) => apiClient.download(API_CONFIG.ENDPOINTS.IMPRESION_COMANDA_PDF, payload),
-    generarMesaPDF: async (consumoId: number) => apiClient.download(API_CONFIG.ENDPOINTS.IMPRESION_MESA_PDF, { id_consumo_mesa: consumoId }),
+    // formato "escpos": el back devuelve bytes RAW (application/octet-stream) en vez del PDF.
+    generarComandaPDF: async (payload: any, formato?: string) =>
+      apiClient.download(`${API_CONFIG.ENDPOINTS.IMPRESION_COMANDA_PDF}${formato ? `?formato=${formato}` : ''}`, payload),
+    generarMesaPDF: async (consumoId: number, formato?: string) =>
+      apiClient.download(`${API_CONFIG.ENDPOINTS.IMPRESION_MESA_PDF}${formato ? `?formato=${formato}` : ''}`, { id_consumo_mesa: consumoId }),
     abrirSesion: () => apiClient.post(API_CONFIG.ENDPOINTS.IMPRESION_COMANDA_PDF.replace('/comanda/pdf', '/sesion/abrir')),
     cerrarSesion: () => apiClient.post(API_CONFIG.ENDPOINTS.IMPRESION_COMANDA_PDF.replace('/comanda/pdf', '/sesion/cerrar')),
   },
@@ -67,6 +67,7 @@ export const API_CONFIG = {
     CAJA_INGRESOS: '/caja/ingresos',
     CAJA_ESTADO: '/caja/estado-actual',
     ARTICULOS_VERSION: '/articulos/version',
+    ARTICULOS_CAMBIOS: '/articulos/cambios',
     CAJA_PANEL_ESTADISTICAS: '/caja/panel-estadisticas',
     CAJA_ESTADISTICAS_GENERALES: '/caja/estadisticas-generales',
     CAJA_REVISAR_SESION: (idSesion: number) => `/caja/admin/sesion/${idSesion}/revisar`,
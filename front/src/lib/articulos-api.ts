@@ -30,6 +30,39 @@ export async function fetchCatalogoVersion(token: string): Promise<number> {
   return data.version ?? 0;
 }
 
+export type CatalogoCambiosAPI = {
+  version: number;
+  desde_version: number;
+  completo: boolean;
+  articulos: ArticuloCatalogoAPI[];
+  bajas: number[];
+};
+
+/**
+ * Delta del catálogo desde `desdeVersion`. Devuelve null si no hubo cambios (304).
+ * Con `completo` la bitácora del server no alcanza y hay que bajar el catálogo entero.
+ */
+export async function fetchCatalogoCambios(
+  token: string,
+  desdeVersion: number,
+): Promise<CatalogoCambiosAPI | null> {
+  const respuesta = await fetch(
+    `${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.ARTICULOS_CAMBIOS}?desde_version=${desdeVersion}`,
+    {
+      headers: {
+        Authorization: `Bearer ${token}`,
+        "If-None-Match": `"catalogo-${desdeVersion}"`,
+      },
+    },
+  );
+
+  if (respuesta.status === 304) return null;
+  if (!respuesta.ok) {
+    throw new Error(`Fallo al obtener cambios de catálogo (status ${respuesta.status})`);
+  }
+  return (await respuesta.json()) as CatalogoCambiosAPI;
+}
+
 /** Catálogo completo con códigos de barras. Usar solo en pantalla de stock. */
 export async function fetchAllArticulos(
   token: string,
@@ -0,0 +1,49 @@
+"use client"
+
+// Envía comandos ESC/POS (formato "ESC/POS" del backend) directo a la térmica por Web Serial.
+// Sin Web Serial o sin puerto elegido devuelve false y el llamador descarga el .bin.
+
+const baud = Number(process.env.NEXT_PUBLIC_ESCPOS_BAUD || "9600")
+
+export async function enviarEscposSerial(bytes: Uint8Array): Promise<boolean> {
+  if (typeof navigator === "undefined" || !("serial" in navigator)) {
+    console.warn("⚠️ [ESC/POS] Web Serial API no soportada en este navegador.");
+    return false;
+  }
+
+  let port: SerialPort
+  try {
+    const autorizados = await navigator.serial.getPorts()
+    port = autorizados[0] ?? await navigator.serial.requestPort()
+  } catch {
+    console.warn("⚠️ [ESC/POS] No se eligió puerto de impresora.");
+    return false;
+  }
+
+  try {
+    await port.open({ baudRate: baud })
+    const writer = port.writable!.getWriter()
+    try {
+      await writer.write(bytes)
+    } finally {
+      writer.releaseLock()
+    }
+    return true
+  } catch (err) {
+    console.error("❌ [ESC/POS] Error escribiendo en la impresora:", err);
+    return false
+  } finally {
+    await port.close().catch(() => undefined)
+  }
+}
+
+export function descargarEscpos(nombreArchivo: string, bytes: Uint8Array): void {
+  const url = URL.createObjectURL(new Blob([bytes], { type: "application/octet-stream" }))
+  const link = document.createElement("a")
+  link.href = url
+  link.download = nombreArchivo
+  document.body.appendChild(link)
+  link.click()
+  document.body.removeChild(link)
+  URL.revokeObjectURL(url)
+}
@@ -1,13 +1,25 @@
 import { API_CONFIG } from "@/lib/api-config";
+import { useFacturacionStore } from "@/lib/facturacionStore";
+import { descargarEscpos, enviarEscposSerial } from "@/lib/impresoraEscpos";
 import { toast } from "sonner";
 
 function esPdfBlob(blob: Blob): boolean {
-  if (blob.type === "application/pdf" || blob.type === "application/octet-stream") {
+  if (blob.type === "application/pdf") {
     return true;
   }
   return blob.type === "" || blob.type === "binary/octet-stream";
 }
 
+async function enviarArqueoEscpos(blob: Blob, idSesion: number): Promise<void> {
+  const bytes = new Uint8Array(await blob.arrayBuffer());
+  if (await enviarEscposSerial(bytes)) {
+    toast.success("✅ Arqueo enviado a la impresora.");
+    return;
+  }
+  descargarEscpos(`cierre_caja_${idSesion}_${Date.now()}.bin`, bytes);
+  toast.info("Arqueo ESC/POS descargado: envialo a la impresora en modo RAW.");
+}
+
 function abrirPdfEnNuevaPestana(blob: Blob, printWindow?: Window | null): void {
   const fileURL = URL.createObjectURL(blob);
 
@@ -45,7 +57,9 @@ export async function imprimirArqueoCaja(
 ): Promise<void> {
   toast.info("Generando ticket, por favor espere...");
 
-  const url = `${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.CAJA_TICKET_CIERRE(idSesion)}`;
+  // ESC/POS solo si el negocio lo eligió; el back devuelve PDF salvo que se le pida.
+  const formato = useFacturacionStore.getState().formatoComprobante.toLowerCase().replace("/", "");
+  const url = `${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.CAJA_TICKET_CIERRE(idSesion)}${formato === "escpos" ? "?formato=escpos" : ""}`;
 
   try {
     const res = await fetch(url, {
@@ -67,6 +81,11 @@ export async function imprimirArqueoCaja(
       printWindow?.close();
       throw new Error("El servidor devolvió un archivo vacío.");
     }
+    if (blob.type === "application/octet-stream") {
+      printWindow?.close();
+      await enviarArqueoEscpos(blob, idSesion);
+      return;
+    }
     if (!esPdfBlob(blob)) {
       printWindow?.close();
       throw new Error(
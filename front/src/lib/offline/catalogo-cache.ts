@@ -1,7 +1,9 @@
 import {
   fetchAllArticulos,
+  fetchCatalogoCambios,
   fetchCatalogoVersion,
   type ArticuloCatalogoAPI,
+  type CatalogoCambiosAPI,
 } from "@/lib/articulos-api";
 import {
   clearOfflineEmpresa,
@@ -67,7 +69,59 @@ function mapCodigosBarras(
   return rows;
 }
 
-/** Full refresh de catálogo + stock snapshot en IndexedDB (abrir/cerrar caja). */
+async function contarCache(
+  idEmpresa: number,
+  refreshed: boolean,
+  catalogoVersion: number,
+): Promise<RefreshCatalogoResult> {
+  return {
+    refreshed,
+    catalogo_version: catalogoVersion,
+    articulos_count: await offlineDb.articulos.where("id_empresa").equals(idEmpresa).count(),
+    codigos_count: await offlineDb.codigos_barras.where("id_empresa").equals(idEmpresa).count(),
+  };
+}
+
+/** Aplica un delta de /articulos/cambios: upsert de los tocados y borrado de las bajas. */
+async function aplicarCambiosCatalogo(
+  cambios: CatalogoCambiosAPI,
+  idEmpresa: number,
+): Promise<void> {
+  const offlineArticulos = cambios.articulos.map((item) => mapArticuloOffline(item, idEmpresa));
+  const codigos = mapCodigosBarras(cambios.articulos, idEmpresa);
+  const bajas = cambios.bajas.map(String);
+  const tocados = [...offlineArticulos.map((a) => a.id), ...bajas];
+
+  await offlineDb.transaction(
+    "rw",
+    offlineDb.articulos,
+    offlineDb.codigos_barras,
+    offlineDb.meta,
+    async () => {
+      if (tocados.length > 0) {
+        await offlineDb.codigos_barras.where("id_articulo").anyOf(tocados).delete();
+      }
+      if (bajas.length > 0) {
+        await offlineDb.articulos.bulkDelete(bajas);
+      }
+      if (offlineArticulos.length > 0) {
+        await offlineDb.articulos.bulkPut(offlineArticulos);
+      }
+      if (codigos.length > 0) {
+        await offlineDb.codigos_barras.bulkPut(codigos);
+      }
+      await upsertOfflineMeta(idEmpresa, {
+        catalogo_version: cambios.version,
+        catalogo_synced_at: new Date().toISOString(),
+      });
+    },
+  );
+}
+
+/**
+ * Refresco de catálogo + stock snapshot en IndexedDB (abrir/cerrar caja). Con caché
+ * previa pide solo el delta desde su versión; `force` o un delta `completo` bajan todo.
+ */
 export async function refreshCatalogoCache(
   token: string,
   idEmpresa: number,
@@ -77,22 +131,24 @@ export async function refreshCatalogoCache(
     throw new Error("Token e id_empresa son requeridos para refrescar caché.");
   }
 
-  const remoteVersion = await fetchCatalogoVersion(token);
   const meta = await getOfflineMeta(idEmpresa);
+  let remoteVersion: number;
 
-  if (
-    !options?.force &&
-    meta &&
-    meta.catalogo_version === remoteVersion &&
-    meta.catalogo_synced_at
-  ) {
-    const count = await offlineDb.articulos.where("id_empresa").equals(idEmpresa).count();
-    return {
-      refreshed: false,
-      catalogo_version: remoteVersion,
-      articulos_count: count,
-      codigos_count: await offlineDb.codigos_barras.where("id_empresa").equals(idEmpresa).count(),
-    };
+  if (!options?.force && meta?.catalogo_synced_at) {
+    const cambios = await fetchCatalogoCambios(token, meta.catalogo_version);
+    if (!cambios) {
+      return contarCache(idEmpresa, false, meta.catalogo_version);
+    }
+    if (!cambios.completo) {
+      if (cambios.version === meta.catalogo_version) {
+        return contarCache(idEmpresa, false, cambios.version);
+      }
+      await aplicarCambiosCatalogo(cambios, idEmpresa);
+      return contarCache(idEmpresa, true, cambios.version);
+    }
+    remoteVersion = cambios.version;
+  } else {
+    remoteVersion = await fetchCatalogoVersion(token);
   }
 
   const articulos = await fetchAllArticulos(token);
@@ -0,0 +1,38 @@
+export const HEADER_SIGUIENTE_CURSOR = "X-Siguiente-Cursor";
+
+export type PaginaCursor<T> = {
+  items: T[];
+  siguienteCursor: string | null;
+};
+
+function conCursor(url: string, cursor: string | null): string {
+  if (!cursor) return url;
+  const separador = url.includes("?") ? "&" : "?";
+  return `${url}${separador}cursor=${encodeURIComponent(cursor)}`;
+}
+
+/** Una página de un listado paginado por cursor (el siguiente viene en el header X-Siguiente-Cursor). */
+export async function fetchPagina<T>(
+  url: string,
+  init: RequestInit,
+  cursor: string | null = null,
+): Promise<PaginaCursor<T>> {
+  const respuesta = await fetch(conCursor(url, cursor), init);
+  if (!respuesta.ok) {
+    throw new Error(`Error ${respuesta.status} al obtener ${url}`);
+  }
+  const items = (await respuesta.json()) as T[];
+  return { items, siguienteCursor: respuesta.headers.get(HEADER_SIGUIENTE_CURSOR) };
+}
+
+/** Recorre todas las páginas; para listados que se usan completos (p. ej. selector de clientes). */
+export async function fetchTodasLasPaginas<T>(url: string, init: RequestInit): Promise<T[]> {
+  const todos: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const pagina: PaginaCursor<T> = await fetchPagina<T>(url, init, cursor);
+    todos.push(...pagina.items);
+    cursor = pagina.siguienteCursor;
+  } while (cursor);
+  return todos;
+}
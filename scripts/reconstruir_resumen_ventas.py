@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Reconstruye ventas_resumen_diario (panel de estadísticas) a partir de ventas y movimientos.
+Sirve de backfill al desplegar y para corregir desvíos.
+
+Uso (raíz del repo, venv + DB prod/local):
+  python scripts/reconstruir_resumen_ventas.py
+  python scripts/reconstruir_resumen_ventas.py --empresa 37 --empresa 38
+  python scripts/reconstruir_resumen_ventas.py --desde 2026-09-01 --hasta 2026-09-30
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from sqlmodel import Session, select
+
+from back.database import engine
+from back.gestion.caja.resumen_ventas import reconstruir_resumen_ventas
+from back.modelos import Empresa
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reconstruir ventas_resumen_diario")
+    parser.add_argument("--empresa", type=int, action="append", help="ID de empresa (repetible; default: todas)")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Día AR inicial (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Día AR final (YYYY-MM-DD, inclusive)")
+    args = parser.parse_args()
+
+    with Session(engine) as db:
+        ids = args.empresa or list(db.exec(select(Empresa.id).order_by(Empresa.id)).all())
+        for id_empresa in ids:
+            t0 = time.perf_counter()
+            filas = reconstruir_resumen_ventas(db, id_empresa, args.desde, args.hasta)
+            db.commit()
+            print(f"Empresa {id_empresa}: {filas} filas en {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+"""
+Micro-benchmark: requests autenticados no-op por segundo con y sin caché de usuarios.
+
+Arma una app FastAPI mínima con un endpoint que solo depende de `obtener_usuario_actual`
+(y otro de `obtener_principal_actual`), la llama por ASGI directo (sin red) y usa
+SQLite en memoria. `--latencia-db-ms` suma una espera por sentencia SQL para simular
+el round-trip a MySQL.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_auth_cache.py
+  python testing/benchmark_auth_cache.py --requests 5000 --latencia-db-ms 0.5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from back import security
+from back.database import get_db
+from back.modelos import Empresa, Rol, Usuario
+
+
+def _crear_app(engine) -> FastAPI:
+    app = FastAPI()
+
+    def _db():
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _db
+
+    @app.get("/noop")
+    def noop(usuario: Usuario = Depends(security.obtener_usuario_actual)):
+        return {"id": usuario.id}
+
+    @app.get("/noop-principal")
+    def noop_principal(principal: security.PrincipalAutenticado = Depends(security.obtener_principal_actual)):
+        return {"id": principal.id}
+
+    return app
+
+
+async def _medir(app: FastAPI, ruta: str, token: str, n: int) -> float:
+    scope_base = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "server": ("bench", 80),
+        "client": ("bench", 1),
+    }
+    estados: list[int] = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            estados.append(mensaje["status"])
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope_base), receive, send)
+    elapsed = time.perf_counter() - t0
+    if any(e != 200 for e in estados):
+        raise RuntimeError(f"Respuestas no-200: {set(estados)}")
+    return n / elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latencia-db-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Rol(id=1, nombre="Cajero"))
+        db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.commit()
+        db.add(Usuario(id=1, nombre_usuario="bench", password_hash="x", id_rol=1, id_empresa=1))
+        db.commit()
+
+    consultas = [0]
+
+    def _contar(*_args):
+        consultas[0] += 1
+        if args.latencia_db_ms > 0:
+            time.sleep(args.latencia_db_ms / 1000)
+
+    event.listen(engine, "before_cursor_execute", _contar)
+
+    app = _crear_app(engine)
+    token = security.crear_access_token({"sub": "bench", "id_empresa": 1})
+    ttl_original = security.obtener_cache_usuarios().ttl_sec
+
+    print(f"=== {args.requests} requests no-op autenticados (latencia DB simulada {args.latencia_db_ms}ms) ===")
+    for ruta in ("/noop", "/noop-principal"):
+        for etiqueta, ttl in (("sin caché", 0), ("con caché", max(ttl_original, 10))):
+            cache = security.obtener_cache_usuarios()
+            cache.limpiar()
+            cache.ttl_sec = ttl
+            consultas[0] = 0
+            rps = asyncio.run(_medir(app, ruta, token, args.requests))
+            print(
+                f"  {ruta:<16} {etiqueta:<10} {rps:8.0f} req/s | "
+                f"consultas/request={consultas[0] / args.requests:.2f}"
+            )
+    security.obtener_cache_usuarios().ttl_sec = ttl_original
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
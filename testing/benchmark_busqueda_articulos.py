@@ -0,0 +1,145 @@
+"""
+Benchmark: latencia p50/p95 de /articulos/buscar según el tamaño del catálogo, con el
+índice en memoria vs. el ILIKE '%termino%' anterior (dos consultas, orden y paginado en Python).
+
+Simula el tipeo en el buscador del POS: cada búsqueda es un prefijo creciente de una
+palabra del catálogo ("c", "ca", "caf", ...). SQLite en memoria.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_busqueda_articulos.py
+  python testing/benchmark_busqueda_articulos.py --tamanios 1000 20000 --busquedas 300
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, or_, select
+
+from back.gestion.stock import articulos as articulos_manager
+from back.gestion.stock.indice_busqueda import obtener_cache_indice_busqueda
+from back.modelos import Articulo, ArticuloCodigo, ConfiguracionEmpresa, Empresa
+
+PALABRAS = [
+    "café", "azúcar", "yerba", "leche", "galletitas", "arroz", "fideos", "aceite", "harina", "jabón",
+    "gaseosa", "agua", "vino", "cerveza", "queso", "jamón", "pan", "manteca", "dulce", "mermelada",
+]
+MARCAS = ["La Serenísima", "Arcor", "Molinos", "Marolio", "Knorr", "Cañuelas", "Quilmes", "Sancor"]
+
+
+def _buscar_ilike(db: Session, id_empresa: int, termino: str, skip: int, limit: int):
+    termino_like = f"%{termino}%"
+    por_descripcion = db.exec(
+        select(Articulo)
+        .where(
+            Articulo.id_empresa == id_empresa,
+            Articulo.activo == True,
+            or_(Articulo.descripcion.ilike(termino_like), Articulo.codigo_interno.ilike(termino_like)),
+        )
+        .order_by(Articulo.descripcion)
+        .options(selectinload(Articulo.codigos))
+    ).all()
+    por_codigo = db.exec(
+        select(Articulo)
+        .join(ArticuloCodigo)
+        .where(Articulo.id_empresa == id_empresa, Articulo.activo == True, ArticuloCodigo.codigo.ilike(termino_like))
+        .distinct()
+        .options(selectinload(Articulo.codigos))
+    ).all()
+    todos = {a.id: a for a in por_descripcion}
+    for a in por_codigo:
+        todos[a.id] = a
+    return sorted(todos.values(), key=lambda a: a.descripcion)[skip:skip + limit]
+
+
+def _crear_catalogo(tamanio: int):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    rnd = random.Random(tamanio)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20999999990", nombre_negocio="Bench"))
+        db.add_all(
+            [
+                Articulo(
+                    id=i,
+                    codigo_interno=f"A{i:06d}",
+                    descripcion=f"{rnd.choice(PALABRAS).capitalize()} {rnd.choice(MARCAS)} {rnd.choice(PALABRAS)} {rnd.randint(1, 999)}",
+                    precio_venta=100,
+                    id_empresa=1,
+                )
+                for i in range(1, tamanio + 1)
+            ]
+        )
+        db.add_all([ArticuloCodigo(codigo=f"779{i:010d}", id_articulo=i) for i in range(1, tamanio + 1)])
+        db.commit()
+    return engine
+
+
+def _terminos(cantidad: int) -> list[str]:
+    rnd = random.Random(11)
+    terminos: list[str] = []
+    while len(terminos) < cantidad:
+        palabra = rnd.choice(PALABRAS + MARCAS)
+        terminos.extend(palabra[:n] for n in range(1, len(palabra) + 1))
+    return terminos[:cantidad]
+
+
+def _percentiles(muestras_ms: list[float]) -> tuple[float, float]:
+    cortes = statistics.quantiles(muestras_ms, n=100)
+    return cortes[49], cortes[94]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanios", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--busquedas", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    terminos = _terminos(args.busquedas)
+    print(f"=== {args.busquedas} búsquedas por tipeo, limit={args.limit} (ms) ===")
+    for tamanio in args.tamanios:
+        engine = _crear_catalogo(tamanio)
+        obtener_cache_indice_busqueda().invalidar()
+        with Session(engine) as db:
+            t0 = time.perf_counter()
+            articulos_manager.buscar_articulos_por_termino(db, 1, "x", 0, args.limit)
+            construccion_ms = (time.perf_counter() - t0) * 1000
+
+        resultados = {}
+        for etiqueta, buscar in (("ILIKE", _buscar_ilike), ("índice", articulos_manager.buscar_articulos_por_termino)):
+            muestras = []
+            with Session(engine) as db:
+                for termino in terminos:
+                    t0 = time.perf_counter()
+                    buscar(db, 1, termino, 0, args.limit)
+                    muestras.append((time.perf_counter() - t0) * 1000)
+                    db.expunge_all()
+            resultados[etiqueta] = _percentiles(muestras)
+
+        (p50_a, p95_a), (p50_b, p95_b) = resultados["ILIKE"], resultados["índice"]
+        print(
+            f"  catálogo {tamanio:6d}: ILIKE p50={p50_a:7.2f} p95={p95_a:7.2f} | "
+            f"índice p50={p50_b:6.2f} p95={p95_b:6.2f} | construcción índice {construccion_ms:7.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,188 @@
+"""
+Benchmark: latencia del panel de estadísticas generales según el volumen histórico de
+ventas, leyendo de ventas_resumen_diario vs. las consultas anteriores que escaneaban
+ventas/venta_detalle/caja_movimientos del mes en cada carga.
+
+Las ventas se reparten en los últimos `--dias` días (2 ítems y un movimiento de caja cada
+una). El resumen se llena con reconstruir_resumen_ventas. SQLite en memoria.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_estadisticas_generales.py
+  python testing/benchmark_estadisticas_generales.py --ventas 10000 100000 --repeticiones 20
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from sqlalchemy import func, insert
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from back.gestion.caja import consultas_caja, resumen_ventas
+from back.modelos import (
+    Articulo,
+    CajaMovimiento,
+    CajaSesion,
+    Categoria,
+    ConfiguracionEmpresa,
+    Empresa,
+    Rol,
+    Usuario,
+    Venta,
+    VentaDetalle,
+)
+
+ARTICULOS = 500
+USUARIOS = 8
+METODOS = ["EFECTIVO", "TRANSFERENCIA", "BANCARIO"]
+
+
+def _panel_escaneando(db: Session, ids_empresas: list[int]) -> None:
+    """Las agregaciones que hacía el panel antes: todas sobre las tablas de ventas del mes."""
+    hoy = consultas_caja._ahora_ar().date()
+    desde, _ = consultas_caja._rango_mes_ar_utc_naive(hoy.year, hoy.month)
+    hasta = datetime.now(timezone.utc).replace(tzinfo=None)
+    validas = (
+        Venta.id_empresa.in_(ids_empresas),
+        Venta.timestamp >= desde,
+        Venta.timestamp < hasta,
+        func.upper(Venta.estado) != "ANULADA",
+        Venta.id_venta_lote_padre.is_(None),
+    )
+    monto_linea = VentaDetalle.cantidad * VentaDetalle.precio_unitario - func.coalesce(VentaDetalle.descuento_aplicado, 0.0)
+    db.exec(select(func.count(Venta.id), func.sum(Venta.total)).where(*validas)).one()
+    for dia in (hoy, hoy - timedelta(days=1)):
+        d, h = consultas_caja._rango_dia_ar_utc_naive(dia)
+        db.exec(select(func.count(Venta.id), func.sum(Venta.total)).where(*validas[:1], *validas[3:], Venta.timestamp >= d, Venta.timestamp < h)).one()
+    db.exec(
+        select(Articulo.id, Articulo.descripcion, func.sum(VentaDetalle.cantidad), func.sum(monto_linea))
+        .join(VentaDetalle, VentaDetalle.id_articulo == Articulo.id)
+        .join(Venta, Venta.id == VentaDetalle.id_venta)
+        .where(*validas)
+        .group_by(Articulo.id, Articulo.descripcion)
+        .order_by(func.sum(monto_linea).desc())
+        .limit(10)
+    ).all()
+    nombre_cat = func.coalesce(Categoria.nombre, "Sin categoría")
+    db.exec(
+        select(nombre_cat, func.sum(VentaDetalle.cantidad), func.sum(monto_linea))
+        .select_from(Articulo)
+        .join(VentaDetalle, VentaDetalle.id_articulo == Articulo.id)
+        .join(Venta, Venta.id == VentaDetalle.id_venta)
+        .outerjoin(Categoria, Categoria.id == Articulo.id_categoria)
+        .where(*validas)
+        .group_by(nombre_cat)
+        .order_by(func.sum(monto_linea).desc())
+        .limit(10)
+    ).all()
+    db.exec(
+        select(Usuario.id, Usuario.nombre_usuario, func.count(Venta.id), func.sum(Venta.total))
+        .join(Venta, Venta.id_usuario == Usuario.id)
+        .where(*validas)
+        .group_by(Usuario.id, Usuario.nombre_usuario)
+        .order_by(func.sum(Venta.total).desc())
+        .limit(15)
+    ).all()
+    db.exec(
+        select(CajaMovimiento.metodo_pago, func.count(CajaMovimiento.id), func.sum(CajaMovimiento.monto))
+        .join(CajaSesion, CajaSesion.id == CajaMovimiento.id_caja_sesion)
+        .where(
+            CajaSesion.id_empresa.in_(ids_empresas),
+            CajaMovimiento.tipo == "VENTA",
+            CajaMovimiento.timestamp >= desde,
+            CajaMovimiento.timestamp < hasta,
+        )
+        .group_by(CajaMovimiento.metodo_pago)
+    ).all()
+
+
+def _crear_ventas(cantidad: int, dias: int):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    rnd = random.Random(cantidad)
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None)
+    with Session(engine) as db:
+        db.add(Rol(id=1, nombre="Cajero"))
+        db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20999999990", nombre_negocio="Bench"))
+        db.add_all([Usuario(id=u, nombre_usuario=f"cajera{u}", password_hash="x", id_rol=1, id_empresa=1) for u in range(1, USUARIOS + 1)])
+        db.add(CajaSesion(id=1, saldo_inicial=0, id_usuario_apertura=1, id_empresa=1))
+        db.add_all([Categoria(id=c, nombre=f"Categoría {c}", id_empresa=1) for c in range(1, 21)])
+        db.add_all([
+            Articulo(id=a, codigo_interno=f"A{a}", descripcion=f"Artículo {a}", precio_venta=100, id_categoria=a % 20 + 1, id_empresa=1)
+            for a in range(1, ARTICULOS + 1)
+        ])
+        db.commit()
+
+        ventas, detalles, movimientos = [], [], []
+        for v in range(1, cantidad + 1):
+            timestamp = ahora - timedelta(seconds=rnd.randint(0, dias * 86400))
+            lineas = [(rnd.randint(1, ARTICULOS), rnd.randint(1, 3), rnd.choice((50.0, 100.0, 250.0))) for _ in range(2)]
+            total = sum(c * p for _, c, p in lineas)
+            usuario = rnd.randint(1, USUARIOS)
+            ventas.append({"id": v, "timestamp": timestamp, "total": total, "descuento_total": 0.0, "facturada": False,
+                           "estado": "COMPLETADA", "id_usuario": usuario, "id_caja_sesion": 1, "id_empresa": 1})
+            detalles.extend({"id_venta": v, "id_articulo": a, "cantidad": c, "precio_unitario": p, "descuento_aplicado": 0.0,
+                             "tasa_iva": 0.21} for a, c, p in lineas)
+            movimientos.append({"timestamp": timestamp, "tipo": "VENTA", "concepto": f"Venta {v}", "monto": total,
+                                "metodo_pago": rnd.choice(METODOS), "estado": "ACTIVO", "id_caja_sesion": 1,
+                                "id_usuario": usuario, "id_venta": v})
+        db.execute(insert(Venta.__table__), ventas)
+        db.execute(insert(VentaDetalle.__table__), detalles)
+        db.execute(insert(CajaMovimiento.__table__), movimientos)
+        db.commit()
+
+        t0 = time.perf_counter()
+        resumen_ventas.reconstruir_resumen_ventas(db, 1)
+        db.commit()
+        reconstruccion_s = time.perf_counter() - t0
+    return engine, reconstruccion_s
+
+
+def _medir(engine, funcion, repeticiones: int) -> tuple[float, float]:
+    muestras = []
+    with Session(engine) as db:
+        usuario = db.get(Usuario, 1)
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            funcion(db, usuario)
+            muestras.append((time.perf_counter() - t0) * 1000)
+            db.expunge_all()
+    return statistics.median(muestras), max(muestras)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ventas", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--dias", type=int, default=180)
+    parser.add_argument("--repeticiones", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"=== Panel de estadísticas, ventas repartidas en {args.dias} días (ms) ===")
+    for cantidad in args.ventas:
+        engine, reconstruccion_s = _crear_ventas(cantidad, args.dias)
+        escaneo = _medir(engine, lambda db, usuario: _panel_escaneando(db, [usuario.id_empresa]), args.repeticiones)
+        resumen = _medir(engine, consultas_caja.obtener_estadisticas_generales, args.repeticiones)
+        print(
+            f"  ventas {cantidad:7d}: escaneo p50={escaneo[0]:8.1f} max={escaneo[1]:8.1f} | "
+            f"resumen p50={resumen[0]:6.1f} max={resumen[1]:6.1f} | reconstrucción {reconstruccion_s:5.1f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark: memoria pico y tiempo al primer byte exportando el catálogo, armando todo en
+memoria (listar_productos + CSV en un string, como antes) vs. en streaming por lotes
+(yield_per) con y sin gzip.
+
+La memoria se mide con tracemalloc (objetos Python; SQLite en memoria no suma).
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_exportacion_catalogo.py
+  python testing/benchmark_exportacion_catalogo.py --articulos 50000 --lote 1000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from sqlalchemy import insert
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from back.gestion import modo_especial_manager
+from back.modelos import Articulo, ArticuloCodigo, Empresa
+from back.utils import respuesta_stream as stream
+
+
+def _exportar_en_memoria(db: Session, id_empresa: int) -> str:
+    productos = modo_especial_manager.listar_productos(db, id_empresa)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=modo_especial_manager.CSV_HEADERS)
+    writer.writeheader()
+    for p in productos:
+        writer.writerow({
+            "Codigo": p["codigo_interno"],
+            "Producto": p["descripcion"],
+            "Precio": p["precio_venta"],
+            "Costo": p["precio_costo"],
+            "Categorias": ", ".join(p["categorias"]),
+            "Stock": p["stock_actual"],
+            "StockMinimo": p.get("stock_minimo") or "",
+            "CodigoBarras": ", ".join(p["barcodes"]),
+            "Unidad": p["unidad"],
+            "CantidadEnvase": p.get("cantidad_envase") or "",
+            "Ubicacion": p.get("ubicacion") or "",
+        })
+    return buffer.getvalue()
+
+
+def _medir(etiqueta: str, generar) -> None:
+    # Tiempos sin tracemalloc (lo hace varias veces más lento); la memoria en una segunda pasada.
+    t0 = time.perf_counter()
+    primeras_filas = None
+    total = 0
+    for i, bloque in enumerate(generar()):
+        # El primer bloque del streaming es solo el encabezado: se mide el primero con filas.
+        if primeras_filas is None and (i > 0 or etiqueta == "en memoria"):
+            primeras_filas = time.perf_counter() - t0
+        total += len(bloque)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    for _ in generar():
+        pass
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  {etiqueta:<20} pico={pico / 2**20:7.1f} MiB | primeras filas={primeras_filas * 1000:8.1f} ms | "
+        f"total={elapsed:6.2f} s | {total / 2**20:5.1f} MiB enviados"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articulos", type=int, default=50_000)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.commit()
+        db.execute(
+            insert(Articulo),
+            [
+                {
+                    "id": i, "codigo_interno": f"A{i:06d}", "descripcion": f"Artículo de prueba número {i}",
+                    "precio_venta": 100 + i % 900, "stock_actual": i % 50, "id_empresa": 1, "activo": True,
+                    "ubicacion": "Góndola 3",
+                }
+                for i in range(1, args.articulos + 1)
+            ],
+        )
+        db.execute(insert(ArticuloCodigo), [{"codigo": f"779{i:010d}", "id_articulo": i} for i in range(1, args.articulos + 1)])
+        db.commit()
+
+    modo_especial_manager.EXPORT_YIELD_PER = args.lote
+    print(f"=== Exportación CSV de {args.articulos} artículos (lote {args.lote}) ===")
+
+    def _en_memoria():
+        with Session(engine) as db:
+            yield _exportar_en_memoria(db, 1).encode("utf-8")
+
+    def _stream(encoding):
+        def _generar():
+            with Session(engine) as db:
+                yield from stream._comprimir(
+                    stream._agrupar(modo_especial_manager.iterar_csv(db, 1), stream.EXPORT_CHUNK_BYTES), encoding
+                )
+        return _generar
+
+    _medir("en memoria", _en_memoria)
+    _medir("streaming", _stream(None))
+    _medir("streaming + gzip", _stream("gzip"))
+    if stream.brotli is not None:
+        _medir("streaming + brotli", _stream("br"))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,141 @@
+"""
+Benchmark: generación de tickets por formato (escpos / texto / ticket).
+
+Por cada tipo (factura B con CAE y QR, recibo, comanda, cierre de caja) y formato mide
+tickets por segundo, ms por ticket (p50) y bytes generados. Sin caché de comprobantes:
+cada llamada arma el ticket completo (payloads distintos).
+
+  escpos  comandos ESC/POS nativos (QR dibujado por la impresora, corte de papel).
+  texto   HTML monospace + QR PNG embebido.
+  ticket  plantilla Jinja + WeasyPrint (necesita pango/cairo del sistema).
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_formatos_ticket.py
+  python testing/benchmark_formatos_ticket.py --formatos escpos texto --segundos 2
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from back.gestion.reportes import generador_comprobantes, generador_escpos
+from back.gestion.reportes.cache_comprobantes import CacheComprobantes
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+
+def _request(tipo: str, formato: str, items: int, numero: int) -> GenerarComprobanteRequest:
+    lineas = [
+        {"cantidad": 1 + i % 3, "descripcion": f"Artículo de prueba {i}", "precio_unitario": 150.0 + i, "subtotal": (1 + i % 3) * (150.0 + i)}
+        for i in range(items)
+    ]
+    total = round(sum(l["subtotal"] for l in lineas), 2)
+    transaccion = {"items": lineas, "total": total, "pagos": [{"forma_pago": "Efectivo", "monto": total}]}
+    if tipo == "factura":
+        transaccion["afip"] = {
+            "fecha_emision": "2026-10-17",
+            "tipo_comprobante_afip": 6,
+            "numero_comprobante": numero,
+            "codigo_tipo_doc_receptor": 99,
+            "cae": "76123456789012",
+            "fecha_vencimiento_cae": "2026-10-27",
+        }
+    return GenerarComprobanteRequest(
+        tipo=tipo,
+        formato=formato,
+        numero=str(numero),
+        emisor={"cuit": "30711223345", "razon_social": "Almacén Bench S.A.", "punto_venta": 5, "condicion_iva": "Responsable Inscripto"},
+        receptor={"nombre_razon_social": "Consumidor Final", "cuit_o_dni": "0", "condicion_iva": "Consumidor Final"},
+        transaccion=transaccion,
+    )
+
+
+def _datos_cierre(numero: int) -> dict:
+    return {
+        "empresa": {"nombre_legal": "Almacén Bench S.A.", "cuit": "30711223345"},
+        "sesion": {
+            "id": numero, "fecha_apertura": "2026-10-17T11:00:00", "fecha_cierre": "2026-10-17T23:00:00",
+            "saldo_inicial": 10000.0, "saldo_final_calculado": 182500.0, "saldo_final_declarado": 182450.0, "diferencia": -50.0,
+        },
+        "usuario_apertura": "cajera",
+        "usuario_cierre": "cajera",
+        "totales": {"ventas": 175000.0, "propinas": 3500.0, "ingresos": 2000.0, "egresos": 8000.0},
+        "desglose_metodos_pago": {"efectivo": 90000.0, "transferencia": 60000.0, "bancario": 25000.0},
+        "desglose_ingresos": [{"concepto": f"Ingreso {i}", "monto": 500.0} for i in range(4)],
+        "desglose_egresos": [{"concepto": f"Proveedor {i}", "monto": 2000.0} for i in range(4)],
+    }
+
+
+def _generador(tipo: str, formato: str, items: int):
+    if tipo == "cierre":
+        if generador_escpos.es_formato_escpos(formato):
+            return lambda i: generador_escpos.generar_ticket_cierre_escpos(_datos_cierre(i))
+        if formato == "ticket":
+            return lambda i: generador_comprobantes.generar_ticket_cierre_pdf(_datos_cierre(i))
+        return None  # el cierre no tiene salida en texto
+    return lambda i: generador_comprobantes.generar_comprobante_stateless(_request(tipo, formato, items, 1000 + i))
+
+
+def _medir(generar, segundos: float) -> tuple[float, float, int]:
+    muestras = []
+    tamanio = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        generar(0)  # compila plantillas / memoiza el QR
+        fin = time.perf_counter() + segundos
+        i = 1
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            tamanio = len(generar(i))
+            muestras.append((time.perf_counter() - t0) * 1000)
+            i += 1
+    return len(muestras) / (sum(muestras) / 1000), statistics.median(muestras), tamanio
+
+
+def _weasyprint_disponible() -> bool:
+    try:
+        generador_comprobantes.HTML(string="<p>x</p>").write_pdf()
+    except Exception:
+        return False
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--formatos", nargs="+", default=["escpos", "texto", "ticket"])
+    parser.add_argument("--tipos", nargs="+", default=["factura", "recibo", "comanda", "cierre"])
+    parser.add_argument("--items", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=1.0)
+    args = parser.parse_args()
+
+    sin_cache = CacheComprobantes(ttl_sec=0)
+    generador_comprobantes.obtener_cache_comprobantes = lambda: sin_cache
+    formatos = args.formatos
+    if "ticket" in formatos and not _weasyprint_disponible():
+        print("(WeasyPrint no disponible: se omite el formato 'ticket')")
+        formatos = [f for f in formatos if f != "ticket"]
+
+    print(f"=== Generación de tickets por formato, {args.items} ítems ({args.segundos:g}s por caso) ===")
+    for tipo in args.tipos:
+        for formato in formatos:
+            generar = _generador(tipo, formato, args.items)
+            if generar is None:
+                continue
+            try:
+                por_segundo, p50, tamanio = _medir(generar, args.segundos)
+            except ValueError as e:  # tipo sin layout para el formato
+                print(f"  {tipo:8s} {formato:7s} no soportado: {e}")
+                continue
+            print(f"  {tipo:8s} {formato:7s} {por_segundo:9.0f} tickets/s  p50 {p50:8.3f} ms  {tamanio:7d} bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
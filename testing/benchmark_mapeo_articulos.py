@@ -0,0 +1,150 @@
+"""
+Benchmark: mapeo de la hoja de artículos de Sheets a campos estándar (cargar_articulos).
+
+Compara, sobre filas sintéticas con las variantes de encabezado que se ven en las planillas:
+  anterior  get_all_records (dicts) + búsqueda de ~14 columnas por fila, normalizando
+            todos los encabezados en cada búsqueda, y la fila original en cada artículo.
+  plan      get_all_values (listas) + plan de columnas compilado una vez por hoja.
+  plan+orig igual, conservando '_fila_original' (conservar_fila_original=True).
+
+Mide filas/s y memoria pico del resultado (tracemalloc). No llama a Google Sheets.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_mapeo_articulos.py
+  python testing/benchmark_mapeo_articulos.py --filas 10000 --repeticiones 3
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from gspread.utils import numericise_all, to_records
+
+from back.utils.tablas_handler import TablasHandler
+
+ENCABEZADOS = {
+    "clasica": ["Código", "Descripción", "precio", "Costo 1", "cantidad", "Activo", "Codigo de barras", "Categoria", "Marca", "ubicacion"],
+    "id_producto": ["id producto", "nombre", "precio venta", "precio negocio", "costo", "stock", "unidad", "categoria", "marca", "Barras"],
+    "ancha": ["codigo_interno", "descripcion", "Precio Venta", "STOCK", "proveedor", "iva", "observaciones", "Activo"]
+    + [f"extra_{i}" for i in range(12)],
+}
+
+
+def _celda(encabezado: str, i: int, rnd: random.Random) -> str:
+    enc = TablasHandler._normalizar_nombre_columna(None, encabezado)
+    if enc in {"codigo", "id_producto", "codigo_interno"}:
+        return f"{i:06d}" if i % 7 else f"A-{i}"
+    if enc.startswith("precio") or enc.startswith("costo"):
+        return rnd.choice([f"$ {rnd.randint(100, 99999):,}".replace(",", ".") + ",00", f"{rnd.uniform(10, 9000):.2f}"])
+    if enc in {"cantidad", "stock"}:
+        return rnd.choice([str(rnd.randint(0, 500)), f"{rnd.randint(0, 50)},5"])
+    if enc == "activo":
+        return rnd.choice(["TRUE", "FALSE", ""])
+    if enc in {"codigo_de_barras", "barras"}:
+        return str(7790000000000 + i)
+    return f"{encabezado} {i}"
+
+
+def _hoja(encabezados: list[str], filas: int, semilla: int = 7) -> list[list[str]]:
+    rnd = random.Random(semilla)
+    return [list(encabezados)] + [[_celda(e, i, rnd) for e in encabezados] for i in range(filas)]
+
+
+def _mapear_fila_anterior(handler: TablasHandler, fila: dict, encabezados: list[str]) -> dict:
+    """El _mapear_fila de antes: resuelve cada columna por fila."""
+    def col(*variantes: str):
+        return handler._encontrar_columna(encabezados, list(variantes))
+
+    col_codigo, col_id = col("Código", "codigo", "codigo_interno"), col("id producto", "id_producto")
+    codigo = (str(fila.get(col_codigo, "")).strip() if col_codigo else "") or (str(fila.get(col_id, "")).strip() if col_id else "")
+    if not codigo:
+        return {}
+    col_nombre, col_desc = col("nombre"), col("Descripción", "descripcion")
+    col_precio, col_negocio, col_costo = col("precio", "precio venta"), col("precio negocio"), col("Costo 1", "costo")
+    col_stock, col_activo, col_barras = col("cantidad", "stock"), col("Activo"), col("Codigo de barras", "Barras")
+    col_ubic, col_unidad, col_cat, col_marca = col("ubicacion"), col("unidad"), col("Categoria", "categoria"), col("Marca", "marca")
+    return {
+        "codigo_interno": codigo,
+        "Código": codigo,
+        "descripcion": (str(fila.get(col_nombre, "")).strip() if col_nombre else "")
+        or (str(fila.get(col_desc, "")).strip() if col_desc else "") or "Sin Descripción",
+        "precio_venta": handler._limpiar_precio(fila.get(col_precio)) if col_precio else 0.0,
+        "venta_negocio": handler._limpiar_precio(fila.get(col_negocio)) if col_negocio else 0.0,
+        "precio_costo": handler._limpiar_precio(fila.get(col_costo)) if col_costo else 0.0,
+        "stock_actual": handler._limpiar_numero(fila.get(col_stock, 0)) if col_stock else 0.0,
+        "Activo": str(fila.get(col_activo, "TRUE")).strip().upper() if col_activo else "TRUE",
+        "Codigo de barras": str(fila.get(col_barras, "")).strip() if col_barras else "",
+        "ubicacion": str(fila.get(col_ubic, "")).strip() if col_ubic else "Sin definir",
+        "unidad_venta": str(fila.get(col_unidad, "Unidad")).strip() if col_unidad else "Unidad",
+        "categoria": str(fila.get(col_cat, "")).strip() if col_cat else "",
+        "marca": str(fila.get(col_marca, "")).strip() if col_marca else "",
+        "_fila_original": fila,
+    }
+
+
+def _anterior(handler: TablasHandler, valores: list[list[str]]) -> list[dict]:
+    registros = to_records(valores[0], [numericise_all(fila) for fila in valores[1:]])  # get_all_records
+    encabezados = list(registros[0].keys())
+    return [_mapear_fila_anterior(handler, fila, encabezados) for fila in registros]
+
+
+def _plan(handler: TablasHandler, valores: list[list[str]], conservar: bool) -> list[dict]:
+    plan = handler._compilar_plan_articulos(valores[0])
+    return [handler._mapear_valores_fila(fila, plan, conservar) for fila in valores[1:]]
+
+
+def _medir(funcion, repeticiones: int) -> tuple[float, float, list[dict]]:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    del resultado
+    tracemalloc.start()
+    resultado = funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mejor, pico / 1024 / 1024, resultado
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=50_000)
+    parser.add_argument("--repeticiones", type=int, default=2)
+    args = parser.parse_args()
+
+    handler = TablasHandler.__new__(TablasHandler)
+    print(f"=== Mapeo de artículos, {args.filas} filas por hoja (mejor de {args.repeticiones}) ===")
+    for nombre, encabezados in ENCABEZADOS.items():
+        valores = _hoja(encabezados, args.filas)
+        print(f"-- encabezados '{nombre}' ({len(encabezados)} columnas)")
+        base = None
+        for etiqueta, funcion in (
+            ("anterior", lambda: _anterior(handler, valores)),
+            ("plan", lambda: _plan(handler, valores, False)),
+            ("plan+orig", lambda: _plan(handler, valores, True)),
+        ):
+            segundos, mb, resultado = _medir(funcion, args.repeticiones)
+            sin_original = [{k: v for k, v in r.items() if k != "_fila_original"} for r in resultado]
+            if base is None:
+                base = (segundos, sin_original)
+            elif sin_original != base[1]:
+                print(f"  {etiqueta}: ¡el resultado difiere del mapeo anterior!")
+                return 1
+            print(
+                f"  {etiqueta:10s} {args.filas / segundos:10.0f} filas/s  {segundos * 1000:8.1f} ms"
+                f"  x{base[0] / segundos:5.1f}  pico {mb:7.1f} MB"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,141 @@
+"""
+Benchmark: costo de registrar movimientos en la hoja MOVIMIENTOS según su tamaño.
+
+Contra la planilla simulada de testing/gspread_simulado.py, con la hoja ya cargada con
+N filas, registra movimientos de tres formas:
+  escaneo  como antes: cada escritura busca la próxima fila leyendo 4 columnas enteras.
+  cursor   de a uno, con el cursor de próxima fila validado con una lectura acotada.
+  lote     registrar_movimientos con varios movimientos en un único update.
+
+Reporta llamadas a la API y celdas leídas por movimiento, y ms por movimiento.
+`--latencia-api-ms` suma una espera por llamada para simular el round-trip a Google.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_movimientos_append.py
+  python testing/benchmark_movimientos_append.py --filas 1000 50000 --movimientos 100 --latencia-api-ms 80
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from gspread_simulado import ClienteSimulado, PlanillaSimulada
+
+from back.gestion.sheets_rate_governor import GobernadorEnMemoria, establecer_gobernador_sheets
+from back.modelos import ConfiguracionEmpresa
+from back.utils import tablas_handler
+from back.utils.tablas_handler import TablasHandler
+
+
+def _planilla(filas_existentes: int, latencia_ms: float) -> PlanillaSimulada:
+    encabezados = TablasHandler.encabezados_movimientos_swing()
+    filas = [encabezados] + [
+        [f"m{i:07d}", "", f"i{i}", "", "cajero", "", "2026-10-17", "", "", "", "VENTA", "", f"Venta {i}", "1.000,00"]
+        for i in range(filas_existentes)
+    ]
+    planilla = PlanillaSimulada({"MOVIMIENTOS": filas}, latencia_ms=latencia_ms)
+    hoja = planilla.hoja("MOVIMIENTOS")
+    hoja.row_count = len(filas) + 100
+    hoja.celdas_leidas = 0
+    for nombre in ("col_values", "get"):
+        original = getattr(hoja, nombre)
+
+        def contar(*args, _original=original, **kwargs):
+            valores = _original(*args, **kwargs)
+            hoja.celdas_leidas += sum(len(v) if isinstance(v, list) else 1 for v in valores)
+            return valores
+
+        setattr(hoja, nombre, contar)
+    return planilla
+
+
+def _handler(engine) -> TablasHandler:
+    with Session(engine) as db:
+        return TablasHandler(id_empresa=1, db=db)
+
+
+def _limpiar_caches_handler() -> None:
+    for cache in (
+        TablasHandler._worksheet_title_cache,
+        TablasHandler._headers_cache,
+        TablasHandler._spreadsheet_cache,
+        TablasHandler._worksheets_index_cache,
+        TablasHandler._cursor_filas,
+    ):
+        cache.clear()
+
+
+def _movimiento(i: int) -> dict:
+    return {"Tipo_movimiento": "VENTA", "monto": 100 + i, "descripcion": f"Venta bench {i}", "Repartidor": "cajero"}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--movimientos", type=int, default=200)
+    parser.add_argument("--lote", type=int, default=20, help="movimientos por escritura en modo lote")
+    parser.add_argument("--latencia-api-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    # Sin tope de cuota: se miden llamadas a la API, no esperas del gobernador.
+    establecer_gobernador_sheets(GobernadorEnMemoria(0, 0))
+
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20999999990", nombre_negocio="Bench", link_google_sheets="bench"))
+        db.commit()
+
+    print(
+        f"=== {args.movimientos} movimientos por caso, lote de {args.lote}, "
+        f"latencia API simulada {args.latencia_api_ms}ms ==="
+    )
+    for filas in args.filas:
+        print(f"-- MOVIMIENTOS con {filas} filas")
+        for modo in ("escaneo", "cursor", "lote"):
+            planilla = _planilla(filas, args.latencia_api_ms)
+            hoja = planilla.hoja("MOVIMIENTOS")
+            _limpiar_caches_handler()
+            tablas_handler.gspread_client = ClienteSimulado(planilla)
+            handler = _handler(engine)
+            with contextlib.redirect_stdout(io.StringIO()):
+                handler.registrar_movimiento(_movimiento(-1))  # abre la planilla y cachea encabezados
+            planilla.llamadas.clear()
+            hoja.celdas_leidas = 0
+
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if modo == "lote":
+                    for inicio in range(0, args.movimientos, args.lote):
+                        fin = min(inicio + args.lote, args.movimientos)
+                        assert handler.registrar_movimientos([_movimiento(i) for i in range(inicio, fin)])
+                else:
+                    for i in range(args.movimientos):
+                        if modo == "escaneo":
+                            TablasHandler._cursor_filas.clear()
+                        assert handler.registrar_movimiento(_movimiento(i))
+            elapsed = time.perf_counter() - t0
+
+            assert len(hoja.filas) == filas + 2 + args.movimientos
+            assert [f[12] for f in hoja.filas[-2:]] == [f"Venta bench {args.movimientos - 2}", f"Venta bench {args.movimientos - 1}"]
+            n = args.movimientos
+            print(
+                f"  {modo:8s} {planilla.total_llamadas / n:6.2f} llamadas/mov  "
+                f"{hoja.celdas_leidas / n:10.1f} celdas leídas/mov  {elapsed * 1000 / n:8.3f} ms/mov"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,6 +8,9 @@ Uso (desde la raíz del repo, PowerShell):
 
 Con API ya levantado:
   .venv/Scripts/python.exe testing/benchmark_poll_optimizations.py --live http://127.0.0.1:8012
+
+Solo cola en memoria (latencia escaneo→entrega y CPU con pollers ociosos, antes/después):
+  .venv/Scripts/python.exe testing/benchmark_poll_optimizations.py --solo-cola --pollers 1000
 """
 from __future__ import annotations
 
@@ -16,6 +19,7 @@ import asyncio
 import os
 import statistics
 import sys
+import threading
 import time
 from pathlib import Path
 
@@ -28,6 +32,7 @@ from fastapi.testclient import TestClient
 
 from back.security import crear_access_token
 from back.api.blueprints import scanner_router
+from back.gestion.scanner_bus import BusEnMemoria, establecer_scanner_bus
 
 
 def _token(con_id_empresa: bool = True) -> str:
@@ -149,6 +154,84 @@ async def bench_longpoll_testclient() -> None:
     print(f"  3 requests en {elapsed:.2f}s -> ~{3 / elapsed:.3f} req/s efectivo")
 
 
+async def _legacy_long_poll(colas: dict, empresa_id: int, timeout_sec: float, intervalo: float) -> dict:
+    """Réplica del long-poll anterior (lista + sleep fijo) para comparar contra la cola con aviso."""
+    deadline = time.monotonic() + timeout_sec
+    while time.monotonic() < deadline:
+        q = colas.get(empresa_id)
+        if q:
+            return {"has_event": True, "event": q.pop(0)}
+        await asyncio.sleep(intervalo)
+    return {"has_event": False}
+
+
+def _percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def _medir_latencia_entrega(modo: str, n_eventos: int, intervalo_legacy: float) -> list[float]:
+    """Un poller por evento; otro hilo (como el threadpool de FastAPI) hace el push."""
+    empresa_id = 9_001
+    colas_legacy: dict = {}
+    latencias: list[float] = []
+    for i in range(n_eventos):
+        if modo == "legacy":
+            tarea = asyncio.create_task(_legacy_long_poll(colas_legacy, empresa_id, 5, intervalo_legacy))
+        else:
+            tarea = asyncio.create_task(scanner_router._long_poll_event(empresa_id, 5))
+        # Dejamos que el poller llegue a esperar y empujamos en un instante "aleatorio" del intervalo.
+        await asyncio.sleep(0.01 + (i % 7) * intervalo_legacy / 7)
+        t_push = time.perf_counter()
+        evento = scanner_router.ScannerEvent(id_articulo=i, nombre="bench")
+        if modo == "legacy":
+            threading.Thread(target=lambda: colas_legacy.setdefault(empresa_id, []).append(evento)).start()
+        else:
+            threading.Thread(target=scanner_router._enqueue_event, args=(empresa_id, evento)).start()
+        resultado = await tarea
+        latencias.append(time.perf_counter() - t_push)
+        assert resultado["has_event"] is True
+    return latencias
+
+
+async def _medir_cpu_pollers_ociosos(modo: str, n_pollers: int, ventana_sec: float, intervalo_legacy: float) -> float:
+    """CPU (segundos de proceso) consumida por N pollers sin eventos durante la ventana."""
+    colas_legacy: dict = {}
+    base_empresa = 20_000
+    if modo == "legacy":
+        tareas = [
+            asyncio.create_task(_legacy_long_poll(colas_legacy, base_empresa + i, ventana_sec, intervalo_legacy))
+            for i in range(n_pollers)
+        ]
+    else:
+        tareas = [
+            asyncio.create_task(scanner_router._long_poll_event(base_empresa + i, int(ventana_sec)))
+            for i in range(n_pollers)
+        ]
+    cpu0 = time.process_time()
+    await asyncio.gather(*tareas)
+    return time.process_time() - cpu0
+
+
+def bench_cola_eventos(n_pollers: int = 1000, n_eventos: int = 50, ventana_sec: float = 3.0) -> None:
+    intervalo_legacy = 0.25
+    anterior = establecer_scanner_bus(BusEnMemoria(maxlen=100))
+    print("\n--- Benchmark cola del escáner: sleep 250 ms (antes) vs aviso inmediato (después) ---")
+    for modo, etiqueta in (("legacy", "antes  (sleep loop)"), ("evento", "después (aviso)   ")):
+        latencias = asyncio.run(_medir_latencia_entrega(modo, n_eventos, intervalo_legacy))
+        cpu = asyncio.run(_medir_cpu_pollers_ociosos(modo, n_pollers, ventana_sec, intervalo_legacy))
+        print(
+            f"  {etiqueta} | escaneo→entrega p50={statistics.median(latencias) * 1000:.2f}ms "
+            f"p99={_percentil(latencias, 0.99) * 1000:.2f}ms | "
+            f"CPU {n_pollers} pollers ociosos {ventana_sec:.0f}s = {cpu * 1000:.0f}ms "
+            f"({cpu / ventana_sec * 100:.1f}% de un núcleo)"
+        )
+    if anterior is not None:
+        establecer_scanner_bus(anterior)
+
+
 async def _bench_live(base_url: str, token: str, label: str, path: str, n: int) -> dict:
     latencies: list[float] = []
     errors = 0
@@ -222,13 +305,20 @@ def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument("--live", metavar="URL", help="Benchmark contra API en ejecución")
     parser.add_argument("--pid", type=int, help="PID del proceso API para RAM/CPU")
+    parser.add_argument("--solo-cola", action="store_true", help="Solo benchmark de la cola en memoria")
+    parser.add_argument("--pollers", type=int, default=1000, help="Pollers ociosos simultáneos")
     args = parser.parse_args()
 
+    if args.solo_cola:
+        bench_cola_eventos(args.pollers)
+        return 0
+
     print("=== Tests unitarios (TestClient) ===")
     test_auth_liviana_sin_db()
     test_poll_testclient()
     bench_testclient_throughput(60)
     asyncio.run(bench_longpoll_testclient())
+    bench_cola_eventos(args.pollers)
 
     if args.live:
         asyncio.run(run_live_benchmark(args.live.rstrip("/"), args.pid))
@@ -0,0 +1,169 @@
+"""
+Benchmark de registro de ventas (registro_caja) sobre SQLite en memoria.
+
+Registra N ventas de M ítems y reporta consultas SQL por venta (total y sobre
+`articulos`) y latencia p50/p99 de `registrar_venta_y_movimiento_caja`.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_registro_ventas.py
+  python testing/benchmark_registro_ventas.py --ventas 1000 --items 30 --multiples
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from back.gestion.caja import registro_caja as registro_module
+from back.modelos import Articulo, CajaSesion, Empresa, Usuario
+from back.schemas.caja_schemas import ArticuloVendido, PagoMultiple
+
+
+def _preparar(db: Session, n_articulos: int) -> tuple[int, int, list[int]]:
+    empresa = Empresa(
+        nombre_legal="Empresa Benchmark",
+        nombre_fantasia="Bench",
+        cuit="20999999990",
+        activa=True,
+        creada_en=datetime.now(timezone.utc),
+    )
+    db.add(empresa)
+    db.commit()
+    db.refresh(empresa)
+
+    usuario = Usuario(
+        nombre_usuario="bench_cajero",
+        password_hash="x",
+        activo=True,
+        creado_en=datetime.now(timezone.utc),
+        id_rol=1,
+        id_empresa=empresa.id,
+    )
+    db.add(usuario)
+    db.commit()
+    db.refresh(usuario)
+
+    sesion = CajaSesion(
+        fecha_apertura=datetime.now(timezone.utc),
+        saldo_inicial=0.0,
+        estado="ABIERTA",
+        id_usuario_apertura=usuario.id,
+        id_empresa=empresa.id,
+    )
+    db.add(sesion)
+    db.add_all(
+        Articulo(
+            codigo_interno=f"B{i:05d}",
+            descripcion=f"Artículo {i}",
+            precio_venta=100.0,
+            stock_actual=1_000_000.0,
+            activo=True,
+            id_empresa=empresa.id,
+        )
+        for i in range(n_articulos)
+    )
+    db.commit()
+    db.refresh(sesion)
+    ids = [a.id for a in db.exec(select(Articulo)).all()]
+    return usuario.id, sesion.id, ids
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ventas", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=30)
+    parser.add_argument("--catalogo", type=int, default=2000)
+    parser.add_argument("--multiples", action="store_true", help="Usar registrar_venta_y_movimientos_caja_multiples")
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+
+    consultas = {"total": 0, "articulos": 0}
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        consultas["total"] += 1
+        if "articulos" in statement:
+            consultas["articulos"] += 1
+
+    with Session(engine) as db:
+        id_usuario, id_sesion, ids_articulos = _preparar(db, args.catalogo)
+
+    rng = random.Random(7)
+    latencias: list[float] = []
+    event.listen(engine, "before_cursor_execute", _contar)
+    stdout = sys.stdout
+    t_total = time.perf_counter()
+    for _ in range(args.ventas):
+        carrito = [
+            ArticuloVendido(id_articulo=rng.choice(ids_articulos), cantidad=1, precio_unitario=100.0)
+            for _ in range(args.items)
+        ]
+        total = 100.0 * args.items
+        with Session(engine) as db:
+            usuario = db.get(Usuario, id_usuario)
+            # registro_caja imprime trazas por venta; se silencian para no medir la consola.
+            sys.stdout = open(os.devnull, "w")
+            t0 = time.perf_counter()
+            try:
+                if args.multiples:
+                    registro_module.registrar_venta_y_movimientos_caja_multiples(
+                        db=db,
+                        usuario_actual=usuario,
+                        id_sesion_caja=id_sesion,
+                        total_venta=total,
+                        pagos_multiples=[
+                            PagoMultiple(metodo_pago="efectivo", monto=total / 2),
+                            PagoMultiple(metodo_pago="transferencia", monto=total / 2),
+                        ],
+                        articulos_vendidos=carrito,
+                        tipo_comprobante_solicitado="ticket",
+                    )
+                else:
+                    registro_module.registrar_venta_y_movimiento_caja(
+                        db=db,
+                        usuario_actual=usuario,
+                        id_sesion_caja=id_sesion,
+                        total_venta=total,
+                        metodo_pago="efectivo",
+                        articulos_vendidos=carrito,
+                        tipo_comprobante_solicitado="ticket",
+                    )
+                db.commit()
+            finally:
+                latencias.append(time.perf_counter() - t0)
+                sys.stdout.close()
+                sys.stdout = stdout
+    elapsed = time.perf_counter() - t_total
+    event.remove(engine, "before_cursor_execute", _contar)
+
+    ordenadas = sorted(latencias)
+    print(f"=== Registro de {args.ventas} ventas × {args.items} ítems ({'pagos múltiples' if args.multiples else 'pago único'}) ===")
+    print(f"  consultas/venta: {consultas['total'] / args.ventas:.1f} (sobre articulos: {consultas['articulos'] / args.ventas:.1f})")
+    print(
+        f"  latencia p50={statistics.median(ordenadas) * 1000:.2f}ms "
+        f"p99={ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000:.2f}ms | "
+        f"{args.ventas / elapsed:.1f} ventas/s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
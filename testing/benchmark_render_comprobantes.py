@@ -0,0 +1,127 @@
+"""
+Benchmark: render de tickets en frío vs. en caliente en generador_comprobantes.
+
+Modos, por formato:
+  frío        Environment Jinja nuevo por llamada, sin bytecode, QR sin memoizar y sin
+              caché de comprobantes (lo que hacía cada llamada antes).
+  compilado   Environment del módulo (plantillas ya compiladas) y QR memoizado; render
+              y conversión completos en cada llamada (payloads distintos).
+  reimpresión mismo payload: sale de la caché de comprobantes.
+
+El comprobante es una factura B con CAE (lleva QR AFIP) y `--items` líneas.
+El formato "ticket" necesita WeasyPrint con sus librerías del sistema.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_render_comprobantes.py
+  python testing/benchmark_render_comprobantes.py --formatos texto --repeticiones 200
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from back.gestion.reportes import generador_comprobantes, qr_generator
+from back.gestion.reportes.cache_comprobantes import CacheComprobantes
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+
+def _request(formato: str, items: int, numero: int) -> GenerarComprobanteRequest:
+    lineas = [
+        {"cantidad": 1 + i % 3, "descripcion": f"Artículo de prueba {i}", "precio_unitario": 150.0 + i, "subtotal": (1 + i % 3) * (150.0 + i)}
+        for i in range(items)
+    ]
+    total = round(sum(l["subtotal"] for l in lineas), 2)
+    return GenerarComprobanteRequest(
+        tipo="factura",
+        formato=formato,
+        emisor={"cuit": "30711223345", "razon_social": "Almacén Bench S.A.", "punto_venta": 5, "condicion_iva": "Responsable Inscripto"},
+        receptor={"nombre_razon_social": "Consumidor Final", "cuit_o_dni": "0", "condicion_iva": "Consumidor Final"},
+        transaccion={
+            "items": lineas,
+            "total": total,
+            "pagos": [{"forma_pago": "Efectivo", "monto": total}],
+            "afip": {
+                "fecha_emision": "2026-10-17",
+                "tipo_comprobante_afip": 6,
+                "numero_comprobante": numero,
+                "codigo_tipo_doc_receptor": 99,
+                "cae": "76123456789012",
+                "fecha_vencimiento_cae": "2026-10-27",
+            },
+        },
+    )
+
+
+def _medir(requests, repeticiones: int) -> tuple[float, float]:
+    muestras = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(repeticiones):
+            req = requests(i)
+            t0 = time.perf_counter()
+            generador_comprobantes.generar_comprobante_stateless(req)
+            muestras.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(muestras), statistics.mean(muestras)
+
+
+def _modo_frio() -> None:
+    generador_comprobantes.JINJA_BYTECODE_CACHE_DIR = ""
+    generador_comprobantes._crear_env_jinja = generador_comprobantes._nuevo_env_jinja
+    generador_comprobantes.obtener_cache_comprobantes = lambda: CacheComprobantes(ttl_sec=0)
+    qr_generator._qr_png_base64 = qr_generator._qr_png_base64.__wrapped__
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--formatos", nargs="+", default=["ticket", "texto"])
+    parser.add_argument("--items", type=int, default=12)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    args = parser.parse_args()
+
+    originales = (
+        generador_comprobantes.JINJA_BYTECODE_CACHE_DIR,
+        generador_comprobantes._crear_env_jinja,
+        generador_comprobantes.obtener_cache_comprobantes,
+        qr_generator._qr_png_base64,
+    )
+    print(f"=== Render de factura B con QR, {args.items} ítems (ms por comprobante: p50 / media) ===")
+    for formato in args.formatos:
+        _modo_frio()
+        frio = _medir(lambda i: _request(formato, args.items, 1000 + i), args.repeticiones)
+        (
+            generador_comprobantes.JINJA_BYTECODE_CACHE_DIR,
+            generador_comprobantes._crear_env_jinja,
+            generador_comprobantes.obtener_cache_comprobantes,
+            qr_generator._qr_png_base64,
+        ) = originales
+
+        sin_cache = CacheComprobantes(ttl_sec=0)
+        generador_comprobantes.obtener_cache_comprobantes = lambda: sin_cache
+        fijo = _request(formato, args.items, 1)
+        _medir(lambda i: fijo, 1)  # compila plantillas y memoiza el QR
+        # Mismo comprobante (mismo QR) sin caché de comprobantes: render y conversión completos.
+        compilado = _medir(lambda i: fijo.model_copy(update={"numero": str(i)}), args.repeticiones)
+
+        cache = CacheComprobantes()
+        generador_comprobantes.obtener_cache_comprobantes = lambda: cache
+        _medir(lambda i: fijo, 1)
+        reimpresion = _medir(lambda i: fijo, args.repeticiones)
+        generador_comprobantes.obtener_cache_comprobantes = originales[2]
+
+        print(
+            f"  {formato:7s} frío {frio[0]:8.2f} / {frio[1]:8.2f} | compilado {compilado[0]:8.2f} / {compilado[1]:8.2f} | "
+            f"reimpresión {reimpresion[0]:6.3f} / {reimpresion[1]:6.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,232 @@
+"""
+Benchmark: latencia de los endpoints de venta mientras hay una ráfaga de impresiones.
+
+App FastAPI mínima llamada por ASGI directo (sin red):
+  POST /venta            sync, registrar_venta_y_movimiento_caja + commit (SQLite en archivo, WAL).
+  GET  /imprimir-hilo    sync, renderiza en el threadpool (como antes).
+  GET  /imprimir-pool    async, await ServicioRender.ejecutar (pool de procesos).
+
+`--cajas` clientes registran ventas en loop (con `--pausa-ms` entre una y otra) mientras
+`--impresiones` clientes piden tickets sin pausa, durante `--segundos`. Se reporta p50/p99
+de /venta y renders por segundo. Si WeasyPrint no carga (faltan pango/cairo del sistema)
+el render es un loop de CPU de `--render-ms` que retiene el GIL, como WeasyPrint.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_render_concurrente.py
+  python testing/benchmark_render_concurrente.py --impresiones 60 --workers 4 --segundos 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+
+from back.gestion.caja import registro_caja
+from back.gestion.reportes import servicio_render
+from back.modelos import Articulo, CajaSesion, ConfiguracionEmpresa, Empresa, Rol, Usuario
+from back.schemas.caja_schemas import ArticuloVendido
+
+
+def _render_sintetico(vueltas: int) -> bytes:
+    x = 0
+    for _ in range(vueltas):
+        x += sum(i * i for i in range(200))
+    return str(x).encode()
+
+
+def _calibrar_vueltas(ms: float) -> int:
+    """Vueltas de _render_sintetico que tardan `ms` en un hilo solo (trabajo fijo, no tiempo fijo)."""
+    t0 = time.perf_counter()
+    _render_sintetico(500)
+    return max(1, int(500 * ms / ((time.perf_counter() - t0) * 1000)))
+
+
+def _weasyprint_disponible() -> bool:
+    try:
+        import weasyprint  # noqa: F401
+    except OSError:
+        return False
+    return True
+
+
+def _request_ticket(numero: int):
+    from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+    lineas = [{"cantidad": 1, "descripcion": f"Plato {i}", "precio_unitario": 900.0, "subtotal": 900.0} for i in range(8)]
+    return GenerarComprobanteRequest(
+        tipo="recibo", formato="ticket", numero=str(numero),
+        emisor={"cuit": "20999999990", "razon_social": "Bench", "punto_venta": 1},
+        receptor={"nombre_razon_social": "Consumidor Final"},
+        transaccion={"items": lineas, "total": 7200.0, "pagos": [{"forma_pago": "Efectivo", "monto": 7200.0}]},
+    )
+
+
+def _crear_engine(ruta: str):
+    engine = create_engine(f"sqlite:///{ruta}", connect_args={"check_same_thread": False, "timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def _wal(conexion, _registro):
+        conexion.execute("PRAGMA journal_mode=WAL")
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Rol(id=1, nombre="Cajero"))
+        db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20999999990", nombre_negocio="Bench"))
+        db.add(Usuario(id=1, nombre_usuario="cajera", password_hash="x", id_rol=1, id_empresa=1))
+        db.add(CajaSesion(id=1, saldo_inicial=0, id_usuario_apertura=1, id_empresa=1))
+        db.add(Articulo(id=1, codigo_interno="A1", descripcion="Agua", precio_venta=100, stock_actual=10**9, id_empresa=1))
+        db.commit()
+    return engine
+
+
+def _crear_app(engine, servicio: servicio_render.ServicioRender, render, args_render) -> FastAPI:
+    app = FastAPI()
+    registro_caja._encolar_sync_sheets_post_venta = lambda db, **kwargs: None
+
+    @app.post("/venta")
+    def venta():
+        with Session(engine) as db:
+            usuario = db.get(Usuario, 1)
+            registro_caja.registrar_venta_y_movimiento_caja(
+                db, usuario, 1, 100.0, "EFECTIVO", [ArticuloVendido(id_articulo=1, cantidad=1, precio_unitario=100.0)],
+                tipo_comprobante_solicitado="ticket",
+            )
+            db.commit()
+        return {"ok": True}
+
+    @app.get("/imprimir-hilo")
+    def imprimir_hilo():
+        return {"bytes": len(render(*args_render()))}
+
+    @app.get("/imprimir-pool")
+    async def imprimir_pool():
+        return {"bytes": len(await servicio.ejecutar(1, render, *args_render()))}
+
+    return app
+
+
+async def _pedir(app: FastAPI, metodo: str, ruta: str) -> int:
+    scope = {
+        "type": "http", "http_version": "1.1", "method": metodo, "scheme": "http",
+        "path": ruta, "raw_path": ruta.encode(), "query_string": b"", "root_path": "",
+        "headers": [], "server": ("bench", 80), "client": ("bench", 1),
+    }
+    estado = [0]
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            estado[0] = mensaje["status"]
+
+    await app(scope, receive, send)
+    return estado[0]
+
+
+async def _escenario(app: FastAPI, ruta_impresion: str | None, args) -> dict:
+    fin = time.perf_counter() + args.segundos
+    latencias: list[float] = []
+    impresiones = [0, 0]  # ok, rechazadas (503/504)
+
+    async def caja():
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            if await _pedir(app, "POST", "/venta") != 200:
+                raise RuntimeError("venta fallida")
+            latencias.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(args.pausa_ms / 1000)
+
+    async def impresora():
+        while time.perf_counter() < fin:
+            estado = await _pedir(app, "GET", ruta_impresion)
+            if estado == 200:
+                impresiones[0] += 1
+            else:
+                impresiones[1] += 1
+                await asyncio.sleep(0.2)
+
+    tareas = [caja() for _ in range(args.cajas)]
+    if ruta_impresion:
+        tareas += [impresora() for _ in range(args.impresiones)]
+    t0 = time.perf_counter()
+    await asyncio.gather(*tareas)
+    transcurrido = time.perf_counter() - t0
+    latencias.sort()
+    return {
+        "ventas": len(latencias),
+        "p50": statistics.median(latencias),
+        "p99": latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))],
+        "renders_s": impresiones[0] / transcurrido,
+        "rechazadas": impresiones[1],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cajas", type=int, default=4)
+    parser.add_argument("--impresiones", type=int, default=40)
+    parser.add_argument("--segundos", type=float, default=6.0)
+    parser.add_argument("--pausa-ms", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--render-ms", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if _weasyprint_disponible():
+        render, args_render, origen = servicio_render._render_comprobante, (lambda: (_request_ticket(time.monotonic_ns()),)), "WeasyPrint"
+        crear_executor = None
+    else:
+        vueltas = _calibrar_vueltas(args.render_ms)
+        render, args_render, origen = _render_sintetico, (lambda: (vueltas,)), f"sintético {args.render_ms:g} ms"
+        # Sin WeasyPrint el inicializador del pool fallaría: solo se baja la prioridad, sin precarga.
+        crear_executor = lambda workers: ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=servicio_render._bajar_prioridad
+        )
+
+    servicio = servicio_render.ServicioRender(
+        workers=args.workers, cola_max=max(64, args.impresiones), cola_max_empresa=max(64, args.impresiones),
+        timeout_sec=60, crear_executor=crear_executor,
+    )
+    with tempfile.TemporaryDirectory() as carpeta:
+        engine = _crear_engine(os.path.join(carpeta, "bench.db"))
+        app = _crear_app(engine, servicio, render, args_render)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(_pedir(app, "GET", "/imprimir-pool"))  # levanta el pool antes de medir
+
+        print(
+            f"=== {args.cajas} cajas vendiendo + {args.impresiones} clientes imprimiendo, {args.segundos:g}s "
+            f"(render {origen}, {args.workers} procesos, CPUs {os.cpu_count()}) ==="
+        )
+        for etiqueta, ruta in (("sin impresiones", None), ("render en threadpool", "/imprimir-hilo"), ("render en pool", "/imprimir-pool")):
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = asyncio.run(_escenario(app, ruta, args))
+            print(
+                f"  {etiqueta:<21} /venta p50 {r['p50']:7.1f} ms  p99 {r['p99']:8.1f} ms  ({r['ventas']:5d} ventas) | "
+                f"renders/s {r['renders_s']:6.1f}  rechazadas {r['rechazadas']}"
+            )
+        engine.dispose()
+    servicio.cerrar()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,207 @@
+"""
+Benchmark del bus de eventos del escáner con varios procesos (simula workers de uvicorn).
+
+Cada worker corre un event loop con un poller por empresa; el proceso principal publica
+eventos (como si llegaran a cualquier worker) y se mide cuántos pares push→poll por
+segundo se completan y la latencia de entrega, para cada backend y cantidad de workers.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_scanner_bus.py
+  python testing/benchmark_scanner_bus.py --workers 1 2 4 --eventos 2000 --empresas 20
+  python testing/benchmark_scanner_bus.py --backends sqlite redis --redis-url redis://127.0.0.1:6379/0
+
+Sin --redis-url se usa el servidor RESP simulado de testing/redis_local_simulado.py.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing as mp
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from back.gestion.scanner_bus import BusEnMemoria, BusRedis, BusSQLite, ScannerBus
+from testing.redis_local_simulado import RedisLocalSimulado
+
+
+def _crear_bus(backend: str, destino: str) -> ScannerBus:
+    if backend == "sqlite":
+        return BusSQLite(destino, maxlen=100_000, intervalo_vigia_sec=0.005)
+    if backend == "redis":
+        return BusRedis(destino, maxlen=100_000)
+    return BusEnMemoria(maxlen=100_000)
+
+
+async def _pollers(bus: ScannerBus, empresas: list[int], entregados, latencias, detener) -> None:
+    async def _poller(id_empresa: int) -> None:
+        while not detener.is_set():
+            evento = await bus.esperar(id_empresa, 1)
+            if evento is None:
+                continue
+            latencias.append(time.time() - evento["t"])
+            with entregados.get_lock():
+                entregados.value += 1
+
+    await asyncio.gather(*(_poller(e) for e in empresas))
+
+
+def _proceso_worker(backend: str, destino: str, empresas: list[int], entregados, listos, detener, salida) -> None:
+    bus = _crear_bus(backend, destino)
+    latencias: list[float] = []
+    with listos.get_lock():
+        listos.value += 1
+    asyncio.run(_pollers(bus, empresas, entregados, latencias, detener))
+    bus.cerrar()
+    salida.put(latencias)
+
+
+def _publicar(bus: ScannerBus, n_eventos: int, empresas: list[int], hilos: int) -> None:
+    def _tanda(inicio: int) -> None:
+        for i in range(inicio, n_eventos, hilos):
+            bus.publicar(empresas[i % len(empresas)], {"id_articulo": i, "t": time.time()})
+
+    trabajadores = [threading.Thread(target=_tanda, args=(h,)) for h in range(hilos)]
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+
+
+def _medir(backend: str, destino: str, n_workers: int, n_eventos: int, n_empresas: int) -> dict:
+    ctx = mp.get_context("spawn")
+    entregados = ctx.Value("i", 0)
+    listos = ctx.Value("i", 0)
+    detener = ctx.Event()
+    salida = ctx.Queue()
+    empresas = list(range(1, n_empresas + 1))
+    procesos = [
+        ctx.Process(
+            target=_proceso_worker,
+            args=(backend, destino, empresas, entregados, listos, detener, salida),
+            daemon=True,
+        )
+        for _ in range(n_workers)
+    ]
+    for p in procesos:
+        p.start()
+    while listos.value < n_workers:
+        time.sleep(0.05)
+    time.sleep(0.5)
+
+    bus = _crear_bus(backend, destino)
+    t0 = time.perf_counter()
+    _publicar(bus, n_eventos, empresas, hilos=4)
+    limite = time.perf_counter() + 60
+    while entregados.value < n_eventos and time.perf_counter() < limite:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - t0
+    detener.set()
+
+    latencias: list[float] = []
+    for _ in procesos:
+        latencias.extend(salida.get(timeout=30))
+    for p in procesos:
+        p.join(10)
+    bus.cerrar()
+
+    ordenadas = sorted(latencias) or [0.0]
+    return {
+        "backend": backend,
+        "workers": n_workers,
+        "entregados": entregados.value,
+        "pares_por_seg": round(entregados.value / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(statistics.median(ordenadas) * 1000, 2),
+        "p99_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000, 2),
+    }
+
+
+def _medir_en_proceso(n_eventos: int, n_empresas: int) -> dict:
+    """La cola en memoria solo tiene sentido con un worker: pollers y push en el mismo proceso."""
+    bus = BusEnMemoria(maxlen=100_000)
+    empresas = list(range(1, n_empresas + 1))
+    entregados = mp.Value("i", 0)
+    detener = threading.Event()
+    latencias: list[float] = []
+    hilo = threading.Thread(
+        target=lambda: asyncio.run(_pollers(bus, empresas, entregados, latencias, detener)),
+        daemon=True,
+    )
+    hilo.start()
+    time.sleep(0.2)
+    t0 = time.perf_counter()
+    _publicar(bus, n_eventos, empresas, hilos=4)
+    while entregados.value < n_eventos and time.perf_counter() - t0 < 60:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - t0
+    detener.set()
+    hilo.join(5)
+    ordenadas = sorted(latencias) or [0.0]
+    return {
+        "backend": "memoria",
+        "workers": 1,
+        "entregados": entregados.value,
+        "pares_por_seg": round(entregados.value / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(statistics.median(ordenadas) * 1000, 2),
+        "p99_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.99))] * 1000, 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["memoria", "sqlite", "redis"])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4])
+    parser.add_argument("--eventos", type=int, default=2000)
+    parser.add_argument("--empresas", type=int, default=20)
+    parser.add_argument("--redis-url", help="Servidor Redis real; sin esto se usa el simulado")
+    args = parser.parse_args()
+
+    print("=== Benchmark bus del escáner: pares push→poll entre procesos ===")
+    for backend in args.backends:
+        simulado = None
+        directorio = tempfile.TemporaryDirectory()
+        if backend == "sqlite":
+            destino = str(Path(directorio.name) / "scanner_bench.sqlite3")
+        elif backend == "redis":
+            if args.redis_url:
+                destino = args.redis_url
+            else:
+                simulado = RedisLocalSimulado()
+                simulado.iniciar()
+                destino = simulado.url
+        else:
+            destino = ""
+
+        for n_workers in args.workers:
+            if backend == "memoria" and n_workers > 1:
+                # La cola en memoria no cruza procesos: ahí está el problema que resuelve el bus.
+                print(f"  memoria | workers={n_workers} | no aplica (eventos no cruzan procesos)")
+                continue
+            if backend == "memoria":
+                resultado = _medir_en_proceso(args.eventos, args.empresas)
+            else:
+                resultado = _medir(backend, destino, n_workers, args.eventos, args.empresas)
+            print(
+                f"  {resultado['backend']:<7} | workers={resultado['workers']} | "
+                f"entregados={resultado['entregados']}/{args.eventos} | "
+                f"{resultado['pares_por_seg']} pares/s | "
+                f"p50={resultado['p50_ms']}ms p99={resultado['p99_ms']}ms"
+            )
+
+        if simulado is not None:
+            simulado.detener()
+        directorio.cleanup()
+
+    print("\n=== Benchmark completado ===")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
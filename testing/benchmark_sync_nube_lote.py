@@ -0,0 +1,127 @@
+"""
+Benchmark: llamadas a la API de Sheets y tiempo para drenar la cola sync_nube,
+procesando item por item vs. por lotes por empresa.
+
+Encola N ventas (un `registrar_movimiento` y un `restar_stock` cada una) en SQLite en
+memoria y las procesa contra la planilla simulada de testing/gspread_simulado.py.
+`--latencia-api-ms` suma una espera por llamada para simular el round-trip a Google.
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_sync_nube_lote.py
+  python testing/benchmark_sync_nube_lote.py --ventas 100 --latencia-api-ms 80
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sqlalchemy import delete
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from gspread_simulado import ClienteSimulado, PlanillaSimulada
+
+from back.gestion import sync_nube_queue_manager as cola
+from back.gestion.sheets_rate_governor import GobernadorEnMemoria, establecer_gobernador_sheets
+from back.modelos import Articulo, ConfiguracionEmpresa, Empresa, SyncNubePendiente
+from back.utils import tablas_handler
+from back.utils.tablas_handler import TablasHandler
+
+
+def _limpiar_caches_handler() -> None:
+    for cache in (
+        TablasHandler._worksheet_title_cache,
+        TablasHandler._headers_cache,
+        TablasHandler._spreadsheet_cache,
+        TablasHandler._worksheets_index_cache,
+        TablasHandler._modificacion_cache,
+        TablasHandler._cursor_filas,
+    ):
+        cache.clear()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ventas", type=int, default=100)
+    parser.add_argument("--catalogo", type=int, default=2000)
+    parser.add_argument("--latencia-api-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    # Sin tope de cuota: se miden llamadas a la API, no esperas del gobernador.
+    establecer_gobernador_sheets(GobernadorEnMemoria(0, 0))
+
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20999999990", nombre_negocio="Bench", link_google_sheets="bench"))
+        db.add_all(
+            [
+                Articulo(id=i, codigo_interno=f"A{i:05d}", descripcion=f"Art {i}", precio_venta=100, id_empresa=1)
+                for i in range(1, args.catalogo + 1)
+            ]
+        )
+        db.commit()
+
+    rnd = random.Random(7)
+    ventas = [
+        [(rnd.randint(1, args.catalogo), rnd.randint(1, 3)) for _ in range(rnd.randint(1, 4))]
+        for _ in range(args.ventas)
+    ]
+
+    print(
+        f"=== {args.ventas} ventas encoladas ({2 * args.ventas} items), catálogo {args.catalogo}, "
+        f"latencia API simulada {args.latencia_api_ms}ms ==="
+    )
+    for etiqueta, en_lote in (("item por item", False), ("por lotes", True)):
+        with Session(engine) as db:
+            db.execute(delete(SyncNubePendiente))
+            for i, items in enumerate(ventas):
+                cola.encolar_sync_nube_pendiente(
+                    db, 1, cola.OPERACION_REGISTRAR_MOVIMIENTO,
+                    {"Tipo_movimiento": "venta", "monto": 100 + i, "descripcion": f"Venta {i}"},
+                )
+                cola.encolar_sync_nube_pendiente(
+                    db, 1, cola.OPERACION_RESTAR_STOCK,
+                    {"articulos_vendidos": [{"id_articulo": a, "cantidad": c} for a, c in items]},
+                )
+            db.commit()
+
+        planilla = PlanillaSimulada(
+            {
+                "stock": [["codigo", "descripcion", "stock"]]
+                + [[f"A{i:05d}", f"Art {i}", 10_000] for i in range(1, args.catalogo + 1)],
+                "MOVIMIENTOS": [TablasHandler.encabezados_movimientos_swing()],
+            },
+            latencia_ms=args.latencia_api_ms,
+        )
+        _limpiar_caches_handler()
+        tablas_handler.gspread_client = ClienteSimulado(planilla)
+
+        t0 = time.perf_counter()
+        with Session(engine) as db:
+            resumen = cola.procesar_cola_sync_nube(db, max_items=2 * args.ventas, en_lote=en_lote)
+        elapsed = time.perf_counter() - t0
+        detalle = ", ".join(f"{k}={v}" for k, v in sorted(planilla.llamadas.items()))
+        print(
+            f"  {etiqueta:<14} llamadas API={planilla.total_llamadas:5d} | {elapsed * 1000:8.1f} ms | "
+            f"completados={resumen['completados']}/{resumen['procesados']}"
+        )
+        print(f"    ({detalle})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
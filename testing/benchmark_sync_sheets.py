@@ -0,0 +1,212 @@
+"""
+Benchmark del subsistema de sincronización con Google Sheets, sin red: llamadas a la API,
+tiempo y consultas a la DB para cada flujo, según el tamaño de la hoja.
+
+Corre contra la planilla simulada de testing/gspread_simulado.py (SQLite en memoria para
+la DB). Por cada tamaño (filas de la hoja):
+  articulos inicial      sincronizar_articulos_desde_sheet sobre la DB vacía (todo alta).
+  articulos incremental  misma sync tras cambiar el 1% de las filas (huellas por fila).
+  clientes inicial       sincronizar_clientes_desde_sheets sobre la DB vacía.
+  clientes repetida      segunda corrida completa (sin cambios).
+  cola item/lote         drena --ventas ventas encoladas (movimiento + stock cada una)
+                         con la hoja stock y MOVIMIENTOS del tamaño dado.
+
+`--latencia-api-ms` suma una espera por llamada; `--cuota-por-minuto` rechaza con 429
+lo que exceda la cuota (columna 429) para ver cómo degrada cada flujo. Con `--gobernador`
+las llamadas pasan por el gobernador de cuota (a 5/6 de esa cuota): en vez de 429 hay
+espera (columna espera; en tiempo real, puede llevar minutos).
+
+Uso (desde la raíz del repo):
+  python testing/benchmark_sync_sheets.py
+  python testing/benchmark_sync_sheets.py --filas 1000 --ventas 50 --latencia-api-ms 80 --cuota-por-minuto 60
+  python testing/benchmark_sync_sheets.py --filas 1000 --ventas 5 --cuota-por-minuto 60 --gobernador
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parents[1]
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from gspread_simulado import ClienteSimulado, PlanillaSimulada
+
+from back.gestion import sync_nube_queue_manager as cola
+from back.gestion.sheets_rate_governor import GobernadorEnMemoria, establecer_gobernador_sheets
+from back.gestion.actualizaciones.actualizaciones_masivas import sincronizar_clientes_desde_sheets
+from back.gestion.sincronizacion_manager import sincronizar_articulos_desde_sheet
+from back.modelos import Articulo, ConfiguracionEmpresa, Empresa
+from back.utils import tablas_handler
+from back.utils.tablas_handler import TablasHandler
+
+ENCABEZADOS_STOCK = ["Código", "Descripción", "precio", "Costo 1", "cantidad", "Activo", "Codigo de barras", "Categoria", "Marca"]
+ENCABEZADOS_CLIENTES = ["id-cliente", "nombre-usuario", "whatsapp", "mail", "direccion", "observaciones", "CUIT-CUIL", "condicion-iva"]
+CATEGORIAS = ["Almacén", "Bebidas", "Limpieza", "Lácteos", "Fiambrería", "Panadería"]
+MARCAS = ["Arcor", "Molinos", "Marolio", "Knorr", "Cañuelas", "Quilmes", "Sancor", "La Serenísima"]
+CLAVES_RESUMEN = (
+    "creados_en_db", "actualizados_en_db", "filas_omitidas_por_huella", "creados", "actualizados", "sin_cambios",
+    "errores", "completados", "reprogramados", "fallidos",
+)
+
+
+def _filas_stock(filas: int, rnd: random.Random) -> list[list]:
+    return [ENCABEZADOS_STOCK] + [
+        [
+            f"A{i:06d}", f"Artículo {i}", f"$ {rnd.randint(100, 9999)}.{rnd.randint(0, 99):02d}",
+            str(rnd.randint(50, 5000)), str(rnd.randint(100, 10_000)), "TRUE", str(7790000000000 + i),
+            CATEGORIAS[i % len(CATEGORIAS)], MARCAS[i % len(MARCAS)],
+        ]
+        for i in range(filas)
+    ]
+
+
+def _filas_clientes(filas: int) -> list[list]:
+    return [ENCABEZADOS_CLIENTES] + [
+        [f"C{i:06d}", f"Cliente {i}", f"11{i:08d}", f"cliente{i}@mail.com", f"Calle {i}", "", "", "CONSUMIDOR_FINAL"]
+        for i in range(filas)
+    ]
+
+
+def _filas_movimientos(filas: int) -> list[list]:
+    return [TablasHandler.encabezados_movimientos_swing()] + [
+        [f"m{i:07d}", "", f"i{i}", "", "cajero", "", "2026-10-17", "", "", "", "VENTA", "", f"Venta {i}", "1.000,00"]
+        for i in range(filas)
+    ]
+
+
+def _limpiar_caches_handler() -> None:
+    for cache in (
+        TablasHandler._worksheet_title_cache,
+        TablasHandler._headers_cache,
+        TablasHandler._spreadsheet_cache,
+        TablasHandler._worksheets_index_cache,
+        TablasHandler._clientes_cache,
+        TablasHandler._modificacion_cache,
+        TablasHandler._cursor_filas,
+    ):
+        cache.clear()
+    TablasHandler._sheets_quota_blocked_until = None
+
+
+class _Entorno:
+    """DB SQLite en memoria con una empresa y contador de sentencias SQL."""
+
+    def __init__(self) -> None:
+        self.engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        self.consultas = 0
+        event.listen(self.engine, "before_cursor_execute", self._contar)
+        with Session(self.engine) as db:
+            db.add(Empresa(id=1, nombre_legal="Bench", cuit="20999999990", activa=True, creada_en=datetime.now(timezone.utc)))
+            db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20999999990", nombre_negocio="Bench", link_google_sheets="bench"))
+            db.commit()
+
+    def _contar(self, *args) -> None:
+        self.consultas += 1
+
+
+def _medir(entorno: _Entorno, planilla: PlanillaSimulada, etiqueta: str, funcion, cuota_gobernador: float = 0) -> None:
+    _limpiar_caches_handler()
+    # Buckets nuevos por flujo; cuota 0 = sin tope (solo se cuentan llamadas).
+    gobernador = GobernadorEnMemoria(cuota_gobernador, cuota_gobernador, espera_max_sync_sec=600)
+    establecer_gobernador_sheets(gobernador)
+    tablas_handler.gspread_client = ClienteSimulado(planilla)
+    planilla.llamadas.clear()
+    planilla.rechazos_429.clear()
+    entorno.consultas = 0
+    t0 = time.perf_counter()
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida), contextlib.redirect_stderr(salida), Session(entorno.engine) as db:
+        resultado = funcion(db)
+    elapsed = time.perf_counter() - t0
+    resumen = ", ".join(f"{k}={resultado[k]}" for k in CLAVES_RESUMEN if k in resultado)
+    espera = sum(gobernador.metricas()["espera_total_sec"].values())
+    print(
+        f"  {etiqueta:22s} API={planilla.total_llamadas:5d}  429={sum(planilla.rechazos_429.values()):4d}  "
+        f"DB={entorno.consultas:6d}  {elapsed * 1000:9.1f} ms  espera={espera:6.1f} s  ({resumen})"
+    )
+
+
+def _encolar_ventas(entorno: _Entorno, ventas: list[list[tuple[int, int]]]) -> None:
+    with Session(entorno.engine) as db:
+        for i, items in enumerate(ventas):
+            cola.encolar_sync_nube_pendiente(
+                db, 1, cola.OPERACION_REGISTRAR_MOVIMIENTO,
+                {"Tipo_movimiento": "venta", "monto": 100 + i, "descripcion": f"Venta {i}"},
+            )
+            cola.encolar_sync_nube_pendiente(
+                db, 1, cola.OPERACION_RESTAR_STOCK,
+                {"articulos_vendidos": [{"id_articulo": a, "cantidad": c} for a, c in items]},
+            )
+        db.commit()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--ventas", type=int, default=50)
+    parser.add_argument("--latencia-api-ms", type=float, default=0.0)
+    parser.add_argument("--cuota-por-minuto", type=int, default=None)
+    parser.add_argument("--gobernador", action="store_true", help="tomar cuota del gobernador (misma cuota por minuto)")
+    args = parser.parse_args()
+    # Como los valores por defecto (50 de las 60/min de Google): cuota + ráfaga de 10 s no pasa la real.
+    cuota_gobernador = args.cuota_por_minuto * 5 / 6 if args.gobernador and args.cuota_por_minuto else 0
+
+    print(
+        f"=== Sync Sheets simulado: latencia {args.latencia_api_ms}ms, "
+        f"cuota {args.cuota_por_minuto or 'sin límite'}/min, {args.ventas} ventas en cola ==="
+    )
+    for filas in args.filas:
+        print(f"-- {filas} filas")
+        rnd = random.Random(filas)
+        opciones = {"latencia_ms": args.latencia_api_ms, "cuota_por_minuto": args.cuota_por_minuto}
+
+        entorno = _Entorno()
+        planilla = PlanillaSimulada({"stock": _filas_stock(filas, rnd)}, **opciones)
+        _medir(entorno, planilla, "articulos inicial", lambda db: sincronizar_articulos_desde_sheet(db, 1, incremental=True), cuota_gobernador)
+        hoja = planilla.hoja("stock")
+        for i in rnd.sample(range(1, filas + 1), max(1, filas // 100)):
+            hoja.filas[i][2] = f"$ {rnd.randint(100, 9999)}.00"
+        planilla._modificada()
+        _medir(entorno, planilla, "articulos incremental", lambda db: sincronizar_articulos_desde_sheet(db, 1, incremental=True), cuota_gobernador)
+
+        planilla = PlanillaSimulada({"clientes": _filas_clientes(filas)}, **opciones)
+        _medir(entorno, planilla, "clientes inicial", lambda db: sincronizar_clientes_desde_sheets(db, 1), cuota_gobernador)
+        _medir(entorno, planilla, "clientes repetida", lambda db: sincronizar_clientes_desde_sheets(db, 1), cuota_gobernador)
+
+        with Session(entorno.engine) as db:
+            ids = list(db.exec(select(Articulo.id).where(Articulo.id_empresa == 1)).all())
+        ventas = [[(rnd.choice(ids), rnd.randint(1, 3)) for _ in range(rnd.randint(1, 4))] for _ in range(args.ventas)]
+        for etiqueta, en_lote in (("cola item por item", False), ("cola por lotes", True)):
+            _encolar_ventas(entorno, ventas)
+            planilla = PlanillaSimulada(
+                {"stock": _filas_stock(filas, random.Random(filas)), "MOVIMIENTOS": _filas_movimientos(filas)},
+                **opciones,
+            )
+            planilla.hoja("MOVIMIENTOS").row_count = filas + 100
+            _medir(
+                entorno, planilla, etiqueta,
+                lambda db: cola.procesar_cola_sync_nube(db, max_items=2 * args.ventas, en_lote=en_lote),
+                cuota_gobernador,
+            )
+            with Session(entorno.engine) as db:
+                for item in db.exec(select(cola.SyncNubePendiente)).all():
+                    db.delete(item)
+                db.commit()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,20 @@
+# testing/conftest.py
+
+"""Fixtures compartidas por los tests de testing/."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from back.gestion.sheets_rate_governor import GobernadorEnMemoria, establecer_gobernador_sheets
+
+
+@pytest.fixture(autouse=True)
+def gobernador_sheets_aislado():
+    """Gobernador de cuota de Sheets sin tope y en memoria (los tests del gobernador instalan el suyo)."""
+    anterior = establecer_gobernador_sheets(GobernadorEnMemoria(0, 0))
+    yield
+    establecer_gobernador_sheets(anterior)
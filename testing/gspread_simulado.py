@@ -0,0 +1,212 @@
+"""
+Planilla de Google Sheets en memoria con la superficie de gspread que usa `TablasHandler`.
+
+Cuenta cada llamada que en gspread real es un request a la API (`llamadas`) y puede
+sumar una latencia fija por llamada para simular el round-trip:
+
+    planilla = PlanillaSimulada({"stock": [["codigo", "stock"], ["A1", 10]]}, latencia_ms=80)
+    monkeypatch.setattr(tablas_handler, "gspread_client", ClienteSimulado(planilla))
+
+Cuota de Google (429): `cuota_por_minuto` rechaza las llamadas que exceden N requests en
+la ventana de 60 s (lecturas y escrituras por separado) y `fallar_429(n)` hace fallar las próximas n. El error es un
+gspread.exceptions.APIError con código 429, como el real (`rechazos_429` los cuenta).
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_to_rowcol, numericise_all, to_records
+
+LLAMADAS_ESCRITURA = frozenset({"update", "batch_update", "add_rows"})
+
+
+def error_cuota(operacion: str) -> APIError:
+    respuesta = requests.Response()
+    respuesta.status_code = 429
+    respuesta._content = json.dumps({
+        "error": {
+            "code": 429,
+            "message": f"Quota exceeded for quota metric 'Read requests' ({operacion}).",
+            "status": "RESOURCE_EXHAUSTED",
+        }
+    }).encode("utf-8")
+    return APIError(respuesta)
+
+
+class HojaSimulada:
+    def __init__(self, planilla: "PlanillaSimulada", title: str, filas: List[List[Any]], row_count: int = 1000):
+        self._planilla = planilla
+        self.title = title
+        self.filas = [list(fila) for fila in filas]
+        self.row_count = max(row_count, len(self.filas))
+
+    def _llamada(self, nombre: str) -> None:
+        self._planilla._llamada(nombre)
+
+    def get_all_records(self) -> List[Dict[str, Any]]:
+        self._llamada("get_all_records")
+        if not self.filas:
+            return []
+        encabezados = [str(e) for e in self.filas[0]]
+        # Igual que gspread: filas completadas al ancho del encabezado y celdas numéricas convertidas.
+        filas = [[fila[i] if i < len(fila) else "" for i in range(len(encabezados))] for fila in self.filas[1:]]
+        return to_records(encabezados, [numericise_all(fila) for fila in filas])
+
+    def get_all_values(self) -> List[List[Any]]:
+        self._llamada("get_all_values")
+        return [list(fila) for fila in self.filas]
+
+    def get(self, rango: str) -> List[List[Any]]:
+        """Valores de un rango A1 acotado; como la API, omite filas y columnas vacías al final."""
+        self._llamada("get")
+        inicio, _, fin = rango.partition(":")
+        fila0, col0 = a1_to_rowcol(inicio)
+        fila1, col1 = a1_to_rowcol(fin or inicio)
+        if fila1 > self.row_count:
+            raise ValueError(f"Rango {rango} fuera del grid ({self.row_count} filas)")
+        valores = []
+        for indice in range(fila0 - 1, fila1):
+            fila = self.filas[indice] if indice < len(self.filas) else []
+            celdas = list(fila[col0 - 1:col1])
+            while celdas and celdas[-1] in ("", None):
+                celdas.pop()
+            valores.append(celdas)
+        while valores and not valores[-1]:
+            valores.pop()
+        return valores
+
+    def row_values(self, fila: int) -> List[Any]:
+        self._llamada("row_values")
+        valores = list(self.filas[fila - 1]) if fila <= len(self.filas) else []
+        while valores and valores[-1] in ("", None):
+            valores.pop()
+        return valores
+
+    def col_values(self, col: int) -> List[Any]:
+        self._llamada("col_values")
+        valores = [fila[col - 1] if col <= len(fila) else "" for fila in self.filas]
+        while valores and valores[-1] in ("", None):
+            valores.pop()
+        return valores
+
+    def _escribir(self, rango: str, valores: List[List[Any]]) -> None:
+        inicio = rango.split(":")[0]
+        fila0, col0 = a1_to_rowcol(inicio)
+        if fila0 + len(valores) - 1 > self.row_count:
+            raise ValueError(f"Rango {rango} fuera del grid ({self.row_count} filas)")
+        for di, fila_valores in enumerate(valores):
+            indice = fila0 - 1 + di
+            while len(self.filas) <= indice:
+                self.filas.append([])
+            fila = self.filas[indice]
+            for dj, valor in enumerate(fila_valores):
+                col = col0 - 1 + dj
+                while len(fila) <= col:
+                    fila.append("")
+                fila[col] = valor
+        self._planilla._modificada()
+
+    def update(self, rango: str, valores: List[List[Any]], value_input_option: Optional[str] = None) -> None:
+        self._llamada("update")
+        self._escribir(rango, valores)
+
+    def batch_update(self, datos: List[Dict[str, Any]], value_input_option: Optional[str] = None) -> None:
+        self._llamada("batch_update")
+        for dato in datos:
+            self._escribir(dato["range"], dato["values"])
+
+    def add_rows(self, cantidad: int) -> None:
+        self._llamada("add_rows")
+        self.row_count += cantidad
+
+
+class PlanillaSimulada:
+    def __init__(
+        self,
+        hojas: Optional[Dict[str, List[List[Any]]]] = None,
+        latencia_ms: float = 0.0,
+        cuota_por_minuto: Optional[int] = None,
+    ):
+        self.latencia_ms = latencia_ms
+        self.cuota_por_minuto = cuota_por_minuto
+        self.llamadas: Counter = Counter()
+        self.rechazos_429: Counter = Counter()
+        # Como Google: la cuota por minuto de lecturas y la de escrituras son independientes.
+        self._ventanas: Dict[bool, Deque[float]] = {False: deque(), True: deque()}
+        self._fallos_pendientes = 0
+        self._lock = threading.Lock()
+        self._hojas: Dict[str, HojaSimulada] = {}
+        self._modificada_en = datetime.now(timezone.utc)
+        for titulo, filas in (hojas or {}).items():
+            self.agregar_hoja(titulo, filas)
+
+    def agregar_hoja(self, titulo: str, filas: List[List[Any]], row_count: int = 1000) -> HojaSimulada:
+        hoja = HojaSimulada(self, titulo, filas, row_count=row_count)
+        self._hojas[titulo] = hoja
+        return hoja
+
+    def hoja(self, titulo: str) -> HojaSimulada:
+        return self._hojas[titulo]
+
+    @property
+    def total_llamadas(self) -> int:
+        return sum(self.llamadas.values())
+
+    def fallar_429(self, cantidad: int = 1) -> None:
+        """Las próximas `cantidad` llamadas a la API responden 429."""
+        with self._lock:
+            self._fallos_pendientes += cantidad
+
+    def _llamada(self, nombre: str) -> None:
+        with self._lock:
+            self.llamadas[nombre] += 1
+            rechazar = self._fallos_pendientes > 0
+            if rechazar:
+                self._fallos_pendientes -= 1
+            elif self.cuota_por_minuto is not None:
+                ahora = time.monotonic()
+                ventana = self._ventanas[nombre in LLAMADAS_ESCRITURA]
+                while ventana and ahora - ventana[0] >= 60:
+                    ventana.popleft()
+                rechazar = len(ventana) >= self.cuota_por_minuto
+                if not rechazar:
+                    ventana.append(ahora)
+            if rechazar:
+                self.rechazos_429[nombre] += 1
+        if self.latencia_ms > 0:
+            time.sleep(self.latencia_ms / 1000)
+        if rechazar:
+            raise error_cuota(nombre)
+
+    def _modificada(self) -> None:
+        self._modificada_en = datetime.now(timezone.utc)
+
+    def worksheets(self) -> List[HojaSimulada]:
+        self._llamada("worksheets")
+        return list(self._hojas.values())
+
+    def worksheet(self, titulo: str) -> HojaSimulada:
+        self._llamada("worksheet")
+        if titulo not in self._hojas:
+            raise WorksheetNotFound(titulo)
+        return self._hojas[titulo]
+
+    def get_lastUpdateTime(self) -> str:
+        self._llamada("get_lastUpdateTime")
+        return self._modificada_en.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class ClienteSimulado:
+    def __init__(self, planilla: PlanillaSimulada):
+        self.planilla = planilla
+
+    def open_by_key(self, key: str) -> PlanillaSimulada:
+        self.planilla._llamada("open_by_key")
+        return self.planilla
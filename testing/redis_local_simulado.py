@@ -0,0 +1,153 @@
+"""
+Servidor mínimo que habla RESP (protocolo de Redis) para probar `BusRedis` sin Redis.
+
+Implementa solo lo que usa el bus del escáner: PING, AUTH, SELECT, RPUSH, LPUSH, LTRIM,
+LPOP, LLEN, BLPOP y DEL. Corre en un hilo con su propio event loop:
+
+    with RedisLocalSimulado() as servidor:
+        bus = BusRedis(servidor.url, maxlen=100)
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+def _bulk(dato: Optional[bytes]) -> bytes:
+    if dato is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(dato), dato)
+
+
+class RedisLocalSimulado:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.host = host
+        self.port = port
+        self._listas: Dict[bytes, Deque[bytes]] = {}
+        self._bloqueados: Dict[bytes, Deque[asyncio.Future]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._listo = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.comandos = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    def __enter__(self) -> "RedisLocalSimulado":
+        self.iniciar()
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.detener()
+
+    def iniciar(self) -> None:
+        self._hilo = threading.Thread(target=self._correr, daemon=True, name="redis-simulado")
+        self._hilo.start()
+        self._listo.wait(5)
+
+    def detener(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._hilo is not None:
+            self._hilo.join(5)
+
+    def _correr(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._atender, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._listo.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            pendientes = asyncio.all_tasks(self._loop)
+            for tarea in pendientes:
+                tarea.cancel()
+            self._loop.run_until_complete(asyncio.gather(*pendientes, return_exceptions=True))
+            self._loop.close()
+
+    async def _leer_comando(self, reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        linea = await reader.readline()
+        if not linea:
+            return None
+        cantidad = int(linea[1:-2])
+        partes: List[bytes] = []
+        for _ in range(cantidad):
+            largo = int((await reader.readline())[1:-2])
+            partes.append((await reader.readexactly(largo + 2))[:-2])
+        return partes
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                partes = await self._leer_comando(reader)
+                if partes is None:
+                    break
+                self.comandos += 1
+                writer.write(await self._ejecutar(partes))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _entregar_a_bloqueados(self, clave: bytes) -> None:
+        lista = self._listas.get(clave)
+        bloqueados = self._bloqueados.get(clave)
+        while lista and bloqueados:
+            fut = bloqueados.popleft()
+            if not fut.done():
+                fut.set_result(lista.popleft())
+
+    async def _ejecutar(self, partes: List[bytes]) -> bytes:
+        comando = partes[0].upper()
+        if comando in (b"PING", b"AUTH", b"SELECT"):
+            return b"+OK\r\n" if comando != b"PING" else b"+PONG\r\n"
+        if comando == b"RPUSH":
+            lista = self._listas.setdefault(partes[1], deque())
+            lista.extend(partes[2:])
+            largo = len(lista)
+            self._entregar_a_bloqueados(partes[1])
+            return b":%d\r\n" % largo
+        if comando == b"LPUSH":
+            lista = self._listas.setdefault(partes[1], deque())
+            lista.extendleft(partes[2:])
+            largo = len(lista)
+            self._entregar_a_bloqueados(partes[1])
+            return b":%d\r\n" % largo
+        if comando == b"LTRIM":
+            lista = self._listas.get(partes[1], deque())
+            inicio, fin = int(partes[2]), int(partes[3])
+            elementos = list(lista)
+            fin = len(elementos) if fin == -1 else fin + 1
+            self._listas[partes[1]] = deque(elementos[inicio:fin])
+            return b"+OK\r\n"
+        if comando == b"LPOP":
+            lista = self._listas.get(partes[1])
+            return _bulk(lista.popleft() if lista else None)
+        if comando == b"LLEN":
+            return b":%d\r\n" % len(self._listas.get(partes[1], ()))
+        if comando == b"DEL":
+            borrados = sum(1 for clave in partes[1:] if self._listas.pop(clave, None) is not None)
+            return b":%d\r\n" % borrados
+        if comando == b"BLPOP":
+            clave, timeout = partes[1], float(partes[2])
+            lista = self._listas.get(clave)
+            if lista:
+                dato = lista.popleft()
+            else:
+                fut = asyncio.get_running_loop().create_future()
+                self._bloqueados.setdefault(clave, deque()).append(fut)
+                try:
+                    dato = await asyncio.wait_for(fut, timeout=timeout or None)
+                except asyncio.TimeoutError:
+                    return b"*-1\r\n"
+            return b"*2\r\n" + _bulk(clave) + _bulk(dato)
+        return b"-ERR comando no soportado\r\n"
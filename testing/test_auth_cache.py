@@ -0,0 +1,201 @@
+# testing/test_auth_cache.py
+
+"""Tests de la caché de usuarios autenticados de back/security.py (SQLite en memoria)."""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.admin import admin_manager
+from back.modelos import Empresa, Rol, Usuario
+from back.security import (
+    CacheUsuariosAutenticados,
+    crear_access_token,
+    obtener_cache_usuarios,
+    obtener_principal_actual,
+    obtener_usuario_actual,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([Rol(id=1, nombre="Admin"), Rol(id=2, nombre="Cajero")])
+        db.add(Empresa(id=1, nombre_legal="Empresa Auth", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.commit()
+        db.add_all(
+            [
+                Usuario(id=1, nombre_usuario="admin", password_hash="x", id_rol=1, id_empresa=1),
+                Usuario(id=2, nombre_usuario="caja", password_hash="x", id_rol=2, id_empresa=1),
+            ]
+        )
+        db.commit()
+    obtener_cache_usuarios().limpiar()
+    yield engine
+    obtener_cache_usuarios().limpiar()
+
+
+def _token(nombre_usuario: str) -> str:
+    return crear_access_token({"sub": nombre_usuario, "id_empresa": 1})
+
+
+def _contar_consultas(engine):
+    contador = {"n": 0}
+
+    def _contar(*_args):
+        contador["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _contar)
+    return contador, lambda: event.remove(engine, "before_cursor_execute", _contar)
+
+
+def test_hit_devuelve_usuario_adjunto_sin_consultar(engine):
+    with Session(engine) as db:
+        obtener_usuario_actual(_token("caja"), db)
+
+    contador, quitar = _contar_consultas(engine)
+    try:
+        with Session(engine) as db:
+            usuario = obtener_usuario_actual(_token("caja"), db)
+            assert usuario in db
+            assert (usuario.id, usuario.id_empresa, usuario.rol.nombre) == (2, 1, "Cajero")
+            principal = obtener_principal_actual(_token("caja"), db)
+            assert (principal.id, principal.rol_nombre) == (2, "Cajero")
+    finally:
+        quitar()
+    assert contador["n"] == 0
+
+    # El usuario adjunto sigue siendo escribible (p. ej. PATCH /users/me/config).
+    with Session(engine) as db:
+        usuario = obtener_usuario_actual(_token("caja"), db)
+        usuario.configuracion = {"link": "x"}
+        db.add(usuario)
+        db.commit()
+    with Session(engine) as db:
+        assert db.get(Usuario, 2).configuracion == {"link": "x"}
+
+
+def _post_asgi(app, ruta: str, token: str, cuerpo: bytes) -> int:
+    estados = []
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": ruta,
+        "raw_path": ruta.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"content-type", b"application/json")],
+        "server": ("test", 80),
+        "client": ("test", 1),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": cuerpo, "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            estados.append(mensaje["status"])
+
+    asyncio.run(app(scope, receive, send))
+    return estados[0]
+
+
+def test_push_del_escaner_con_principal_cacheado_no_consulta(engine):
+    from fastapi import FastAPI
+
+    from back.api.blueprints import scanner_router
+    from back.database import get_db
+    from back.gestion.scanner_bus import BusEnMemoria, establecer_scanner_bus
+
+    app = FastAPI()
+    app.include_router(scanner_router.router)
+
+    def _db():
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _db
+    bus = BusEnMemoria(10)
+    anterior = establecer_scanner_bus(bus)
+    try:
+        assert _post_asgi(app, "/scanner/evento", _token("caja"), b'{"codigo": "1"}') == 200
+        contador, quitar = _contar_consultas(engine)
+        try:
+            assert _post_asgi(app, "/scanner/evento", _token("caja"), b'{"codigo": "2"}') == 200
+        finally:
+            quitar()
+        assert contador["n"] == 0
+        assert [bus.extraer(1)["codigo"], bus.extraer(1)["codigo"]] == ["1", "2"]
+    finally:
+        establecer_scanner_bus(anterior)
+
+
+def test_desactivar_y_cambiar_rol_invalidan(engine):
+    with Session(engine) as db:
+        assert obtener_usuario_actual(_token("caja"), db).rol.nombre == "Cajero"
+        admin = obtener_usuario_actual(_token("admin"), db)
+
+        admin_manager.cambiar_rol_de_usuario(db, 2, 1)
+        assert obtener_principal_actual(_token("caja"), db).rol_nombre == "Admin"
+
+        admin_manager.desactivar_usuario(db, 2, admin)
+    with Session(engine) as db:
+        with pytest.raises(HTTPException):
+            obtener_usuario_actual(_token("caja"), db)
+
+
+def test_invalidacion_durante_la_carga_no_deja_el_usuario_cacheado(engine):
+    invalidado = []
+
+    def _desactivar_en_paralelo(*_args):
+        if not invalidado:
+            # Otro request desactiva al usuario justo después de que esta carga lo leyó activo.
+            invalidado.append(True)
+            obtener_cache_usuarios().invalidar(id_usuario=2)
+
+    event.listen(engine, "after_cursor_execute", _desactivar_en_paralelo)
+    try:
+        with Session(engine) as db:
+            assert obtener_usuario_actual(_token("caja"), db).id == 2
+    finally:
+        event.remove(engine, "after_cursor_execute", _desactivar_en_paralelo)
+
+    assert invalidado
+    assert obtener_cache_usuarios().obtener("caja") is None
+    with Session(engine) as db:
+        obtener_usuario_actual(_token("caja"), db)
+    assert obtener_cache_usuarios().obtener("caja") is not None
+
+
+def test_lru_acotado_y_ttl_cero_desactiva():
+    cache = CacheUsuariosAutenticados(ttl_sec=60, maxsize=2)
+    rol = Rol(id=1, nombre="Admin")
+    usuarios = [Usuario(id=i, nombre_usuario=f"u{i}", password_hash="x", id_rol=1, id_empresa=1) for i in range(3)]
+    for usuario in usuarios:
+        usuario.rol = rol
+        cache.guardar(usuario)
+    assert cache.obtener("u0") is None
+    assert cache.obtener("u2")[2].id == 2
+
+    sin_cache = CacheUsuariosAutenticados(ttl_sec=0)
+    sin_cache.guardar(usuarios[0])
+    assert sin_cache.obtener("u0") is None
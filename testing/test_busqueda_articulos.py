@@ -0,0 +1,111 @@
+# testing/test_busqueda_articulos.py
+
+"""Tests del índice de búsqueda de artículos (SQLite en memoria)."""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.stock import articulos as articulos_manager
+from back.gestion.stock import indice_busqueda
+from back.gestion.stock.indice_busqueda import obtener_cache_indice_busqueda
+from back.modelos import Articulo, ArticuloCodigo, ConfiguracionEmpresa, Empresa
+from back.schemas.articulo_schemas import ArticuloUpdate
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    obtener_cache_indice_busqueda().invalidar()
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Empresa Busqueda", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20123456789", nombre_negocio="Busqueda"))
+        db.add_all(
+            [
+                Articulo(id=1, codigo_interno="CAF01", descripcion="Café molido 500g", precio_venta=100, id_empresa=1),
+                Articulo(id=2, codigo_interno="AZ1", descripcion="Azúcar común", precio_venta=100, id_empresa=1),
+                Articulo(id=3, codigo_interno="CAF1", descripcion="Taza para café", precio_venta=100, id_empresa=1),
+                Articulo(id=4, codigo_interno="GAL", descripcion="Galletitas de cafe con leche", precio_venta=100, id_empresa=1),
+                Articulo(id=5, codigo_interno="INA", descripcion="Café instantáneo", precio_venta=100, id_empresa=1, activo=False),
+            ]
+        )
+        db.add(ArticuloCodigo(codigo="7790001112223", id_articulo=2))
+        db.commit()
+        yield db
+    obtener_cache_indice_busqueda().invalidar()
+
+
+def _ids(db, termino, skip=0, limit=100):
+    return [a.id for a in articulos_manager.buscar_articulos_por_termino(db, 1, termino, skip, limit)]
+
+
+def test_ranking_sin_acentos_y_paginacion(db):
+    # Código exacto, luego prefijo de descripción, después palabra interna; inactivos afuera.
+    assert _ids(db, "CAF1") == [3]
+    assert _ids(db, "caf") == [1, 3, 4]
+    assert _ids(db, "cafe") == [1, 4, 3]
+    assert _ids(db, "CAFÉ") == _ids(db, "cafe")
+    assert _ids(db, "AZUCAR") == [2]
+    assert _ids(db, "leche cafe") == [4]
+    assert _ids(db, "7790001") == [2]
+    assert _ids(db, "cafe", skip=1, limit=1) == [4]
+    assert _ids(db, "ta") == [3, 4]
+    assert _ids(db, "inexistente") == []
+
+
+def test_indice_se_reconstruye_con_escrituras_y_version(db):
+    cache = obtener_cache_indice_busqueda()
+    assert _ids(db, "yerba") == []
+    construcciones = cache.construcciones
+    assert _ids(db, "cafe") == [1, 4, 3]
+    assert cache.construcciones == construcciones
+
+    articulos_manager.actualizar_articulo(1, db, 2, ArticuloUpdate(descripcion="Yerba mate"))
+    assert _ids(db, "yerba") == [2]
+
+    # Otro worker cambia el catálogo y sube la versión: el índice local deja de valer.
+    db.add(Articulo(id=6, codigo_interno="YB2", descripcion="Yerba suave", precio_venta=100, id_empresa=1))
+    db.get(ConfiguracionEmpresa, 1).catalogo_version += 1
+    db.commit()
+    assert _ids(db, "yerba") == [2, 6]
+
+
+def test_busquedas_concurrentes_construyen_el_indice_una_sola_vez(monkeypatch):
+    cache = indice_busqueda.CacheIndiceBusqueda(ttl_sec=60)
+    cargas = []
+
+    def _cargar_lento(db, id_empresa):
+        cargas.append(id_empresa)
+        time.sleep(0.2)
+        return indice_busqueda.IndiceArticulos.construir([], {})
+
+    class _SinConfig:
+        def get(self, *_args):
+            return None
+
+    monkeypatch.setattr(indice_busqueda, "_cargar_indice", _cargar_lento)
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener(_SinConfig(), 9))) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert cargas == [9]
+    assert len({id(indice) for indice in resultados}) == 1
+    assert cache.construcciones == 1
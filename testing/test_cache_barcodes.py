@@ -0,0 +1,85 @@
+# testing/test_cache_barcodes.py
+
+"""Tests del cache en memoria de códigos de barras usado por /articulos/codigos/buscar (SQLite en memoria)."""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import modo_especial_manager
+from back.gestion.stock import articulos as articulos_manager
+from back.gestion.stock.cache_barcodes import obtener_cache_barcodes
+from back.modelos import Articulo, ArticuloCodigo, ConfiguracionEmpresa, Empresa
+from back.schemas.modo_especial_schemas import ProductoModoEspecialCreate
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    obtener_cache_barcodes().limpiar()
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Empresa Escaner", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20123456789", nombre_negocio="Escaner"))
+        db.commit()
+        yield db
+    obtener_cache_barcodes().limpiar()
+
+
+def _crear(db, codigo, descripcion, barcodes=None):
+    producto = modo_especial_manager.crear_producto(
+        db, 1, ProductoModoEspecialCreate(
+            codigo_interno=codigo, descripcion=descripcion, precio_venta=100, categorias=["Varios"], barcodes=barcodes
+        )
+    )
+    return producto["id"]
+
+
+def _buscar(db, codigo):
+    articulo = articulos_manager.buscar_articulo_por_codigo(db, 1, codigo)
+    return articulo.id if articulo else None
+
+
+def test_resuelve_barcodes_legacy_e_internos_con_refresco_incremental(db):
+    leche = _crear(db, "LECHE", "Leche", barcodes=["7790001"])
+    pan = _crear(db, "PAN", "Pan")
+    # Fila vieja con varios códigos en un mismo registro.
+    db.add(ArticuloCodigo(id_articulo=pan, codigo="7790002;7790003"))
+    db.commit()
+
+    assert [_buscar(db, c) for c in ("7790001", "7790003", "PAN", " LECHE ", "nada")] == [leche, pan, pan, leche, None]
+
+    articulos_manager.anadir_codigo_a_articulo(db, leche, "7790009")
+    assert _buscar(db, "7790009") == leche
+    articulos_manager.eliminar_codigo_de_articulo(db, "7790001", leche)
+    assert _buscar(db, "7790001") is None
+    articulos_manager.eliminar_articulo(db, 1, pan)
+    assert _buscar(db, "7790002") is None and _buscar(db, "PAN") is None
+
+    metricas = obtener_cache_barcodes().metricas(1)[0]
+    assert metricas["reconstrucciones"] == 1
+    assert metricas["refrescos_incrementales"] >= 3
+    assert (metricas["articulos"], metricas["codigos"]) == (1, 2)
+    assert metricas["hits"] >= 5 and metricas["misses"] >= 3 and 0 < metricas["hit_rate"] < 1
+
+
+def test_baja_sin_subir_version_no_devuelve_articulo_inactivo(db):
+    leche = _crear(db, "LECHE", "Leche", barcodes=["7790001"])
+    assert _buscar(db, "7790001") == leche
+
+    # Otro proceso da de baja sin pasar por la bitácora: el cache todavía tiene el código.
+    db.get(Articulo, leche).activo = False
+    db.commit()
+    assert _buscar(db, "7790001") is None
@@ -0,0 +1,105 @@
+# testing/test_cache_comprobantes.py
+
+"""Tests de la caché de comprobantes generados (reimpresiones sin volver a renderizar)."""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.reportes.cache_comprobantes import (
+    CacheComprobantes,
+    clave_comprobante,
+    es_cacheable,
+    fijar_fecha_emision,
+)
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+
+VENTA = datetime(2026, 3, 14, 10, 30)
+
+
+def _request(total=1500.0, formato="texto", numero="0003-00000042", fecha_emision=VENTA):
+    return GenerarComprobanteRequest(
+        tipo="recibo",
+        numero=numero,
+        formato=formato,
+        fecha_emision=fecha_emision,
+        emisor={"cuit": "20123456789", "razon_social": "Kiosco Sur", "punto_venta": 3},
+        receptor={"nombre_razon_social": "Consumidor Final"},
+        transaccion={
+            "items": [{"cantidad": 1, "descripcion": "Alfajor", "precio_unitario": total, "subtotal": total}],
+            "total": total,
+        },
+    )
+
+
+def test_cache_lru_acotada_por_bytes():
+    cache = CacheComprobantes(max_bytes=100, ttl_sec=60)
+    cache.guardar("a", b"x" * 20)
+    cache.guardar("b", b"x" * 20)
+    cache.guardar("grande", b"x" * 30)  # más de la cuarta parte del presupuesto: no se guarda
+    assert cache.obtener("a") == b"x" * 20  # "a" pasa a ser la más reciente
+    cache.guardar("c", b"x" * 25)
+    cache.guardar("d", b"x" * 25)
+    cache.guardar("e", b"x" * 25)
+
+    assert cache.obtener("grande") is None
+    assert cache.obtener("b") is None
+    assert all(cache.obtener(k) is not None for k in ("a", "c", "d", "e"))
+    metricas = cache.metricas()
+    assert metricas["bytes"] <= 100
+    assert metricas["desalojos"] == 1
+
+    sin_ttl = CacheComprobantes(max_bytes=100, ttl_sec=0)
+    sin_ttl.guardar("a", b"x")
+    assert sin_ttl.obtener("a") is None
+
+
+def test_clave_depende_del_contenido():
+    assert clave_comprobante(_request()) == clave_comprobante(_request())
+    assert clave_comprobante(_request()) != clave_comprobante(_request(total=1501.0))
+    assert clave_comprobante(_request()) != clave_comprobante(_request(formato="ticket"))
+
+
+def test_solo_se_cachean_comprobantes_numerados():
+    assert es_cacheable(_request())
+    assert not es_cacheable(_request(numero=None))
+
+
+def test_la_fecha_impresa_entra_en_la_clave():
+    assert clave_comprobante(_request()) != clave_comprobante(_request(fecha_emision=datetime(2026, 3, 15, 10, 30)))
+    assert fijar_fecha_emision(_request()).fecha_emision == VENTA
+    fijada = fijar_fecha_emision(_request(fecha_emision=None)).fecha_emision
+    assert fijada is not None and (fijada.second, fijada.microsecond) == (0, 0)
+
+
+def test_reimpresion_sale_de_cache(monkeypatch):
+    try:
+        from back.gestion.reportes import generador_comprobantes
+    except OSError as e:  # weasyprint sin librerías del sistema (pango)
+        pytest.skip(str(e))
+    cache = CacheComprobantes(max_bytes=1024 * 1024, ttl_sec=60)
+    monkeypatch.setattr(generador_comprobantes, "obtener_cache_comprobantes", lambda: cache)
+    renders = []
+    original = generador_comprobantes._generar_comprobante
+    monkeypatch.setattr(
+        generador_comprobantes, "_generar_comprobante", lambda data: renders.append(data.tipo) or original(data)
+    )
+
+    primero = generador_comprobantes.generar_comprobante_stateless(_request())
+    segundo = generador_comprobantes.generar_comprobante_stateless(_request())
+    generador_comprobantes.generar_comprobante_stateless(_request(total=99.0))
+    # Sin número ni CAE no se cachea.
+    generador_comprobantes.generar_comprobante_stateless(_request(numero=None))
+    generador_comprobantes.generar_comprobante_stateless(_request(numero=None))
+
+    assert primero == segundo and b"Alfajor" in primero
+    assert b"14/03/2026" in primero
+    assert len(renders) == 4
+    assert (cache.hits, cache.misses) == (1, 2)
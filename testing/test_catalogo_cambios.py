@@ -0,0 +1,92 @@
+# testing/test_catalogo_cambios.py
+
+"""Tests de la bitácora de cambios del catálogo y del endpoint delta /articulos/cambios (SQLite en memoria)."""
+
+import os
+import sys
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Response
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.api.blueprints.articulos_router import api_catalogo_cambios
+from back.gestion import modo_especial_manager
+from back.gestion.stock import articulos as articulos_manager
+from back.gestion.stock import catalogo_cambios
+from back.modelos import Articulo, CatalogoCambio, ConfiguracionEmpresa, Empresa
+from back.schemas.articulo_schemas import ArticuloUpdate
+from back.schemas.modo_especial_schemas import ProductoModoEspecialCreate
+
+USUARIO = SimpleNamespace(id_empresa=1)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Empresa Delta", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20123456789", nombre_negocio="Delta"))
+        db.commit()
+        yield db
+
+
+def _crear(db, codigo, descripcion):
+    producto = modo_especial_manager.crear_producto(
+        db, 1, ProductoModoEspecialCreate(codigo_interno=codigo, descripcion=descripcion, precio_venta=100, categorias=["Varios"])
+    )
+    return db.get(Articulo, producto["id"])
+
+
+def _cambios(db, desde, if_none_match=None):
+    response = Response()
+    resultado = api_catalogo_cambios(response, desde, if_none_match, USUARIO, db)
+    return resultado, response
+
+
+def test_delta_con_altas_modificaciones_y_bajas(db):
+    uno = _crear(db, "A1", "Uno")
+    dos = _crear(db, "A2", "Dos")
+    base = catalogo_cambios.version_catalogo(db, 1)
+    assert base == 2
+
+    articulos_manager.actualizar_articulo(1, db, uno.id, ArticuloUpdate(descripcion="Uno bis"))
+    articulos_manager.anadir_codigo_a_articulo(db, uno.id, "7790001")
+    articulos_manager.eliminar_articulo(db, 1, dos.id)
+    tres = _crear(db, "A3", "Tres")
+
+    delta, response = _cambios(db, base)
+    assert (delta.version, delta.desde_version, delta.completo) == (6, 2, False)
+    assert [(a.id, a.descripcion) for a in delta.articulos] == [(uno.id, "Uno bis"), (tres.id, "Tres")]
+    assert [c.codigo for c in delta.articulos[0].codigos] == ["7790001"]
+    assert delta.bajas == [dos.id]
+    assert response.headers["ETag"] == '"catalogo-6"'
+
+    # Al día: 304 sin cuerpo con If-None-Match, delta vacío sin él.
+    assert _cambios(db, 6, 'W/"catalogo-6"')[0].status_code == 304
+    vacio, _ = _cambios(db, 6)
+    assert (vacio.articulos, vacio.bajas, vacio.completo) == ([], [], False)
+
+
+def test_version_fuera_de_bitacora_pide_catalogo_completo(db, monkeypatch):
+    monkeypatch.setattr(catalogo_cambios, "CATALOGO_CAMBIOS_MAX_VERSIONES", 3)
+    articulo = _crear(db, "A1", "Uno")
+    for i in range(5):
+        articulos_manager.actualizar_articulo(1, db, articulo.id, ArticuloUpdate(precio_venta=100 + i))
+
+    # Versión 6: la bitácora conserva 4..6, así que se puede pedir desde la 3 pero no desde la 2.
+    assert sorted({c.version for c in db.exec(select(CatalogoCambio)).all()}) == [4, 5, 6]
+    assert _cambios(db, 3)[0].completo is False
+    assert _cambios(db, 2)[0].completo is True
+    assert _cambios(db, 9)[0].completo is True
@@ -0,0 +1,48 @@
+# testing/test_comprobantes_emitidos.py
+
+"""Tests de los CAE guardados antes del render: un reintento reutiliza el CAE en vez de facturar otra vez."""
+
+import os
+import sys
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import comprobantes_emitidos_manager as emitidos
+from back.modelos import ComprobanteEmitido
+
+_AFIP = {"cae": "74123456789012", "numero_comprobante": 42, "punto_venta": 3, "tipo_comprobante": 6}
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[ComprobanteEmitido.__table__])
+    with Session(engine) as sesion:
+        yield sesion
+
+
+def test_sin_idempotency_key_no_se_deduplica():
+    # Dos ventas iguales de consumidor final son dos facturas: sin clave no hay nada que reutilizar.
+    assert emitidos.clave_emision(None) is None
+    assert emitidos.clave_emision("   ") is None
+
+
+def test_reintento_con_la_misma_clave_reutiliza_el_cae(db):
+    clave = emitidos.clave_emision(" venta-981 ")
+    assert clave == "cliente:venta-981"
+    assert emitidos.buscar_emision(db, 1, clave) is None
+
+    emitidos.guardar_emision(db, 1, clave, _AFIP)
+    emitidos.guardar_emision(db, 1, clave, _AFIP)  # reintento concurrente: no rompe
+    assert emitidos.buscar_emision(db, 1, clave) == _AFIP
+    assert emitidos.buscar_emision(db, 2, clave) is None
+    assert emitidos.buscar_emision(db, 1, emitidos.clave_emision("venta-982")) is None
+
+    # "Descargar de nuevo" después de entregar sigue usando el mismo CAE.
+    emitidos.confirmar_entrega(db, 1, clave)
+    assert emitidos.buscar_emision(db, 1, clave) == _AFIP
@@ -0,0 +1,132 @@
+# testing/test_configuracion_cache.py
+
+"""Tests de la caché de configuración/perfil resuelto por empresa (SQLite en memoria)."""
+
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, text
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import configuracion_manager, perfil_operativo_manager
+from back.gestion.configuracion_cache import CacheConfiguracionResuelta, obtener_cache_configuracion
+from back.modelos import ConfiguracionEmpresa, Empresa
+from back.schemas.configuracion_schemas import ConfiguracionUpdate
+from back.schemas.perfil_operativo_schemas import MigrarEsquemaRequest, PerfilOperativoUpdate, TipoEsquemaEmpresa
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        empresa = Empresa(
+            nombre_legal="Empresa Cache",
+            nombre_fantasia="Cache",
+            cuit="20111111112",
+            activa=True,
+            creada_en=datetime.now(timezone.utc),
+        )
+        db.add(empresa)
+        db.commit()
+        db.refresh(empresa)
+        db.add(ConfiguracionEmpresa(id_empresa=empresa.id, cuit=empresa.cuit, nombre_negocio="Cache"))
+        db.commit()
+    obtener_cache_configuracion().limpiar()
+    yield engine
+    obtener_cache_configuracion().limpiar()
+
+
+def _contar_consultas(engine):
+    contador = {"n": 0}
+
+    def _contar(*_args):
+        contador["n"] += 1
+
+    event.listen(engine, "before_cursor_execute", _contar)
+    return contador, lambda: event.remove(engine, "before_cursor_execute", _contar)
+
+
+def test_segunda_resolucion_no_consulta_la_db(engine):
+    with Session(engine) as db:
+        primero = perfil_operativo_manager.obtener_perfil_resuelto(db, 1)
+
+    contador, quitar = _contar_consultas(engine)
+    try:
+        with Session(engine) as db:
+            assert perfil_operativo_manager.obtener_perfil_resuelto(db, 1) is primero
+            assert perfil_operativo_manager.empresa_sincroniza_google_sheets(db, 1) is True
+    finally:
+        quitar()
+    assert contador["n"] == 0
+
+    fila = obtener_cache_configuracion().metricas()[0]
+    assert fila["endpoint"] == "fuera_de_request"
+    assert (fila["hits"], fila["misses"]) == (2, 1)
+    assert fila["consultas_ahorradas"] == 2 * fila["consultas_carga"] > 0
+
+
+def test_escrituras_de_los_managers_invalidan(engine):
+    with Session(engine) as db:
+        assert perfil_operativo_manager.obtener_perfil_resuelto(db, 1).modo_especial is False
+
+        perfil_operativo_manager.migrar_esquema(
+            db, 1, MigrarEsquemaRequest(tipo_esquema=TipoEsquemaEmpresa.ESPECIAL, plantilla_id="modo_especial_pos")
+        )
+        assert perfil_operativo_manager.obtener_perfil_resuelto(db, 1).modo_especial is True
+
+        perfil_operativo_manager.actualizar_perfil_operativo(db, 1, PerfilOperativoUpdate(mesas_habilitado=True))
+        assert perfil_operativo_manager.obtener_perfil_resuelto(db, 1).mesas_habilitado is True
+
+        configuracion_manager.actualizar_configuracion_parcial(db, 1, ConfiguracionUpdate(nombre_negocio="Nuevo"))
+        assert perfil_operativo_manager.resolver_configuracion_empresa(db, 1).estandar.nombre_negocio == "Nuevo"
+
+
+def test_carga_concurrente_con_invalidacion_no_queda_cacheada():
+    cache = CacheConfiguracionResuelta(ttl_sec=60)
+
+    class _SinBind:
+        def get_bind(self):
+            raise RuntimeError("sin engine")
+
+    def _cargar_viejo():
+        # Otro request escribe la configuración mientras esta carga leía la versión anterior.
+        cache.invalidar(7)
+        return "viejo"
+
+    assert cache.obtener(_SinBind(), 7, _cargar_viejo) == "viejo"
+    assert cache.obtener(_SinBind(), 7, lambda: "nuevo") == "nuevo"
+    assert cache.obtener(_SinBind(), 7, lambda: "no se llama") == "nuevo"
+
+
+def test_carga_no_cuenta_consultas_de_otros_hilos(engine):
+    cache = CacheConfiguracionResuelta(ttl_sec=60)
+
+    def _consultar():
+        with Session(engine) as otra:
+            for _ in range(5):
+                otra.exec(text("SELECT 1"))
+
+    def _cargar():
+        hilo = threading.Thread(target=_consultar)
+        hilo.start()
+        hilo.join()
+        with Session(engine) as db:
+            db.exec(text("SELECT 1"))
+        return "config"
+
+    with Session(engine) as db:
+        assert cache.obtener(db, 1, _cargar) == "config"
+    assert cache.metricas()[0]["consultas_carga"] == 1
@@ -0,0 +1,101 @@
+# testing/test_escpos.py
+
+"""Tests de la salida ESC/POS nativa (comandos de impresora térmica, sin HTML→PDF)."""
+
+import os
+import sys
+
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.schemas.comprobante_schemas import GenerarComprobanteRequest
+
+try:
+    from back.gestion.reportes import generador_escpos
+except OSError as e:  # weasyprint sin librerías del sistema (pango)
+    pytest.skip(str(e), allow_module_level=True)
+
+_CORTE = b"\x1dVB\x03"
+
+
+def _request(tipo="factura", **kwargs):
+    return GenerarComprobanteRequest(
+        tipo=tipo,
+        formato="escpos",
+        emisor={"cuit": "30711223345", "razon_social": "Almacén Ñandú", "punto_venta": 5},
+        receptor={"nombre_razon_social": "Consumidor Final", "cuit_o_dni": "0"},
+        transaccion={
+            "items": [{"cantidad": 2, "descripcion": "Café", "precio_unitario": 100.0, "subtotal": 200.0}],
+            "total": 200.0,
+            "pagos": [{"forma_pago": "Efectivo", "monto": 200.0}],
+            "afip": {
+                "fecha_emision": "2026-10-17",
+                "tipo_comprobante_afip": 6,
+                "numero_comprobante": 12,
+                "codigo_tipo_doc_receptor": 99,
+                "cae": "76123456789012",
+                "fecha_vencimiento_cae": "2026-10-27",
+            },
+        },
+        **kwargs,
+    )
+
+
+def test_builder_resaltado_codepage_y_corte():
+    ticket = generador_escpos.TicketEscposBuilder(32)
+    ticket.centrado("Ñandú", resaltado=True).par("TOTAL", "$10.00").corte()
+    contenido = ticket.build()
+
+    assert contenido.startswith(b"\x1b@\x1bt\x13")
+    assert b"\x1ba\x01\x1bE\x01\x1d!\x01\xa5and\xa3\n\x1bE\x00\x1d!\x00" in contenido
+    assert b"TOTAL" + b" " * 21 + b"$10.00\n" in contenido
+    assert contenido.endswith(_CORTE) and contenido.count(_CORTE) == 1
+
+
+def test_factura_con_qr_nativo_y_ticket_de_cambio():
+    contenido = generador_escpos.generar_comprobante_escpos(_request(incluir_ticket_cambio=True))
+
+    assert b"\x1d(k" in contenido and b"https://www.afip.gob.ar/fe/qr/?p=" in contenido
+    assert b"[ QR AFIP ]" not in contenido
+    assert b"CAE N: 76123456789012" in contenido
+    assert b"TICKET DE CAMBIO" in contenido
+    assert contenido.count(_CORTE) == 2
+    assert "café".encode("cp858") in contenido.lower()
+
+
+def test_comanda_y_cierre():
+    comanda = generador_escpos.generar_comprobante_escpos(_request("comanda"))
+    assert b"COMANDA" in comanda and b"2 x Caf\x82" in comanda
+    assert b"$" not in comanda
+    assert len(comanda) < 300
+
+    datos = {
+        "empresa": {"nombre_legal": "Almacén Sur", "cuit": "20123456789"},
+        "sesion": {"id": 7, "saldo_inicial": 1000, "saldo_final_calculado": 1500, "saldo_final_declarado": 1490, "diferencia": -10},
+        "usuario_apertura": "ana",
+        "usuario_cierre": "luis",
+        "totales": {"ventas": 500, "propinas": 0, "ingresos": 0, "egresos": 0},
+        "desglose_metodos_pago": {"efectivo": 500, "transferencia": 0, "bancario": 0},
+        "desglose_ingresos": [],
+        "desglose_egresos": [{"concepto": "Proveedor de hielo", "monto": 35.5}],
+        "ancho_impresora": "58mm",
+    }
+    cierre = generador_escpos.generar_ticket_cierre_escpos(datos)
+    assert b"CIERRE DE CAJA" in cierre and b"Sesion ID: 7" in cierre
+    assert b"DIFERENCIA:" + b" " * 14 + b"$-10.00" in cierre
+    assert b"Proveedor de hielo:" in cierre and b"Detalle de Ingresos" not in cierre
+
+
+def test_formato_escpos_y_comandera_solo_si_se_pide():
+    from back.gestion.reportes.adapters_mesas import _formato_comandera
+
+    assert all(generador_escpos.es_formato_escpos(f) for f in ("escpos", "ESC/POS", " raw "))
+    assert not generador_escpos.es_formato_escpos("ticket")
+    # Solo con formato explícito: el cliente que no lo pide no sabe qué hacer con bytes RAW.
+    assert _formato_comandera("escpos") == "escpos"
+    assert _formato_comandera(" ESC/POS ") == "escpos"
+    assert _formato_comandera("pdf") == "ticket"
+    assert _formato_comandera(None) == "ticket"
@@ -0,0 +1,129 @@
+# testing/test_eventos_tiempo_real.py
+
+"""Tests del diario de eventos del canal push (memoria y SQLite; sin MySQL)."""
+
+import asyncio
+import inspect
+import os
+import sys
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.eventos_tiempo_real import (
+    EVENTO_COCINA_ESTADO,
+    EVENTO_COMANDA_NUEVA,
+    DiarioEnMemoria,
+    DiarioSQLite,
+)
+from back.api.blueprints.eventos_router import _id_empresa_desde_request, stream_eventos
+from back.security import crear_access_token, crear_ticket_eventos, decodificar_token
+
+
+def test_memoria_reanuda_desde_ultimo_id():
+    diario = DiarioEnMemoria(maxlen=10)
+    inicio = diario.ultimo_id(1)
+    id_a = diario.publicar(1, EVENTO_COMANDA_NUEVA, {"id_detalle": 1})
+    diario.publicar(1, EVENTO_COCINA_ESTADO, {"id_detalle": 1, "estado_cocina": "LISTO"})
+    diario.publicar(2, EVENTO_COMANDA_NUEVA, {"id_detalle": 99})
+
+    eventos, resync = diario.leer_desde(1, inicio)
+    assert not resync
+    assert [e["tipo"] for e in eventos] == [EVENTO_COMANDA_NUEVA, EVENTO_COCINA_ESTADO]
+
+    eventos, resync = diario.leer_desde(1, id_a)
+    assert not resync
+    assert [e["datos"].get("estado_cocina") for e in eventos] == ["LISTO"]
+
+
+def test_memoria_pide_resync_si_el_id_salio_del_buffer_o_es_de_otra_epoca():
+    diario = DiarioEnMemoria(maxlen=2)
+    primero = diario.publicar(1, EVENTO_COMANDA_NUEVA, {"n": 1})
+    for n in range(2, 6):
+        diario.publicar(1, EVENTO_COMANDA_NUEVA, {"n": n})
+
+    assert diario.leer_desde(1, primero) == ([], True)
+    assert diario.leer_desde(1, "otraepoca-3") == ([], True)
+
+
+def test_memoria_esperar_despierta_a_todos_los_streams():
+    diario = DiarioEnMemoria(maxlen=10)
+    desde = diario.ultimo_id(3)
+
+    async def _escenario():
+        streams = [asyncio.create_task(diario.esperar(3, desde, 5)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        t0 = time.perf_counter()
+        threading.Thread(target=diario.publicar, args=(3, EVENTO_COMANDA_NUEVA, {"id_detalle": 5})).start()
+        resultados = await asyncio.gather(*streams)
+        return resultados, time.perf_counter() - t0
+
+    resultados, demora = asyncio.run(_escenario())
+    assert demora < 0.2
+    assert all(len(eventos) == 1 and not resync for eventos, resync in resultados)
+
+
+def test_sqlite_evento_de_un_worker_llega_al_stream_de_otro(tmp_path):
+    ruta = str(tmp_path / "eventos.sqlite3")
+    worker_a = DiarioSQLite(ruta, maxlen=10, intervalo_vigia_sec=0.01)
+    worker_b = DiarioSQLite(ruta, maxlen=10, intervalo_vigia_sec=0.01)
+    try:
+        desde = worker_b.ultimo_id(4)
+
+        async def _escenario():
+            stream = asyncio.create_task(worker_b.esperar(4, desde, 5))
+            await asyncio.sleep(0.05)
+            threading.Thread(target=worker_a.publicar, args=(4, EVENTO_COMANDA_NUEVA, {"id_detalle": 8})).start()
+            return await stream
+
+        eventos, resync = asyncio.run(_escenario())
+        assert not resync
+        assert eventos[0]["datos"] == {"id_detalle": 8}
+    finally:
+        worker_a.cerrar()
+        worker_b.cerrar()
+
+
+def test_sqlite_poda_y_resync(tmp_path):
+    diario = DiarioSQLite(str(tmp_path / "eventos.sqlite3"), maxlen=2)
+    primero = diario.publicar(5, EVENTO_COMANDA_NUEVA, {"n": 1})
+    segundo = diario.publicar(5, EVENTO_COMANDA_NUEVA, {"n": 2})
+    diario.publicar(5, EVENTO_COMANDA_NUEVA, {"n": 3})
+    diario.publicar(6, EVENTO_COMANDA_NUEVA, {"n": 1})
+    diario.publicar(5, EVENTO_COMANDA_NUEVA, {"n": 4})
+
+    # Quedan 3 y 4: quien vio el 1 perdió el 2; quien vio el 2 no perdió nada.
+    assert diario.leer_desde(5, primero) == ([], True)
+    eventos, resync = diario.leer_desde(5, segundo)
+    assert not resync
+    assert [e["datos"]["n"] for e in eventos] == [3, 4]
+
+
+def test_ticket_del_stream_no_se_intercambia_con_el_access_token():
+    request = Request({"type": "http", "headers": []})
+    ticket = crear_ticket_eventos(7)
+
+    assert _id_empresa_desde_request(request, ticket=ticket) == 7
+    # El ticket no sirve como access token...
+    with pytest.raises(HTTPException):
+        decodificar_token(ticket)
+    # ...y el JWT de sesión no se acepta en la URL.
+    with pytest.raises(HTTPException):
+        _id_empresa_desde_request(request, ticket=crear_access_token({"sub": "cajero", "id_empresa": 7}))
+
+    con_header = Request({
+        "type": "http",
+        "headers": [(b"authorization", f"Bearer {crear_access_token({'sub': 'cajero', 'id_empresa': 7})}".encode())],
+    })
+    assert _id_empresa_desde_request(con_header) == 7
+
+
+def test_stream_no_consume_el_escaner_por_defecto():
+    assert inspect.signature(stream_eventos).parameters["incluir_scanner"].default.default is False
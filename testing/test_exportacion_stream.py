@@ -0,0 +1,82 @@
+# testing/test_exportacion_stream.py
+
+"""Tests de la exportación del catálogo en streaming con compresión negociada (SQLite en memoria)."""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import modo_especial_manager
+from back.modelos import Articulo, ArticuloCodigo, Empresa
+from back.utils import respuesta_stream as stream
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Empresa Export", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add_all(
+            [
+                Articulo(id=i, codigo_interno=f"A{i}", descripcion=f"Artículo {i:02d}", precio_venta=10 * i, id_empresa=1)
+                for i in range(1, 8)
+            ]
+        )
+        db.add(Articulo(id=8, codigo_interno="X", descripcion="Inactivo", precio_venta=1, id_empresa=1, activo=False))
+        db.add(ArticuloCodigo(codigo="7790001", id_articulo=3))
+        db.commit()
+        yield db
+
+
+def _leer(respuesta) -> bytes:
+    async def _juntar():
+        return b"".join([bloque async for bloque in respuesta.body_iterator])
+
+    return asyncio.run(_juntar())
+
+
+def test_iterar_por_lotes_igual_que_listar(db):
+    vistos = [p["codigo_interno"] for p in modo_especial_manager.iterar_productos(db, 1, lote=3)]
+    assert vistos == [p["codigo_interno"] for p in modo_especial_manager.listar_productos(db, 1)]
+    assert vistos == [f"A{i}" for i in range(1, 8)]
+
+    filas = list(csv.DictReader(io.StringIO(modo_especial_manager.exportar_csv(db, 1))))
+    assert [f["Codigo"] for f in filas] == vistos
+    assert filas[2]["CodigoBarras"] == "7790001"
+
+
+@pytest.mark.parametrize("accept_encoding, esperado", [("gzip, deflate, br", "br"), ("gzip;q=1, br;q=0", "gzip"), ("identity", None)])
+def test_respuesta_comprimida_segun_accept_encoding(db, accept_encoding, esperado):
+    if esperado == "br" and stream.brotli is None:
+        pytest.skip("brotli no instalado")
+    respuesta = stream.respuesta_stream(
+        stream.en_sesion_propia(db, lambda sesion: modo_especial_manager.iterar_ndjson(sesion, 1)),
+        "application/x-ndjson",
+        accept_encoding,
+    )
+    assert respuesta.headers.get("content-encoding") == esperado
+    cuerpo = _leer(respuesta)
+    if esperado == "br":
+        cuerpo = stream.brotli.decompress(cuerpo)
+    elif esperado == "gzip":
+        cuerpo = gzip.decompress(cuerpo)
+    lineas = [json.loads(l) for l in cuerpo.decode("utf-8").splitlines()]
+    assert [l["descripcion"] for l in lineas] == [f"Artículo {i:02d}" for i in range(1, 8)]
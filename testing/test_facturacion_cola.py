@@ -0,0 +1,166 @@
+# testing/test_facturacion_cola.py
+
+"""Tests de la cola de facturación AFIP asíncrona (SQLite en memoria, AFIP simulado)."""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import facturacion_afip
+from back.gestion import facturacion_cola_manager as cola
+from back.modelos import Empresa, FacturaPendiente, Venta
+from back.schemas.comprobante_schemas import EmisorData
+
+_EMISOR = EmisorData(cuit="30711223345", razon_social="Almacén Cola", punto_venta=5, condicion_iva="Responsable Inscripto")
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Empresa Cola", cuit="30711223345", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(Venta(id=10, total=1210.0, id_usuario=1, id_caja_sesion=1, id_empresa=1))
+        db.commit()
+        cola.encolar_factura_venta(db, 1, 10, cola.payload_factura(1210.0, _EMISOR, None, "ticket", "Factura B"))
+        db.commit()
+
+    eventos = []
+    monkeypatch.setattr(cola, "publicar_evento_empresa", lambda id_empresa, tipo, datos: eventos.append((id_empresa, tipo, datos)))
+    engine.eventos = eventos
+    return engine
+
+
+def _afip(monkeypatch, efecto):
+    llamadas = []
+
+    def generar(db, venta_a_facturar, total, cliente_data, emisor_data, formato_comprobante, tipo_solicitado):
+        llamadas.append((venta_a_facturar.id, total, emisor_data.cuit, formato_comprobante))
+        if isinstance(efecto, Exception):
+            raise efecto
+        venta_a_facturar.facturada = True
+        venta_a_facturar.datos_factura = efecto
+        db.add(venta_a_facturar)
+        db.commit()
+        return efecto
+
+    monkeypatch.setattr(facturacion_afip, "generar_factura_para_venta", generar)
+    return llamadas
+
+
+def test_encolar_es_idempotente_por_venta(engine):
+    with Session(engine) as db:
+        otra = cola.encolar_factura_venta(db, 1, 10, {"total": 1.0})
+        db.commit()
+        assert db.exec(select(FacturaPendiente)).all() == [otra]
+        assert otra.payload["total"] == 1210.0
+        assert cola.estado_factura_venta(db, 10, 1)["estado"] == "PENDIENTE"
+        assert cola.estado_factura_venta(db, 10, 2) is None
+
+
+def test_factura_exitosa_se_completa_y_se_publica(engine, monkeypatch):
+    llamadas = _afip(monkeypatch, {"cae": "76123456789012", "numero_comprobante": "7", "tipo_comprobante": "Factura B"})
+    with Session(engine) as db:
+        assert cola.procesar_cola_facturas(db, worker_id="w1")["completados"] == 1
+        estado = cola.estado_factura_venta(db, 10, 1)
+        assert estado["estado"] == "EXITOSO" and estado["datos_factura"]["cae"] == "76123456789012"
+        assert cola.metricas_cola_facturas(db, 1)["profundidad"] == 0
+
+    assert llamadas == [(10, 1210.0, "30711223345", "ticket")]
+    (id_empresa, tipo, datos), = engine.eventos
+    assert (id_empresa, tipo, datos["estado"], datos["cae"]) == (1, cola.EVENTO_FACTURA_ESTADO, "EXITOSO", "76123456789012")
+
+
+def test_error_transitorio_reprograma_y_error_de_datos_falla(engine, monkeypatch):
+    _afip(monkeypatch, RuntimeError("microservicio AFIP caído"))
+    with Session(engine) as db:
+        assert cola.procesar_cola_facturas(db, worker_id="w1")["reprogramados"] == 1
+        item = db.exec(select(FacturaPendiente)).one()
+        assert (item.estado, item.intentos) == ("pendiente", 1)
+        assert item.proximo_reintento_en > datetime.utcnow()
+        # No está listo hasta que venza el backoff.
+        assert cola.procesar_cola_facturas(db, worker_id="w1")["procesados"] == 0
+
+        item.proximo_reintento_en = datetime.utcnow()
+        db.commit()
+        _afip(monkeypatch, ValueError("punto de venta inválido"))
+        assert cola.procesar_cola_facturas(db, worker_id="w1")["fallidos"] == 1
+        assert cola.estado_factura_venta(db, 10, 1)["estado"] == "FALLIDO"
+
+        assert cola.reintentar_factura_venta(db, 10, 1).estado == "pendiente"
+        assert cola.reintentar_factura_venta(db, 10, 1) is None
+
+    assert [datos["estado"] for _, _, datos in engine.eventos] == ["PENDIENTE", "FALLIDO"]
+
+
+def test_venta_ya_facturada_no_vuelve_a_llamar_a_afip(engine, monkeypatch):
+    llamadas = _afip(monkeypatch, {"cae": "1"})
+    with Session(engine) as db:
+        venta = db.get(Venta, 10)
+        venta.facturada, venta.datos_factura = True, {"cae": "999"}
+        db.commit()
+        assert cola.procesar_cola_facturas(db, worker_id="w1")["completados"] == 1
+    assert llamadas == []
+
+
+@pytest.mark.parametrize("formato", ["escpos", "ESC/POS", "raw"])
+def test_escpos_pide_a_afip_el_mismo_comprobante_que_ticket(formato):
+    CondicionIVA = facturacion_afip.CondicionIVA
+    for emisor in (CondicionIVA.RESPONSABLE_INSCRIPTO, CondicionIVA.MONOTRIBUTO):
+        ticket = facturacion_afip.determinar_logica_comprobante(emisor, CondicionIVA.CONSUMIDOR_FINAL, 1210.0, formato="ticket")
+        assert facturacion_afip.determinar_logica_comprobante(emisor, CondicionIVA.CONSUMIDOR_FINAL, 1210.0, formato=formato) == ticket
+    assert ticket["tipo_afip"] == 11
+    assert facturacion_afip.determinar_logica_comprobante(
+        CondicionIVA.RESPONSABLE_INSCRIPTO, CondicionIVA.CONSUMIDOR_FINAL, 1210.0, formato=formato
+    )["tipo_afip"] == 83
+
+
+def test_item_retomado_por_otro_worker_no_llama_a_afip(engine, monkeypatch):
+    llamadas = _afip(monkeypatch, {"cae": "76123456789012"})
+    with Session(engine) as db:
+        db.add(Venta(id=11, total=500.0, id_usuario=1, id_caja_sesion=1, id_empresa=1))
+        db.commit()
+        cola.encolar_factura_venta(db, 1, 11, cola.payload_factura(500.0, _EMISOR, None, "ticket", "Factura B"))
+        db.commit()
+
+    reclamar_real = cola.reclamar_facturas_pendientes
+
+    def reclamar_y_perder_el_segundo(db, max_items, worker_id, lease_sec=cola.FACTURACION_LEASE_SEC):
+        items = reclamar_real(db, max_items, worker_id, lease_sec)
+        # Mientras w1 factura la venta 10, el lease de la 11 vence y la retoma w2.
+        with Session(engine) as otra:
+            item = otra.exec(select(FacturaPendiente).where(FacturaPendiente.id_venta == 11)).one()
+            item.reclamado_por, item.lease_hasta = "w2", datetime.utcnow()
+            otra.add(item)
+            otra.commit()
+        return items
+
+    monkeypatch.setattr(cola, "reclamar_facturas_pendientes", reclamar_y_perder_el_segundo)
+    with Session(engine) as db:
+        resumen = cola.procesar_cola_facturas(db, max_items=5, worker_id="w1")
+        assert (resumen["completados"], resumen["lease_perdido"]) == (1, 1)
+        item = db.exec(select(FacturaPendiente).where(FacturaPendiente.id_venta == 11)).one()
+        assert (item.estado, item.reclamado_por) == ("procesando", "w2")
+    assert [venta for venta, *_ in llamadas] == [10]
+
+
+def test_cae_guardado_por_otro_intento_no_se_vuelve_a_pedir(engine, monkeypatch):
+    llamadas = _afip(monkeypatch, {"cae": "1"})
+    with Session(engine) as db:
+        venta = db.get(Venta, 10)
+        venta.datos_factura = {"cae": "76123456789012"}  # CAE guardado, el cierre no llegó a marcarla
+        db.commit()
+        assert cola.procesar_cola_facturas(db, worker_id="w1")["completados"] == 1
+    assert llamadas == []
@@ -0,0 +1,64 @@
+# testing/test_mapeo_articulos.py
+
+"""Tests del plan de columnas de la hoja de artículos (mapeo por índice, sin Google Sheets)."""
+
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.utils.tablas_handler import TablasHandler
+from testing.gspread_simulado import PlanillaSimulada
+
+ENCABEZADOS = ["id producto", "Descripción", "Precio Venta", "precio negocio", "Costo 1", "STOCK", "Activo", "Barras", "extra"]
+
+
+def _handler() -> TablasHandler:
+    return TablasHandler.__new__(TablasHandler)
+
+
+def test_plan_resuelve_variantes_y_columnas_ausentes():
+    plan = _handler()._compilar_plan_articulos(ENCABEZADOS)
+
+    assert (plan.id_producto, plan.descripcion, plan.precio, plan.precio_negocio, plan.costo, plan.stock) == (0, 1, 2, 3, 4, 5)
+    assert (plan.activo, plan.barras) == (6, 7)
+    assert plan.codigo is None and plan.nombre is None and plan.marca is None
+
+
+def test_fila_de_valores_igual_que_get_all_records():
+    handler = _handler()
+    plan = handler._compilar_plan_articulos(ENCABEZADOS)
+    fila = ["00123", " Café molido ", "$ 2.900,00", "2500", "1.234,56", "7", "false", "7790001234567"]
+
+    mapeada = handler._mapear_valores_fila(fila, plan)
+
+    # Igual que get_all_records: numericise convierte "00123" en 123.
+    assert mapeada["codigo_interno"] == mapeada["Código"] == "123"
+    assert mapeada["descripcion"] == "Café molido"
+    assert (mapeada["precio_venta"], mapeada["venta_negocio"], mapeada["stock_actual"]) == (2900.0, 2500.0, 7.0)
+    assert (mapeada["Activo"], mapeada["Codigo de barras"]) == ("FALSE", "7790001234567")
+    assert (mapeada["ubicacion"], mapeada["unidad_venta"], mapeada["marca"]) == ("Sin definir", "Unidad", "")
+    assert "_fila_original" not in mapeada
+
+    registro = dict(zip(ENCABEZADOS, [123, " Café molido ", "$ 2.900,00", 2500, "1.234,56", 7, "false", 7790001234567, ""]))
+    assert {k: v for k, v in handler._mapear_fila(registro, ENCABEZADOS).items() if k != "_fila_original"} == mapeada
+    assert handler._mapear_valores_fila(["", "sin código"], plan) == {}
+
+
+def test_cargar_articulos_lee_valores_y_conserva_original_a_pedido(monkeypatch):
+    planilla = PlanillaSimulada({"stock": [ENCABEZADOS, ["A1", "Yerba", "1500"], ["", "sin código"]]})
+    monkeypatch.setattr(TablasHandler, "_abrir_planilla", lambda self: planilla)
+    monkeypatch.setattr(TablasHandler, "_obtener_worksheets_index", lambda self, sheet: {"stock": planilla.hoja("stock")})
+    handler = _handler()
+    handler.client = object()
+    handler.google_sheet_id = "planilla-test"
+
+    articulos = handler.cargar_articulos()
+    assert [a.get("codigo_interno") for a in articulos] == ["A1", None]
+    assert articulos[0]["precio_venta"] == 1500.0 and articulos[0]["stock_actual"] == 0.0
+    assert planilla.llamadas["get_all_values"] == 1 and planilla.llamadas["get_all_records"] == 0
+
+    original = handler.cargar_articulos(conservar_fila_original=True)[0]["_fila_original"]
+    assert original == {"id producto": "A1", "Descripción": "Yerba", "Precio Venta": 1500}
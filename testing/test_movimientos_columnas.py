@@ -4,6 +4,7 @@ Tests de alineación de columnas MOVIMIENTOS (sin Google Sheets en vivo).
 import json
 import os
 import sys
+import threading
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -145,6 +146,85 @@ def test_codigo_produccion_escribe_desde_columna_a_ancho_completo():
     assert "row_count + 1" not in fuente.split("_escribir_fila_movimientos_desde_a")[1].split("def _construir_fila_movimiento")[0]
 
 
+def _hoja_movimientos(filas_existentes: int):
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from gspread_simulado import PlanillaSimulada
+
+    filas = [["ID", "x", "y"]] + [[f"m{i}", "", "v"] for i in range(filas_existentes)]
+    planilla = PlanillaSimulada({"MOVIMIENTOS": filas})
+    return planilla, planilla.hoja("MOVIMIENTOS")
+
+
+def test_cursor_de_fila_evita_escanear_columnas_en_cada_escritura():
+    TablasHandler._cursor_filas.clear()
+    handler = _handler_sin_sheets()
+    planilla, hoja = _hoja_movimientos(30)
+
+    handler._escribir_fila_movimientos_desde_a(hoja, ["a1", "", "v"])
+    assert planilla.llamadas["col_values"] == 4
+    planilla.llamadas.clear()
+
+    handler._escribir_fila_movimientos_desde_a(hoja, ["a2", "", "v"])
+    handler._escribir_filas_movimientos_desde_a(hoja, [["a3", "", "v"], ["a4", "", "v"]])
+    assert dict(planilla.llamadas) == {"get": 2, "update": 2}
+    assert [f[0] for f in hoja.filas[-5:]] == ["m29", "a1", "a2", "a3", "a4"]
+
+
+def test_cursor_se_recalcula_si_otro_escribio_o_se_borraron_filas():
+    TablasHandler._cursor_filas.clear()
+    handler = _handler_sin_sheets()
+    planilla, hoja = _hoja_movimientos(5)
+    handler._escribir_fila_movimientos_desde_a(hoja, ["a1", "", "v"])
+
+    hoja.filas.append(["otro_proceso", "", "v"])
+    handler._escribir_fila_movimientos_desde_a(hoja, ["a2", "", "v"])
+    assert [f[0] for f in hoja.filas[-3:]] == ["a1", "otro_proceso", "a2"]
+
+    del hoja.filas[-3:]
+    planilla.llamadas.clear()
+    handler._escribir_fila_movimientos_desde_a(hoja, ["a3", "", "v"])
+    assert planilla.llamadas["col_values"] == 4
+    assert [f[0] for f in hoja.filas[-2:]] == ["m4", "a3"]
+
+
+def test_escrituras_concurrentes_no_esperan_la_red_de_la_otra():
+    TablasHandler._cursor_filas.clear()
+    handler = _handler_sin_sheets()
+    planilla, hoja = _hoja_movimientos(5)
+    handler._escribir_fila_movimientos_desde_a(hoja, ["a0", "", "v"])
+
+    # Las dos escrituras tienen que estar en update a la vez: si una esperara a la
+    # otra con un lock tomado durante la llamada a la API, la barrera no se completaría.
+    barrera = threading.Barrier(2, timeout=5)
+    escritura = threading.Lock()
+    update_real = hoja.update
+
+    def update_lento(rango, valores, value_input_option=None):
+        barrera.wait()
+        with escritura:
+            update_real(rango, valores, value_input_option)
+
+    hoja.update = update_lento
+    errores = []
+
+    def escribir(etiqueta):
+        try:
+            handler._escribir_filas_movimientos_desde_a(hoja, [[f"{etiqueta}1", "", "v"], [f"{etiqueta}2", "", "v"]])
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=escribir, args=(etiqueta,)) for etiqueta in ("x", "y")]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(10)
+
+    assert errores == []
+    assert [f[0] for f in hoja.filas[:7]] == ["ID"] + [f"m{i}" for i in range(5)] + ["a0"]
+    assert sorted(f[0] for f in hoja.filas[7:]) == ["x1", "x2", "y1", "y2"]
+    assert len(hoja.filas) == 11
+
+
 if __name__ == "__main__":
     test_fila_swing_21_columnas_desde_a()
     test_encabezados_swing_mapean_campos_criticos()
@@ -152,4 +232,7 @@ if __name__ == "__main__":
     test_fila_misma_longitud_que_encabezados()
     test_fallback_encabezados_cubre_layout_estandar()
     test_codigo_produccion_escribe_desde_columna_a_ancho_completo()
+    test_cursor_de_fila_evita_escanear_columnas_en_cada_escritura()
+    test_cursor_se_recalcula_si_otro_escribio_o_se_borraron_filas()
+    test_escrituras_concurrentes_no_esperan_la_red_de_la_otra()
     print("OK: todos los tests de movimientos_columnas pasaron.")
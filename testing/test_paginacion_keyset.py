@@ -0,0 +1,102 @@
+# testing/test_paginacion_keyset.py
+
+"""Tests de la paginación por cursor de clientes y del libro mayor de caja (SQLite en memoria)."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.caja import consultas_caja
+from back.gestion.contabilidad.clientes_contabilidad import manager as clientes_manager
+from back.modelos import CajaMovimiento, CajaSesion, Empresa, Rol, Tercero, Usuario
+
+BASE = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Rol(id=1, nombre="Cajero"))
+        for id_empresa in (1, 2):
+            db.add(Empresa(id=id_empresa, nombre_legal=f"Empresa {id_empresa}", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+            db.add(Usuario(id=id_empresa, nombre_usuario=f"cajero{id_empresa}", password_hash="x", id_rol=1, id_empresa=id_empresa))
+            db.add(CajaSesion(id=id_empresa, saldo_inicial=0, id_usuario_apertura=id_empresa, id_empresa=id_empresa))
+        db.commit()
+        yield db
+
+
+def _recorrer(pedir):
+    filas, cursor, paginas = [], None, 0
+    while True:
+        pagina, cursor = pedir(cursor)
+        filas.extend(pagina)
+        paginas += 1
+        if cursor is None:
+            return filas, paginas
+
+
+def test_clientes_paginados_con_empates_y_filtros(db):
+    nombres = ["Bravo", "Alfa", "Alfa", "Charlie", "Alfa", "Delta", "Eco"]
+    for i, nombre in enumerate(nombres, start=1):
+        db.add(Tercero(
+            id=i, es_cliente=True, nombre_razon_social=nombre, cuit=f"20{i:09d}", condicion_iva="CF",
+            activo=i != 4, fecha_alta=BASE + timedelta(days=i), id_empresa=1,
+        ))
+    db.add(Tercero(id=99, es_cliente=True, nombre_razon_social="Alfa", condicion_iva="CF", id_empresa=2))
+    db.commit()
+
+    filas, paginas = _recorrer(lambda c: clientes_manager.listar_clientes(1, db, limite=2, cursor=c))
+    assert [(t.nombre_razon_social, t.id) for t in filas] == [
+        ("Alfa", 2), ("Alfa", 3), ("Alfa", 5), ("Bravo", 1), ("Charlie", 4), ("Delta", 6), ("Eco", 7),
+    ]
+    assert paginas == 4
+
+    activos, _ = clientes_manager.listar_clientes(
+        1, db, limite=10, activo=True, alta_desde=BASE + timedelta(days=3), alta_hasta=BASE + timedelta(days=7)
+    )
+    assert [t.id for t in activos] == [3, 5, 6]
+    por_cuit, _ = clientes_manager.listar_clientes(1, db, busqueda="20000000007")
+    assert [t.id for t in por_cuit] == [7]
+
+    with pytest.raises(ValueError):
+        clientes_manager.listar_clientes(1, db, cursor="no-es-un-cursor")
+
+
+def test_libro_mayor_paginado_por_fecha_con_filtros(db):
+    movimientos = [
+        # (id, minutos, tipo, empresa)
+        (1, 0, "VENTA", 1), (2, 10, "INGRESO", 1), (3, 10, "VENTA", 1), (4, 10, "EGRESO", 1),
+        (5, 20, "VENTA", 1), (6, 30, "VENTA", 2), (7, 40, "VENTA", 1),
+    ]
+    for id_mov, minutos, tipo, empresa in movimientos:
+        db.add(CajaMovimiento(
+            id=id_mov, timestamp=BASE + timedelta(minutes=minutos), tipo=tipo, concepto=tipo, monto=10,
+            metodo_pago="EFECTIVO", id_caja_sesion=empresa, id_usuario=empresa,
+        ))
+    db.commit()
+    usuario = db.get(Usuario, 1)
+
+    filas, paginas = _recorrer(
+        lambda c: consultas_caja.obtener_todos_los_movimientos_de_caja(db, usuario, limite=2, cursor=c)
+    )
+    assert [m.id for m in filas] == [7, 5, 4, 3, 2, 1]
+    assert paginas == 3
+
+    ventas, _ = consultas_caja.obtener_todos_los_movimientos_de_caja(
+        db, usuario, desde=BASE + timedelta(minutes=5), hasta=BASE + timedelta(minutes=40), tipos=["VENTA"], id_usuario=1
+    )
+    assert [m.id for m in ventas] == [5, 3]
@@ -9,6 +9,7 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from sqlmodel import Session, create_engine
+from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 
 from back.modelos import SQLModel, Empresa, Usuario, Articulo, CajaSesion
@@ -172,12 +173,67 @@ def test_pagos_multiples_suma_incorrecta():
             pass
 
 
+def test_venta_carrito_se_carga_en_una_consulta_y_agrupa_repetidos():
+    with Session(engine) as db:
+        empresa, usuario, sesion, articulo = crear_datos_prueba(db)
+        manual = Articulo(
+            codigo_interno=f"MANUAL{empresa.id}",
+            descripcion="Recarga",
+            precio_venta=0.0,
+            stock_actual=5.0,
+            precio_manual=True,
+            activo=True,
+            id_empresa=empresa.id,
+        )
+        db.add(manual)
+        db.commit()
+        db.refresh(manual)
+        id_usuario, id_sesion, id_articulo, id_manual = usuario.id, sesion.id, articulo.id, manual.id
+        db.expunge_all()
+
+        consultas_articulos = []
+
+        def _contar(conn, cursor, statement, parameters, context, executemany):
+            if "FROM articulos" in statement or "UPDATE articulos" in statement:
+                consultas_articulos.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _contar)
+        try:
+            venta, movimiento = registro_module.registrar_venta_y_movimiento_caja(
+                db=db,
+                usuario_actual=db.get(Usuario, id_usuario),
+                id_sesion_caja=id_sesion,
+                total_venta=300.0,
+                metodo_pago="efectivo",
+                articulos_vendidos=[
+                    ArticuloVendido(id_articulo=id_articulo, cantidad=1, precio_unitario=50.0),
+                    ArticuloVendido(id_articulo=id_manual, cantidad=1, precio_unitario=100.0),
+                    ArticuloVendido(id_articulo=id_articulo, cantidad=3, precio_unitario=50.0),
+                ],
+                tipo_comprobante_solicitado="ticket",
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", _contar)
+
+        assert movimiento is not None
+        assert len(venta.items) == 3
+        # Un SELECT para todo el carrito y un UPDATE para todo el stock.
+        assert len([q for q in consultas_articulos if q.lstrip().upper().startswith("SELECT")]) == 1
+        assert len([q for q in consultas_articulos if q.lstrip().upper().startswith("UPDATE")]) == 1
+        db.commit()
+        db.expunge_all()
+        assert db.get(Articulo, id_articulo).stock_actual == 46.0
+        assert db.get(Articulo, id_manual).stock_actual == 5.0
+
+
 def run_all_tests():
     print("Ejecutando pruebas de pagos multiples...")
     test_pagos_multiples_ok()
     print("OK: test_pagos_multiples_ok")
     test_pagos_multiples_suma_incorrecta()
     print("OK: test_pagos_multiples_suma_incorrecta")
+    test_venta_carrito_se_carga_en_una_consulta_y_agrupa_repetidos()
+    print("OK: test_venta_carrito_se_carga_en_una_consulta_y_agrupa_repetidos")
 
 
 if __name__ == "__main__":
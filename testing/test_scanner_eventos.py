@@ -0,0 +1,180 @@
+# testing/test_scanner_eventos.py
+
+"""Tests del bus de eventos del escáner (memoria, SQLite y RESP simulado; sin MySQL)."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.scanner_bus import BusEnMemoria, BusRedis, BusSQLite
+from testing.redis_local_simulado import RedisLocalSimulado
+
+
+def _evento(n: int) -> dict:
+    return {"id_articulo": n, "nombre": f"art {n}"}
+
+
+def _esperar_con_push(bus_poll, bus_push, id_empresa: int, evento: dict, timeout: float = 5):
+    async def _escenario():
+        tarea = asyncio.create_task(bus_poll.esperar(id_empresa, timeout))
+        await asyncio.sleep(0.05)
+        t0 = time.perf_counter()
+        threading.Thread(target=bus_push.publicar, args=(id_empresa, evento)).start()
+        resultado = await tarea
+        return resultado, time.perf_counter() - t0
+
+    return asyncio.run(_escenario())
+
+
+def test_memoria_descarta_los_mas_viejos():
+    bus = BusEnMemoria(maxlen=5)
+    for i in range(8):
+        bus.publicar(1, _evento(i))
+
+    assert bus.extraer(1)["id_articulo"] == 3
+    metricas = {m["id_empresa"]: m for m in bus.metricas()}
+    assert metricas[1]["descartados"] == 3
+    assert metricas[1]["pendientes"] == 4
+
+
+def test_memoria_long_poll_despierta_al_recibir_push_desde_otro_hilo():
+    bus = BusEnMemoria(maxlen=10)
+    resultado, demora = _esperar_con_push(bus, bus, 2, _evento(7))
+    assert resultado["id_articulo"] == 7
+    assert demora < 0.2
+    assert bus.metricas()[0]["pollers_esperando"] == 0
+
+
+def test_memoria_long_poll_sin_eventos_vence():
+    bus = BusEnMemoria(maxlen=10)
+    t0 = time.perf_counter()
+    assert asyncio.run(bus.esperar(3, 1)) is None
+    assert 0.9 < time.perf_counter() - t0 < 2
+
+
+def test_memoria_evento_previo_se_entrega_sin_esperar():
+    bus = BusEnMemoria(maxlen=10)
+    bus.publicar(4, _evento(1))
+    t0 = time.perf_counter()
+    assert asyncio.run(bus.esperar(4, 5))["id_articulo"] == 1
+    assert time.perf_counter() - t0 < 0.1
+
+
+def test_sqlite_push_en_un_worker_llega_al_poller_de_otro(tmp_path):
+    ruta = str(tmp_path / "scanner.sqlite3")
+    worker_a = BusSQLite(ruta, maxlen=10, intervalo_vigia_sec=0.01)
+    worker_b = BusSQLite(ruta, maxlen=10, intervalo_vigia_sec=0.01)
+    try:
+        resultado, demora = _esperar_con_push(worker_b, worker_a, 5, _evento(42))
+        assert resultado["id_articulo"] == 42
+        assert demora < 0.5
+        assert worker_a.extraer(5) is None
+    finally:
+        worker_a.cerrar()
+        worker_b.cerrar()
+
+
+def test_sqlite_respeta_maxlen(tmp_path):
+    bus = BusSQLite(str(tmp_path / "scanner.sqlite3"), maxlen=3)
+    for i in range(5):
+        bus.publicar(6, _evento(i))
+    assert [bus.extraer(6)["id_articulo"] for _ in range(3)] == [2, 3, 4]
+    assert bus.extraer(6) is None
+
+
+def test_redis_entrega_entre_workers_y_recorta_la_cola():
+    with RedisLocalSimulado() as servidor:
+        worker_a = BusRedis(servidor.url, maxlen=3)
+        worker_b = BusRedis(servidor.url, maxlen=3)
+
+        resultado, demora = _esperar_con_push(worker_b, worker_a, 7, _evento(9))
+        assert resultado["id_articulo"] == 9
+        assert demora < 0.5
+
+        for i in range(5):
+            worker_a.publicar(8, _evento(i))
+        assert worker_b.metricas() == []
+        assert worker_a.metricas()[-1]["pendientes"] == 3
+        assert worker_b.extraer(8)["id_articulo"] == 2
+        assert asyncio.run(worker_b.esperar(9, 1)) is None
+
+
+def test_redis_poller_cancelado_devuelve_el_evento_en_vuelo():
+    with RedisLocalSimulado() as servidor:
+        worker_a = BusRedis(servidor.url, maxlen=3)
+        worker_b = BusRedis(servidor.url, maxlen=3)
+
+        async def _escenario():
+            tarea = asyncio.create_task(worker_b.esperar(11, 5))
+            await asyncio.sleep(0.1)
+            tarea.cancel()
+            # El BLPOP ya estaba en el servidor: el push lo recibe esa conexión, no la cola.
+            worker_a.publicar(11, _evento(4))
+            limite = time.monotonic() + 3
+            while time.monotonic() < limite:
+                evento = await worker_a.extraer_async(11)
+                if evento is not None:
+                    return evento, tarea.cancelled()
+                await asyncio.sleep(0.02)
+            return None, tarea.cancelled()
+
+        evento, cancelada = asyncio.run(_escenario())
+        assert cancelada
+        assert evento is not None and evento["id_articulo"] == 4
+
+
+def test_redis_error_de_conexion_cierra_el_socket():
+    servidor = RedisLocalSimulado()
+    servidor.iniciar()
+    bus = BusRedis(servidor.url, maxlen=3)
+    bus.publicar(12, _evento(1))
+    sock = bus._local.sock
+    servidor.detener()
+    try:
+        bus.publicar(12, _evento(2))
+    except (OSError, ConnectionError):
+        pass
+    assert sock.fileno() == -1
+
+
+def test_sqlite_no_bloquea_el_event_loop(tmp_path):
+    bus = BusSQLite(str(tmp_path / "scanner.sqlite3"), maxlen=10, intervalo_vigia_sec=0.01)
+    hilos = []
+    extraer_original = bus.extraer
+
+    def extraer_lento(id_empresa):
+        hilos.append(threading.get_ident())
+        time.sleep(0.3)
+        return extraer_original(id_empresa)
+
+    bus.extraer = extraer_lento
+
+    async def _escenario():
+        latidos = 0
+
+        async def latir():
+            nonlocal latidos
+            while True:
+                await asyncio.sleep(0.01)
+                latidos += 1
+
+        corazon = asyncio.create_task(latir())
+        bus.publicar(10, _evento(3))
+        evento = await bus.extraer_async(10)
+        corazon.cancel()
+        return evento, latidos
+
+    try:
+        evento, latidos = asyncio.run(_escenario())
+        assert evento["id_articulo"] == 3
+        assert hilos and threading.get_ident() not in hilos
+        # El loop siguió atendiendo otras tareas mientras el backend estaba ocupado.
+        assert latidos >= 10
+    finally:
+        bus.cerrar()
@@ -0,0 +1,162 @@
+# testing/test_servicio_render.py
+
+"""Tests del despachador del pool de render: reparto por empresa, cola acotada y timeout."""
+
+import asyncio
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.reportes.servicio_render import ColaRenderLlena, ServicioRender, TimeoutRender
+
+
+def _servicio(**kwargs):
+    # Hilos en vez de procesos: el despachador es el mismo y las funciones no necesitan ser picklables.
+    return ServicioRender(crear_executor=lambda workers: ThreadPoolExecutor(max_workers=workers), **kwargs)
+
+
+def test_round_robin_entre_empresas():
+    servicio = _servicio(workers=1, cola_max=20, cola_max_empresa=10, timeout_sec=5)
+    liberar = threading.Event()
+    orden = []
+
+    def render(etiqueta):
+        if etiqueta == "a0":
+            liberar.wait(5)
+        orden.append(etiqueta)
+        return etiqueta.encode()
+
+    async def escenario():
+        tareas = [asyncio.create_task(servicio.ejecutar(1, render, f"a{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        tareas.append(asyncio.create_task(servicio.ejecutar(2, render, "b0")))
+        await asyncio.sleep(0.05)
+        liberar.set()
+        return await asyncio.gather(*tareas)
+
+    resultados = asyncio.run(escenario())
+    assert resultados == [b"a0", b"a1", b"a2", b"a3", b"b0"]
+    # La empresa 2 no espera a que se vacíe la cola de la 1.
+    assert orden == ["a0", "a1", "b0", "a2", "a3"]
+    metricas = servicio.metricas()
+    assert (metricas["en_curso"], metricas["pendientes"]) == (0, 0)
+    assert [e["completados"] for e in metricas["empresas"]] == [4, 1]
+    servicio.cerrar()
+
+
+def test_cola_llena_y_timeout_en_cola():
+    servicio = _servicio(workers=1, cola_max=3, cola_max_empresa=2, timeout_sec=0.2)
+    liberar = threading.Event()
+    ejecutados = []
+
+    def render(etiqueta):
+        if etiqueta == "lento":
+            liberar.wait(5)
+        ejecutados.append(etiqueta)
+        return b"ok"
+
+    async def escenario():
+        lento = asyncio.create_task(servicio.ejecutar(1, render, "lento"))
+        await asyncio.sleep(0)
+        servicio.encolar(1, render, "a1")
+        servicio.encolar(1, render, "a2")
+        with pytest.raises(ColaRenderLlena):
+            servicio.encolar(1, render, "a3")  # tope por empresa
+        esperando = asyncio.create_task(servicio.ejecutar(2, render, "b1"))
+        await asyncio.sleep(0)
+        with pytest.raises(ColaRenderLlena):
+            servicio.encolar(3, render, "c1")  # tope global
+        with pytest.raises(TimeoutRender):
+            await esperando
+        with pytest.raises(TimeoutRender):
+            await lento
+        liberar.set()
+
+    asyncio.run(escenario())
+    servicio.cerrar()
+    assert "b1" not in ejecutados  # venció en la cola: no se renderizó
+    empresas = {e["id_empresa"]: e for e in servicio.metricas()["empresas"]}
+    assert (empresas[1]["rechazados"], empresas[3]["rechazados"], empresas[2]["timeouts"]) == (1, 1, 1)
+
+
+class _ProcesoFalso:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def terminate(self):
+        self.pool.terminar()
+
+
+class _PoolFalso:
+    """Pool que no corre nada solo: los renders terminan cuando el test los resuelve o al terminar sus procesos."""
+
+    def __init__(self):
+        self.futuros = []
+        self._processes = {1: _ProcesoFalso(self)}
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        futuro.set_running_or_notify_cancel()
+        self.futuros.append((futuro, funcion, args))
+        return futuro
+
+    def resolver(self):
+        for futuro, funcion, args in self.futuros:
+            if not futuro.done():
+                futuro.set_result(funcion(*args))
+
+    def terminar(self):
+        for futuro, _funcion, _args in self.futuros:
+            if not futuro.done():
+                futuro.set_exception(BrokenProcessPool("terminado"))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def test_render_colgado_recicla_el_pool_y_reencola_a_los_demas():
+    pools = []
+
+    def crear(workers):
+        pools.append(_PoolFalso())
+        return pools[-1]
+
+    servicio = ServicioRender(workers=2, cola_max=10, cola_max_empresa=10, timeout_sec=0.05, crear_executor=crear)
+
+    async def escenario():
+        sano = servicio.encolar(2, lambda: b"ok")
+        with pytest.raises(TimeoutRender):
+            await servicio.ejecutar(1, lambda: b"nunca")
+        # El pool se recicló: el render que cayó de rebote volvió a la cola y corre en el pool nuevo.
+        assert len(pools) == 2
+        assert not sano.futuro.done()
+        pools[1].resolver()
+        return await asyncio.wrap_future(sano.futuro)
+
+    assert asyncio.run(escenario()) == b"ok"
+    metricas = servicio.metricas()
+    assert (metricas["en_curso"], metricas["pendientes"]) == (0, 0)
+    assert {e["id_empresa"]: e["timeouts"] for e in metricas["empresas"]}[1] == 1
+    servicio.cerrar()
+
+
+def test_verificar_capacidad_antes_de_facturar():
+    servicio = _servicio(workers=1, cola_max=5, cola_max_empresa=1, timeout_sec=5)
+    liberar = threading.Event()
+    servicio.encolar(1, liberar.wait, 5)
+    servicio.verificar_capacidad(1)  # el que corre no ocupa la cola
+    servicio.encolar(1, liberar.wait, 5)
+    with pytest.raises(ColaRenderLlena):
+        servicio.verificar_capacidad(1)
+    servicio.verificar_capacidad(2)
+    liberar.set()
+    servicio.cerrar()
+    assert ServicioRender(workers=0).verificar_capacidad(1) is None
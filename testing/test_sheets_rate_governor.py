@@ -0,0 +1,196 @@
+# testing/test_sheets_rate_governor.py
+
+"""Tests del gobernador de cuota de Google Sheets (buckets, prioridades y estado compartido)."""
+
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+sys.path.insert(0, current_dir)
+
+from gspread_simulado import ClienteSimulado, PlanillaSimulada
+
+from back import config
+from back.gestion import sheets_rate_governor as gobernador
+from back.gestion.sheets_rate_governor import (
+    ESCRITURA,
+    PRIORIDAD_SYNC,
+    PRIORIDAD_VENTA,
+    GobernadorEnMemoria,
+    GobernadorSQLite,
+    crear_gobernador_sheets,
+    establecer_gobernador_sheets,
+)
+from back.modelos import ConfiguracionEmpresa
+from back.utils import tablas_handler
+from back.utils.tablas_handler import TablasHandler
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1_000.0]
+
+    def dormir(segundos):
+        ahora[0] += segundos
+
+    monkeypatch.setattr(gobernador, "time", SimpleNamespace(time=lambda: ahora[0], sleep=dormir))
+    return ahora
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    for cache in (
+        TablasHandler._worksheet_title_cache,
+        TablasHandler._headers_cache,
+        TablasHandler._spreadsheet_cache,
+        TablasHandler._worksheets_index_cache,
+        TablasHandler._cursor_filas,
+    ):
+        cache.clear()
+    monkeypatch.setattr(TablasHandler, "_sheets_quota_blocked_until", None)
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(ConfiguracionEmpresa(id_empresa=1, cuit="20123456789", nombre_negocio="Cuota", link_google_sheets="clave-cuota"))
+        db.commit()
+
+    def _crear(planilla):
+        monkeypatch.setattr(tablas_handler, "gspread_client", ClienteSimulado(planilla))
+        with Session(engine) as db:
+            return TablasHandler(id_empresa=1, db=db)
+
+    return _crear
+
+
+def test_sync_deja_la_reserva_para_las_ventas(reloj):
+    gob = GobernadorEnMemoria(10, 10, reserva_ventas=0.2, rafaga_sec=60, espera_max_venta_sec=0, espera_max_sync_sec=0)
+
+    for _ in range(8):
+        gob.adquirir("p1", "cuenta")
+    with pytest.raises(RuntimeError, match="sin cuota"):
+        gob.adquirir("p1", "cuenta", prioridad=PRIORIDAD_SYNC)
+    gob.adquirir("p1", "cuenta", prioridad=PRIORIDAD_VENTA)
+    gob.adquirir("p1", "cuenta", prioridad=PRIORIDAD_VENTA)
+    with pytest.raises(RuntimeError):
+        gob.adquirir("p1", "cuenta", prioridad=PRIORIDAD_VENTA)
+    # Las escrituras tienen sus propios buckets.
+    gob.adquirir("p1", "cuenta", tipo=ESCRITURA)
+
+    metricas = gob.metricas()
+    assert metricas["adquiridos"] == {PRIORIDAD_SYNC: 9, PRIORIDAD_VENTA: 2}
+    assert metricas["rechazados"] == {PRIORIDAD_SYNC: 1, PRIORIDAD_VENTA: 1}
+
+
+def test_espera_lo_justo_para_reponer_y_luego_rechaza(reloj):
+    gob = GobernadorEnMemoria(60, 0, reserva_ventas=0, rafaga_sec=60, espera_max_venta_sec=5, espera_max_sync_sec=5)
+    for _ in range(60):
+        assert gob.adquirir("p1", "cuenta") == 0
+
+    assert gob.adquirir("p1", "cuenta") == pytest.approx(1.0)
+    assert reloj[0] == pytest.approx(1_001.0)
+
+    gob.pausar("p1", "cuenta", 120)
+    with pytest.raises(RuntimeError):
+        gob.adquirir("p1", "cuenta", prioridad=PRIORIDAD_VENTA)
+    assert reloj[0] == pytest.approx(1_001.0)
+
+
+def test_sqlite_comparte_tokens_y_pausa_entre_procesos(tmp_path):
+    ruta = str(tmp_path / "cuota.sqlite3")
+    proceso_a = GobernadorSQLite(ruta, 10, 10, reserva_ventas=0, rafaga_sec=60, espera_max_venta_sec=0, espera_max_sync_sec=0)
+    proceso_b = GobernadorSQLite(ruta, 10, 10, reserva_ventas=0, rafaga_sec=60, espera_max_venta_sec=0, espera_max_sync_sec=0)
+
+    for _ in range(6):
+        proceso_a.adquirir("p1", "cuenta")
+    for _ in range(4):
+        proceso_b.adquirir("p1", "cuenta")
+    with pytest.raises(RuntimeError):
+        proceso_a.adquirir("p1", "cuenta")
+
+    proceso_a.pausar("p2", "otra", 60)
+    with pytest.raises(RuntimeError):
+        proceso_b.adquirir("p2", "otra", tipo=ESCRITURA, prioridad=PRIORIDAD_VENTA)
+    assert proceso_b.estado_buckets()["planilla:p2:escritura"]["pausado_sec"] > 50
+
+
+def test_venta_escribe_aunque_la_sync_haya_gastado_su_parte(handler):
+    establecer_gobernador_sheets(GobernadorEnMemoria(0, 12, reserva_ventas=0.5, rafaga_sec=60, espera_max_venta_sec=0, espera_max_sync_sec=0))
+    planilla = PlanillaSimulada(
+        {"stock": [["codigo", "descripcion", "stock"], ["A1", "Uno", 10]], "MOVIMIENTOS": [TablasHandler.encabezados_movimientos_swing()]},
+        cuota_por_minuto=12,
+    )
+    h = handler(planilla)
+
+    lecturas = 0
+    while h.cargar_articulos() and lecturas < 10:
+        lecturas += 1
+    assert lecturas == 4
+
+    # Con lo que dejó la reserva alcanza para encabezados, ubicar la fila y escribir.
+    assert h.registrar_movimiento({"Tipo_movimiento": "venta", "monto": 100, "descripcion": "Venta"})
+    assert not planilla.rechazos_429
+    assert planilla.hoja("MOVIMIENTOS").filas[-1][12] == "Venta"
+
+
+def test_429_pausa_los_buckets_para_los_demas_procesos(handler, tmp_path):
+    ruta = str(tmp_path / "cuota.sqlite3")
+    establecer_gobernador_sheets(GobernadorSQLite(ruta, 60, 60))
+    otro_proceso = GobernadorSQLite(ruta, 60, 60, espera_max_venta_sec=1, espera_max_sync_sec=1)
+    planilla = PlanillaSimulada({"MOVIMIENTOS": [TablasHandler.encabezados_movimientos_swing()]})
+    planilla.fallar_429(1)
+    h = handler(planilla)
+
+    assert not h.registrar_movimiento({"Tipo_movimiento": "venta", "monto": 1, "descripcion": "x"})
+    with pytest.raises(RuntimeError, match="sin cuota"):
+        otro_proceso.adquirir("clave-cuota", h._cuenta_servicio(), prioridad=PRIORIDAD_VENTA)
+
+
+def test_ruta_sqlite_por_defecto_bajo_data_dir_y_no_el_cwd(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "DATA_DIR", tmp_path / "datos")
+    monkeypatch.delenv("SHEETS_GOBERNADOR_SQLITE_PATH", raising=False)
+    rutas = []
+    for cwd in ("back", "raiz"):
+        (tmp_path / cwd).mkdir()
+        monkeypatch.chdir(tmp_path / cwd)
+        rutas.append(crear_gobernador_sheets("sqlite").ruta)
+    # La API (cwd back/) y el sync_worker (cwd raíz) comparten el mismo archivo.
+    assert rutas == [str(tmp_path / "datos" / "sheets_cuota.sqlite3")] * 2
+
+    monkeypatch.setenv("SHEETS_GOBERNADOR_SQLITE_PATH", "cuota/compartida.sqlite3")
+    assert crear_gobernador_sheets("sqlite").ruta == str(tmp_path / "datos" / "cuota" / "compartida.sqlite3")
+
+
+def test_esperar_cuota_no_frena_otra_escritura_de_la_hoja(handler):
+    esperando, liberar = threading.Event(), threading.Event()
+    liberada_a_tiempo = []
+
+    class GobernadorLento(GobernadorEnMemoria):
+        def adquirir(self, id_planilla, cuenta, tipo=gobernador.LECTURA, prioridad=PRIORIDAD_SYNC):
+            if tipo == ESCRITURA and threading.current_thread().name == "lenta":
+                esperando.set()
+                liberada_a_tiempo.append(liberar.wait(5))
+            return 0.0
+
+    establecer_gobernador_sheets(GobernadorLento(0, 0))
+    planilla = PlanillaSimulada({"MOVIMIENTOS": [["ID", "x"], ["m0", "v"]]})
+    h = handler(planilla)
+    hoja = planilla.hoja("MOVIMIENTOS")
+
+    lenta = threading.Thread(target=h._escribir_filas_movimientos_desde_a, args=(hoja, [["lenta", "v"]]), name="lenta")
+    lenta.start()
+    assert esperando.wait(5)
+    # Mientras "lenta" espera cuota con su fila reservada, otra escritura de la misma hoja termina.
+    h._escribir_filas_movimientos_desde_a(hoja, [["rapida", "v"]])
+    liberar.set()
+    lenta.join(5)
+
+    assert liberada_a_tiempo == [True]
+    assert [f[0] for f in hoja.filas] == ["ID", "m0", "lenta", "rapida"]
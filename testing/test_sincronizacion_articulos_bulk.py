@@ -0,0 +1,150 @@
+# testing/test_sincronizacion_articulos_bulk.py
+
+"""Tests del motor de diferencias de sincronizar_articulos_desde_sheet (SQLite en memoria, hoja simulada)."""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import sincronizacion_manager
+from back.modelos import Articulo, ArticuloCodigo, Categoria, ConfiguracionEmpresa, Empresa, VentaDetalle
+
+ID_EMPRESA = 1
+
+
+def _fila(codigo, descripcion="Artículo", precio=100, categoria="Bebidas", barras="", **extra):
+    return {
+        "codigo_interno": codigo,
+        "descripcion": descripcion,
+        "precio_venta": precio,
+        "precio_costo": 50,
+        "stock_actual": 10,
+        "categoria": categoria,
+        "marca": "Marca X",
+        "Codigo de barras": barras,
+        **extra,
+    }
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=ID_EMPRESA, nombre_legal="Empresa Sync", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=ID_EMPRESA, cuit="20123456789", nombre_negocio="Sync", link_google_sheets="https://sheet"))
+        db.commit()
+
+    hoja = {"filas": []}
+
+    class _HandlerSimulado:
+        def __init__(self, id_empresa=None, db=None):
+            pass
+
+        def obtener_modificacion_planilla(self):
+            return None
+
+        def cargar_articulos(self, nombre_hoja=None):
+            return [dict(f) for f in hoja["filas"]]
+
+    monkeypatch.setattr(sincronizacion_manager, "TablasHandler", _HandlerSimulado)
+    return engine, hoja
+
+
+def _sincronizar(engine):
+    with Session(engine) as db:
+        return sincronizacion_manager.sincronizar_articulos_desde_sheet(db, ID_EMPRESA)
+
+
+def test_crea_actualiza_solo_lo_cambiado_y_las_consultas_no_crecen_con_las_filas(entorno):
+    engine, hoja = entorno
+    hoja["filas"] = [_fila(f"A{i:04d}", barras=f"779{i:010d}") for i in range(300)]
+    resumen = _sincronizar(engine)
+    assert (resumen["creados_en_db"], resumen["actualizados_en_db"], resumen["filas_con_error"]) == (300, 0, 0)
+    assert resumen["filas_por_segundo"] > 0
+
+    hoja["filas"][5]["precio_venta"] = 999
+    hoja["filas"][7]["categoria"] = "Almacén"
+    consultas = [0]
+    event.listen(engine, "before_cursor_execute", lambda *a: consultas.__setitem__(0, consultas[0] + 1))
+    resumen = _sincronizar(engine)
+    assert (resumen["creados_en_db"], resumen["actualizados_en_db"], resumen["sin_cambios_en_db"]) == (0, 2, 298)
+    assert consultas[0] < 30
+
+    with Session(engine) as db:
+        assert db.exec(select(Articulo).where(Articulo.codigo_interno == "A0005")).one().precio_venta == 999
+        articulo = db.exec(select(Articulo).where(Articulo.codigo_interno == "A0007")).one()
+        assert db.get(Categoria, articulo.id_categoria).nombre == "Almacén"
+        assert len(db.exec(select(Categoria)).all()) == 2
+        assert len(db.exec(select(ArticuloCodigo)).all()) == 300
+
+
+def test_codigos_de_barra_conflictos_y_bajas(entorno):
+    engine, hoja = entorno
+    hoja["filas"] = [_fila("A1", barras="111"), _fila("A2", barras="222"), _fila("A3"), _fila("A4")]
+    _sincronizar(engine)
+    with Session(engine) as db:
+        id_a3 = db.exec(select(Articulo.id).where(Articulo.codigo_interno == "A3")).one()
+        db.add(VentaDetalle(cantidad=1, precio_unitario=100, id_venta=1, id_articulo=id_a3))
+        db.commit()
+
+    # A1 cambia de código y A2 toma el que A1 liberó; A3 (con ventas) y A4 salen de la hoja.
+    hoja["filas"] = [_fila("A1", barras="333"), _fila("A2", barras="222;111;")]
+    resumen = _sincronizar(engine)
+    assert resumen["conflictos_codigos"] == 0
+    assert (resumen["eliminados_en_db"], resumen["inactivados_con_movimientos"]) == (1, 1)
+
+    with Session(engine) as db:
+        codigos = {(c.codigo, c.id_articulo) for c in db.exec(select(ArticuloCodigo)).all()}
+        ids = {a.codigo_interno: a.id for a in db.exec(select(Articulo)).all()}
+        assert codigos == {("333", ids["A1"]), ("222", ids["A2"]), ("111", ids["A2"])}
+        assert "A4" not in ids
+        a3 = db.get(Articulo, ids["A3"])
+        assert (a3.activo, a3.stock_actual) == (False, 0)
+
+    hoja["filas"] = [_fila("A1", barras="333;222;"), _fila("A2", barras="222;111;")]
+    assert _sincronizar(engine)["conflictos_codigos"] == 1
+
+
+def test_claves_sin_acentos_como_la_collation_de_mysql(entorno):
+    engine, hoja = entorno
+    hoja["filas"] = [_fila("C1", categoria="Café"), _fila("C2", categoria="CAFE "), _fila("C3", categoria="cafe")]
+    resumen = _sincronizar(engine)
+    assert resumen["filas_con_error"] == 0
+
+    with Session(engine) as db:
+        assert [c.nombre for c in db.exec(select(Categoria)).all()] == ["Café"]
+        assert len({a.id_categoria for a in db.exec(select(Articulo)).all()}) == 1
+
+    # El mismo código con otro acento o mayúscula es la misma fila: se actualiza, no se duplica.
+    hoja["filas"] = [_fila("Ñandú-1", precio=10)]
+    _sincronizar(engine)
+    hoja["filas"] = [_fila("nandu-1", precio=20)]
+    resumen = _sincronizar(engine)
+    assert (resumen["creados_en_db"], resumen["actualizados_en_db"]) == (0, 1)
+
+
+def test_bloque_que_falla_se_reintenta_fila_por_fila(entorno, monkeypatch):
+    engine, hoja = entorno
+    monkeypatch.setattr(sincronizacion_manager, "SYNC_ARTICULOS_CHUNK", 10)
+    hoja["filas"] = [_fila(f"B{i}") for i in range(25)]
+    # Un valor que el driver no puede enviar rompe su bloque completo.
+    hoja["filas"][12]["ubicacion"] = {"no": "serializable"}
+
+    resumen = _sincronizar(engine)
+    assert (resumen["creados_en_db"], resumen["filas_con_error"]) == (24, 1)
+    with Session(engine) as db:
+        assert len(db.exec(select(Articulo)).all()) == 24
@@ -0,0 +1,175 @@
+# testing/test_sync_incremental.py
+
+"""Tests de la sincronización incremental por huellas (SQLite en memoria, planilla simulada)."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import sincronizacion_manager
+from back.gestion.actualizaciones import actualizaciones_masivas
+from back.modelos import Articulo, ConfiguracionEmpresa, Empresa, SyncHuellaHoja, Tercero
+
+ID_EMPRESA = 1
+
+
+def _articulo(codigo, precio=100):
+    return {
+        "codigo_interno": codigo,
+        "descripcion": f"Artículo {codigo}",
+        "precio_venta": precio,
+        "precio_costo": 50,
+        "stock_actual": 10,
+        "categoria": "Bebidas",
+        "marca": "Marca X",
+        "Codigo de barras": "",
+    }
+
+
+def _cliente(codigo, nombre="Cliente"):
+    return {"id-cliente": codigo, "nombre-usuario": nombre, "whatsapp": "", "mail": "", "condicion-iva": ""}
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=ID_EMPRESA, nombre_legal="Empresa Sync", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=ID_EMPRESA, cuit="20123456789", nombre_negocio="Sync", link_google_sheets="https://sheet"))
+        db.commit()
+
+    planilla = {"articulos": [], "clientes": [], "modificada_en": None, "lecturas": 0}
+
+    class _HandlerSimulado:
+        def __init__(self, id_empresa=None, db=None):
+            pass
+
+        def obtener_modificacion_planilla(self):
+            return planilla["modificada_en"]
+
+        def cargar_articulos(self, nombre_hoja=None):
+            planilla["lecturas"] += 1
+            return [dict(f) for f in planilla["articulos"]]
+
+        def cargar_clientes(self):
+            planilla["lecturas"] += 1
+            return [dict(f) for f in planilla["clientes"]]
+
+    monkeypatch.setattr(sincronizacion_manager, "TablasHandler", _HandlerSimulado)
+    monkeypatch.setattr(actualizaciones_masivas, "TablasHandler", _HandlerSimulado)
+    return engine, planilla
+
+
+def _sync_articulos(engine, incremental=True):
+    with Session(engine) as db:
+        return sincronizacion_manager.sincronizar_articulos_desde_sheet(db, ID_EMPRESA, incremental=incremental)
+
+
+def _contar_escrituras(engine):
+    escrituras = []
+
+    def _contar(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            escrituras.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _contar)
+    return escrituras, lambda: event.remove(engine, "before_cursor_execute", _contar)
+
+
+def test_hoja_sin_cambios_no_escribe_y_planilla_sin_modificar_no_se_lee(entorno):
+    engine, planilla = entorno
+    planilla["articulos"] = [_articulo(f"A{i}") for i in range(50)]
+    planilla["modificada_en"] = "2026-10-17T10:00:00.000Z"
+    assert _sync_articulos(engine)["creados_en_db"] == 50
+
+    escrituras, quitar = _contar_escrituras(engine)
+    try:
+        resumen = _sync_articulos(engine)
+    finally:
+        quitar()
+    assert resumen["hoja_sin_cambios"] is True
+    assert planilla["lecturas"] == 1
+    assert escrituras == []
+
+    # Otra pestaña de la planilla cambió (p. ej. movimientos): se lee, pero la hoja es igual.
+    planilla["modificada_en"] = "2026-10-17T10:05:00.000Z"
+    escrituras, quitar = _contar_escrituras(engine)
+    try:
+        resumen = _sync_articulos(engine)
+    finally:
+        quitar()
+    assert (resumen["hoja_sin_cambios"], planilla["lecturas"]) == (True, 2)
+    assert all("sync_huellas_hojas" in sentencia for sentencia in escrituras)
+    assert _sync_articulos(engine)["hoja_sin_cambios"] is True
+    assert planilla["lecturas"] == 2
+
+
+def test_solo_se_aplican_las_filas_cambiadas_y_las_bajas_siguen_funcionando(entorno):
+    engine, planilla = entorno
+    planilla["articulos"] = [_articulo(f"A{i}") for i in range(10)]
+    _sync_articulos(engine)
+
+    # La DB se desvió en A1 (p. ej. una venta local): la fila de la hoja no cambió, no se pisa.
+    with Session(engine) as db:
+        a1 = db.exec(select(Articulo).where(Articulo.codigo_interno == "A1")).one()
+        a1.stock_actual = 7
+        db.add(a1)
+        db.commit()
+
+    planilla["articulos"][2]["precio_venta"] = 999
+    del planilla["articulos"][9]
+    resumen = _sync_articulos(engine)
+    assert (resumen["actualizados_en_db"], resumen["eliminados_en_db"]) == (1, 1)
+    assert resumen["filas_omitidas_por_huella"] == 8
+    with Session(engine) as db:
+        precios = {a.codigo_interno: (a.precio_venta, a.stock_actual) for a in db.exec(select(Articulo)).all()}
+    assert precios["A2"] == (999, 10)
+    assert precios["A1"] == (100, 7)
+    assert "A9" not in precios
+
+    # Vencida la reconciliación, la corrida incremental vuelve a aplicar la hoja completa.
+    with Session(engine) as db:
+        huella = db.exec(select(SyncHuellaHoja).where(SyncHuellaHoja.hoja == "articulos")).one()
+        huella.reconciliado_en = datetime.utcnow() - timedelta(days=1)
+        db.add(huella)
+        db.commit()
+    assert _sync_articulos(engine)["actualizados_en_db"] == 1
+    with Session(engine) as db:
+        assert db.exec(select(Articulo).where(Articulo.codigo_interno == "A1")).one().stock_actual == 10
+
+
+def test_clientes_incrementales_y_sincronizacion_manual_completa(entorno):
+    engine, planilla = entorno
+    planilla["clientes"] = [_cliente("C1"), _cliente("C2"), _cliente("")]
+    with Session(engine) as db:
+        resumen = actualizaciones_masivas.sincronizar_clientes_desde_sheets(db, ID_EMPRESA, incremental=True)
+    assert (resumen["creados"], resumen["errores"]) == (2, 1)
+
+    planilla["clientes"][1]["nombre-usuario"] = "Renombrado"
+    with Session(engine) as db:
+        c1 = db.exec(select(Tercero).where(Tercero.codigo_interno == "C1")).one()
+        c1.telefono = "local"
+        db.add(c1)
+        db.commit()
+        resumen = actualizaciones_masivas.sincronizar_clientes_desde_sheets(db, ID_EMPRESA, incremental=True)
+        assert (resumen["actualizados"], resumen["sin_cambios"]) == (1, 1)
+        assert db.exec(select(Tercero).where(Tercero.codigo_interno == "C1")).one().telefono == "local"
+
+        # La sincronización manual (no incremental) aplica todo aunque la hoja no haya cambiado.
+        resumen = actualizaciones_masivas.sincronizar_clientes_desde_sheets(db, ID_EMPRESA)
+        assert resumen["actualizados"] == 1
+        assert db.exec(select(Tercero).where(Tercero.codigo_interno == "C1")).one().telefono == ""
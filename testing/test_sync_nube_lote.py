@@ -0,0 +1,158 @@
+# testing/test_sync_nube_lote.py
+
+"""Tests del modo por lotes de la cola sync_nube contra una planilla simulada (SQLite en memoria)."""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+sys.path.insert(0, current_dir)
+
+from gspread_simulado import ClienteSimulado, PlanillaSimulada
+
+from back.gestion import sync_nube_queue_manager as cola
+from back.modelos import Articulo, ConfiguracionEmpresa, Empresa, SyncNubePendiente
+from back.utils import tablas_handler
+from back.utils.tablas_handler import TablasHandler
+
+ID_EMPRESA = 1
+
+
+def _limpiar_caches_handler():
+    for cache in (
+        TablasHandler._worksheet_title_cache,
+        TablasHandler._headers_cache,
+        TablasHandler._spreadsheet_cache,
+        TablasHandler._worksheets_index_cache,
+        TablasHandler._clientes_cache,
+        TablasHandler._modificacion_cache,
+        TablasHandler._cursor_filas,
+    ):
+        cache.clear()
+    TablasHandler._sheets_quota_blocked_until = None
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=ID_EMPRESA, nombre_legal="Empresa Cola", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.add(ConfiguracionEmpresa(id_empresa=ID_EMPRESA, cuit="20123456789", nombre_negocio="Cola", link_google_sheets="clave-planilla"))
+        db.add_all(
+            [
+                Articulo(id=1, codigo_interno="A1", descripcion="Uno", precio_venta=100, id_empresa=ID_EMPRESA),
+                Articulo(id=2, codigo_interno="A2", descripcion="Dos", precio_venta=100, id_empresa=ID_EMPRESA),
+                Articulo(id=3, codigo_interno="A3", descripcion="Tres", precio_venta=100, id_empresa=ID_EMPRESA),
+            ]
+        )
+        db.commit()
+
+    def _planilla():
+        return PlanillaSimulada(
+            {
+                "stock": [["codigo", "descripcion", "stock"], ["A1", "Uno", 10], ["A2", "Dos", 3], ["A3", "Tres", 5]],
+                "MOVIMIENTOS": [TablasHandler.encabezados_movimientos_swing()],
+            }
+        )
+
+    def _usar(planilla):
+        _limpiar_caches_handler()
+        monkeypatch.setattr(tablas_handler, "gspread_client", ClienteSimulado(planilla))
+        return planilla
+
+    yield engine, _planilla, _usar
+    _limpiar_caches_handler()
+
+
+def _encolar_ventas(engine, ventas):
+    with Session(engine) as db:
+        for i, items in enumerate(ventas):
+            cola.encolar_sync_nube_pendiente(
+                db, ID_EMPRESA, cola.OPERACION_REGISTRAR_MOVIMIENTO,
+                {"Tipo_movimiento": "venta", "monto": 100 + i, "descripcion": f"Venta {i}"},
+            )
+            cola.encolar_sync_nube_pendiente(
+                db, ID_EMPRESA, cola.OPERACION_RESTAR_STOCK,
+                {"articulos_vendidos": [{"id_articulo": a, "cantidad": c} for a, c in items]},
+            )
+        db.commit()
+
+
+def _procesar(engine, en_lote):
+    with Session(engine) as db:
+        return cola.procesar_cola_sync_nube(db, max_items=100, en_lote=en_lote)
+
+
+def test_lote_neta_stock_y_escribe_movimientos_juntos(entorno):
+    engine, nueva_planilla, usar = entorno
+    ventas = [[(1, 2), (2, 1)], [(1, 3)], [(2, 5)], [(2, 1), (3, 1)]]
+
+    _encolar_ventas(engine, ventas)
+    serie = usar(nueva_planilla())
+    resumen_serie = _procesar(engine, en_lote=False)
+
+    with Session(engine) as db:
+        for item in db.exec(select(SyncNubePendiente)).all():
+            db.delete(item)
+        db.commit()
+    _encolar_ventas(engine, ventas)
+    lote = usar(nueva_planilla())
+    resumen_lote = _procesar(engine, en_lote=True)
+
+    # La venta 3 pide 5 de A2 cuando quedan 2: se reprograma igual que en serie.
+    assert resumen_lote == resumen_serie == {"procesados": 8, "completados": 7, "reprogramados": 1, "fallidos": 0}
+    assert lote.hoja("stock").filas == serie.hoja("stock").filas
+    assert [fila[2] for fila in lote.hoja("stock").filas[1:]] == [5, 1, 4]
+    assert len(lote.hoja("MOVIMIENTOS").filas) == len(serie.hoja("MOVIMIENTOS").filas) == 5
+
+    assert (lote.llamadas["get_all_records"], lote.llamadas["batch_update"], lote.llamadas["update"]) == (1, 1, 1)
+    assert lote.total_llamadas < serie.total_llamadas / 2
+    # Item por item, solo la primera escritura de MOVIMIENTOS escanea columnas (después usa el cursor).
+    assert serie.llamadas["col_values"] == lote.llamadas["col_values"] == 4
+
+    with Session(engine) as db:
+        pendiente = db.exec(select(SyncNubePendiente).where(SyncNubePendiente.estado == "pendiente")).one()
+        assert pendiente.ultimo_error == "RuntimeError: Stock insuficiente para ID A2."
+
+
+def test_fallo_de_escritura_reprograma_todo_el_lote(entorno, monkeypatch):
+    engine, nueva_planilla, usar = entorno
+    _encolar_ventas(engine, [[(1, 1)], [(3, 1)]])
+    planilla = usar(nueva_planilla())
+
+    def _falla(*_args, **_kwargs):
+        raise RuntimeError("APIError: [429]: Quota exceeded")
+
+    monkeypatch.setattr(planilla.hoja("stock"), "batch_update", _falla)
+    resumen = _procesar(engine, en_lote=True)
+    assert (resumen["completados"], resumen["reprogramados"]) == (2, 2)
+    assert TablasHandler._sheets_quota_blocked_until is not None
+    with Session(engine) as db:
+        reprogramados = db.exec(select(SyncNubePendiente).where(SyncNubePendiente.estado == "pendiente")).all()
+        assert {p.operacion for p in reprogramados} == {cola.OPERACION_RESTAR_STOCK}
+
+
+def test_429_de_la_planilla_pausa_sheets_sin_mas_llamadas(entorno):
+    engine, nueva_planilla, usar = entorno
+    _encolar_ventas(engine, [[(1, 1)], [(3, 1)]])
+    planilla = usar(nueva_planilla())
+    planilla.fallar_429(1)
+
+    resumen = _procesar(engine, en_lote=False)
+    assert (resumen["completados"], resumen["reprogramados"]) == (0, 4)
+    assert dict(planilla.rechazos_429) == {"open_by_key": 1}
+    # Tras el 429 el handler pausa Sheets: el resto de la cola no vuelve a llamar a la API.
+    assert planilla.total_llamadas == 1
+    assert TablasHandler._sheets_quota_blocked_until is not None
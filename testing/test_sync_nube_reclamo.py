@@ -0,0 +1,160 @@
+# testing/test_sync_nube_reclamo.py
+
+"""Tests del reclamo con lease de la cola sync_nube (SQLite en memoria, sin Sheets)."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion import sync_nube_queue_manager as cola
+from back.modelos import Empresa, SyncNubePendiente
+
+_LOTE_REAL = cola._procesar_lote_empresa
+_RECLAMAR_REAL = cola.reclamar_pendientes
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Empresa(id=1, nombre_legal="Empresa Cola", cuit="20123456789", activa=True, creada_en=datetime.now(timezone.utc)))
+        db.commit()
+        for i in range(5):
+            cola.encolar_sync_nube_pendiente(db, 1, cola.OPERACION_REGISTRAR_MOVIMIENTO, {"monto": i})
+        db.commit()
+    monkeypatch.setattr(
+        cola, "_procesar_lote_empresa", lambda db, id_empresa, items, renovar=None: {i.id: None for i in renovar(items)}
+    )
+    return engine
+
+
+def test_workers_no_reclaman_los_mismos_items(engine):
+    with Session(engine) as db_a, Session(engine) as db_b:
+        a = cola.reclamar_pendientes(db_a, 3, "worker-a")
+        b = cola.reclamar_pendientes(db_b, 10, "worker-b")
+        assert len(a) == 3 and len(b) == 2
+        assert not {i.id for i in a} & {i.id for i in b}
+        assert cola.reclamar_pendientes(db_a, 10, "worker-c") == []
+
+        metricas = cola.metricas_cola_sync_nube(db_a, 1)
+        assert (metricas["profundidad"], metricas["listos"], metricas["leases_vencidos"]) == (5, 0, 0)
+        assert metricas["por_estado"] == {"procesando": 5}
+
+
+def test_lease_vencido_se_retoma_y_el_worker_original_no_pisa(engine, monkeypatch):
+    with Session(engine) as db:
+        lento = cola.reclamar_pendientes(db, 1, "worker-lento")
+        id_lento = lento[0].id
+        db.get(SyncNubePendiente, id_lento).lease_hasta = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        assert cola.metricas_cola_sync_nube(db)["leases_vencidos"] == 1
+
+    # Otro worker retoma el item vencido junto con los pendientes y los completa.
+    with Session(engine) as db:
+        assert cola.procesar_cola_sync_nube(db, max_items=10, worker_id="worker-nuevo")["completados"] == 5
+
+    # El worker lento termina tarde: ya no es dueño del lease y no toca el item.
+    with Session(engine) as db:
+        item = db.get(SyncNubePendiente, id_lento)
+        item.estado, item.reclamado_por = "procesando", "worker-otro"
+        item.lease_hasta = datetime.utcnow() + timedelta(minutes=1)
+        db.commit()
+
+    monkeypatch.setattr(cola, "reclamar_pendientes", lambda db, max_items, worker_id: [db.get(SyncNubePendiente, id_lento)])
+    with Session(engine) as db:
+        resumen = cola.procesar_cola_sync_nube(db, worker_id="worker-lento")
+        assert (resumen["completados"], resumen["lease_perdido"]) == (0, 1)
+        item = db.get(SyncNubePendiente, id_lento)
+        assert (item.estado, item.reclamado_por) == ("procesando", "worker-otro")
+
+
+def test_lease_se_renueva_antes_de_escribir_y_no_se_escribe_lo_ajeno(engine, monkeypatch):
+    escritos = []
+
+    class _HandlerSimulado:
+        ultimo_error_sync = None
+
+        def __init__(self, id_empresa=None, db=None):
+            pass
+
+        def registrar_movimientos(self, payloads):
+            escritos.extend(p["monto"] for p in payloads)
+            return True
+
+    def _reclamar_y_perder_dos(db, max_items, worker_id):
+        items = _RECLAMAR_REAL(db, max_items, worker_id, lease_sec=5)
+        # Mientras el worker esperaba cuota, el lease de dos items venció y otro worker los tomó.
+        for item in items[:2]:
+            item.reclamado_por = "worker-otro"
+            db.add(item)
+        db.commit()
+        return items
+
+    monkeypatch.setattr(cola, "TablasHandler", _HandlerSimulado)
+    monkeypatch.setattr(cola, "_procesar_lote_empresa", _LOTE_REAL)
+    monkeypatch.setattr(cola, "reclamar_pendientes", _reclamar_y_perder_dos)
+
+    with Session(engine) as db:
+        resumen = cola.procesar_cola_sync_nube(db, max_items=10, en_lote=True, worker_id="worker-lento")
+
+    assert sorted(escritos) == [2, 3, 4]
+    assert (resumen["completados"], resumen["lease_perdido"]) == (3, 2)
+    with Session(engine) as db:
+        ajenos = db.exec(select(SyncNubePendiente).where(SyncNubePendiente.reclamado_por == "worker-otro")).all()
+        assert [i.estado for i in ajenos] == ["procesando", "procesando"]
+
+
+def test_renovar_lease_extiende_solo_los_propios(engine):
+    with Session(engine) as db:
+        ids = [i.id for i in cola.reclamar_pendientes(db, 5, "worker-a", lease_sec=5)]
+        db.get(SyncNubePendiente, ids[0]).reclamado_por = "worker-b"
+        db.commit()
+
+        antes = datetime.utcnow()
+        assert cola.renovar_lease(db, ids, "worker-a", lease_sec=300) == set(ids[1:])
+        assert all(db.get(SyncNubePendiente, i).lease_hasta > antes + timedelta(seconds=200) for i in ids[1:])
+        assert db.get(SyncNubePendiente, ids[0]).lease_hasta < antes + timedelta(seconds=10)
+
+
+def test_renovar_lease_no_recarga_los_items_del_lote(engine, monkeypatch):
+    class _HandlerSimulado:
+        ultimo_error_sync = None
+
+        def __init__(self, id_empresa=None, db=None):
+            pass
+
+        def registrar_movimientos(self, payloads):
+            return True
+
+    monkeypatch.setattr(cola, "TablasHandler", _HandlerSimulado)
+    monkeypatch.setattr(cola, "_procesar_lote_empresa", _LOTE_REAL)
+    consultas = []
+
+    def _contar(_conn, _cursor, sentencia, *_args):
+        consultas.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", _contar)
+    try:
+        with Session(engine) as db:
+            resumen = cola.procesar_cola_sync_nube(db, max_items=10, en_lote=True, worker_id="worker-a")
+    finally:
+        event.remove(engine, "before_cursor_execute", _contar)
+
+    assert resumen["completados"] == 5
+    # Reclamo, renovación y cierre van por lote: leer payloads no dispara un SELECT por item.
+    recargas = [s for s in consultas if s.lstrip().startswith("SELECT") and "WHERE sync_nube_pendientes.id = ?" in s]
+    assert recargas == []
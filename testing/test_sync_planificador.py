@@ -0,0 +1,244 @@
+# testing/test_sync_planificador.py
+
+"""Tests del planificador de la sync automática: turnos, cupos, prioridad e intervalo adaptativo."""
+
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from back.gestion.sync_planificador import (
+    PlanificadorSync,
+    desfase_empresa,
+    estado_planificador,
+    filas_de_resultado,
+    intervalo_adaptado,
+    proxima_en_turno,
+)
+from back.modelos import SyncEmpresaEstado
+
+
+def _resultado(creados=0, sin_cambios=100, status="success"):
+    return {
+        "status": status,
+        "pasos": {
+            "articulos": {"ok": True, "resultado": {"leidos_de_sheet": 100, "creados_en_db": creados, "actualizados_en_db": 0}},
+            "clientes": {"ok": True, "resultado": {"creados": 0, "actualizados": 0, "sin_cambios": sin_cambios, "errores": 0}},
+        },
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Archivo (no memoria): las syncs corren en los hilos del pool del planificador.
+    engine = create_engine(f"sqlite:///{tmp_path / 'planificador.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _vencer(engine, ids, ahora, ultimo_cambio=None):
+    with Session(engine) as db:
+        for id_empresa in ids:
+            estado = db.get(SyncEmpresaEstado, id_empresa)
+            estado.proxima_ejecucion = ahora - timedelta(seconds=1)
+            estado.ultimo_cambio_en = ultimo_cambio.get(id_empresa) if ultimo_cambio else None
+            db.add(estado)
+        db.commit()
+
+
+def test_turnos_repartidos_en_el_intervalo_y_estables():
+    desde = datetime(2026, 10, 17, 12, 0, 7)
+    turnos = [proxima_en_turno(i, 300, desde) for i in range(1, 61)]
+
+    assert turnos == [proxima_en_turno(i, 300, desde) for i in range(1, 61)]
+    assert all(desde <= t < desde + timedelta(seconds=300) for t in turnos)
+    assert all(int((t - datetime(1970, 1, 1)).total_seconds()) % 300 == desfase_empresa(i, 300) for i, t in zip(range(1, 61), turnos))
+    # 60 empresas no arrancan todas juntas: se reparten en muchos segundos distintos del intervalo.
+    assert len(set(turnos)) > 40
+    assert max(turnos) - min(turnos) > timedelta(seconds=200)
+
+
+def test_filas_e_intervalo_adaptativo():
+    assert filas_de_resultado(_resultado(creados=3, sin_cambios=50)) == (150, 3)
+    assert filas_de_resultado({"status": "busy", "pasos": {}}) == (0, 0)
+
+    assert intervalo_adaptado(300, 1800, 0, None) == 300
+    assert intervalo_adaptado(300, 1800, 2, None) == 1200
+    assert intervalo_adaptado(300, 1800, 10, None) == 1800
+    # Una empresa cuya sync tarda 2 minutos no vuelve a correr antes de 8.
+    assert intervalo_adaptado(300, 1800, 0, 120_000) == 480
+
+
+def test_cupos_global_y_por_cuenta_con_prioridad_a_ediciones_recientes(engine):
+    liberar = threading.Event()
+    corridas = []
+
+    def sincronizar(id_empresa):
+        corridas.append(id_empresa)
+        liberar.wait(5)
+        return _resultado()
+
+    planificador = PlanificadorSync(
+        engine, sincronizar, intervalo_base_sec=300, max_concurrentes=2, max_por_cuenta=1,
+        cuenta_de=lambda id_empresa: "a" if id_empresa <= 2 else "b",
+    )
+    try:
+        planificador.actualizar_empresas([1, 2, 3, 4])
+        ahora = datetime.utcnow()
+        _vencer(engine, [1, 2, 3, 4], ahora, ultimo_cambio={4: ahora - timedelta(minutes=5)})
+
+        assert planificador.despachar(ahora) == [4, 1]
+        with Session(engine) as db:
+            estado = estado_planificador(db)
+        assert sorted(e["id_empresa"] for e in estado["en_curso"]) == [1, 4]
+        assert sorted(e["id_empresa"] for e in estado["en_cola"]) == [2, 3]
+        # Sin cupo no se lanza nada más.
+        assert planificador.despachar(ahora) == []
+
+        liberar.set()
+        planificador.esperar(5)
+        assert sorted(planificador.despachar(ahora)) == [2, 3]
+        planificador.esperar(5)
+    finally:
+        planificador.cerrar()
+    assert sorted(corridas) == [1, 2, 3, 4]
+
+
+def test_corrida_registra_tiempos_y_adapta_el_intervalo(engine):
+    resultados = [_resultado(), _resultado(), _resultado(creados=5)]
+    planificador = PlanificadorSync(engine, lambda _id: resultados.pop(0), intervalo_base_sec=300, intervalo_max_sec=1800)
+    try:
+        planificador.actualizar_empresas([7])
+        intervalos = []
+        for _ in range(3):
+            ahora = datetime.utcnow()
+            _vencer(engine, [7], ahora)
+            assert planificador.despachar(ahora) == [7]
+            planificador.esperar(5)
+            with Session(engine) as db:
+                estado = db.get(SyncEmpresaEstado, 7)
+                intervalos.append(estado.intervalo_sec)
+                assert estado.estado == "programada"
+                assert estado.proxima_ejecucion > ahora
+                assert int((estado.proxima_ejecucion - datetime(1970, 1, 1)).total_seconds()) % 300 == desfase_empresa(7, 300)
+    finally:
+        planificador.cerrar()
+
+    assert intervalos == [600, 1200, 300]
+    with Session(engine) as db:
+        estado = db.exec(select(SyncEmpresaEstado)).one()
+    assert (estado.corridas, estado.ultimas_filas_leidas, estado.ultimas_filas_cambiadas) == (3, 200, 5)
+    assert estado.ultimo_cambio_en is not None and estado.ultima_duracion_ms is not None
+
+
+def test_dos_procesos_no_corren_la_misma_empresa_y_comparten_cupos(engine):
+    liberar = threading.Event()
+    corridas = []
+
+    def sincronizar(id_empresa):
+        corridas.append(id_empresa)
+        liberar.wait(5)
+        return _resultado()
+
+    # La API y el sync_worker: cada uno con su planificador sobre la misma tabla.
+    api, worker = (
+        PlanificadorSync(engine, sincronizar, max_concurrentes=2, max_por_cuenta=2) for _ in range(2)
+    )
+    try:
+        for planificador in (api, worker):
+            planificador.actualizar_empresas([1, 2, 3])
+        ahora = datetime.utcnow()
+        _vencer(engine, [1, 2, 3], ahora)
+
+        assert api.despachar(ahora) == [1, 2]
+        # Las vencidas en curso en el otro proceso no se lanzan y el cupo total ya está lleno.
+        assert worker.despachar(ahora) == []
+        # Reconciliar empresas en el otro proceso no pisa las corridas vivas.
+        worker.actualizar_empresas([1, 2, 3])
+        with Session(engine) as db:
+            assert sorted(e["id_empresa"] for e in estado_planificador(db)["en_curso"]) == [1, 2]
+
+        liberar.set()
+        api.esperar(5)
+        assert worker.despachar(ahora) == [3]
+        worker.esperar(5)
+    finally:
+        api.cerrar()
+        worker.cerrar()
+    assert sorted(corridas) == [1, 2, 3]
+
+
+def test_corrida_abandonada_se_retoma_y_la_vieja_no_pisa_el_estado(engine):
+    liberar = threading.Event()
+    caido = PlanificadorSync(engine, lambda _id: liberar.wait(5) and _resultado(creados=1), ejecucion_max_sec=60)
+    vivo = PlanificadorSync(engine, lambda _id: _resultado(), ejecucion_max_sec=60)
+    try:
+        caido.actualizar_empresas([5])
+        vivo.actualizar_empresas([5])
+        ahora = datetime.utcnow()
+        _vencer(engine, [5], ahora)
+        assert caido.despachar(ahora) == [5]
+        assert vivo.despachar(ahora) == []
+
+        # Pasado SYNC_EJECUCION_MAX_SECONDS se da por abandonada y otro proceso la retoma.
+        assert vivo.despachar(ahora + timedelta(seconds=61)) == [5]
+        vivo.esperar(5)
+        liberar.set()
+        caido.esperar(5)
+    finally:
+        caido.cerrar()
+        vivo.cerrar()
+    with Session(engine) as db:
+        estado = db.get(SyncEmpresaEstado, 5)
+    assert (estado.estado, estado.corridas, estado.ultimas_filas_cambiadas) == ("programada", 1, 0)
+
+
+def test_edicion_en_la_planilla_corta_el_backoff(engine):
+    modificacion = {8: "2026-10-17T12:00:00Z"}
+    consultas = []
+
+    def modificacion_de(id_empresa):
+        consultas.append(id_empresa)
+        return modificacion[id_empresa]
+
+    planificador = PlanificadorSync(
+        engine, lambda _id: _resultado(), intervalo_base_sec=300, intervalo_max_sec=1800, modificacion_de=modificacion_de
+    )
+    try:
+        planificador.actualizar_empresas([8])
+        for _ in range(2):
+            ahora = datetime.utcnow()
+            _vencer(engine, [8], ahora)
+            assert planificador.despachar(ahora) == [8]
+            planificador.esperar(5)
+        with Session(engine) as db:
+            estado = db.get(SyncEmpresaEstado, 8)
+            assert (estado.intervalo_sec, estado.modificacion_planilla) == (1200, "2026-10-17T12:00:00Z")
+            corrida = estado.ultimo_inicio
+            turno_estirado = estado.proxima_ejecucion
+
+        # Dentro del intervalo base no se vuelve a mirar Drive.
+        consultas.clear()
+        assert planificador.revisar_modificaciones([8], corrida + timedelta(seconds=60)) == []
+        assert consultas == []
+        # Sin edición solo queda registrada la revisión.
+        despues = corrida + timedelta(seconds=301)
+        assert planificador.revisar_modificaciones([8], despues) == []
+        assert consultas == [8]
+
+        modificacion[8] = "2026-10-17T12:07:00Z"
+        despues += timedelta(seconds=301)
+        assert planificador.revisar_modificaciones([8], despues) == [8]
+        with Session(engine) as db:
+            estado = db.get(SyncEmpresaEstado, 8)
+        assert (estado.intervalo_sec, estado.corridas_sin_cambios) == (300, 0)
+        assert despues <= estado.proxima_ejecucion < min(turno_estirado, despues + timedelta(seconds=300))
+    finally:
+        planificador.cerrar()